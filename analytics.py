@@ -0,0 +1,302 @@
+"""Relatórios de adesão, calorias e progresso em arrays NumPy, no processo.
+
+As consultas 3 (calorias por dia), 5 (pacientes com adesão abaixo de 80%) e
+6 (progresso das medidas) rodam hoje como agregação no MongoDB ou Cypher a
+cada pedido. Aqui os campos que elas usam ficam em arrays colunares
+ordenados por (paciente, data), e cada relatório é um group-by vetorizado:
+as fronteiras dos grupos saem de uma comparação entre vizinhos e as somas de
+``np.add.reduceat`` sobre esses deslocamentos, sem laço em Python por linha.
+
+Os arrays são carregados uma vez (do MongoDB com cursor em lotes, ou da
+exportação Parquet de ``parquet_export.py``) e mantidos em dia com
+``append``: as linhas novas são ordenadas entre si e intercaladas nas
+existentes por busca binária na chave (paciente, data), em tempo linear,
+sem reordenar tudo.
+
+A chave combina o id do paciente (até 2**31 - 1) e a data em segundos num
+inteiro de 64 bits; datas vão de 1901 a 2038.
+
+Uso::
+
+    meals = MealColumns.from_mongodb(db)
+    meals.daily_calories(patient_id=1)          # consulta 3
+    adherence_below(meals, names, 0.8)          # consulta 5
+    measurements.progress(patient_id=1)         # consulta 6
+"""
+
+import numpy as np
+
+from mongo_dump import CURSOR_BATCH_SIZE
+
+ADHERENCE_THRESHOLD = 0.8
+COMPLETE = "Completa"
+_TIME_OFFSET = 2**31
+
+
+def _seconds(dates):
+    """Datas (datetime ou datetime64) em segundos desde 1970, como int64."""
+    return np.asarray(dates, dtype="datetime64[s]").astype(np.int64)
+
+
+def sort_key(patients, seconds):
+    """Chave de ordenação (paciente, data) num único int64."""
+    return (np.asarray(patients, dtype=np.int64) << 32) | (
+        np.asarray(seconds, dtype=np.int64) + _TIME_OFFSET
+    )
+
+
+def group_starts(*keys):
+    """Índices onde começa cada grupo de valores iguais consecutivos das chaves."""
+    size = len(keys[0])
+    if not size:
+        return np.zeros(0, dtype=np.intp)
+    changed = np.zeros(size, dtype=bool)
+    changed[0] = True
+    for key in keys:
+        changed[1:] |= key[1:] != key[:-1]
+    return np.flatnonzero(changed)
+
+
+class PatientColumns:
+    """Colunas de eventos de pacientes, ordenadas por (paciente, data).
+
+    ``patient`` (int64) e ``time`` (segundos, int64) são obrigatórias; as
+    demais colunas são as de ``FIELDS``.
+    """
+
+    FIELDS = {}  # nome: dtype
+
+    def __init__(self, patient, time, **columns):
+        self.patient = np.asarray(patient, dtype=np.int64)
+        self.time = np.asarray(time, dtype=np.int64)
+        self.columns = {
+            name: np.asarray(columns[name], dtype=dtype)
+            for name, dtype in self.FIELDS.items()
+        }
+        order = np.argsort(sort_key(self.patient, self.time), kind="stable")
+        self._take(order)
+
+    def _take(self, order):
+        self.patient = self.patient[order]
+        self.time = self.time[order]
+        self.columns = {name: values[order] for name, values in self.columns.items()}
+        self.key = sort_key(self.patient, self.time)
+
+    def __len__(self):
+        return len(self.patient)
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Monta as colunas a partir de documentos, convertidos por ``row``."""
+        names = ("patient", "time", *cls.FIELDS)
+        values = {name: [] for name in names}
+        for row in rows:
+            for name, value in zip(names, cls.row(row)):
+                values[name].append(value)
+        return cls(values.pop("patient"), _seconds(values.pop("time")), **values)
+
+    @classmethod
+    def row(cls, document):
+        """Valores (paciente, data, *FIELDS) de um documento."""
+        raise NotImplementedError
+
+    def append(self, other):
+        """Intercala as linhas de ``other`` (da mesma classe) nas existentes.
+
+        As linhas novas são ordenadas entre si; as posições de inserção saem
+        de uma busca binária na chave, e cada coluna é copiada uma vez.
+        Linhas com a mesma chave entram depois das existentes.
+        """
+        if not len(other):
+            return self
+        positions = np.searchsorted(self.key, other.key, side="right")
+        self.patient = np.insert(self.patient, positions, other.patient)
+        self.time = np.insert(self.time, positions, other.time)
+        self.columns = {
+            name: np.insert(values, positions, other.columns[name])
+            for name, values in self.columns.items()
+        }
+        self.key = np.insert(self.key, positions, other.key)
+        return self
+
+    def patient_slice(self, patient_id):
+        """Fatia das linhas do paciente (ordenadas por data)."""
+        start, end = np.searchsorted(self.patient, [patient_id, patient_id + 1])
+        return slice(start, end)
+
+    def patient_groups(self):
+        """(ids dos pacientes, início de cada grupo, tamanho de cada grupo)."""
+        starts = group_starts(self.patient)
+        sizes = np.diff(np.append(starts, len(self)))
+        return self.patient[starts], starts, sizes
+
+
+class MealColumns(PatientColumns):
+    """Refeições: calorias e se a adesão foi completa."""
+
+    FIELDS = {"calories": np.float64, "complete": np.bool_}
+
+    @classmethod
+    def row(cls, document):
+        return (
+            document["paciente_id"],
+            document["data"],
+            document.get("calorias") or 0,
+            document.get("adesao") == COMPLETE,
+        )
+
+    @classmethod
+    def from_mongodb(cls, db):
+        """Lê as refeições com um cursor em lotes, só com os campos usados."""
+        projection = {"paciente_id": 1, "data": 1, "calorias": 1, "adesao": 1}
+        cursor = db.meals.find({}, projection).batch_size(CURSOR_BATCH_SIZE)
+        try:
+            return cls.from_rows(cursor)
+        finally:
+            cursor.close()
+
+    @classmethod
+    def from_parquet(cls, directory):
+        """Lê as refeições da exportação de parquet_export.py."""
+        import pyarrow.compute as pc
+
+        from parquet_export import read_collection
+
+        table = read_collection(directory, "meals")
+        return cls(
+            table.column("paciente_id").to_numpy(),
+            _seconds(table.column("data").to_numpy()),
+            calories=table.column("calorias").fill_null(0).to_numpy(),
+            complete=pc.equal(table.column("adesao"), COMPLETE)
+            .fill_null(False)
+            .to_numpy(),
+        )
+
+    def daily_calories(self, patient_id=None):
+        """Consulta 3: calorias somadas por paciente e dia.
+
+        Retorna (pacientes, dias como datetime64[D], totais), em ordem de
+        paciente e dia; com ``patient_id``, só as do paciente.
+        """
+        part = self.patient_slice(patient_id) if patient_id is not None else slice(None)
+        patients = self.patient[part]
+        days = self.time[part] // 86400
+        starts = group_starts(patients, days)
+        calories = self["calories"][part]
+        totals = np.add.reduceat(calories, starts) if len(starts) else calories
+        return patients[starts], days[starts].astype("datetime64[D]"), totals
+
+    def adherence(self):
+        """Por paciente: (ids, total de refeições, refeições completas, taxa)."""
+        patients, starts, sizes = self.patient_groups()
+        complete = self["complete"].astype(np.int64)
+        if len(starts):
+            complete = np.add.reduceat(complete, starts)
+        return patients, sizes, complete, complete / sizes
+
+
+def adherence_below(meals, names, threshold=ADHERENCE_THRESHOLD):
+    """Consulta 5: pacientes com taxa de adesão abaixo do limite, da menor para a maior.
+
+    ``names`` mapeia o id do paciente ao nome; retorna linhas no formato da
+    agregação documentada.
+    """
+    patients, totals, complete, rates = meals.adherence()
+    below = np.flatnonzero(rates < threshold)
+    order = below[np.argsort(rates[below], kind="stable")]
+    return [
+        {
+            "nome": names.get(int(patients[i])),
+            "totalRefeicoes": int(totals[i]),
+            "refeicoesCompletas": int(complete[i]),
+            "taxaAdesao": float(rates[i]),
+        }
+        for i in order
+        if int(patients[i]) in names
+    ]
+
+
+class MeasurementColumns(PatientColumns):
+    """Medidas corporais: peso, IMC, gordura corporal, cintura e quadril."""
+
+    FIELDS = {
+        "weight": np.float64,
+        "bmi": np.float64,
+        "body_fat": np.float64,
+        "waist": np.float64,
+        "hip": np.float64,
+    }
+
+    @classmethod
+    def row(cls, document):
+        measures = document.get("medidas") or {}
+        return (
+            document["paciente_id"],
+            document["data"],
+            _number(document.get("peso")),
+            _number(document.get("imc")),
+            _number(document.get("gordura_corporal")),
+            _number(measures.get("cintura")),
+            _number(measures.get("quadril")),
+        )
+
+    @classmethod
+    def from_mongodb(cls, db):
+        """Lê as medidas com um cursor em lotes, só com os campos usados."""
+        projection = {
+            "paciente_id": 1,
+            "data": 1,
+            "peso": 1,
+            "imc": 1,
+            "gordura_corporal": 1,
+            "medidas.cintura": 1,
+            "medidas.quadril": 1,
+        }
+        cursor = db.measurements.find({}, projection).batch_size(CURSOR_BATCH_SIZE)
+        try:
+            return cls.from_rows(cursor)
+        finally:
+            cursor.close()
+
+    @classmethod
+    def from_parquet(cls, directory):
+        """Lê as medidas da exportação de parquet_export.py."""
+        import pyarrow.compute as pc
+
+        from parquet_export import read_collection
+
+        table = read_collection(directory, "measurements")
+
+        def column(values):
+            return values.fill_null(np.nan).to_numpy()
+
+        return cls(
+            table.column("paciente_id").to_numpy(),
+            _seconds(table.column("data").to_numpy()),
+            weight=column(table.column("peso")),
+            bmi=column(table.column("imc")),
+            body_fat=column(table.column("gordura_corporal")),
+            waist=column(pc.struct_field(table.column("medidas"), "cintura")),
+            hip=column(pc.struct_field(table.column("medidas"), "quadril")),
+        )
+
+    def progress(self, patient_id):
+        """Consulta 6: as medidas do paciente em ordem de data, como dict de arrays."""
+        part = self.patient_slice(patient_id)
+        series = {name: values[part] for name, values in self.columns.items()}
+        series["date"] = self.time[part].astype("datetime64[s]")
+        return series
+
+    def weight_change(self):
+        """Por paciente: (ids, peso da primeira medida, variação até a última)."""
+        patients, starts, sizes = self.patient_groups()
+        weight = self["weight"]
+        first = weight[starts]
+        return patients, first, weight[starts + sizes - 1] - first
+
+
+def _number(value):
+    return np.nan if value is None else value
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+"""
+Compara os relatórios NumPy de analytics.py com as agregações do MongoDB.
+
+Gera ``--meals`` refeições sintéticas (4 por paciente e dia, adesão
+"Completa" em 70% delas) num banco de rascunho, apagado ao final, e mede
+cada relatório de coorte das duas formas, REPEATS vezes (mediana):
+
+- calorias por paciente e dia (a consulta 3 para todos os pacientes);
+- pacientes com adesão abaixo de 80% (a consulta 5, com o $lookup do nome).
+
+O tempo de montar os arrays (leitura com cursor) é mostrado à parte: é
+pago uma vez e mantido em dia com ``append``. Falha se algum relatório
+NumPy não for pelo menos MIN_SPEEDUP vezes mais rápido que a agregação.
+Com ``--backend memory`` usa o MemoryClient (sem servidor, bem mais lento).
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import analytics  # noqa: E402
+from load_mongodb_data import MONGO_URI  # noqa: E402
+from queries import MONGODB_QUERIES  # noqa: E402
+
+BENCH_DB = "diet_app_bench"
+INSERT_BATCH = 10_000
+MEALS_PER_DAY = 4
+REPEATS = 5
+MIN_SPEEDUP = 10
+
+DAILY_CALORIES = [
+    {
+        "$group": {
+            "_id": {
+                "paciente_id": "$paciente_id",
+                "dia": {"$dateToString": {"format": "%Y-%m-%d", "date": "$data"}},
+            },
+            "totalCalorias": {"$sum": "$calorias"},
+        }
+    },
+    {"$sort": {"_id": 1}},
+]
+
+
+def generate(db, meals, seed=0):
+    """Grava as refeições e os pacientes sintéticos no banco de rascunho."""
+    rng = np.random.default_rng(seed)
+    patients = max(1, meals // (MEALS_PER_DAY * 30))
+    db.meals.drop()
+    db.patients.drop()
+    db.patients.insert_many(
+        [{"_id": i, "nome": f"Paciente {i}"} for i in range(1, patients + 1)]
+    )
+    first = np.datetime64("2023-01-01")
+    for start in range(0, meals, INSERT_BATCH):
+        ids = np.arange(start, min(start + INSERT_BATCH, meals))
+        slot = ids // MEALS_PER_DAY
+        days = first + (slot // patients).astype("timedelta64[D]")
+        calories = rng.integers(150, 800, len(ids))
+        complete = rng.random(len(ids)) < 0.7
+        db.meals.insert_many(
+            [
+                {
+                    "_id": int(i + 1),
+                    "paciente_id": int(p),
+                    "data": datetime.fromisoformat(str(d)),
+                    "calorias": int(c),
+                    "adesao": "Completa" if ok else "Parcial",
+                }
+                for i, p, d, c, ok in zip(
+                    ids, slot % patients + 1, days, calories, complete
+                )
+            ]
+        )
+    return patients
+
+
+def median_seconds(func):
+    timings = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--meals", type=int, default=1_000_000)
+    parser.add_argument("--backend", choices=("mongodb", "memory"), default="mongodb")
+    args = parser.parse_args(argv)
+
+    if args.backend == "memory":
+        from memory_mongo import MemoryClient
+
+        client = MemoryClient()
+    else:
+        from pymongo import MongoClient
+
+        client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
+    db = client[BENCH_DB]
+    try:
+        patients = generate(db, args.meals)
+        started = time.perf_counter()
+        meals = analytics.MealColumns.from_mongodb(db)
+        names = {doc["_id"]: doc["nome"] for doc in db.patients.find()}
+        load = time.perf_counter() - started
+
+        low_adherence = MONGODB_QUERIES[5]["pipeline"]
+        reports = {
+            "calorias por paciente e dia": (
+                lambda: list(db.meals.aggregate(DAILY_CALORIES, allowDiskUse=True)),
+                meals.daily_calories,
+            ),
+            "adesão abaixo de 80%": (
+                lambda: list(db.meals.aggregate(low_adherence, allowDiskUse=True)),
+                lambda: analytics.adherence_below(meals, names),
+            ),
+        }
+        print(f"{args.meals} refeições, {patients} pacientes ({args.backend})")
+        print(f"Montagem dos arrays: {load:.2f} s (uma vez)")
+        success = True
+        for name, (aggregation, numpy_report) in reports.items():
+            server = median_seconds(aggregation)
+            local = median_seconds(numpy_report)
+            speedup = server / local
+            success &= speedup >= MIN_SPEEDUP
+            print(
+                f"{name}: agregação {server * 1e3:.1f} ms, NumPy {local * 1e3:.1f} ms "
+                f"({speedup:.0f}x)"
+            )
+        return success
+    finally:
+        client.drop_database(BENCH_DB)
+        client.close()
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
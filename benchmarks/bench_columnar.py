@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+"""
+Mede a leitura dos loaders a partir do snapshot colunar (columnar.py).
+
+Gera (ou reaproveita, se já existe) o snapshot de um conjunto sintético com
+``--patients`` pacientes e percorre todas as tabelas em lotes do tamanho
+usado pelos loaders, como eles fariam, sem banco. Mostra o tempo de geração
+(zero quando o snapshot foi reaproveitado), o tempo até o primeiro lote, o
+tempo total de leitura e a memória residente antes, durante (máxima) e
+depois da leitura. Com o mmap a memória residente acompanha o lote corrente,
+não o tamanho do conjunto; a verificação falha se o acréscimo passar de
+MAX_RSS_GROWTH.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import columnar  # noqa: E402
+
+BATCH_SIZE = 1000
+MAX_RSS_GROWTH = 256 * 2**20  # bytes
+
+
+def resident_bytes():
+    """Memória residente atual do processo (Linux), em bytes."""
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+    return pages * 4096
+
+
+def stream(snapshot):
+    """Percorre todas as tabelas em lotes; retorna linhas, 1º lote e RSS máxima."""
+    readers = [reader for *_, reader in snapshot.nodes()]
+    readers += [reader for *_, reader in snapshot.relationships()]
+    readers += [reader for *_, reader in snapshot.collections()]
+    started = time.perf_counter()
+    first = None
+    rows = 0
+    peak = resident_bytes()
+    for reader in readers:
+        for batch in reader.iter_batches(BATCH_SIZE):
+            if first is None:
+                first = time.perf_counter() - started
+            rows += len(batch)
+            peak = max(peak, resident_bytes())
+        reader.close()
+    return rows, first, peak
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--patients", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    directory = columnar.ensure_snapshot(args.patients, args.seed)
+    generation = time.perf_counter() - started
+    snapshot = columnar.ColumnarSnapshot(directory)
+    size = sum(path.stat().st_size for path in directory.rglob("*.arrow"))
+
+    before = resident_bytes()
+    started = time.perf_counter()
+    rows, first, peak = stream(snapshot)
+    elapsed = time.perf_counter() - started
+    after = resident_bytes()
+
+    print(f"Snapshot: {directory} ({size / 2**20:.1f} MB)")
+    print(f"Geração: {generation:.2f} s (0 quando reaproveitado)")
+    print(f"Primeiro lote: {first * 1e3:.2f} ms")
+    print(f"Leitura: {rows} linhas em {elapsed:.2f} s ({rows / elapsed:,.0f} linhas/s)")
+    print(
+        f"Memória residente: {before / 2**20:.0f} MB antes, "
+        f"{peak / 2**20:.0f} MB no máximo, {after / 2**20:.0f} MB depois"
+    )
+    return peak - before < MAX_RSS_GROWTH
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,237 @@
+#!/usr/bin/env python
+"""
+Compara as consultas 8 e 10 com ``$lookup`` e com as referências estendidas.
+
+Gera ``--messages`` mensagens e ``--appointments`` consultas sintéticas
+(com os ids e as cópias ``{id, nome}`` dos participantes) num banco de
+rascunho, apagado ao final, e mede cada consulta das duas formas, REPEATS
+vezes (mediana): a versão anterior, com os quatro (ou dois) ``$lookup`` em
+``nutritionists``/``patients``, e a documentada, que lê os nomes embutidos.
+Mede também o job de propagação depois da troca de nome de um
+nutricionista. Falha se alguma consulta sem ``$lookup`` não for mais
+rápida. Com ``--backend memory`` usa o MemoryClient (sem servidor).
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import extended_references  # noqa: E402
+from load_mongodb_data import MONGO_URI  # noqa: E402
+from queries import MONGODB_QUERIES  # noqa: E402
+
+BENCH_DB = "diet_app_bench"
+INSERT_BATCH = 10_000
+PATIENTS_PER_NUTRITIONIST = 50
+REPEATS = 5
+FIRST_DAY = datetime(2023, 1, 1)
+
+
+def lookup(collection, local_field, alias):
+    return {
+        "$lookup": {
+            "from": collection,
+            "localField": local_field,
+            "foreignField": "_id",
+            "as": alias,
+        }
+    }
+
+
+def first_name(alias):
+    return {"$arrayElemAt": [f"${alias}.nome", 0]}
+
+
+# As consultas 8 e 10 como eram antes das referências estendidas
+LOOKUP_QUERIES = {
+    8: {
+        "collection": "messages",
+        "pipeline": [
+            lookup("nutritionists", "de_id", "nutricionista_de"),
+            lookup("patients", "de_id", "paciente_de"),
+            lookup("nutritionists", "para_id", "nutricionista_para"),
+            lookup("patients", "para_id", "paciente_para"),
+            {
+                "$project": {
+                    "remetente": {
+                        "$cond": {
+                            "if": {"$eq": ["$de_tipo", "nutricionista"]},
+                            "then": first_name("nutricionista_de"),
+                            "else": first_name("paciente_de"),
+                        }
+                    },
+                    "destinatario": {
+                        "$cond": {
+                            "if": {"$eq": ["$para_tipo", "nutricionista"]},
+                            "then": first_name("nutricionista_para"),
+                            "else": first_name("paciente_para"),
+                        }
+                    },
+                    "data": 1,
+                    "hora": 1,
+                    "conteudo": 1,
+                    "_id": 0,
+                }
+            },
+            {"$sort": {"data": 1, "hora": 1}},
+        ],
+    },
+    10: {
+        "collection": "appointments",
+        "pipeline": [
+            {"$match": {"status": "Agendada"}},
+            lookup("patients", "paciente_id", "paciente"),
+            lookup("nutritionists", "nutricionista_id", "nutricionista"),
+            {"$unwind": "$paciente"},
+            {"$unwind": "$nutricionista"},
+            {
+                "$project": {
+                    "paciente": "$paciente.nome",
+                    "nutricionista": "$nutricionista.nome",
+                    "data": 1,
+                    "hora": 1,
+                    "_id": 0,
+                }
+            },
+            {"$sort": {"data": 1, "hora": 1}},
+        ],
+    },
+}
+
+
+def insert(collection, documents):
+    for start in range(0, len(documents), INSERT_BATCH):
+        collection.insert_many(documents[start : start + INSERT_BATCH])
+
+
+def generate(db, messages, appointments):
+    """Grava participantes, mensagens e consultas sintéticas no banco de rascunho."""
+    patients = max(1, messages // 20)
+    nutritionists = max(1, patients // PATIENTS_PER_NUTRITIONIST)
+    for name in ("nutritionists", "patients", "messages", "appointments"):
+        db[name].drop()
+    insert(
+        db.nutritionists,
+        [{"_id": i, "nome": f"Nutricionista {i}"} for i in range(1, nutritionists + 1)],
+    )
+    insert(
+        db.patients,
+        [{"_id": i, "nome": f"Paciente {i}"} for i in range(1, patients + 1)],
+    )
+
+    def nutritionist_of(patient_id):
+        return (patient_id - 1) % nutritionists + 1
+
+    message_docs = []
+    for i in range(messages):
+        patient_id = i % patients + 1
+        ids = {"nutricionista": nutritionist_of(patient_id), "paciente": patient_id}
+        sender = "nutricionista" if i % 2 else "paciente"
+        receiver = "paciente" if i % 2 else "nutricionista"
+        message_docs.append(
+            {
+                "_id": i + 1,
+                "de_id": ids[sender],
+                "de_tipo": sender,
+                "para_id": ids[receiver],
+                "para_tipo": receiver,
+                "conteudo": f"Mensagem {i + 1}",
+                "data": FIRST_DAY + timedelta(days=i % 365),
+                "hora": f"{8 + i % 10:02d}:00",
+                "lida": bool(i % 3),
+            }
+        )
+    appointment_docs = [
+        {
+            "_id": i + 1,
+            "nutricionista_id": nutritionist_of(i % patients + 1),
+            "paciente_id": i % patients + 1,
+            "data": FIRST_DAY + timedelta(days=i % 365),
+            "hora": f"{8 + i % 10:02d}:00",
+            "status": "Agendada" if i % 2 else "Realizada",
+        }
+        for i in range(appointments)
+    ]
+    nutritionist_docs = list(db.nutritionists.find())
+    patient_docs = list(db.patients.find())
+    for name, documents in (
+        ("messages", message_docs),
+        ("appointments", appointment_docs),
+    ):
+        insert(
+            db[name],
+            extended_references.embed_references(
+                name, documents, nutritionist_docs, patient_docs
+            ),
+        )
+    extended_references.create_reference_indexes(db)
+    return nutritionists, patients
+
+
+def median_seconds(func):
+    timings = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def run(db, query):
+    return list(db[query["collection"]].aggregate(query["pipeline"], allowDiskUse=True))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=200_000)
+    parser.add_argument("--appointments", type=int, default=50_000)
+    parser.add_argument("--backend", choices=("mongodb", "memory"), default="mongodb")
+    args = parser.parse_args(argv)
+
+    if args.backend == "memory":
+        from memory_mongo import MemoryClient
+
+        client = MemoryClient()
+    else:
+        from pymongo import MongoClient
+
+        client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
+    db = client[BENCH_DB]
+    try:
+        nutritionists, patients = generate(db, args.messages, args.appointments)
+        print(
+            f"{args.messages} mensagens, {args.appointments} consultas, "
+            f"{nutritionists} nutricionistas, {patients} pacientes ({args.backend})"
+        )
+        success = True
+        for number, old_query in LOOKUP_QUERIES.items():
+            new_query = MONGODB_QUERIES[number]
+            old = median_seconds(lambda: run(db, old_query))
+            new = median_seconds(lambda: run(db, new_query))
+            success &= new < old
+            print(
+                f"Consulta {number}: $lookup {old * 1e3:.1f} ms, referências "
+                f"estendidas {new * 1e3:.1f} ms ({old / new:.1f}x)"
+            )
+
+        db.nutritionists.update_one({"_id": 1}, {"$set": {"nome": "Renomeado"}})
+        started = time.perf_counter()
+        modified = extended_references.propagate_names(db, "nutricionista", [1])
+        print(
+            f"Propagação de um nome: {sum(modified.values())} documentos em "
+            f"{(time.perf_counter() - started) * 1e3:.1f} ms"
+        )
+        return success
+    finally:
+        client.drop_database(BENCH_DB)
+        client.close()
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+"""
+Mede o custo da instrumentação dos loaders.
+
+Em vez de comparar duas cargas inteiras (cuja diferença fica abaixo do ruído
+da máquina), mede separadamente, com timeit, o trabalho de um lote (montagem
+e serialização BSON dos documentos, como faz o driver) e as chamadas de
+instrumentação feitas por lote (transaction, count com estimate_bson_size e
+log, mais a fração do custo de abrir e fechar a fase). Cada medida é repetida
+REPEATS vezes; o acréscimo usa as medianas e o limite superior combina o
+percentil 95 da instrumentação com o percentil 5 do trabalho. Falha se esse
+limite passar de 1%.
+"""
+
+import statistics
+import sys
+import timeit
+from pathlib import Path
+
+import bson
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import instrumentation  # noqa: E402
+from load_mongodb_data import estimate_bson_size  # noqa: E402
+
+BATCHES_PER_PHASE = 50
+BATCH_SIZE = 1000
+REPEATS = 21
+WORK_LOOPS = 5  # lotes por medida do trabalho
+CALL_LOOPS = 2000  # lotes por medida da instrumentação
+MAX_OVERHEAD = 0.01
+
+
+def build_batch(batch_index):
+    """Monta um lote de documentos parecidos com as refeições."""
+    base = batch_index * BATCH_SIZE
+    return [
+        {
+            "_id": base + i,
+            "tipo": "Almoço",
+            "hora": "12:30",
+            "paciente_id": i % 97,
+            "calorias": 300 + i % 400,
+            "adesao": "Completa",
+            "registro_foto": bool(i % 2),
+            "alimentos": [1, 7],
+            "receitas": [],
+        }
+        for i in range(BATCH_SIZE)
+    ]
+
+
+def send(batch):
+    """Serializa o lote como o driver faria antes de enviá-lo."""
+    return sum(len(bson.encode(doc)) for doc in batch)
+
+
+def batch_work():
+    send(build_batch(0))
+
+
+def batch_instrumentation(batch):
+    """Chamadas de instrumentação que os loaders fazem a cada lote."""
+    with instrumentation.transaction():
+        pass
+    instrumentation.count(rows=len(batch), bytes_sent=estimate_bson_size(batch))
+    instrumentation.log("lote enviado")
+
+
+def phase_enter_exit():
+    with instrumentation.phase("fase"):
+        pass
+
+
+def per_call(func, loops):
+    """Retorna os tempos por chamada de REPEATS medidas de loops chamadas."""
+    return [t / loops for t in timeit.repeat(func, number=loops, repeat=REPEATS)]
+
+
+def percentile(timings, p):
+    """Percentil p (1 a 99) dos tempos medidos."""
+    return statistics.quantiles(timings, n=100, method="inclusive")[p - 1]
+
+
+def main():
+    instrumentation.start_run("benchmark", quiet=True)
+    batch = build_batch(0)
+
+    work = per_call(batch_work, WORK_LOOPS)
+    with instrumentation.phase("lotes"):
+        calls = per_call(lambda: batch_instrumentation(batch), CALL_LOOPS)
+    phases = per_call(phase_enter_exit, CALL_LOOPS)
+
+    def overhead(call, phase, batch_work):
+        return (call + phase / BATCHES_PER_PHASE) / batch_work
+
+    median = overhead(
+        statistics.median(calls), statistics.median(phases), statistics.median(work)
+    )
+    upper = overhead(percentile(calls, 95), percentile(phases, 95), percentile(work, 5))
+
+    print(f"Trabalho por lote: {statistics.median(work) * 1e3:.3f} ms (mediana)")
+    print(f"Instrumentação por lote: {statistics.median(calls) * 1e6:.2f} µs (mediana)")
+    print(f"Abertura e fechamento de fase: {statistics.median(phases) * 1e6:.2f} µs")
+    print(
+        f"Acréscimo: {median:.3%} (limite superior {upper:.3%}, "
+        f"máximo permitido {MAX_OVERHEAD:.0%})"
+    )
+    return upper < MAX_OVERHEAD
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
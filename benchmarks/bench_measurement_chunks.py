@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+"""
+Compara as medidas em documentos (``measurements``) com os blocos mensais
+compactos de measurement_chunks.py: espaço e latência de leitura.
+
+Gera ``--patients`` pacientes com uma leitura diária de balança conectada
+por ``--days`` dias num banco de rascunho, apagado ao final, e gera os
+blocos com ``compact_measurements``. Mede:
+
+- o tamanho em BSON das duas coleções (e, no MongoDB, o ``storageSize`` do
+  ``collStats``, já com a compressão do WiredTiger);
+- a leitura de ``--reads`` intervalos aleatórios de ``--range-days`` dias de
+  um paciente (mediana), por ``find`` com o índice (paciente_id, data) e por
+  ``read_measurements``.
+
+Falha se os blocos não ocuparem menos que MAX_SIZE_RATIO do tamanho dos
+documentos. Com ``--backend memory`` usa o MemoryClient (sem servidor).
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import bson
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import measurement_chunks  # noqa: E402
+from load_mongodb_data import MONGO_URI  # noqa: E402
+
+BENCH_DB = "diet_app_bench"
+INSERT_BATCH = 10_000
+FIRST_DAY = datetime(2023, 1, 1)
+MAX_SIZE_RATIO = 0.5
+
+
+def generate(db, patients, days, seed=0):
+    """Grava leituras diárias sintéticas, com os campos dos dados de exemplo."""
+    rng = random.Random(seed)
+    db.measurements.drop()
+    batch = []
+    measurement_id = 0
+    for patient_id in range(1, patients + 1):
+        weight = rng.uniform(60, 110)
+        height = rng.uniform(1.55, 1.95)
+        for day in range(days):
+            measurement_id += 1
+            weight += rng.uniform(-0.3, 0.25)
+            batch.append(
+                {
+                    "_id": measurement_id,
+                    "paciente_id": patient_id,
+                    "data": FIRST_DAY + timedelta(days=day, hours=7),
+                    "peso": round(weight, 1),
+                    "imc": round(weight / height**2, 1),
+                    "gordura_corporal": round(rng.uniform(15, 35), 1),
+                    "medidas": {
+                        "cintura": rng.randint(70, 110),
+                        "quadril": rng.randint(85, 120),
+                    },
+                    "pressao": f"{rng.randint(110, 140)}/{rng.randint(70, 90)}",
+                }
+            )
+            if len(batch) == INSERT_BATCH:
+                db.measurements.insert_many(batch)
+                batch = []
+    if batch:
+        db.measurements.insert_many(batch)
+    db.measurements.create_index([("paciente_id", 1), ("data", 1)])
+
+
+def bson_size(collection):
+    return sum(len(bson.encode(doc)) for doc in collection.find())
+
+
+def storage_size(db, name):
+    try:
+        return db.command("collStats", name)["storageSize"]
+    except Exception:
+        return None
+
+
+def median_seconds(func, ranges):
+    timings = []
+    for args in ranges:
+        started = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--patients", type=int, default=200)
+    parser.add_argument("--days", type=int, default=730)
+    parser.add_argument("--reads", type=int, default=50)
+    parser.add_argument("--range-days", type=int, default=30)
+    parser.add_argument("--backend", choices=("mongodb", "memory"), default="mongodb")
+    args = parser.parse_args(argv)
+
+    if args.backend == "memory":
+        from memory_mongo import MemoryClient
+
+        client = MemoryClient()
+    else:
+        from pymongo import MongoClient
+
+        client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
+    db = client[BENCH_DB]
+    rng = random.Random(1)
+    try:
+        generate(db, args.patients, args.days)
+        started = time.perf_counter()
+        chunks = measurement_chunks.compact_measurements(db)
+        print(
+            f"{args.patients * args.days} medidas de {args.patients} pacientes "
+            f"({args.backend}) em {chunks} blocos, gerados em "
+            f"{time.perf_counter() - started:.2f} s"
+        )
+
+        documents = bson_size(db.measurements)
+        compact = bson_size(db[measurement_chunks.CHUNKS])
+        ratio = compact / documents
+        print(
+            f"BSON: documentos {documents / 2**20:.1f} MiB, blocos "
+            f"{compact / 2**20:.1f} MiB ({ratio:.0%})"
+        )
+        on_disk = [
+            storage_size(db, name)
+            for name in ("measurements", measurement_chunks.CHUNKS)
+        ]
+        if None not in on_disk:
+            print(
+                f"storageSize: documentos {on_disk[0] / 2**20:.1f} MiB, blocos "
+                f"{on_disk[1] / 2**20:.1f} MiB"
+            )
+
+        ranges = []
+        for _ in range(args.reads):
+            start = FIRST_DAY + timedelta(days=rng.randrange(args.days))
+            end = start + timedelta(days=args.range_days)
+            ranges.append((rng.randint(1, args.patients), start, end))
+
+        def read_documents(patient_id, start, end):
+            return list(
+                db.measurements.find(
+                    {"paciente_id": patient_id, "data": {"$gte": start, "$lte": end}}
+                ).sort("data", 1)
+            )
+
+        old = median_seconds(read_documents, ranges)
+        new = median_seconds(
+            lambda *args: measurement_chunks.read_measurements(db, *args), ranges
+        )
+        print(
+            f"Leitura de {args.range_days} dias: documentos {old * 1e3:.2f} ms, "
+            f"blocos {new * 1e3:.2f} ms"
+        )
+        return ratio <= MAX_SIZE_RATIO
+    finally:
+        client.drop_database(BENCH_DB)
+        client.close()
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
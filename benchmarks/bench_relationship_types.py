@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+"""
+Compara os db hits das consultas 7 e 8 com os tipos de relacionamento
+antigos (INCLUI, ENVIA, PARA) e com os tipos separados de graph_migrations.py.
+
+Tudo roda numa única transação que é desfeita ao final, sem alterar o
+banco: opcionalmente cria ``--messages`` mensagens sintéticas (metade em
+cada sentido) e ``--meals`` refeições ligadas a alimentos, para que os
+relacionamentos que a consulta não quer pesem; faz o PROFILE das consultas
+documentadas; volta aos tipos antigos; e faz o PROFILE das consultas
+antigas. Falha se alguma consulta nova tiver mais db hits que a antiga.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+from neo4j import GraphDatabase
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from graph_migrations import RELATIONSHIP_RENAMES  # noqa: E402
+from load_data import NEO4J_PASSWORD, NEO4J_URI, NEO4J_USER  # noqa: E402
+from queries import NEO4J_QUERIES  # noqa: E402
+
+OLD_QUERIES = {
+    7: """
+MATCH (pa:PlanoAlimentar)-[:INCLUI]->(a:Alimento)
+RETURN a.nome AS Alimento, a.grupo AS Grupo, COUNT(pa) AS NumeroDeRecomendacoes
+ORDER BY NumeroDeRecomendacoes DESC
+""",
+    8: """
+MATCH (origem)-[:ENVIA]->(m:Mensagem)-[:PARA]->(destino)
+WHERE origem:Nutricionista OR destino:Nutricionista
+RETURN
+  CASE
+    WHEN origem:Nutricionista THEN origem.nome
+    ELSE origem.nome
+  END AS Remetente,
+  CASE
+    WHEN destino:Nutricionista THEN destino.nome
+    ELSE destino.nome
+  END AS Destinatario,
+  m.data AS Data, m.hora AS Hora, m.conteudo AS Mensagem
+ORDER BY m.data, m.hora
+""",
+}
+
+SYNTHETIC_MESSAGES = """
+MATCH (n:Nutricionista {id: 1}), (p:Paciente {id: 1})
+UNWIND range(1, $count) AS i
+CREATE (m:Mensagem {id: -i, data: "2023-10-18", hora: "08:00", conteudo: "."})
+FOREACH (_ IN CASE WHEN i % 2 = 0 THEN [1] ELSE [] END |
+  CREATE (n)-[:NUTRICIONISTA_ENVIA]->(m)-[:PARA_PACIENTE]->(p))
+FOREACH (_ IN CASE WHEN i % 2 = 1 THEN [1] ELSE [] END |
+  CREATE (p)-[:PACIENTE_ENVIA]->(m)-[:PARA_NUTRICIONISTA]->(n))
+"""
+
+SYNTHETIC_MEALS = """
+MATCH (a:Alimento {id: 1})
+UNWIND range(1, $count) AS i
+CREATE (r:Refeicao {id: -i})-[:REFEICAO_TEM_ALIMENTO]->(a)
+"""
+
+
+def db_hits(plan):
+    """Soma os db hits de um plano de PROFILE e de todos os seus filhos."""
+    return plan.get("dbHits", 0) + sum(db_hits(child) for child in plan["children"])
+
+
+def profile(tx, query):
+    return db_hits(tx.run("PROFILE " + query).consume().profile)
+
+
+def revert_types(tx):
+    """Volta aos tipos antigos dentro da transação, sem lotes."""
+    for old, from_label, to_label, new in RELATIONSHIP_RENAMES:
+        tx.run(
+            f"""
+            MATCH (a:{from_label})-[r:{new}]->(b:{to_label})
+            CREATE (a)-[n:{old}]->(b)
+            SET n = properties(r)
+            DELETE r
+            """
+        ).consume()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=10_000)
+    parser.add_argument("--meals", type=int, default=10_000)
+    args = parser.parse_args(argv)
+
+    driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+    try:
+        with driver.session() as session:
+            tx = session.begin_transaction()
+            try:
+                if args.messages:
+                    tx.run(SYNTHETIC_MESSAGES, count=args.messages).consume()
+                if args.meals:
+                    tx.run(SYNTHETIC_MEALS, count=args.meals).consume()
+                new = {
+                    number: profile(tx, NEO4J_QUERIES[number]) for number in OLD_QUERIES
+                }
+                revert_types(tx)
+                old = {
+                    number: profile(tx, query) for number, query in OLD_QUERIES.items()
+                }
+            finally:
+                tx.rollback()
+    finally:
+        driver.close()
+
+    print(f"{args.messages} mensagens e {args.meals} refeições sintéticas")
+    success = True
+    for number in OLD_QUERIES:
+        success &= new[number] <= old[number]
+        print(
+            f"Consulta {number}: {old[number]} db hits com os tipos antigos, "
+            f"{new[number]} com os separados "
+            f"({1 - new[number] / max(old[number], 1):.0%} a menos)"
+        )
+    return success
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
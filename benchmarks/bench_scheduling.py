@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+"""
+Mede a vazão da agenda (scheduling.py): verificações de conflito, horários
+livres e marcação em lote.
+
+Gera ``--appointments`` consultas sintéticas de uma hora, distribuídas entre
+``--nutritionists`` nutricionistas ao longo de um ano, num banco de rascunho
+apagado ao final. Carrega o índice de intervalos uma vez e mede:
+
+- ``--checks`` verificações de conflito em horários aleatórios;
+- ``--checks`` consultas de horários livres em dias aleatórios;
+- a marcação de ``--bookings`` pedidos aleatórios em lotes de ``--batch``,
+  com a gravação e o controle de versão no banco.
+
+Falha se as verificações de conflito ficarem abaixo de MIN_CHECKS_PER_SECOND.
+Com ``--backend memory`` usa o MemoryClient (sem servidor).
+"""
+
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import scheduling  # noqa: E402
+from load_mongodb_data import MONGO_URI  # noqa: E402
+
+BENCH_DB = "diet_app_bench"
+INSERT_BATCH = 10_000
+FIRST_DAY = datetime(2024, 1, 1)
+DAYS = 365
+HOURS = range(8, 18)
+MIN_CHECKS_PER_SECOND = 1000
+
+
+def generate(db, nutritionists, appointments, seed=0):
+    """Grava participantes e consultas sintéticas sem sobreposição."""
+    rng = random.Random(seed)
+    for name in ("nutritionists", "patients", "appointments", scheduling.AGENDAS):
+        db[name].drop()
+    db.nutritionists.insert_many(
+        [{"_id": i, "nome": f"Nutricionista {i}"} for i in range(1, nutritionists + 1)]
+    )
+    db.patients.insert_many(
+        [{"_id": i, "nome": f"Paciente {i}"} for i in range(1, nutritionists * 10 + 1)]
+    )
+    slots = rng.sample(range(nutritionists * DAYS * len(HOURS)), appointments)
+    documents = []
+    for appointment_id, slot in enumerate(slots, start=1):
+        nutritionist, rest = divmod(slot, DAYS * len(HOURS))
+        day, hour = divmod(rest, len(HOURS))
+        documents.append(
+            {
+                "_id": appointment_id,
+                "nutricionista_id": nutritionist + 1,
+                "paciente_id": rng.randint(1, nutritionists * 10),
+                "data": FIRST_DAY + timedelta(days=day),
+                "hora": f"{HOURS[hour]:02d}:00",
+                "status": "Agendada",
+            }
+        )
+    for start in range(0, len(documents), INSERT_BATCH):
+        db.appointments.insert_many(documents[start : start + INSERT_BATCH])
+
+
+def random_request(rng, nutritionists):
+    return {
+        "nutricionista_id": rng.randint(1, nutritionists),
+        "paciente_id": rng.randint(1, nutritionists * 10),
+        "data": FIRST_DAY + timedelta(days=rng.randrange(DAYS)),
+        "hora": f"{rng.choice(HOURS):02d}:{rng.choice((0, 30)):02d}",
+    }
+
+
+def rate(count, seconds):
+    return count / seconds if seconds else float("inf")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--nutritionists", type=int, default=100)
+    parser.add_argument("--appointments", type=int, default=200_000)
+    parser.add_argument("--checks", type=int, default=100_000)
+    parser.add_argument("--bookings", type=int, default=10_000)
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--backend", choices=("mongodb", "memory"), default="mongodb")
+    args = parser.parse_args(argv)
+
+    if args.backend == "memory":
+        from memory_mongo import MemoryClient
+
+        client = MemoryClient()
+    else:
+        from pymongo import MongoClient
+
+        client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
+    db = client[BENCH_DB]
+    rng = random.Random(1)
+    try:
+        generate(db, args.nutritionists, args.appointments)
+        started = time.perf_counter()
+        schedule = scheduling.Schedule.from_mongodb(db)
+        print(
+            f"{args.appointments} consultas, {args.nutritionists} nutricionistas "
+            f"({args.backend}); índice carregado em "
+            f"{time.perf_counter() - started:.2f} s"
+        )
+
+        requests = [random_request(rng, args.nutritionists) for _ in range(args.checks)]
+        started = time.perf_counter()
+        clashes = sum(
+            bool(schedule.conflicts(r["nutricionista_id"], r["data"], r["hora"]))
+            for r in requests
+        )
+        checks = rate(len(requests), time.perf_counter() - started)
+        print(f"Conflitos: {checks:,.0f} verificações/s ({clashes} com conflito)")
+
+        started = time.perf_counter()
+        for r in requests:
+            schedule.free_slots(r["nutricionista_id"], r["data"])
+        print(
+            f"Horários livres: "
+            f"{rate(len(requests), time.perf_counter() - started):,.0f} dias/s"
+        )
+
+        bookings = [
+            random_request(rng, args.nutritionists) for _ in range(args.bookings)
+        ]
+        started = time.perf_counter()
+        booked = 0
+        for start in range(0, len(bookings), args.batch):
+            results = schedule.book(bookings[start : start + args.batch])
+            booked += sum(result is not None for result in results)
+        print(
+            f"Marcação em lotes de {args.batch}: "
+            f"{rate(len(bookings), time.perf_counter() - started):,.0f} pedidos/s "
+            f"({booked} marcados)"
+        )
+        return checks >= MIN_CHECKS_PER_SECOND
+    finally:
+        client.drop_database(BENCH_DB)
+        client.close()
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
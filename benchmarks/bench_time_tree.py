@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+"""
+Compara as consultas por período com CONSOME e com a árvore de tempo.
+
+Numa transação desfeita ao final (o banco não é alterado), cria
+``--patients`` pacientes sintéticos com ``--years`` anos de histórico,
+MEALS_PER_DAY refeições por dia, ligadas ao paciente tanto por CONSOME
+quanto por Paciente -> Dia -> Refeicao. Para janelas de 1, 7 e 30 dias no
+fim do histórico, mede as duas formas das consultas 2 (refeições no
+período) e 3 (calorias de um dia): a mediana do tempo de REPEATS execuções
+por paciente e os db hits do PROFILE. Falha se a árvore de tempo não tiver
+menos db hits que CONSOME em todas as janelas.
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from neo4j import GraphDatabase
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from load_data import NEO4J_PASSWORD, NEO4J_URI, NEO4J_USER  # noqa: E402
+
+FIRST_DAY = date(2019, 1, 1)
+MEALS_PER_DAY = 4
+REPEATS = 5
+WINDOWS = (1, 7, 30)
+
+# Um paciente por comando, para não montar o histórico inteiro num só plano
+SYNTHETIC_PATIENT = """
+CREATE (p:Paciente {id: $id, nome: $nome})
+WITH p
+UNWIND range(0, $days - 1) AS offset
+WITH p, toString(date($first) + duration({days: offset})) AS data
+CREATE (p)-[:PACIENTE_TEM_DIA]->(d:Dia {id: toString(p.id) + ":" + data,
+                                       paciente_id: p.id, data: data})
+WITH p, d, data
+UNWIND range(1, $meals_per_day) AS slot
+CREATE (p)-[:CONSOME]->(r:Refeicao {tipo: "Refeição " + slot, data: data,
+                                    hora: toString(6 + 4 * slot) + ":00",
+                                    calorias: 150 + 100 * slot, adesao: "Completa"})
+CREATE (d)-[:DIA_TEM_REFEICAO]->(r)
+"""
+
+QUERIES = {
+    "consulta 2 (período)": {
+        "CONSOME": """
+MATCH (p:Paciente {nome: $nome})-[:CONSOME]->(r:Refeicao)
+WHERE r.data >= $inicio AND r.data <= $fim
+RETURN p.nome AS Paciente, r.tipo AS TipoRefeicao, r.data AS Data,
+       r.calorias AS Calorias, r.adesao AS Adesao
+ORDER BY r.data, r.hora
+""",
+        "árvore de tempo": """
+MATCH (p:Paciente {nome: $nome})-[:PACIENTE_TEM_DIA]->(d:Dia)
+WHERE d.data >= $inicio AND d.data <= $fim
+MATCH (d)-[:DIA_TEM_REFEICAO]->(r:Refeicao)
+RETURN p.nome AS Paciente, r.tipo AS TipoRefeicao, r.data AS Data,
+       r.calorias AS Calorias, r.adesao AS Adesao
+ORDER BY r.data, r.hora
+""",
+    },
+    "consulta 3 (um dia)": {
+        "CONSOME": """
+MATCH (p:Paciente {nome: $nome})-[:CONSOME]->(r:Refeicao)
+WHERE r.data = $fim
+RETURN p.nome AS Paciente, r.data AS Data, SUM(r.calorias) AS TotalCalorias
+""",
+        "árvore de tempo": """
+MATCH (p:Paciente {nome: $nome})-[:PACIENTE_TEM_DIA]->(d:Dia {data: $fim})
+MATCH (d)-[:DIA_TEM_REFEICAO]->(r:Refeicao)
+RETURN p.nome AS Paciente, d.data AS Data, SUM(r.calorias) AS TotalCalorias
+""",
+    },
+}
+
+
+def db_hits(plan):
+    """Soma os db hits de um plano de PROFILE e de todos os seus filhos."""
+    return plan.get("dbHits", 0) + sum(db_hits(child) for child in plan["children"])
+
+
+def measure(tx, query, names, window):
+    """(mediana em ms, db hits do primeiro paciente) da consulta na janela."""
+    last = FIRST_DAY + timedelta(days=window["days"] - 1)
+    parameters = {
+        "inicio": (last - timedelta(days=window["size"] - 1)).isoformat(),
+        "fim": last.isoformat(),
+    }
+    hits = db_hits(
+        tx.run("PROFILE " + query, nome=names[0], **parameters).consume().profile
+    )
+    timings = []
+    for name in names:
+        for _ in range(REPEATS):
+            started = time.perf_counter()
+            tx.run(query, nome=name, **parameters).consume()
+            timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1e3, hits
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--patients", type=int, default=10)
+    parser.add_argument("--years", type=int, default=5)
+    args = parser.parse_args(argv)
+    days = 365 * args.years
+    names = [f"Paciente bench {i}" for i in range(1, args.patients + 1)]
+
+    success = True
+    driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+    try:
+        with driver.session() as session:
+            tx = session.begin_transaction()
+            try:
+                started = time.perf_counter()
+                for i, name in enumerate(names, start=1):
+                    tx.run(
+                        SYNTHETIC_PATIENT,
+                        id=-i,
+                        nome=name,
+                        days=days,
+                        first=FIRST_DAY.isoformat(),
+                        meals_per_day=MEALS_PER_DAY,
+                    ).consume()
+                print(
+                    f"{args.patients} pacientes x {days * MEALS_PER_DAY} refeições "
+                    f"({args.years} anos) criados em "
+                    f"{time.perf_counter() - started:.1f} s"
+                )
+                for title, variants in QUERIES.items():
+                    sizes = WINDOWS if "período" in title else (1,)
+                    for size in sizes:
+                        window = {"days": days, "size": size}
+                        results = {
+                            model: measure(tx, query, names, window)
+                            for model, query in variants.items()
+                        }
+                        (old_ms, old_hits), (new_ms, new_hits) = results.values()
+                        success &= new_hits < old_hits
+                        print(
+                            f"{title}, {size} dia(s): CONSOME {old_ms:.2f} ms / "
+                            f"{old_hits} db hits; árvore de tempo {new_ms:.2f} ms / "
+                            f"{new_hits} db hits"
+                        )
+            finally:
+                tx.rollback()
+    finally:
+        driver.close()
+    return success
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
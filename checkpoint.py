@@ -0,0 +1,138 @@
+"""Journal local de lotes confirmados, para retomar cargas interrompidas.
+
+Cada loader grava, por etapa (tipo de entidade ou de relacionamento), o
+número do último lote confirmado no banco. Com ``--resume`` os lotes já
+registrados são pulados. Como as escritas são idempotentes (MERGE por
+``id`` no Neo4j e upsert por ``_id`` no MongoDB), reexecutar um lote que
+foi confirmado no banco mas não chegou ao journal é seguro.
+
+O tamanho de lote também é registrado: os números de lote só identificam as
+mesmas linhas se o tamanho não mudar, então a retomada é recusada quando
+``NEO4J_BATCH_SIZE``/``MONGO_BATCH_SIZE`` difere do usado na carga original.
+"""
+
+import os
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+
+JOURNAL_PATH = os.getenv("LOAD_JOURNAL_PATH", "./runs/load_journal.sqlite3")
+
+
+def iter_batches(rows, batch_size):
+    """Divide uma sequência em lotes de até batch_size itens."""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class BatchSizeMismatch(ValueError):
+    """O journal foi gravado com outro tamanho de lote e não pode ser retomado."""
+
+
+class LoadJournal:
+    """Último lote confirmado de cada etapa de um loader, em SQLite."""
+
+    def __init__(self, loader, path=JOURNAL_PATH):
+        self.loader = loader
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS batches (
+                loader TEXT NOT NULL,
+                step TEXT NOT NULL,
+                batch INTEGER NOT NULL,
+                rows INTEGER NOT NULL,
+                batch_size INTEGER,
+                committed_at TEXT NOT NULL,
+                PRIMARY KEY (loader, step)
+            )
+            """
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(batches)")}
+        if "batch_size" not in columns:
+            # Journals anteriores não registravam o tamanho de lote
+            self._conn.execute("ALTER TABLE batches ADD COLUMN batch_size INTEGER")
+        self._conn.commit()
+
+    def last_batch(self, step):
+        """Retorna o número do último lote confirmado da etapa (-1 se nenhum)."""
+        row = self._conn.execute(
+            "SELECT batch FROM batches WHERE loader = ? AND step = ?",
+            (self.loader, step),
+        ).fetchone()
+        return row[0] if row else -1
+
+    def batch_size(self, step):
+        """Retorna o tamanho de lote registrado na etapa (None se desconhecido)."""
+        row = self._conn.execute(
+            "SELECT batch_size FROM batches WHERE loader = ? AND step = ?",
+            (self.loader, step),
+        ).fetchone()
+        return row[0] if row else None
+
+    def record(self, step, batch, rows, batch_size):
+        """Registra um lote como confirmado."""
+        self._conn.execute(
+            """
+            INSERT INTO batches (loader, step, batch, rows, batch_size, committed_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (loader, step) DO UPDATE SET
+                batch = excluded.batch,
+                rows = batches.rows + excluded.rows,
+                batch_size = excluded.batch_size,
+                committed_at = excluded.committed_at
+            """,
+            (self.loader, step, batch, rows, batch_size, datetime.now().isoformat()),
+        )
+        self._conn.commit()
+
+    def reset(self):
+        """Descarta o progresso registrado do loader (carga do zero)."""
+        self._conn.execute("DELETE FROM batches WHERE loader = ?", (self.loader,))
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+
+def run_batches(journal, step, rows, batch_size, write_batch):
+    """Escreve os lotes ainda não confirmados da etapa e os registra no journal.
+
+    ``rows`` é uma sequência de registros ou um objeto com ``len()`` e
+    ``iter_batches(batch_size, start)``. Retorna a quantidade de lotes
+    escritos e de lotes pulados. Levanta BatchSizeMismatch se a etapa já tem
+    lotes confirmados com outro tamanho.
+    """
+    done = journal.last_batch(step)
+    if done >= 0 and journal.batch_size(step) != batch_size:
+        raise BatchSizeMismatch(
+            f"Etapa {step}: o journal registra lotes de "
+            f"{journal.batch_size(step) or 'tamanho desconhecido'}, mas o tamanho "
+            f"atual é {batch_size}. Use o mesmo tamanho de lote ou carregue sem "
+            "--resume."
+        )
+    written = skipped = 0
+    if hasattr(rows, "iter_batches"):
+        # Fontes que sabem fatiar (columnar.TableReader) começam direto no
+        # primeiro lote pendente, sem ler os já confirmados
+        start = done + 1
+        skipped = min(start, -(-len(rows) // batch_size))
+        batches = enumerate(rows.iter_batches(batch_size, start=start), start)
+    else:
+        batches = enumerate(iter_batches(rows, batch_size))
+    for number, batch in batches:
+        if number <= done:
+            skipped += 1
+            continue
+        write_batch(batch)
+        journal.record(step, number, len(batch), batch_size)
+        written += 1
+    return written, skipped
@@ -0,0 +1,646 @@
+"""Snapshot colunar do conjunto de dados dos loaders, em Arrow IPC.
+
+Recarregar os dados hoje significa reexecutar a construção dos literais
+Python de ``load_data.py``/``load_mongodb_data.py`` e recalcular o hash de
+cada registro; num conjunto gerado com milhões de pacientes isso custa mais
+que as escritas no banco. Este módulo grava o conjunto de dados uma vez, já
+com o ``_hash``, num arquivo Arrow IPC (formato de arquivo, sem compressão)
+por tabela: colunas contíguas, strings repetitivas com dicionário, lidas por
+``mmap`` sem cópia. Os loaders (``--snapshot <dir>``) leem os lotes direto
+do snapshot: só o lote corrente vira objetos Python, então a carga começa de
+imediato e a memória residente não cresce com o tamanho do conjunto, e uma
+carga retomada pula os lotes confirmados sem decodificá-los.
+
+Estrutura::
+
+    <dir>/manifest.json                 # chave, tabelas, linhas por tabela
+    <dir>/neo4j/nodes/<Rótulo>.arrow
+    <dir>/neo4j/relationships/<TIPO>-<Origem>-<Destino>.arrow
+    <dir>/mongodb/<coleção>.arrow
+
+Há duas fontes: os dados canônicos dos loaders e um gerador sintético com a
+mesma forma (``--patients N``: nutricionistas, pacientes, refeições, medidas
+e seus relacionamentos, mais o catálogo canônico de alimentos, receitas e
+planos). ``ensure_snapshot`` guarda cada snapshot em
+``.snapshots/columnar/<chave>``, com a chave derivada da fonte, da escala e
+da semente; execuções repetidas de benchmark reaproveitam o arquivo em vez
+de gerá-lo de novo.
+
+Na conversão para Arrow, colunas que misturam inteiros e decimais viram
+float64 e campos ausentes viram nulos, que a leitura descarta de novo (o
+snapshot não distingue campo ausente de campo nulo).
+
+Uso:
+    python columnar.py build                       # dados canônicos
+    python columnar.py build --patients 1000000    # conjunto gerado
+    python columnar.py info .snapshots/columnar/<chave>
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import shutil
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import numpy as np
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    np = pa = pc = None
+
+from sync import DATASET_SOURCES, content_hash, with_hash
+
+SNAPSHOT_ROOT = Path(os.getenv("COLUMNAR_SNAPSHOT_DIR", ".snapshots/columnar"))
+FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+WRITE_BATCH_ROWS = 65536
+# Strings com até essa fração de valores distintos são gravadas com dicionário
+DICTIONARY_MAX_RATIO = 0.5
+# Fontes do conjunto de dados e deste módulo, que define o gerador e o formato
+SOURCES = DATASET_SOURCES + ("columnar.py",)
+
+# Gerador sintético
+NUTRITIONIST_RATIO = 100  # pacientes por nutricionista
+MEALS_PER_PATIENT = 4
+MEASUREMENTS_PER_PATIENT = 3
+MEAL_TYPES = (
+    ("Café da manhã", "08:00"),
+    ("Almoço", "12:30"),
+    ("Lanche", "16:00"),
+    ("Jantar", "20:00"),
+)
+ADHERENCE = ("Completa", "Parcial", "Não realizada")
+SPECIALTIES = ("Nutrição Esportiva", "Nutrição Clínica", "Nutrição Funcional")
+GOALS = (
+    "Emagrecimento",
+    "Controle de colesterol",
+    "Ganho de massa muscular",
+    "Controle de diabetes",
+)
+RESTRICTIONS = ("Glúten", "Lactose", "Sódio")
+ALLERGIES = ("Amendoim", "Frutos do mar", "Nozes")
+FIRST_DAY = np.datetime64("2023-01-01") if np is not None else None
+
+
+def require_pyarrow():
+    if pa is None:
+        raise RuntimeError("O snapshot colunar requer os pacotes 'pyarrow' e 'numpy'.")
+
+
+def _strip_nulls(value):
+    """Remove os campos nulos que a conversão para Arrow acrescenta."""
+    if isinstance(value, dict):
+        return {
+            key: _strip_nulls(item) for key, item in value.items() if item is not None
+        }
+    if isinstance(value, list):
+        return [_strip_nulls(item) for item in value]
+    return value
+
+
+class TableReader:
+    """Uma tabela do snapshot, mapeada em memória.
+
+    Segue o protocolo de ``checkpoint.run_batches``: ``iter_batches(tamanho,
+    start)`` gera os lotes a partir do lote ``start`` sem ler os anteriores.
+    """
+
+    def __init__(self, path, entry):
+        self.path = Path(path)
+        self.entry = entry
+        self._table = None
+
+    @property
+    def table(self):
+        if self._table is None:
+            # read_all sobre um memory_map não copia os buffers
+            self._table = pa.ipc.open_file(pa.memory_map(str(self.path))).read_all()
+        return self._table
+
+    def __len__(self):
+        return self.entry["rows"]
+
+    def close(self):
+        """Libera o mapeamento; uma nova leitura mapeia o arquivo de novo."""
+        self._table = None
+
+    def record_batches(self, batch_size, start=0):
+        """Gera fatias do arquivo como RecordBatch, sem cópia."""
+        for offset in range(start * batch_size, len(self), batch_size):
+            yield from self.table.slice(offset, batch_size).to_batches()
+
+    def iter_batches(self, batch_size, start=0):
+        """Gera os lotes de registros (dicts) a partir do lote ``start``."""
+        for offset in range(start * batch_size, len(self), batch_size):
+            rows = self.table.slice(offset, batch_size).to_pylist()
+            yield [_strip_nulls(row) for row in rows]
+
+    def __iter__(self):
+        for batch in self.iter_batches(WRITE_BATCH_ROWS):
+            yield from batch
+
+
+class ColumnarSnapshot:
+    """Snapshot gravado por build_snapshot, lido a partir do manifesto."""
+
+    def __init__(self, directory):
+        require_pyarrow()
+        self.directory = Path(directory)
+        with open(self.directory / MANIFEST, encoding="utf-8") as f:
+            self.manifest = json.load(f)
+
+    def _readers(self, store, kind):
+        return [
+            (entry, TableReader(self.directory / entry["file"], entry))
+            for entry in self.manifest["tables"]
+            if entry["store"] == store and entry["kind"] == kind
+        ]
+
+    def nodes(self):
+        """[(fase, rótulo, leitor)], na ordem de carga."""
+        return [(e["phase"], e["label"], r) for e, r in self._readers("neo4j", "node")]
+
+    def relationships(self):
+        """[(tipo, rótulo de origem, rótulo de destino, leitor)]."""
+        return [
+            (e["type"], e["from"], e["to"], r)
+            for e, r in self._readers("neo4j", "relationship")
+        ]
+
+    def collections(self):
+        """[(fase, coleção, leitor)], na ordem de carga."""
+        return [
+            (e["phase"], e["collection"], r)
+            for e, r in self._readers("mongodb", "collection")
+        ]
+
+    def total_rows(self):
+        return sum(entry["rows"] for entry in self.manifest["tables"])
+
+
+# --- escrita ---
+
+
+def _dictionary_encode(table):
+    """Troca as colunas de string repetitivas por colunas com dicionário."""
+    for index, field in enumerate(table.schema):
+        if not pa.types.is_string(field.type) or not table.num_rows:
+            continue
+        column = table.column(index)
+        if pc.count_distinct(column).as_py() <= DICTIONARY_MAX_RATIO * table.num_rows:
+            table = table.set_column(index, field.name, pc.dictionary_encode(column))
+    return table
+
+
+def _with_hash_column(batch):
+    """Acrescenta a coluna _hash, calculada sobre os registros como serão lidos."""
+    hashes = [content_hash(_strip_nulls(row)) for row in batch.to_pylist()]
+    return batch.append_column("_hash", pa.array(hashes, pa.string()))
+
+
+def write_table(path, schema, batches):
+    """Grava os lotes num arquivo Arrow IPC e retorna o número de linhas."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    rows = 0
+    with pa.OSFile(str(path), "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    return rows
+
+
+def _table_from_rows(rows):
+    table = _dictionary_encode(pa.Table.from_pylist(rows))
+    return table.schema, table.to_batches(WRITE_BATCH_ROWS)
+
+
+def canonical_tables():
+    """Tabelas com os dados canônicos dos dois loaders, já com _hash."""
+    import load_data
+    import load_mongodb_data
+
+    for phase, label, rows in load_data.NODE_LOADS:
+        entry = {"store": "neo4j", "kind": "node", "label": label, "phase": phase}
+        yield entry, _table_from_rows([with_hash(row) for row in rows])
+    for rel_type, from_label, to_label, pairs in load_data.RELATIONSHIPS:
+        entry = {
+            "store": "neo4j",
+            "kind": "relationship",
+            "type": rel_type,
+            "from": from_label,
+            "to": to_label,
+        }
+        rows = [with_hash(row) for row in load_data.relationship_rows(pairs)]
+        yield entry, _table_from_rows(rows)
+    for phase, name, documents in load_mongodb_data.COLLECTION_LOADS:
+        entry = {
+            "store": "mongodb",
+            "kind": "collection",
+            "collection": name,
+            "phase": phase,
+        }
+        yield entry, _table_from_rows([with_hash(doc) for doc in documents])
+
+
+def table_file(entry):
+    if entry["kind"] == "node":
+        return f"neo4j/nodes/{entry['label']}.arrow"
+    if entry["kind"] == "relationship":
+        return (
+            f"neo4j/relationships/{entry['type']}-{entry['from']}-{entry['to']}.arrow"
+        )
+    return f"mongodb/{entry['collection']}.arrow"
+
+
+def build_snapshot(directory, tables, key):
+    """Grava as tabelas e o manifesto; o diretório só aparece completo."""
+    require_pyarrow()
+    directory = Path(directory)
+    partial = directory.with_name(directory.name + ".part")
+    shutil.rmtree(partial, ignore_errors=True)
+    started = time.perf_counter()
+    entries = []
+    for entry, (schema, batches) in tables:
+        entry = {**entry, "file": table_file(entry)}
+        entry["rows"] = write_table(partial / entry["file"], schema, batches)
+        entries.append(entry)
+    manifest = {
+        "version": FORMAT_VERSION,
+        "key": key,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "build_seconds": round(time.perf_counter() - started, 3),
+        "tables": entries,
+    }
+    with open(partial / MANIFEST, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    shutil.rmtree(directory, ignore_errors=True)
+    partial.rename(directory)
+    return manifest
+
+
+# --- gerador sintético ---
+
+
+def _dictionary(values, vocabulary):
+    return pa.DictionaryArray.from_arrays(
+        pa.array(values, pa.int32()), pa.array(vocabulary, pa.string())
+    )
+
+
+def _lists(rng, count, vocabulary, max_items):
+    """Listas de 0 a max_items valores consecutivos do vocabulário."""
+    sizes = rng.integers(0, max_items + 1, count)
+    firsts = rng.integers(0, len(vocabulary), count)
+    offsets = np.concatenate([[0], np.cumsum(sizes)]).astype(np.int32)
+    positions = np.repeat(firsts - offsets[:-1], sizes) + np.arange(offsets[-1])
+    values = np.asarray(vocabulary, dtype=object)[positions % len(vocabulary)]
+    return pa.ListArray.from_arrays(pa.array(offsets), pa.array(values, pa.string()))
+
+
+def _id_lists(rng, count, high, min_items, max_items):
+    sizes = rng.integers(min_items, max_items + 1, count)
+    offsets = np.concatenate([[0], np.cumsum(sizes)]).astype(np.int32)
+    return pa.ListArray.from_arrays(
+        pa.array(offsets), pa.array(rng.integers(1, high + 1, int(sizes.sum())))
+    )
+
+
+def _day_strings(days):
+    return pa.array((FIRST_DAY + days).astype(str))
+
+
+def _timestamps(days):
+    return pa.array((FIRST_DAY + days).astype("datetime64[ms]"))
+
+
+def _generated(total, build, seed):
+    """Lotes de uma tabela gerada: ``build(ids, rng)`` devolve as colunas."""
+
+    def batches():
+        for start in range(0, total, WRITE_BATCH_ROWS):
+            ids = np.arange(start + 1, min(start + WRITE_BATCH_ROWS, total) + 1)
+            rng = np.random.default_rng([seed, start])
+            columns = build(ids, rng)
+            batch = pa.record_batch(list(columns.values()), names=list(columns))
+            yield _with_hash_column(batch)
+
+    stream = batches()
+    first = next(stream, None)
+    if first is None:
+        return pa.schema([]), iter(())
+    return first.schema, itertools.chain([first], stream)
+
+
+def _nutritionist(ids, rng, mongo):
+    columns = {
+        "_id" if mongo else "id": pa.array(ids),
+        "nome": pa.array([f"Nutricionista {i}" for i in ids]),
+        "especialidade": _dictionary(
+            rng.integers(0, len(SPECIALTIES), len(ids)), SPECIALTIES
+        ),
+        "experiencia": pa.array(rng.integers(1, 30, len(ids))),
+        "email": pa.array([f"nutri{i}@nutri.com" for i in ids]),
+        "telefone": pa.array([f"21-9{i % 10**8:08d}" for i in ids]),
+    }
+    return columns
+
+
+def _patient(ids, rng, mongo, nutritionists):
+    columns = {
+        "_id" if mongo else "id": pa.array(ids),
+        "nome": pa.array([f"Paciente {i}" for i in ids]),
+        "idade": pa.array(rng.integers(18, 80, len(ids))),
+        "genero": _dictionary(rng.integers(0, 2, len(ids)), ("F", "M")),
+        "altura": pa.array(rng.integers(150, 195, len(ids))),
+        "peso_inicial": pa.array(rng.integers(50, 120, len(ids))),
+        "email": pa.array([f"paciente{i}@email.com" for i in ids]),
+        "telefone": pa.array([f"21-8{i % 10**8:08d}" for i in ids]),
+        "restricoes": _lists(rng, len(ids), RESTRICTIONS, 1),
+        "alergias": _lists(rng, len(ids), ALLERGIES, 1),
+        "objetivo": _dictionary(rng.integers(0, len(GOALS), len(ids)), GOALS),
+    }
+    if mongo:
+        columns["nutricionista_id"] = pa.array((ids - 1) % nutritionists + 1)
+    return columns
+
+
+def _meal(ids, rng, mongo, foods, recipes):
+    slot = (ids - 1) % MEALS_PER_PATIENT
+    days = (ids - 1) // MEALS_PER_PATIENT % 365
+    columns = {
+        "_id" if mongo else "id": pa.array(ids),
+        "tipo": _dictionary(slot, [tipo for tipo, _ in MEAL_TYPES]),
+        "data": _timestamps(days) if mongo else _day_strings(days),
+        "hora": _dictionary(slot, [hora for _, hora in MEAL_TYPES]),
+        "calorias": pa.array(rng.integers(150, 800, len(ids))),
+        "adesao": _dictionary(
+            rng.choice(len(ADHERENCE), len(ids), p=[0.7, 0.2, 0.1]), ADHERENCE
+        ),
+        "registro_foto": pa.array(rng.random(len(ids)) < 0.6),
+    }
+    if mongo:
+        columns["paciente_id"] = pa.array((ids - 1) // MEALS_PER_PATIENT + 1)
+        columns["alimentos"] = _id_lists(rng, len(ids), foods, 1, 2)
+        columns["receitas"] = _id_lists(rng, len(ids), recipes, 0, 1)
+    return columns
+
+
+def _day_ids(patients):
+    """Ids dos nós Dia (load_data.day_id) dos pacientes, no dia das suas refeições."""
+    dates = (FIRST_DAY + (patients - 1) % 365).astype(str)
+    return np.char.add(np.char.add(patients.astype(str), ":"), dates)
+
+
+def _day(ids, rng):
+    return {
+        "id": pa.array(_day_ids(ids)),
+        "paciente_id": pa.array(ids),
+        "data": _day_strings((ids - 1) % 365),
+    }
+
+
+def _measurement(ids, rng, mongo):
+    weight = np.round(rng.normal(80, 12, len(ids)), 1)
+    height = rng.normal(1.7, 0.08, len(ids))
+    waist = rng.integers(70, 115, len(ids))
+    hip = rng.integers(85, 120, len(ids))
+    days = (ids - 1) % MEASUREMENTS_PER_PATIENT * 15
+    columns = {
+        "_id" if mongo else "id": pa.array(ids),
+        "data": _timestamps(days) if mongo else _day_strings(days),
+        "peso": pa.array(weight),
+        "imc": pa.array(np.round(weight / height**2, 1)),
+        "gordura_corporal": pa.array(np.round(rng.uniform(15, 35, len(ids)), 1)),
+    }
+    if mongo:
+        columns["paciente_id"] = pa.array((ids - 1) // MEASUREMENTS_PER_PATIENT + 1)
+        columns["medidas"] = pa.StructArray.from_arrays(
+            [pa.array(waist), pa.array(hip)], names=["cintura", "quadril"]
+        )
+    else:
+        columns["cintura"] = pa.array(waist)
+        columns["quadril"] = pa.array(hip)
+    columns["pressao"] = pa.array(
+        [
+            f"{s}/{d}"
+            for s, d in zip(
+                rng.integers(110, 140, len(ids)), rng.integers(70, 90, len(ids))
+            )
+        ]
+    )
+    return columns
+
+
+def _relationship(ids, de, para):
+    return {
+        "de": pa.array(de),
+        "para": pa.array(para),
+        "props": pa.array([{}] * len(ids), pa.struct([])),
+    }
+
+
+def generated_tables(patients, seed=0):
+    """Tabelas de um conjunto sintético com ``patients`` pacientes."""
+    import load_data
+    import load_mongodb_data
+
+    nutritionists = max(1, patients // NUTRITIONIST_RATIO)
+    meals = patients * MEALS_PER_PATIENT
+    measurements = patients * MEASUREMENTS_PER_PATIENT
+    plans = len(load_data.DIET_PLANS)
+    foods, recipes = len(load_data.FOODS), len(load_data.RECIPES)
+    catalog_labels = {"Alimento", "Receita", "PlanoAlimentar"}
+    catalog_collections = {"foods", "recipes", "dietPlans"}
+
+    node_builders = {
+        "Nutricionista": (
+            nutritionists,
+            lambda ids, rng: _nutritionist(ids, rng, False),
+        ),
+        "Paciente": (
+            patients,
+            lambda ids, rng: _patient(ids, rng, False, nutritionists),
+        ),
+        "Refeicao": (meals, lambda ids, rng: _meal(ids, rng, False, foods, recipes)),
+        # As refeições de um paciente caem todas num mesmo dia
+        "Dia": (patients, _day),
+        "MedidaCorporal": (
+            measurements,
+            lambda ids, rng: _measurement(ids, rng, False),
+        ),
+    }
+    for phase, label, rows in load_data.NODE_LOADS:
+        entry = {"store": "neo4j", "kind": "node", "label": label, "phase": phase}
+        if label in catalog_labels:
+            yield entry, _table_from_rows([with_hash(row) for row in rows])
+        elif label in node_builders:
+            total, build = node_builders[label]
+            yield entry, _generated(total, build, seed)
+
+    relationships = [
+        (
+            "ATENDE",
+            "Nutricionista",
+            "Paciente",
+            patients,
+            lambda ids: ((ids - 1) % nutritionists + 1, ids),
+        ),
+        (
+            "SEGUE",
+            "Paciente",
+            "PlanoAlimentar",
+            patients,
+            lambda ids: (ids, (ids - 1) % plans + 1),
+        ),
+        (
+            "CONSOME",
+            "Paciente",
+            "Refeicao",
+            meals,
+            lambda ids: ((ids - 1) // MEALS_PER_PATIENT + 1, ids),
+        ),
+        (
+            "PACIENTE_TEM_DIA",
+            "Paciente",
+            "Dia",
+            patients,
+            lambda ids: (ids, _day_ids(ids)),
+        ),
+        (
+            "DIA_TEM_REFEICAO",
+            "Dia",
+            "Refeicao",
+            meals,
+            lambda ids: (_day_ids((ids - 1) // MEALS_PER_PATIENT + 1), ids),
+        ),
+        (
+            "REFEICAO_TEM_ALIMENTO",
+            "Refeicao",
+            "Alimento",
+            meals,
+            lambda ids: (ids, (ids - 1) % foods + 1),
+        ),
+        (
+            "POSSUI",
+            "Paciente",
+            "MedidaCorporal",
+            measurements,
+            lambda ids: ((ids - 1) // MEASUREMENTS_PER_PATIENT + 1, ids),
+        ),
+    ]
+    for rel_type, from_label, to_label, total, ends in relationships:
+        entry = {
+            "store": "neo4j",
+            "kind": "relationship",
+            "type": rel_type,
+            "from": from_label,
+            "to": to_label,
+        }
+        yield entry, _generated(
+            total, lambda ids, rng, ends=ends: _relationship(ids, *ends(ids)), seed
+        )
+    for rel_type, from_label, to_label, pairs in load_data.RELATIONSHIPS:
+        if from_label in catalog_labels and to_label in catalog_labels:
+            entry = {
+                "store": "neo4j",
+                "kind": "relationship",
+                "type": rel_type,
+                "from": from_label,
+                "to": to_label,
+            }
+            yield entry, _table_from_rows(
+                [with_hash(row) for row in load_data.relationship_rows(pairs)]
+            )
+
+    collection_builders = {
+        "nutritionists": (
+            nutritionists,
+            lambda ids, rng: _nutritionist(ids, rng, True),
+        ),
+        "patients": (
+            patients,
+            lambda ids, rng: _patient(ids, rng, True, nutritionists),
+        ),
+        "meals": (meals, lambda ids, rng: _meal(ids, rng, True, foods, recipes)),
+        "measurements": (measurements, lambda ids, rng: _measurement(ids, rng, True)),
+    }
+    for phase, name, documents in load_mongodb_data.COLLECTION_LOADS:
+        entry = {
+            "store": "mongodb",
+            "kind": "collection",
+            "collection": name,
+            "phase": phase,
+        }
+        if name in catalog_collections:
+            yield entry, _table_from_rows([with_hash(doc) for doc in documents])
+        elif name in collection_builders:
+            total, build = collection_builders[name]
+            yield entry, _generated(total, build, seed)
+
+
+# --- cache ---
+
+
+def snapshot_key(patients=None, seed=0):
+    """Chave do snapshot: versão, fontes dos dados e, se gerado, escala e semente."""
+    digest = hashlib.sha256(f"columnar-v{FORMAT_VERSION}:{patients}:{seed}".encode())
+    root = Path(__file__).resolve().parent
+    for name in SOURCES:
+        digest.update((root / name).read_bytes())
+    source = "canonico" if patients is None else f"gerado-{patients}-s{seed}"
+    return f"{source}-{digest.hexdigest()[:12]}"
+
+
+def ensure_snapshot(patients=None, seed=0, root=None):
+    """Retorna o diretório do snapshot, construindo-o só se ainda não existe."""
+    require_pyarrow()
+    key = snapshot_key(patients, seed)
+    directory = Path(root or SNAPSHOT_ROOT) / key
+    if not (directory / MANIFEST).exists():
+        tables = (
+            canonical_tables() if patients is None else generated_tables(patients, seed)
+        )
+        build_snapshot(directory, tables, key)
+    return directory
+
+
+def parse_args(argv=None):
+    """Lê as opções de linha de comando."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="constrói (ou reaproveita) um snapshot")
+    build.add_argument(
+        "--patients", type=int, help="gera um conjunto sintético com N pacientes"
+    )
+    build.add_argument("--seed", type=int, default=0)
+    build.add_argument("--root", type=Path, default=SNAPSHOT_ROOT)
+
+    info = commands.add_parser("info", help="mostra as tabelas de um snapshot")
+    info.add_argument("directory", type=Path)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == "build":
+        directory = ensure_snapshot(args.patients, args.seed, args.root)
+        print(directory)
+        return True
+
+    snapshot = ColumnarSnapshot(args.directory)
+    for entry in snapshot.manifest["tables"]:
+        size = (args.directory / entry["file"]).stat().st_size
+        print(f"{entry['file']}: {entry['rows']} linhas, {size / 1e6:.1f} MB")
+    print(f"Total: {snapshot.total_rows()} linhas")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,118 @@
+"""
+Conversas entre nutricionista e paciente no modelo de grafo.
+
+Cada par nutricionista–paciente tem um nó ``Conversa`` (id
+``"<nutricionista>:<paciente>"``). As mensagens da conversa formam uma
+lista encadeada em ordem de envio::
+
+    (:Conversa)-[:FIRST]->(:Mensagem)-[:NEXT]->(:Mensagem)-[:NEXT]->...
+    (:Conversa)-[:LATEST]->(última :Mensagem)
+
+e a conversa guarda o total de mensagens e, para cada lado, quantas ele
+recebeu e ainda não leu. Assim a caixa de entrada de um participante lê
+só as suas conversas e a última mensagem de cada uma, e "as últimas N
+mensagens" percorrem N relacionamentos a partir de ``LATEST``, qualquer
+que seja o tamanho do histórico.
+
+O loader monta essas estruturas a partir das mensagens canônicas com
+``conversation_threads``; depois da carga, ``GraphStore.append_messages`` e
+``GraphStore.mark_read`` as mantêm consistentes numa única transação.
+"""
+
+SIDES = ("Nutricionista", "Paciente")
+
+# Tipos de relacionamento por lado da conversa
+SENT = {"Nutricionista": "NUTRICIONISTA_ENVIA", "Paciente": "PACIENTE_ENVIA"}
+RECEIVED = {"Nutricionista": "PARA_NUTRICIONISTA", "Paciente": "PARA_PACIENTE"}
+PARTICIPATES = {
+    "Nutricionista": "NUTRICIONISTA_TEM_CONVERSA",
+    "Paciente": "PACIENTE_TEM_CONVERSA",
+}
+
+# Contadores de mensagens recebidas e não lidas, por quem as recebeu
+UNREAD = {"Nutricionista": "nao_lidas_nutricionista", "Paciente": "nao_lidas_paciente"}
+
+
+def conversation_id(nutritionist_id, patient_id):
+    """Id do nó Conversa de um par nutricionista–paciente"""
+    return f"{nutritionist_id}:{patient_id}"
+
+
+def other_side(label):
+    """O outro participante da conversa: "Paciente" para "Nutricionista" e vice-versa"""
+    if label not in SIDES:
+        raise ValueError(f"Participante inválido: {label}")
+    return SIDES[1 - SIDES.index(label)]
+
+
+def new_conversation(nutritionist_id, patient_id):
+    """Propriedades de uma conversa ainda sem mensagens"""
+    return {
+        "id": conversation_id(nutritionist_id, patient_id),
+        "nutricionista_id": nutritionist_id,
+        "paciente_id": patient_id,
+        "mensagens": 0,
+        **{field: 0 for field in UNREAD.values()},
+    }
+
+
+def message_relationships(parties):
+    """Relacionamentos de envio e destino das mensagens, no formato de RELATIONSHIPS
+
+    ``parties`` tem (id da mensagem, id do nutricionista, id do paciente,
+    rótulo de quem enviou).
+    """
+    pairs = {rel_type: [] for rel_type in (*SENT.values(), *RECEIVED.values())}
+    for message_id, nutritionist_id, patient_id, sender in parties:
+        ids = {"Nutricionista": nutritionist_id, "Paciente": patient_id}
+        receiver = other_side(sender)
+        pairs[SENT[sender]].append((ids[sender], message_id))
+        pairs[RECEIVED[receiver]].append((message_id, ids[receiver]))
+    return [(SENT[side], side, "Mensagem", pairs[SENT[side]]) for side in SIDES] + [
+        (RECEIVED[side], "Mensagem", side, pairs[RECEIVED[side]]) for side in SIDES
+    ]
+
+
+def conversation_threads(messages, parties):
+    """Nós Conversa e seus relacionamentos, no formato de NODE_LOADS/RELATIONSHIPS
+
+    As mensagens de cada par são encadeadas em ordem de data, hora e id.
+    Retorna (conversas, relacionamentos).
+    """
+    by_id = {message["id"]: message for message in messages}
+    threads = {}
+    for message_id, nutritionist_id, patient_id, sender in parties:
+        threads.setdefault((nutritionist_id, patient_id), []).append(
+            (by_id[message_id], sender)
+        )
+
+    conversations = []
+    pairs = {
+        rel_type: [] for rel_type in (*PARTICIPATES.values(), "FIRST", "LATEST", "NEXT")
+    }
+    for (nutritionist_id, patient_id), thread in sorted(threads.items()):
+        thread.sort(key=lambda item: (item[0]["data"], item[0]["hora"], item[0]["id"]))
+        conversation = new_conversation(nutritionist_id, patient_id)
+        conversation["mensagens"] = len(thread)
+        for message, sender in thread:
+            if not message.get("lida"):
+                conversation[UNREAD[other_side(sender)]] += 1
+        conversations.append(conversation)
+
+        key = conversation["id"]
+        pairs[PARTICIPATES["Nutricionista"]].append((nutritionist_id, key))
+        pairs[PARTICIPATES["Paciente"]].append((patient_id, key))
+        ids = [message["id"] for message, _ in thread]
+        pairs["FIRST"].append((key, ids[0]))
+        pairs["LATEST"].append((key, ids[-1]))
+        pairs["NEXT"].extend(zip(ids, ids[1:]))
+
+    relationships = [
+        (PARTICIPATES[side], side, "Conversa", pairs[PARTICIPATES[side]])
+        for side in SIDES
+    ] + [
+        ("FIRST", "Conversa", "Mensagem", pairs["FIRST"]),
+        ("LATEST", "Conversa", "Mensagem", pairs["LATEST"]),
+        ("NEXT", "Mensagem", "Mensagem", pairs["NEXT"]),
+    ]
+    return conversations, relationships
@@ -0,0 +1,437 @@
+"""Repositório de dumps endereçado por conteúdo, com deduplicação.
+
+Dumps diários repetem quase todos os bytes do dia anterior. Em vez de um
+diretório com timestamp por dump, os arquivos são cortados em chunks
+definidos pelo conteúdo (hash rolante "gear", como no FastCDC) e cada chunk
+é gravado uma única vez, comprimido, com o SHA-256 dos bytes originais como
+nome. Um snapshot é só um manifesto JSON com a lista de chunks de cada
+arquivo; como os cortes dependem do conteúdo e não da posição, inserir ou
+remover bytes no meio de um arquivo só altera os chunks ao redor da mudança.
+Estrutura::
+
+    <repositório>/chunks/ab/ab12...ef.zst
+    <repositório>/snapshots/mongodb_20250319_232448.json
+
+Manter 90 snapshots diários custa pouco mais que um: só os chunks novos de
+cada dia ocupam espaço. ``gc`` apaga os snapshots fora da retenção e os
+chunks que nenhum snapshot referencia; ``verify`` recalcula o hash de cada
+chunk referenciado. A restauração lê os chunks em paralelo.
+
+Para deduplicar bem, o conteúdo deve entrar sem compressão (a compressão é
+feita por chunk): ``scripts/dump_databases.py --store`` exporta o MongoDB com
+``--compression none`` e transmite o dump do Neo4j direto para o
+repositório.
+
+Uso:
+    python dump_store.py add dumps/mongodb/mongodb_dump_20250319_232448
+    python dump_store.py list
+    python dump_store.py restore mongodb_dump_20250319_232448 /tmp/restaurado
+    python dump_store.py gc --keep-days 90
+    python dump_store.py verify
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+STORE_DIR = os.getenv("DUMP_STORE_DIR", "./dumps/store")
+MIN_CHUNK = 16 * 1024
+MAX_CHUNK = 256 * 1024
+# 16 bits de máscara: um corte a cada ~64 KiB depois do mínimo
+CUT_MASK = 0xFFFF << 48
+READ_SIZE = 4 * 1024 * 1024
+MAX_WORKERS = 4
+# Chunks mais novos que isto não são apagados pelo gc: podem pertencer a um
+# snapshot ainda em gravação, cujo manifesto só é escrito no fim
+GC_GRACE_SECONDS = 3600
+
+_MASK64 = (1 << 64) - 1
+# Tabela fixa de 256 valores de 64 bits; mudá-la muda todos os cortes
+GEAR = [
+    int.from_bytes(hashlib.sha256(bytes([i])).digest()[:8], "big") for i in range(256)
+]
+CHUNK_SUFFIXES = {".zst": "zstd", ".gz": "gzip"}
+
+
+class CorruptChunk(ValueError):
+    """Chunk ausente ou cujo conteúdo não corresponde ao hash."""
+
+
+def cut_point(data):
+    """Retorna o tamanho do primeiro chunk de data.
+
+    Os primeiros MIN_CHUNK bytes nunca são cortados (e nem entram no hash),
+    o que limita o tamanho mínimo e acelera o corte; MAX_CHUNK limita o
+    máximo.
+    """
+    size = len(data)
+    if size <= MIN_CHUNK:
+        return size
+    end = min(size, MAX_CHUNK)
+    gear = GEAR
+    h = 0
+    position = MIN_CHUNK
+    for byte in data[MIN_CHUNK:end]:
+        h = ((h << 1) + gear[byte]) & _MASK64
+        position += 1
+        if not h & CUT_MASK:
+            return position
+    return end
+
+
+def iter_chunks(f):
+    """Divide um arquivo binário aberto em chunks definidos pelo conteúdo."""
+    buffer = b""
+    eof = False
+    while True:
+        # Sempre há MAX_CHUNK bytes à frente, exceto no fim do arquivo, para
+        # que o corte não dependa de onde as leituras terminaram
+        while not eof and len(buffer) < MAX_CHUNK:
+            block = f.read(READ_SIZE)
+            if not block:
+                eof = True
+            buffer += block
+        if not buffer:
+            return
+        view = memoryview(buffer)
+        start = 0
+        while len(buffer) - start >= MAX_CHUNK or (eof and start < len(buffer)):
+            size = cut_point(view[start : start + MAX_CHUNK])
+            yield bytes(view[start : start + size])
+            start += size
+        view.release()
+        buffer = buffer[start:]
+
+
+def _compress(data):
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=3).compress(data), ".zst"
+    return gzip.compress(data, compresslevel=6, mtime=0), ".gz"
+
+
+def _decompress(data, suffix):
+    if CHUNK_SUFFIXES[suffix] == "zstd":
+        if zstandard is None:
+            raise CorruptChunk("Chunk zstd requer o pacote 'zstandard'.")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def _write_json(path, data):
+    """Grava JSON de forma atômica (arquivo temporário e rename)."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _ordered_map(executor, func, items, window):
+    """Como executor.map, mas com no máximo window tarefas adiantadas."""
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(func, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+class ChunkStore:
+    """Chunks comprimidos endereçados por SHA-256 e manifestos de snapshot."""
+
+    def __init__(self, root=STORE_DIR):
+        self.root = Path(root)
+        self.chunks_dir = self.root / "chunks"
+        self.snapshots_dir = self.root / "snapshots"
+
+    def _chunk_base(self, digest):
+        return self.chunks_dir / digest[:2] / digest
+
+    def chunk_path(self, digest):
+        """Retorna o caminho do chunk gravado, ou None se ele não existe."""
+        base = self._chunk_base(digest)
+        for suffix in CHUNK_SUFFIXES:
+            path = base.with_name(digest + suffix)
+            if path.exists():
+                return path
+        return None
+
+    def put_chunk(self, data):
+        """Grava um chunk se ele ainda não existe; retorna (hash, bytes gravados)."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.chunk_path(digest)
+        if path is not None:
+            # Renova o mtime para que o gc não apague um chunk reaproveitado
+            # por um snapshot ainda em gravação
+            os.utime(path)
+            return digest, 0
+        compressed, suffix = _compress(data)
+        path = self._chunk_base(digest).with_name(digest + suffix)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_bytes(compressed)
+        os.replace(tmp_path, path)
+        return digest, len(compressed)
+
+    def get_chunk(self, digest):
+        """Lê um chunk e confere o hash do conteúdo."""
+        path = self.chunk_path(digest)
+        if path is None:
+            raise CorruptChunk(f"Chunk ausente: {digest}")
+        data = _decompress(path.read_bytes(), path.suffix)
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise CorruptChunk(f"Chunk corrompido: {digest}")
+        return data
+
+    def add_stream(self, f, path):
+        """Grava o conteúdo de um arquivo aberto; retorna a entrada do manifesto."""
+        sha256 = hashlib.sha256()
+        entry = {"path": str(path), "size": 0, "chunks": [], "stored_bytes": 0}
+        for data in iter_chunks(f):
+            digest, stored = self.put_chunk(data)
+            sha256.update(data)
+            entry["size"] += len(data)
+            entry["stored_bytes"] += stored
+            entry["chunks"].append([digest, len(data)])
+        entry["sha256"] = sha256.hexdigest()
+        return entry
+
+    def add_file(self, path, relative_path):
+        with open(path, "rb") as f:
+            return self.add_stream(f, relative_path)
+
+    def add_tree(self, source, max_workers=MAX_WORKERS):
+        """Grava um arquivo ou os arquivos de um diretório, em processos paralelos.
+
+        O corte em chunks é CPU puro em Python, então cada arquivo vai para um
+        processo; os processos gravam os chunks direto no repositório.
+        """
+        source = Path(source)
+        if source.is_file():
+            return [self.add_file(source, source.name)]
+        paths = sorted(p for p in source.rglob("*") if p.is_file())
+        relative = [p.relative_to(source).as_posix() for p in paths]
+        if max_workers <= 1 or len(paths) <= 1:
+            return [self.add_file(p, r) for p, r in zip(paths, relative)]
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            return list(
+                executor.map(_add_file, [self.root] * len(paths), paths, relative)
+            )
+
+    def commit(self, name, files, source=None):
+        """Grava o manifesto do snapshot; só a partir daqui ele existe."""
+        self.snapshots_dir.mkdir(parents=True, exist_ok=True)
+        path = self.snapshots_dir / f"{name}.json"
+        if path.exists():
+            raise FileExistsError(f"Snapshot já existe: {name}")
+        manifest = {
+            "name": name,
+            "source": str(source) if source is not None else None,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "size": sum(entry["size"] for entry in files),
+            "stored_bytes": sum(entry.pop("stored_bytes", 0) for entry in files),
+            "files": files,
+        }
+        _write_json(path, manifest)
+        return manifest
+
+    def snapshot(self, source, name=None, max_workers=MAX_WORKERS):
+        """Grava um arquivo ou diretório como um novo snapshot."""
+        source = Path(source)
+        files = self.add_tree(source, max_workers)
+        return self.commit(name or source.name, files, source)
+
+    def snapshots(self):
+        """Retorna os manifestos de todos os snapshots, do mais antigo ao mais novo."""
+        if not self.snapshots_dir.exists():
+            return []
+        manifests = []
+        for path in self.snapshots_dir.glob("*.json"):
+            with open(path, encoding="utf-8") as f:
+                manifests.append(json.load(f))
+        return sorted(manifests, key=lambda m: (m["created_at"], m["name"]))
+
+    def load(self, name):
+        with open(self.snapshots_dir / f"{name}.json", encoding="utf-8") as f:
+            return json.load(f)
+
+    def restore(self, name, target, max_workers=MAX_WORKERS):
+        """Recria os arquivos do snapshot em target, lendo os chunks em paralelo."""
+        manifest = self.load(name)
+        target = Path(target)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for entry in manifest["files"]:
+                path = target / entry["path"]
+                path.parent.mkdir(parents=True, exist_ok=True)
+                sha256 = hashlib.sha256()
+                digests = [digest for digest, _ in entry["chunks"]]
+                with open(path, "wb") as f:
+                    for data in _ordered_map(
+                        executor, self.get_chunk, digests, max_workers * 4
+                    ):
+                        sha256.update(data)
+                        f.write(data)
+                if sha256.hexdigest() != entry["sha256"]:
+                    raise CorruptChunk(f"Arquivo restaurado difere: {entry['path']}")
+        return manifest
+
+    def referenced_chunks(self, manifests=None):
+        referenced = set()
+        for manifest in self.snapshots() if manifests is None else manifests:
+            for entry in manifest["files"]:
+                referenced.update(digest for digest, _ in entry["chunks"])
+        return referenced
+
+    def _chunk_files(self):
+        if not self.chunks_dir.exists():
+            return []
+        return [
+            path
+            for path in self.chunks_dir.glob("*/*")
+            if path.suffix in CHUNK_SUFFIXES
+        ]
+
+    def gc(self, keep_days=None, now=None):
+        """Apaga os snapshots fora da retenção e os chunks não referenciados.
+
+        Retorna (snapshots apagados, chunks apagados, bytes liberados).
+        """
+        now = now or datetime.now()
+        manifests = self.snapshots()
+        removed_snapshots = []
+        if keep_days is not None:
+            cutoff = (now - timedelta(days=keep_days)).isoformat(timespec="seconds")
+            for manifest in manifests:
+                if manifest["created_at"] < cutoff:
+                    (self.snapshots_dir / f"{manifest['name']}.json").unlink()
+                    removed_snapshots.append(manifest["name"])
+            manifests = [m for m in manifests if m["name"] not in removed_snapshots]
+
+        referenced = self.referenced_chunks(manifests)
+        grace = time.time() - GC_GRACE_SECONDS
+        removed_chunks = freed = 0
+        for path in self._chunk_files():
+            if path.stem in referenced:
+                continue
+            stat = path.stat()
+            if stat.st_mtime > grace:
+                continue
+            path.unlink()
+            removed_chunks += 1
+            freed += stat.st_size
+        return removed_snapshots, removed_chunks, freed
+
+    def verify(self, max_workers=MAX_WORKERS):
+        """Confere todos os chunks referenciados; retorna a lista de problemas."""
+        problems = []
+        referenced = {}
+        for manifest in self.snapshots():
+            for entry in manifest["files"]:
+                for digest, _ in entry["chunks"]:
+                    referenced.setdefault(digest, f"{manifest['name']}:{entry['path']}")
+
+        def check(digest):
+            try:
+                self.get_chunk(digest)
+            except (CorruptChunk, OSError, EOFError) as e:
+                return f"{referenced[digest]}: {e}"
+            except Exception as e:  # erro de descompressão (zstd/gzip)
+                return f"{referenced[digest]}: Chunk ilegível {digest}: {e}"
+            return None
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            problems = [p for p in executor.map(check, sorted(referenced)) if p]
+        return problems
+
+    def stats(self):
+        """Tamanho lógico de todos os snapshots e espaço de fato ocupado."""
+        manifests = self.snapshots()
+        return {
+            "snapshots": len(manifests),
+            "logical_bytes": sum(m["size"] for m in manifests),
+            "chunks": len(self._chunk_files()),
+            "stored_bytes": sum(p.stat().st_size for p in self._chunk_files()),
+        }
+
+
+def _add_file(root, path, relative_path):
+    # Executado nos processos do add_tree
+    return ChunkStore(root).add_file(path, relative_path)
+
+
+def parse_args(argv=None):
+    """Lê as opções de linha de comando."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--store", type=Path, default=STORE_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="grava um arquivo ou diretório")
+    add.add_argument("source", type=Path)
+    add.add_argument("--name", help="nome do snapshot (padrão: nome da origem)")
+    commands.add_parser("list", help="lista os snapshots")
+    restore = commands.add_parser("restore", help="recria os arquivos de um snapshot")
+    restore.add_argument("name")
+    restore.add_argument("target", type=Path)
+    gc = commands.add_parser("gc", help="apaga snapshots antigos e chunks órfãos")
+    gc.add_argument(
+        "--keep-days", type=int, help="apaga snapshots mais antigos que N dias"
+    )
+    commands.add_parser("verify", help="confere o hash de todos os chunks")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Executa o comando pedido no repositório de dumps."""
+    args = parse_args(argv)
+    store = ChunkStore(args.store)
+
+    if args.command == "add":
+        manifest = store.snapshot(args.source, args.name)
+        print(
+            f"Snapshot {manifest['name']}: {manifest['size']} bytes, "
+            f"{manifest['stored_bytes']} bytes novos gravados"
+        )
+    elif args.command == "list":
+        for manifest in store.snapshots():
+            print(f"{manifest['created_at']}  {manifest['name']}  {manifest['size']}")
+        stats = store.stats()
+        print(
+            f"{stats['snapshots']} snapshot(s), {stats['logical_bytes']} bytes "
+            f"lógicos em {stats['stored_bytes']} bytes ({stats['chunks']} chunks)"
+        )
+    elif args.command == "restore":
+        store.restore(args.name, args.target)
+        print(f"Snapshot {args.name} restaurado em {args.target}")
+    elif args.command == "gc":
+        snapshots, chunks, freed = store.gc(args.keep_days)
+        print(
+            f"{len(snapshots)} snapshot(s) e {chunks} chunk(s) apagados, "
+            f"{freed} bytes liberados"
+        )
+    else:
+        problems = store.verify()
+        for problem in problems:
+            print(problem)
+        if problems:
+            print(f"\n{len(problems)} chunk(s) com problema.")
+            return False
+        print("Todos os chunks referenciados estão íntegros.")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
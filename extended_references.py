@@ -0,0 +1,164 @@
+"""
+Referências estendidas nos documentos do MongoDB.
+
+``messages`` e ``appointments`` guardam, além do id de cada participante,
+uma cópia do que as consultas mostram dele (``{"id": ..., "nome": ...}``)::
+
+    messages:     "de": {"id": 1, "nome": "Ana Silva"},
+                  "para": {"id": 1, "nome": "João Pereira"}
+    appointments: "nutricionista": {"id": 1, "nome": "Ana Silva"},
+                  "paciente": {"id": 1, "nome": "João Pereira"}
+
+Assim as consultas 8 e 10 leem só a própria coleção, sem os ``$lookup`` em
+``nutritionists`` e ``patients``. Os ids (``de_id``, ``paciente_id`` etc.)
+continuam sendo a referência; o nome é uma cópia, que fica desatualizada
+quando muda na origem até ``propagate_names`` rodar. A troca de nome pelo
+projeto passa por ``rename_participant``, que já propaga.
+"""
+
+import argparse
+
+from pymongo import UpdateMany
+
+from checkpoint import iter_batches
+from mongo_inbox import INBOX, PARTICIPANT_COLLECTIONS, SIDES
+from sync import UPDATED_AT_FIELD
+
+BATCH_SIZE = 1000
+
+# (coleção, campo embutido, campo do id, campo com o tipo do participante);
+# sem campo de tipo, o participante é o lado com o nome do campo
+REFERENCES = [
+    ("messages", "de", "de_id", "de_tipo"),
+    ("messages", "para", "para_id", "para_tipo"),
+    ("appointments", "nutricionista", "nutricionista_id", None),
+    ("appointments", "paciente", "paciente_id", None),
+]
+
+# Cópias mantidas por propagate_names: as referências e os nomes da caixa de entrada
+COPIES = REFERENCES + [
+    (INBOX, "nutricionista", "nutricionista.id", None),
+    (INBOX, "paciente", "paciente.id", None),
+]
+
+
+def reference(participant_id, name):
+    """Cópia embutida de um participante"""
+    return {"id": participant_id, "nome": name}
+
+
+def embed_references(collection, documents, nutritionists, patients):
+    """Documentos de ``collection`` com as referências estendidas preenchidas.
+
+    ``nutritionists`` e ``patients`` são os documentos (com _id e nome) dos
+    participantes; os documentos dados não são alterados.
+    """
+    names = {
+        "nutricionista": {doc["_id"]: doc["nome"] for doc in nutritionists},
+        "paciente": {doc["_id"]: doc["nome"] for doc in patients},
+    }
+    specs = [spec for spec in REFERENCES if spec[0] == collection]
+    embedded = []
+    for document in documents:
+        document = dict(document)
+        for _, field, id_field, kind_field in specs:
+            side = document[kind_field] if kind_field else field
+            participant_id = document[id_field]
+            document[field] = reference(participant_id, names[side].get(participant_id))
+        embedded.append(document)
+    return embedded
+
+
+def create_reference_indexes(db):
+    """Índices pelos ids dos participantes, usados na propagação dos nomes"""
+    for collection, _, id_field, kind_field in REFERENCES:
+        keys = [(kind_field, 1)] if kind_field else []
+        db[collection].create_index(keys + [(id_field, 1)])
+
+
+def _copy_updates(side, participant_id, name):
+    """(coleção, UpdateMany) que acertam as cópias desatualizadas do nome"""
+    for collection, field, id_field, kind_field in COPIES:
+        if kind_field is None and field != side:
+            continue
+        stale = {id_field: participant_id, f"{field}.nome": {"$ne": name}}
+        if kind_field:
+            stale[kind_field] = side
+        yield collection, UpdateMany(
+            stale,
+            {
+                "$set": {f"{field}.nome": name},
+                "$currentDate": {UPDATED_AT_FIELD: True},
+            },
+        )
+
+
+def propagate_names(db, side=None, ids=None, batch_size=BATCH_SIZE):
+    """Atualiza em lote as cópias dos nomes que diferem da origem.
+
+    Sem ``side`` percorre nutricionistas e pacientes; ``ids`` limita aos
+    participantes dados. Só documentos com o nome desatualizado são
+    escritos, então rodar de novo não muda nada. Retorna quantos documentos
+    foram alterados por coleção.
+    """
+    requests = {collection: [] for collection, *_ in COPIES}
+    for current in (side,) if side else SIDES:
+        query = {"_id": {"$in": list(ids)}} if ids is not None else {}
+        for doc in db[PARTICIPANT_COLLECTIONS[current]].find(query, {"nome": 1}):
+            for collection, update in _copy_updates(current, doc["_id"], doc["nome"]):
+                requests[collection].append(update)
+
+    modified = {}
+    for collection, updates in requests.items():
+        modified[collection] = 0
+        for batch in iter_batches(updates, batch_size):
+            result = db[collection].bulk_write(batch, ordered=False)
+            modified[collection] += result.modified_count
+    return modified
+
+
+def rename_participant(db, side, participant_id, name):
+    """Troca o nome de um nutricionista ou paciente e propaga para as cópias"""
+    result = db[PARTICIPANT_COLLECTIONS[side]].update_one(
+        {"_id": participant_id},
+        {"$set": {"nome": name}, "$currentDate": {UPDATED_AT_FIELD: True}},
+    )
+    if result.matched_count == 0:
+        raise ValueError(f"{side} {participant_id} não encontrado")
+    return propagate_names(db, side, [participant_id])
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Propaga os nomes dos participantes para as cópias embutidas."
+    )
+    parser.add_argument("--side", choices=SIDES, help="Só nutricionistas ou pacientes")
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=BATCH_SIZE,
+        help=f"Atualizações por bulk_write (padrão: {BATCH_SIZE})",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Roda a propagação no banco configurado."""
+    from pymongo import MongoClient
+
+    from load_mongodb_data import MONGO_DB, MONGO_URI
+
+    args = parse_args(argv)
+    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
+    try:
+        modified = propagate_names(
+            client[MONGO_DB], args.side, batch_size=args.batch_size
+        )
+    finally:
+        client.close()
+    for collection, count in modified.items():
+        print(f"{collection}: {count} documentos atualizados")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Migração dos tipos de relacionamento sobrecarregados do grafo.
+
+Antes, ``INCLUI`` ligava PlanoAlimentar e Refeicao a Alimento e Receita, e
+``ENVIA``/``PARA`` ligavam Mensagem tanto a Paciente quanto a Nutricionista.
+Uma travessia por esses tipos expandia todos os relacionamentos do tipo e
+filtrava os rótulos depois; com um tipo por par de rótulos, o planner do
+Neo4j só expande os relacionamentos que a consulta quer.
+
+A migração troca o tipo em lotes de ``--batch-size`` relacionamentos, cada
+lote numa transação, até não sobrar nenhum com o tipo antigo: pode ser
+interrompida e executada de novo. ``--reverse`` volta aos tipos antigos.
+
+Uso::
+
+    python graph_migrations.py [--batch-size N] [--reverse]
+"""
+
+import argparse
+import sys
+
+from instrumentation import log, phase, start_run
+
+BATCH_SIZE = 10_000
+
+# (tipo antigo, rótulo de origem, rótulo de destino, tipo novo)
+RELATIONSHIP_RENAMES = [
+    ("INCLUI", "PlanoAlimentar", "Alimento", "PLANO_INCLUI_ALIMENTO"),
+    ("INCLUI", "Refeicao", "Receita", "REFEICAO_TEM_RECEITA"),
+    ("INCLUI", "Refeicao", "Alimento", "REFEICAO_TEM_ALIMENTO"),
+    ("ENVIA", "Nutricionista", "Mensagem", "NUTRICIONISTA_ENVIA"),
+    ("ENVIA", "Paciente", "Mensagem", "PACIENTE_ENVIA"),
+    ("PARA", "Mensagem", "Paciente", "PARA_PACIENTE"),
+    ("PARA", "Mensagem", "Nutricionista", "PARA_NUTRICIONISTA"),
+]
+
+
+def migrate_relationship_types(store, batch_size=BATCH_SIZE, reverse=False):
+    """Troca os tipos de RELATIONSHIP_RENAMES no store (um GraphStore).
+
+    Retorna {tipo novo (ou antigo, com reverse): relacionamentos trocados}.
+    Cada tipo é uma fase da execução corrente.
+    """
+    moved = {}
+    for old, from_label, to_label, new in RELATIONSHIP_RENAMES:
+        if reverse:
+            old, new = new, old
+        total = 0
+        with phase(f"{from_label}-{new}-{to_label}"):
+            while True:
+                changed = store.retype_relationships(
+                    old, from_label, to_label, new, batch_size
+                )
+                total += changed
+                if changed < batch_size:
+                    break
+        log(f"{from_label}-[{old}]->{to_label}: {total} renomeado(s) para {new}")
+        moved[new] = moved.get(new, 0) + total
+    return moved
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Separa os tipos de relacionamento INCLUI, ENVIA e PARA"
+    )
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument(
+        "--reverse", action="store_true", help="Volta aos tipos antigos"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    from neo4j import GraphDatabase
+
+    from load_data import NEO4J_PASSWORD, NEO4J_URI, NEO4J_USER, Neo4jGraphStore
+
+    run = start_run("neo4j_migration")
+    driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+    try:
+        with driver.session() as session:
+            migrate_relationship_types(
+                Neo4jGraphStore(session), args.batch_size, reverse=args.reverse
+            )
+        return True
+    except Exception as e:
+        print(f"Erro na migração: {str(e)}")
+        return False
+    finally:
+        driver.close()
+        run.write()
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,440 @@
+"""
+Interface dos loaders com o banco de grafos e um stand-in em memória.
+
+O loader do Neo4j (``load_data.py``) não fala Cypher diretamente: cada
+escrita passa por um ``GraphStore``, uma transação por chamada, e é
+contabilizada na instrumentação (transações, linhas e novas tentativas).
+Há duas implementações:
+
+- ``load_data.Neo4jGraphStore``, que executa o Cypher no servidor;
+- ``MemoryGraphStore``, um grafo em listas de adjacência, sem servidor, para
+  testar lotes, retomada e sincronização offline e perfilar só o lado
+  Python da carga (``python load_data.py --backend memory``).
+
+Além das escritas da carga, a interface tem as buscas de que as consultas
+documentadas (``queries.py``) precisam: nó por id, nós por rótulo e
+propriedades, vizinhos por tipo de relacionamento e direção, e contagens;
+e as operações das conversas (``conversations.py``): anexar mensagens,
+marcar como lidas, últimas mensagens e caixa de entrada.
+"""
+
+import conversations
+from instrumentation import count, transaction
+from sync import HASH_FIELD
+
+DIRECTIONS = ("out", "in")
+
+
+class GraphStore:
+    """Operações de grafo usadas pelos loaders e pelas consultas."""
+
+    # --- escritas (uma transação por chamada) ---
+
+    def clear(self):
+        """Remove todos os nós e relacionamentos."""
+        raise NotImplementedError
+
+    def create_constraints(self, labels):
+        """Garante a unicidade de id nos nós de cada rótulo."""
+        raise NotImplementedError
+
+    def merge_nodes(self, label, rows):
+        """Cria ou substitui os nós identificados por row["id"]."""
+        raise NotImplementedError
+
+    def merge_relationships(self, rel_type, from_label, to_label, rows):
+        """Cria ou substitui relacionamentos entre os ids row["de"] e row["para"].
+
+        As propriedades vêm de row["props"], mais o hash de conteúdo; linhas
+        cujas pontas não existem são ignoradas.
+        """
+        raise NotImplementedError
+
+    def delete_nodes(self, label, ids):
+        """Remove os nós e seus relacionamentos."""
+        raise NotImplementedError
+
+    def delete_relationships(self, rel_type, from_label, to_label, keys):
+        """Remove os relacionamentos dos pares (de, para)."""
+        raise NotImplementedError
+
+    def retype_relationships(self, rel_type, from_label, to_label, new_type, limit):
+        """Troca o tipo de até ``limit`` relacionamentos; retorna quantos trocou."""
+        raise NotImplementedError
+
+    def append_message(self, nutritionist_id, patient_id, sender, message):
+        """Acrescenta a mensagem ao fim da conversa do par, numa transação.
+
+        ``sender`` é o rótulo de quem envia ("Nutricionista" ou "Paciente").
+        Cria a conversa se preciso, liga a mensagem a ela (FIRST ou NEXT da
+        anterior, LATEST) e aos participantes, e soma os contadores.
+        Levanta ValueError se um dos participantes não existe.
+        """
+        self.append_messages(nutritionist_id, patient_id, sender, [message])
+
+    def append_messages(self, nutritionist_id, patient_id, sender, messages):
+        """Acrescenta as mensagens, na ordem, ao fim da conversa, numa transação.
+
+        Como ``append_message``, com todas as mensagens enviadas por ``sender``.
+        """
+        raise NotImplementedError
+
+    def mark_read(self, nutritionist_id, patient_id, reader):
+        """Marca como lidas as mensagens recebidas por ``reader`` na conversa.
+
+        Zera o contador de não lidas desse lado; retorna quantas marcou.
+        """
+        raise NotImplementedError
+
+    # --- leituras ---
+
+    def latest_messages(self, nutritionist_id, patient_id, limit):
+        """As ``limit`` últimas mensagens da conversa, da mais recente à mais antiga."""
+        raise NotImplementedError
+
+    def inbox(self, label, node_id):
+        """Conversas do participante, (conversa, última mensagem), da mais recente."""
+        raise NotImplementedError
+
+    def node_hashes(self, label):
+        """Mapeia o id de cada nó do rótulo ao hash de conteúdo gravado."""
+        raise NotImplementedError
+
+    def relationship_hashes(self, rel_type, from_label, to_label):
+        """Mapeia cada par (de, para) do tipo ao hash de conteúdo gravado."""
+        raise NotImplementedError
+
+    def relationships(self, rel_type, from_label, to_label):
+        """Gera os relacionamentos do tipo entre os rótulos, em ordem de (de, para).
+
+        Cada linha tem o formato das escritas: {"de", "para", "props"}, com o
+        hash de conteúdo dentro de props.
+        """
+        raise NotImplementedError
+
+    def node(self, label, node_id):
+        """Propriedades do nó, ou None se ele não existe."""
+        raise NotImplementedError
+
+    def missing_nodes(self, label, ids):
+        """Os ids, na ordem dada, que não têm nó do rótulo (uma só leitura)."""
+        raise NotImplementedError
+
+    def nodes(self, label, **properties):
+        """Nós do rótulo com as propriedades dadas, em ordem de id."""
+        raise NotImplementedError
+
+    def neighbors(self, label, node_id, rel_type, direction="out", other_label=None):
+        """Vizinhos do nó por um tipo de relacionamento, em ordem de id.
+
+        Retorna pares (propriedades do relacionamento, propriedades do
+        vizinho); ``direction`` é "out" (o nó é a origem) ou "in".
+        """
+        raise NotImplementedError
+
+    def count_nodes(self, label=None):
+        raise NotImplementedError
+
+    def count_relationships(self, rel_type=None):
+        raise NotImplementedError
+
+
+def _properties(values):
+    """Copia as propriedades como o Neo4j as grava: sem nulos, sem mapas."""
+    properties = {}
+    for key, value in values.items():
+        if value is None:
+            continue
+        if isinstance(value, dict) or (
+            isinstance(value, list) and any(isinstance(v, (dict, list)) for v in value)
+        ):
+            raise TypeError(f"Propriedade {key!r} não pode guardar {value!r}")
+        properties[key] = list(value) if isinstance(value, list) else value
+    return properties
+
+
+class MemoryGraphStore(GraphStore):
+    """Grafo em memória, em listas de adjacência indexadas por (rótulo, id).
+
+    Segue a semântica do Cypher dos loaders: MERGE por id com ``SET n =
+    row`` (propriedades substituídas, nulos descartados), um relacionamento
+    por tipo e par de nós, DETACH DELETE. Cada escrita conta como uma
+    transação e registra as linhas; nenhum byte é enviado. Não grava
+    ``updated_at`` nem tombstones, que só servem aos dumps do Neo4j.
+    """
+
+    def __init__(self):
+        self._nodes = {}  # {rótulo: {id: propriedades}}
+        self._out = {}  # {(rótulo, id): {tipo: {(rótulo, id): propriedades}}}
+        self._in = {}  # o mesmo, a partir do destino
+        self.constraints = set()
+
+    def _write(self, rows, apply):
+        with transaction():
+            apply()
+        count(rows=len(rows))
+
+    # --- escritas ---
+
+    def clear(self):
+        with transaction():
+            self._nodes.clear()
+            self._out.clear()
+            self._in.clear()
+
+    def create_constraints(self, labels):
+        self.constraints.update(labels)
+
+    def merge_nodes(self, label, rows):
+        def apply():
+            nodes = self._nodes.setdefault(label, {})
+            for row in rows:
+                if row.get("id") is None:
+                    raise ValueError(f"Nó {label} sem id: {row!r}")
+                nodes[row["id"]] = _properties(row)
+
+        self._write(rows, apply)
+
+    def merge_relationships(self, rel_type, from_label, to_label, rows):
+        def apply():
+            for row in rows:
+                start, end = (from_label, row["de"]), (to_label, row["para"])
+                if not (self._exists(*start) and self._exists(*end)):
+                    continue
+                properties = _properties(row["props"])
+                if row.get(HASH_FIELD) is not None:
+                    properties[HASH_FIELD] = row[HASH_FIELD]
+                self._out.setdefault(start, {}).setdefault(rel_type, {})[
+                    end
+                ] = properties
+                self._in.setdefault(end, {}).setdefault(rel_type, {})[
+                    start
+                ] = properties
+
+        self._write(rows, apply)
+
+    def delete_nodes(self, label, ids):
+        def apply():
+            for node_id in ids:
+                key = (label, node_id)
+                if self._nodes.get(label, {}).pop(node_id, None) is None:
+                    continue
+                for adjacency, reverse in (
+                    (self._out, self._in),
+                    (self._in, self._out),
+                ):
+                    for rel_type, others in adjacency.pop(key, {}).items():
+                        for other in others:
+                            reverse[other][rel_type].pop(key, None)
+
+        self._write(ids, apply)
+
+    def delete_relationships(self, rel_type, from_label, to_label, keys):
+        def apply():
+            for de, para in keys:
+                start, end = (from_label, de), (to_label, para)
+                self._out.get(start, {}).get(rel_type, {}).pop(end, None)
+                self._in.get(end, {}).get(rel_type, {}).pop(start, None)
+
+        self._write(keys, apply)
+
+    def retype_relationships(self, rel_type, from_label, to_label, new_type, limit):
+        moved = []
+
+        def apply():
+            for (label, de), types in self._out.items():
+                if label != from_label or len(moved) == limit:
+                    continue
+                others = types.get(rel_type, {})
+                for end in [end for end in others if end[0] == to_label]:
+                    if len(moved) == limit:
+                        break
+                    start = (from_label, de)
+                    properties = others.pop(end)
+                    self._in[end][rel_type].pop(start)
+                    types.setdefault(new_type, {})[end] = properties
+                    self._in[end].setdefault(new_type, {})[start] = properties
+                    moved.append((de, end[1]))
+
+        self._write(moved, apply)
+        return len(moved)
+
+    def _link(self, rel_type, start, end, properties=None):
+        properties = {} if properties is None else properties
+        self._out.setdefault(start, {}).setdefault(rel_type, {})[end] = properties
+        self._in.setdefault(end, {}).setdefault(rel_type, {})[start] = properties
+
+    def _unlink(self, rel_type, start, end):
+        self._out.get(start, {}).get(rel_type, {}).pop(end, None)
+        self._in.get(end, {}).get(rel_type, {}).pop(start, None)
+
+    def _single(self, key, rel_type, direction="out"):
+        """O único vizinho por um relacionamento (ex.: LATEST), ou None."""
+        adjacency = self._out if direction == "out" else self._in
+        others = adjacency.get(key, {}).get(rel_type, {})
+        return next(iter(others), None)
+
+    def append_messages(self, nutritionist_id, patient_id, sender, messages):
+        receiver = conversations.other_side(sender)
+        ids = {"Nutricionista": nutritionist_id, "Paciente": patient_id}
+        if not all(self._exists(label, node_id) for label, node_id in ids.items()):
+            raise ValueError(f"Participantes não encontrados: {ids}")
+        for message in messages:
+            if message.get("id") is None:
+                raise ValueError(f"Mensagem sem id: {message!r}")
+        conversation_id = conversations.conversation_id(nutritionist_id, patient_id)
+        key = ("Conversa", conversation_id)
+
+        def apply():
+            thread = self._nodes.setdefault("Conversa", {}).setdefault(
+                conversation_id,
+                conversations.new_conversation(nutritionist_id, patient_id),
+            )
+            for label in conversations.SIDES:
+                self._link(conversations.PARTICIPATES[label], (label, ids[label]), key)
+            for message in messages:
+                node = ("Mensagem", message["id"])
+                self._nodes.setdefault("Mensagem", {})[message["id"]] = _properties(
+                    message
+                )
+                self._link(conversations.SENT[sender], (sender, ids[sender]), node)
+                self._link(
+                    conversations.RECEIVED[receiver], node, (receiver, ids[receiver])
+                )
+
+                previous = self._single(key, "LATEST")
+                if previous is None:
+                    self._link("FIRST", key, node)
+                else:
+                    self._unlink("LATEST", key, previous)
+                    self._link("NEXT", previous, node)
+                self._link("LATEST", key, node)
+                thread["mensagens"] += 1
+                if not message.get("lida"):
+                    thread[conversations.UNREAD[receiver]] += 1
+
+        if messages:
+            self._write(messages, apply)
+
+    def mark_read(self, nutritionist_id, patient_id, reader):
+        conversation_id = conversations.conversation_id(nutritionist_id, patient_id)
+        received = conversations.RECEIVED[reader]
+        marked = []
+
+        def apply():
+            thread = self._nodes.get("Conversa", {}).get(conversation_id)
+            if thread is None or not thread[conversations.UNREAD[reader]]:
+                return
+            # As não lidas estão no fim: volta a partir de LATEST até zerar
+            node = self._single(("Conversa", conversation_id), "LATEST")
+            while (
+                node is not None and len(marked) < thread[conversations.UNREAD[reader]]
+            ):
+                message = self._nodes[node[0]][node[1]]
+                if self._out.get(node, {}).get(received) and not message.get("lida"):
+                    message["lida"] = True
+                    marked.append(node[1])
+                node = self._single(node, "NEXT", direction="in")
+            thread[conversations.UNREAD[reader]] = 0
+
+        self._write(marked, apply)
+        return len(marked)
+
+    # --- leituras ---
+
+    def latest_messages(self, nutritionist_id, patient_id, limit):
+        conversation_id = conversations.conversation_id(nutritionist_id, patient_id)
+        messages = []
+        node = self._single(("Conversa", conversation_id), "LATEST")
+        while node is not None and len(messages) < limit:
+            messages.append(dict(self._nodes[node[0]][node[1]]))
+            node = self._single(node, "NEXT", direction="in")
+        return messages
+
+    def inbox(self, label, node_id):
+        threads = []
+        for key in self._out.get((label, node_id), {}).get(
+            conversations.PARTICIPATES[label], {}
+        ):
+            latest = self._single(key, "LATEST")
+            threads.append(
+                (
+                    dict(self._nodes[key[0]][key[1]]),
+                    dict(self._nodes[latest[0]][latest[1]]),
+                )
+            )
+        threads.sort(key=lambda item: (item[1]["data"], item[1]["hora"]), reverse=True)
+        return threads
+
+    def _exists(self, label, node_id):
+        return node_id in self._nodes.get(label, {})
+
+    def node_hashes(self, label):
+        return {
+            node_id: properties.get(HASH_FIELD)
+            for node_id, properties in self._nodes.get(label, {}).items()
+        }
+
+    def relationship_hashes(self, rel_type, from_label, to_label):
+        hashes = {}
+        for (label, de), types in self._out.items():
+            if label != from_label:
+                continue
+            for (other_label, para), properties in types.get(rel_type, {}).items():
+                if other_label == to_label:
+                    hashes[(de, para)] = properties.get(HASH_FIELD)
+        return hashes
+
+    def relationships(self, rel_type, from_label, to_label):
+        # Ids de rótulos diferentes podem não ser comparáveis (ex.: Dia)
+        starts = sorted(
+            (de, types)
+            for (label, de), types in self._out.items()
+            if label == from_label
+        )
+        for de, types in starts:
+            ends = sorted(
+                (para, properties)
+                for (other_label, para), properties in types.get(rel_type, {}).items()
+                if other_label == to_label
+            )
+            for para, properties in ends:
+                yield {"de": de, "para": para, "props": dict(properties)}
+
+    def node(self, label, node_id):
+        properties = self._nodes.get(label, {}).get(node_id)
+        return dict(properties) if properties is not None else None
+
+    def missing_nodes(self, label, ids):
+        return [node_id for node_id in ids if not self._exists(label, node_id)]
+
+    def nodes(self, label, **properties):
+        return [
+            dict(node)
+            for _, node in sorted(self._nodes.get(label, {}).items())
+            if all(node.get(key) == value for key, value in properties.items())
+        ]
+
+    def neighbors(self, label, node_id, rel_type, direction="out", other_label=None):
+        if direction not in DIRECTIONS:
+            raise ValueError(f"Direção inválida: {direction}")
+        adjacency = self._out if direction == "out" else self._in
+        others = adjacency.get((label, node_id), {}).get(rel_type, {})
+        return [
+            (dict(properties), dict(self._nodes[other[0]][other[1]]))
+            for other, properties in sorted(others.items(), key=lambda item: item[0][1])
+            if other_label is None or other[0] == other_label
+        ]
+
+    def count_nodes(self, label=None):
+        if label is not None:
+            return len(self._nodes.get(label, {}))
+        return sum(len(nodes) for nodes in self._nodes.values())
+
+    def count_relationships(self, rel_type=None):
+        return sum(
+            len(others)
+            for types in self._out.values()
+            for current, others in types.items()
+            if rel_type is None or current == rel_type
+        )
@@ -0,0 +1,300 @@
+"""Instrumentação leve dos scripts de carga.
+
+Cada execução registra, por fase, o tempo de parede (dividido entre CPU do
+cliente e espera pelo servidor), as linhas escritas, as linhas puladas por
+estarem inalteradas (modo ``--sync``), os bytes enviados, as novas
+tentativas, o número de transações e o pico de memória residente (RSS) do
+processo até o fim da fase.
+Ao final, as métricas são exportadas em formato texto do Prometheus
+(compatível com o textfile collector do node_exporter) e em um resumo JSON.
+
+Os loaders usam as funções de módulo (``phase``, ``transaction``, ``count``
+e ``log``), que operam sobre a execução corrente criada por ``start_run``.
+"""
+
+import json
+import os
+import time
+from contextlib import ExitStack, contextmanager
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+RUN_OUTPUT_DIR = os.getenv("RUN_OUTPUT_DIR", "./runs")
+METRIC_PREFIX = "diet_app_loader"
+SIZE_SAMPLE = 4  # itens amostrados por lote para estimar os bytes enviados
+
+# Ganchos executados em torno de cada fase (ver add_phase_hook)
+PHASE_HOOKS = []
+
+
+def process_peak_rss_bytes():
+    """Retorna o pico de memória residente do processo, em bytes.
+
+    É o ``ru_maxrss``: o máximo desde o início do processo, não o de uma fase.
+    Registrado ao fim de cada fase, só cresce de uma fase para a seguinte; a
+    fase em que ele sobe é a que elevou o pico. Para as alocações de cada fase,
+    use ``--profile tracemalloc``.
+    """
+    if resource is None:
+        return 0
+    # ru_maxrss é dado em KiB no Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def estimate_size(items, size_of):
+    """Estima o tamanho serializado de um lote a partir de uma pequena amostra.
+
+    Serializar o lote inteiro só para medi-lo dobraria o custo de CPU do
+    cliente; a amostra mantém a instrumentação abaixo de 1% da carga.
+    """
+    if not items:
+        return 0
+    step = max(1, len(items) // SIZE_SAMPLE)
+    sample = items[::step]
+    return sum(size_of(item) for item in sample) * len(items) // len(sample)
+
+
+class PhaseStats:
+    """Contadores acumulados de uma fase da carga."""
+
+    __slots__ = (
+        "name",
+        "wall_seconds",
+        "cpu_seconds",
+        "wait_seconds",
+        "transaction_seconds",
+        "transactions",
+        "rows",
+        "skipped",
+        "bytes_sent",
+        "retries",
+        "process_peak_rss_bytes",
+    )
+
+    def __init__(self, name):
+        self.name = name
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.wait_seconds = 0.0
+        self.transaction_seconds = 0.0
+        self.transactions = 0
+        self.rows = 0
+        self.skipped = 0
+        self.bytes_sent = 0
+        self.retries = 0
+        self.process_peak_rss_bytes = 0
+
+    def as_dict(self):
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+
+class RunMetrics:
+    """Métricas de uma execução de carga, agrupadas por fase."""
+
+    def __init__(self, loader, quiet=False):
+        self.loader = loader
+        self.quiet = quiet
+        self.started_at = datetime.now()
+        self.phases = {}
+        self._current = self._get_phase("total")
+        self._start = time.perf_counter()
+
+    def _get_phase(self, name):
+        stats = self.phases.get(name)
+        if stats is None:
+            stats = self.phases[name] = PhaseStats(name)
+        return stats
+
+    @contextmanager
+    def phase(self, name):
+        """Cronometra uma fase; contadores registrados dentro dela são somados a ela.
+
+        O tempo de CPU do processo é medido junto com o tempo de parede: a
+        diferença entre os dois é o tempo gasto esperando o servidor (rede e
+        processamento no banco).
+        """
+        previous = self._current
+        stats = self._current = self._get_phase(name)
+        with ExitStack() as hooks:
+            for hook in PHASE_HOOKS:
+                hooks.enter_context(hook(name))
+            start = time.perf_counter()
+            cpu_start = time.process_time()
+            try:
+                yield stats
+            finally:
+                wall = time.perf_counter() - start
+                cpu = time.process_time() - cpu_start
+                stats.wall_seconds += wall
+                stats.cpu_seconds += cpu
+                stats.wait_seconds += max(wall - cpu, 0.0)
+                stats.process_peak_rss_bytes = process_peak_rss_bytes()
+                self._current = previous
+
+    @contextmanager
+    def transaction(self):
+        """Cronometra uma transação (ou comando de escrita) da fase corrente."""
+        stats = self._current
+        start = time.perf_counter()
+        try:
+            yield stats
+        finally:
+            stats.transaction_seconds += time.perf_counter() - start
+            stats.transactions += 1
+
+    def count(self, rows=0, bytes_sent=0, retries=0, skipped=0):
+        """Soma contadores à fase corrente."""
+        stats = self._current
+        stats.rows += rows
+        stats.skipped += skipped
+        stats.bytes_sent += bytes_sent
+        stats.retries += retries
+
+    def log(self, message):
+        """Imprime uma mensagem de progresso, exceto no modo silencioso."""
+        if not self.quiet:
+            print(message)
+
+    def summary(self):
+        """Retorna o resumo da execução como dicionário serializável."""
+        total = self.phases["total"]
+        total.wall_seconds = time.perf_counter() - self._start
+        total.process_peak_rss_bytes = process_peak_rss_bytes()
+        phases = [s for s in self.phases.values() if s is not total]
+        return {
+            "loader": self.loader,
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "wall_seconds": total.wall_seconds,
+            "rows": total.rows + sum(s.rows for s in phases),
+            "skipped": total.skipped + sum(s.skipped for s in phases),
+            "bytes_sent": total.bytes_sent + sum(s.bytes_sent for s in phases),
+            "retries": total.retries + sum(s.retries for s in phases),
+            "transactions": total.transactions + sum(s.transactions for s in phases),
+            "process_peak_rss_bytes": total.process_peak_rss_bytes,
+            "phases": [s.as_dict() for s in phases],
+        }
+
+    def prometheus_text(self, summary=None):
+        """Formata as métricas por fase no formato texto do Prometheus."""
+        summary = summary or self.summary()
+        metrics = [
+            ("phase_seconds", "wall_seconds", "gauge", "Tempo de parede da fase."),
+            (
+                "phase_cpu_seconds",
+                "cpu_seconds",
+                "gauge",
+                "Tempo de CPU do cliente na fase.",
+            ),
+            (
+                "phase_wait_seconds",
+                "wait_seconds",
+                "gauge",
+                "Tempo de espera pelo servidor na fase.",
+            ),
+            (
+                "phase_transaction_seconds",
+                "transaction_seconds",
+                "gauge",
+                "Tempo gasto em transações na fase.",
+            ),
+            ("phase_transactions", "transactions", "counter", "Transações na fase."),
+            ("phase_rows_written", "rows", "counter", "Linhas escritas na fase."),
+            (
+                "phase_rows_skipped",
+                "skipped",
+                "counter",
+                "Linhas inalteradas puladas na fase.",
+            ),
+            ("phase_bytes_sent", "bytes_sent", "counter", "Bytes enviados na fase."),
+            ("phase_retries", "retries", "counter", "Novas tentativas na fase."),
+            (
+                "process_peak_rss_bytes",
+                "process_peak_rss_bytes",
+                "gauge",
+                "Pico de RSS do processo desde o início, lido ao fim da fase.",
+            ),
+        ]
+        lines = []
+        for name, field, kind, help_text in metrics:
+            metric = f"{METRIC_PREFIX}_{name}"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {kind}")
+            for stats in summary["phases"]:
+                labels = f'loader="{self.loader}",phase="{stats["name"]}"'
+                lines.append(f"{metric}{{{labels}}} {stats[field]}")
+        metric = f"{METRIC_PREFIX}_run_seconds"
+        lines.append(f"# HELP {metric} Tempo total da execução.")
+        lines.append(f"# TYPE {metric} gauge")
+        lines.append(f'{metric}{{loader="{self.loader}"}} {summary["wall_seconds"]}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, directory=None):
+        """Grava o arquivo .prom e o resumo JSON; retorna os caminhos gravados."""
+        directory = Path(directory or RUN_OUTPUT_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        summary = self.summary()
+
+        prom_path = directory / f"{self.loader}.prom"
+        # Escrita atômica para que o coletor nunca leia um arquivo parcial
+        tmp_path = prom_path.with_suffix(".prom.tmp")
+        tmp_path.write_text(self.prometheus_text(summary), encoding="utf-8")
+        tmp_path.replace(prom_path)
+
+        json_path = directory / f"{self.loader}_summary.json"
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        return prom_path, json_path
+
+
+_run = RunMetrics("diet_app")
+
+
+def add_phase_hook(hook):
+    """Registra um gancho de fase.
+
+    ``hook(name)`` deve retornar um gerenciador de contexto, que envolve a
+    execução de cada fase (usado pelo modo de perfil tracemalloc).
+    """
+    PHASE_HOOKS.append(hook)
+
+
+def remove_phase_hook(hook):
+    PHASE_HOOKS.remove(hook)
+
+
+def current_phase_name():
+    """Retorna o nome da fase em execução na execução corrente."""
+    return _run._current.name
+
+
+def start_run(loader, quiet=False):
+    """Inicia uma nova execução instrumentada e a torna corrente."""
+    global _run
+    _run = RunMetrics(loader, quiet=quiet)
+    return _run
+
+
+def current_run():
+    """Retorna a execução corrente."""
+    return _run
+
+
+def phase(name):
+    return _run.phase(name)
+
+
+def transaction():
+    return _run.transaction()
+
+
+def count(rows=0, bytes_sent=0, retries=0, skipped=0):
+    _run.count(rows, bytes_sent, retries, skipped)
+
+
+def log(message):
+    _run.log(message)
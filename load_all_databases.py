@@ -1,7 +1,10 @@
+import argparse
 import subprocess
 import sys
 import time
 
+from profiling import add_profile_argument
+
 
 def print_header(message):
     """Imprime cabeçalho formatado para melhor visualização."""
@@ -55,13 +58,13 @@ def start_docker_services():
         return False
 
 
-def load_neo4j_data():
+def load_neo4j_data(loader_args=()):
     """Carrega dados no Neo4j usando o script Python."""
     print_header("Carregando dados no Neo4j")
 
     try:
         # Executa o script para carregar dados no Neo4j
-        subprocess.run([sys.executable, "load_data.py"], check=True)
+        subprocess.run([sys.executable, "load_data.py", *loader_args], check=True)
         print("Dados carregados no Neo4j com sucesso!")
         return True
     except subprocess.SubprocessError as e:
@@ -69,13 +72,15 @@ def load_neo4j_data():
         return False
 
 
-def load_mongodb_data():
+def load_mongodb_data(loader_args=()):
     """Carrega dados no MongoDB usando o script Python."""
     print_header("Carregando dados no MongoDB")
 
     try:
         # Executa o script para carregar dados no MongoDB
-        subprocess.run([sys.executable, "load_mongodb_data.py"], check=True)
+        subprocess.run(
+            [sys.executable, "load_mongodb_data.py", *loader_args], check=True
+        )
         print("Dados carregados no MongoDB com sucesso!")
         return True
     except subprocess.SubprocessError as e:
@@ -83,8 +88,50 @@ def load_mongodb_data():
         return False
 
 
-def main():
+def parse_args(argv=None):
+    """Lê as opções de linha de comando repassadas aos scripts de carga."""
+    parser = argparse.ArgumentParser(
+        description="Inicia os serviços e carrega os dados nos dois bancos."
+    )
+    parser.add_argument(
+        "--quiet",
+        action="store_true",
+        help="não imprime mensagens de progresso durante a carga",
+    )
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--resume",
+        action="store_true",
+        help="retoma uma carga interrompida, pulando os lotes já confirmados",
+    )
+    mode.add_argument(
+        "--sync",
+        action="store_true",
+        help="sincroniza sem apagar os bancos, escrevendo só os registros alterados",
+    )
+    add_profile_argument(parser)
+    return parser.parse_args(argv)
+
+
+def loader_arguments(args):
+    """Monta os argumentos de linha de comando para os scripts de carga."""
+    loader_args = []
+    if args.quiet:
+        loader_args.append("--quiet")
+    if args.resume:
+        loader_args.append("--resume")
+    if args.sync:
+        loader_args.append("--sync")
+    if args.profile:
+        loader_args.extend(["--profile", args.profile])
+    return loader_args
+
+
+def main(argv=None):
     """Função principal que coordena o carregamento de dados."""
+    args = parse_args(argv)
+    loader_args = loader_arguments(args)
+
     print_header("SISTEMA DE ACOMPANHAMENTO DE DIETAS - CONFIGURAÇÃO DE BANCOS")
 
     # Verificar se o Docker está em execução
@@ -102,10 +149,10 @@ def main():
         return False
 
     # Carregar dados no Neo4j
-    neo4j_success = load_neo4j_data()
+    neo4j_success = load_neo4j_data(loader_args)
 
     # Carregar dados no MongoDB
-    mongodb_success = load_mongodb_data()
+    mongodb_success = load_mongodb_data(loader_args)
 
     # Exibir resumo final
     print_header("RESUMO DA CONFIGURAÇÃO")
@@ -1,9 +1,28 @@
+import argparse
+import json
 import os
 import time
 
 from dotenv import load_dotenv
 from neo4j import GraphDatabase
 
+from checkpoint import LoadJournal, iter_batches, run_batches
+from conversations import (
+    PARTICIPATES,
+    RECEIVED,
+    SENT,
+    UNREAD,
+    conversation_id,
+    conversation_threads,
+    message_relationships,
+    new_conversation,
+    other_side,
+)
+from graph_store import GraphStore, MemoryGraphStore
+from instrumentation import count, estimate_size, log, phase, start_run, transaction
+from profiling import add_profile_argument, profile
+from sync import GRAPH_TOMBSTONE, HASH_FIELD, UPDATED_AT_FIELD, plan_sync, with_hash
+
 # Carregar variáveis de ambiente (opcional)
 load_dotenv()
 
@@ -13,6 +32,8 @@ NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
 NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD", "senha123")
 MAX_CONNECTION_RETRY = 10
 RETRY_INTERVAL = 5  # segundos
+BATCH_SIZE = int(os.getenv("NEO4J_BATCH_SIZE", "1000"))
+BACKENDS = ("neo4j", "memory")
 
 
 def wait_for_neo4j():
@@ -26,11 +47,12 @@ def wait_for_neo4j():
                 result = session.run("RETURN 1 AS num")
                 record = result.single()
                 if record and record["num"] == 1:
-                    print("Conexão com Neo4j estabelecida com sucesso!")
+                    log("Conexão com Neo4j estabelecida com sucesso!")
                     driver.close()
                     return True
         except Exception as e:
-            print(
+            count(retries=1)
+            log(
                 f"Tentativa {i + 1}/{MAX_CONNECTION_RETRY}: Neo4j ainda não está pronto: {str(e)}"
             )
             if driver:
@@ -41,695 +63,1422 @@ def wait_for_neo4j():
     return False
 
 
-def load_nutritionists(tx):
-    query = """
-    // Criar Nutricionistas
-    CREATE (n1:Nutricionista {id: 1, nome: "Ana Silva", especialidade: "Nutrição Esportiva", 
-            experiencia: 8, email: "ana@nutri.com", telefone: "21-99999-1111"})
-    CREATE (n2:Nutricionista {id: 2, nome: "Carlos Mendes", especialidade: "Nutrição Clínica", 
-            experiencia: 5, email: "carlos@nutri.com", telefone: "21-99999-2222"})
-    CREATE (n3:Nutricionista {id: 3, nome: "Mariana Costa", especialidade: "Nutrição Funcional", 
-            experiencia: 12, email: "mariana@nutri.com", telefone: "21-99999-3333"})
+# --- Nutricionistas ---
+NUTRITIONISTS = [
+    {
+        "id": 1,
+        "nome": "Ana Silva",
+        "especialidade": "Nutrição Esportiva",
+        "experiencia": 8,
+        "email": "ana@nutri.com",
+        "telefone": "21-99999-1111",
+    },
+    {
+        "id": 2,
+        "nome": "Carlos Mendes",
+        "especialidade": "Nutrição Clínica",
+        "experiencia": 5,
+        "email": "carlos@nutri.com",
+        "telefone": "21-99999-2222",
+    },
+    {
+        "id": 3,
+        "nome": "Mariana Costa",
+        "especialidade": "Nutrição Funcional",
+        "experiencia": 12,
+        "email": "mariana@nutri.com",
+        "telefone": "21-99999-3333",
+    },
+]
+
+# --- Pacientes ---
+PATIENTS = [
+    {
+        "id": 1,
+        "nome": "João Pereira",
+        "idade": 35,
+        "genero": "M",
+        "altura": 178,
+        "peso_inicial": 92,
+        "email": "joao@email.com",
+        "telefone": "21-88888-1111",
+        "restricoes": ["Glúten"],
+        "alergias": ["Amendoim"],
+        "objetivo": "Emagrecimento",
+    },
+    {
+        "id": 2,
+        "nome": "Maria Santos",
+        "idade": 42,
+        "genero": "F",
+        "altura": 165,
+        "peso_inicial": 78,
+        "email": "maria@email.com",
+        "telefone": "21-88888-2222",
+        "restricoes": ["Lactose"],
+        "alergias": [],
+        "objetivo": "Controle de colesterol",
+    },
+    {
+        "id": 3,
+        "nome": "Pedro Alves",
+        "idade": 28,
+        "genero": "M",
+        "altura": 182,
+        "peso_inicial": 75,
+        "email": "pedro@email.com",
+        "telefone": "21-88888-3333",
+        "restricoes": [],
+        "alergias": [],
+        "objetivo": "Ganho de massa muscular",
+    },
+    {
+        "id": 4,
+        "nome": "Lúcia Ferreira",
+        "idade": 55,
+        "genero": "F",
+        "altura": 160,
+        "peso_inicial": 85,
+        "email": "lucia@email.com",
+        "telefone": "21-88888-4444",
+        "restricoes": ["Sódio"],
+        "alergias": ["Frutos do mar"],
+        "objetivo": "Controle de diabetes",
+    },
+    {
+        "id": 5,
+        "nome": "Ricardo Gomes",
+        "idade": 30,
+        "genero": "M",
+        "altura": 175,
+        "peso_inicial": 88,
+        "email": "ricardo@email.com",
+        "telefone": "21-88888-5555",
+        "restricoes": [],
+        "alergias": ["Nozes"],
+        "objetivo": "Emagrecimento",
+    },
+]
+
+# --- Alimentos ---
+FOODS = [
+    {
+        "id": 1,
+        "nome": "Maçã",
+        "porcao": "1 unidade (150g)",
+        "calorias": 95,
+        "proteinas": 0.5,
+        "carboidratos": 25,
+        "gorduras": 0.3,
+        "fibras": 4.4,
+        "grupo": "Frutas",
+    },
+    {
+        "id": 2,
+        "nome": "Peito de Frango",
+        "porcao": "100g",
+        "calorias": 165,
+        "proteinas": 31,
+        "carboidratos": 0,
+        "gorduras": 3.6,
+        "fibras": 0,
+        "grupo": "Carnes",
+    },
+    {
+        "id": 3,
+        "nome": "Arroz Integral",
+        "porcao": "100g cozido",
+        "calorias": 112,
+        "proteinas": 2.6,
+        "carboidratos": 23.5,
+        "gorduras": 0.9,
+        "fibras": 1.8,
+        "grupo": "Cereais",
+    },
+    {
+        "id": 4,
+        "nome": "Brócolis",
+        "porcao": "100g",
+        "calorias": 34,
+        "proteinas": 2.8,
+        "carboidratos": 6.6,
+        "gorduras": 0.4,
+        "fibras": 2.6,
+        "grupo": "Vegetais",
+    },
+    {
+        "id": 5,
+        "nome": "Salmão",
+        "porcao": "100g",
+        "calorias": 206,
+        "proteinas": 22,
+        "carboidratos": 0,
+        "gorduras": 13,
+        "fibras": 0,
+        "grupo": "Peixes",
+    },
+    {
+        "id": 6,
+        "nome": "Lentilha",
+        "porcao": "100g cozida",
+        "calorias": 116,
+        "proteinas": 9,
+        "carboidratos": 20,
+        "gorduras": 0.4,
+        "fibras": 7.9,
+        "grupo": "Leguminosas",
+    },
+    {
+        "id": 7,
+        "nome": "Iogurte Natural",
+        "porcao": "100g",
+        "calorias": 59,
+        "proteinas": 3.5,
+        "carboidratos": 4.7,
+        "gorduras": 3.3,
+        "fibras": 0,
+        "grupo": "Laticínios",
+    },
+    {
+        "id": 8,
+        "nome": "Aveia",
+        "porcao": "30g",
+        "calorias": 117,
+        "proteinas": 4,
+        "carboidratos": 21,
+        "gorduras": 2,
+        "fibras": 3,
+        "grupo": "Cereais",
+    },
+    {
+        "id": 9,
+        "nome": "Azeite",
+        "porcao": "1 colher (10ml)",
+        "calorias": 90,
+        "proteinas": 0,
+        "carboidratos": 0,
+        "gorduras": 10,
+        "fibras": 0,
+        "grupo": "Óleos",
+    },
+    {
+        "id": 10,
+        "nome": "Banana",
+        "porcao": "1 unidade (120g)",
+        "calorias": 105,
+        "proteinas": 1.3,
+        "carboidratos": 27,
+        "gorduras": 0.4,
+        "fibras": 3.1,
+        "grupo": "Frutas",
+    },
+]
+
+# --- Receitas ---
+RECIPES = [
+    {
+        "id": 1,
+        "nome": "Salada de Frango com Abacate",
+        "instrucoes": "Corte o peito de frango em cubos e grelhe. Misture com abacate, tomate e folhas verdes. Tempere com azeite, limão e sal.",
+        "tempo_preparo": 20,
+        "dificuldade": "Fácil",
+        "calorias": 320,
+    },
+    {
+        "id": 2,
+        "nome": "Bowl de Açaí com Frutas",
+        "instrucoes": "Misture açaí congelado batido com banana. Adicione granola, frutas frescas e mel.",
+        "tempo_preparo": 10,
+        "dificuldade": "Fácil",
+        "calorias": 450,
+    },
+    {
+        "id": 3,
+        "nome": "Salmão Grelhado com Legumes",
+        "instrucoes": "Grelhe o filé de salmão. Refogue brócolis, cenoura e abobrinha. Sirva com arroz integral.",
+        "tempo_preparo": 30,
+        "dificuldade": "Médio",
+        "calorias": 480,
+    },
+    {
+        "id": 4,
+        "nome": "Smoothie Proteico",
+        "instrucoes": "Bata no liquidificador iogurte, banana, aveia, pasta de amendoim e mel.",
+        "tempo_preparo": 5,
+        "dificuldade": "Fácil",
+        "calorias": 350,
+    },
+    {
+        "id": 5,
+        "nome": "Omelete de Legumes",
+        "instrucoes": "Bata 2 ovos, adicione espinafre, tomate e queijo. Cozinhe em frigideira antiaderente.",
+        "tempo_preparo": 15,
+        "dificuldade": "Fácil",
+        "calorias": 280,
+    },
+]
+
+# --- Planos Alimentares ---
+DIET_PLANS = [
+    {
+        "id": 1,
+        "nome": "Emagrecimento Saudável",
+        "descricao": "Plano focado em déficit calórico moderado com alimentos nutritivos",
+        "objetivo": "Perda de peso",
+        "duracao": 90,
+        "calorias_diarias": 1800,
+        "proteinas": "30%",
+        "carboidratos": "40%",
+        "gorduras": "30%",
+    },
+    {
+        "id": 2,
+        "nome": "Ganho de Massa",
+        "descricao": "Plano focado em superávit calórico com alta proteína",
+        "objetivo": "Hipertrofia",
+        "duracao": 120,
+        "calorias_diarias": 2800,
+        "proteinas": "35%",
+        "carboidratos": "45%",
+        "gorduras": "20%",
+    },
+    {
+        "id": 3,
+        "nome": "Controle Glicêmico",
+        "descricao": "Plano para controle de diabetes com baixo índice glicêmico",
+        "objetivo": "Controle de glicemia",
+        "duracao": 180,
+        "calorias_diarias": 1600,
+        "proteinas": "25%",
+        "carboidratos": "35%",
+        "gorduras": "40%",
+    },
+    {
+        "id": 4,
+        "nome": "Controle de Colesterol",
+        "descricao": "Plano para redução de colesterol LDL e aumento de HDL",
+        "objetivo": "Saúde cardiovascular",
+        "duracao": 90,
+        "calorias_diarias": 2000,
+        "proteinas": "25%",
+        "carboidratos": "50%",
+        "gorduras": "25%",
+    },
+    {
+        "id": 5,
+        "nome": "Dieta Anti-inflamatória",
+        "descricao": "Plano rico em antioxidantes e ômega-3",
+        "objetivo": "Redução de inflamação",
+        "duracao": 60,
+        "calorias_diarias": 2200,
+        "proteinas": "20%",
+        "carboidratos": "55%",
+        "gorduras": "25%",
+    },
+]
+
+# --- Refeições ---
+MEALS = [
+    {
+        "id": 1,
+        "tipo": "Café da manhã",
+        "data": "2023-10-18",
+        "hora": "08:00",
+        "calorias": 320,
+        "adesao": "Completa",
+        "registro_foto": True,
+    },
+    {
+        "id": 2,
+        "tipo": "Almoço",
+        "data": "2023-10-18",
+        "hora": "12:30",
+        "calorias": 580,
+        "adesao": "Parcial",
+        "registro_foto": True,
+    },
+    {
+        "id": 3,
+        "tipo": "Lanche",
+        "data": "2023-10-18",
+        "hora": "16:00",
+        "calorias": 180,
+        "adesao": "Completa",
+        "registro_foto": False,
+    },
+    {
+        "id": 4,
+        "tipo": "Jantar",
+        "data": "2023-10-18",
+        "hora": "20:00",
+        "calorias": 450,
+        "adesao": "Completa",
+        "registro_foto": True,
+    },
+    {
+        "id": 5,
+        "tipo": "Café da manhã",
+        "data": "2023-10-19",
+        "hora": "07:45",
+        "calorias": 340,
+        "adesao": "Completa",
+        "registro_foto": True,
+    },
+    {
+        "id": 6,
+        "tipo": "Almoço",
+        "data": "2023-10-19",
+        "hora": "13:00",
+        "calorias": 620,
+        "adesao": "Completa",
+        "registro_foto": True,
+    },
+    {
+        "id": 7,
+        "tipo": "Lanche",
+        "data": "2023-10-19",
+        "hora": "15:30",
+        "calorias": 200,
+        "adesao": "Parcial",
+        "registro_foto": False,
+    },
+    {
+        "id": 8,
+        "tipo": "Jantar",
+        "data": "2023-10-19",
+        "hora": "19:30",
+        "calorias": 380,
+        "adesao": "Não realizada",
+        "registro_foto": False,
+    },
+]
+
+# --- Medidas Corporais ---
+MEASUREMENTS = [
+    {
+        "id": 1,
+        "data": "2023-09-15",
+        "peso": 92,
+        "imc": 29.1,
+        "gordura_corporal": 28,
+        "cintura": 102,
+        "quadril": 106,
+        "pressao": "130/85",
+    },
+    {
+        "id": 2,
+        "data": "2023-10-01",
+        "peso": 89.5,
+        "imc": 28.2,
+        "gordura_corporal": 26.8,
+        "cintura": 99,
+        "quadril": 105,
+        "pressao": "128/83",
+    },
+    {
+        "id": 3,
+        "data": "2023-10-15",
+        "peso": 87.8,
+        "imc": 27.7,
+        "gordura_corporal": 25.5,
+        "cintura": 97,
+        "quadril": 104,
+        "pressao": "125/82",
+    },
+    {
+        "id": 4,
+        "data": "2023-09-10",
+        "peso": 78,
+        "imc": 28.7,
+        "gordura_corporal": 32,
+        "cintura": 91,
+        "quadril": 110,
+        "pressao": "135/88",
+    },
+    {
+        "id": 5,
+        "data": "2023-09-25",
+        "peso": 77.2,
+        "imc": 28.4,
+        "gordura_corporal": 31.5,
+        "cintura": 90,
+        "quadril": 109,
+        "pressao": "132/86",
+    },
+    {
+        "id": 6,
+        "data": "2023-10-10",
+        "peso": 76.5,
+        "imc": 28.1,
+        "gordura_corporal": 30.8,
+        "cintura": 88,
+        "quadril": 108,
+        "pressao": "130/85",
+    },
+]
+
+# --- Mensagens ---
+MESSAGES = [
+    {
+        "id": 1,
+        "conteudo": "Como está se sentindo com a nova dieta?",
+        "data": "2023-10-15",
+        "hora": "14:30",
+        "lida": True,
+    },
+    {
+        "id": 2,
+        "conteudo": "Estou me adaptando bem, mas sinto fome à tarde",
+        "data": "2023-10-15",
+        "hora": "15:45",
+        "lida": True,
+    },
+    {
+        "id": 3,
+        "conteudo": "Vamos ajustar seu lanche da tarde para resolver isso",
+        "data": "2023-10-15",
+        "hora": "16:20",
+        "lida": True,
+    },
+    {
+        "id": 4,
+        "conteudo": "Lembrete: sua consulta é amanhã às 14h",
+        "data": "2023-10-16",
+        "hora": "09:00",
+        "lida": True,
+    },
+    {
+        "id": 5,
+        "conteudo": "Confirmado, estarei lá",
+        "data": "2023-10-16",
+        "hora": "09:15",
+        "lida": True,
+    },
+    {
+        "id": 6,
+        "conteudo": "Como está se sentindo após a última consulta?",
+        "data": "2023-10-20",
+        "hora": "11:00",
+        "lida": False,
+    },
+]
+
+# Participantes de cada mensagem:
+# (id da mensagem, id do nutricionista, id do paciente, rótulo de quem enviou)
+MESSAGE_PARTIES = [
+    (1, 1, 1, "Nutricionista"),
+    (2, 1, 1, "Paciente"),
+    (3, 1, 1, "Nutricionista"),
+    (4, 1, 1, "Nutricionista"),
+    (5, 1, 1, "Paciente"),
+    (6, 2, 2, "Nutricionista"),
+]
+
+# Conversas por par nutricionista–paciente (ver conversations.py)
+CONVERSATIONS, CONVERSATION_RELATIONSHIPS = conversation_threads(
+    MESSAGES, MESSAGE_PARTIES
+)
+
+# --- Consultas ---
+APPOINTMENTS = [
+    {
+        "id": 1,
+        "data": "2023-09-15",
+        "hora": "14:00",
+        "status": "Realizada",
+        "notas": "Avaliação inicial e definição de plano alimentar",
+    },
+    {
+        "id": 2,
+        "data": "2023-10-01",
+        "hora": "15:30",
+        "status": "Realizada",
+        "notas": "Ajustes no plano devido à fome relatada",
+    },
+    {
+        "id": 3,
+        "data": "2023-10-17",
+        "hora": "14:00",
+        "status": "Realizada",
+        "notas": "Progresso acima do esperado, reforço positivo",
+    },
+    {"id": 4, "data": "2023-11-01", "hora": "16:00", "status": "Agendada", "notas": ""},
+    {
+        "id": 5,
+        "data": "2023-09-10",
+        "hora": "09:30",
+        "status": "Realizada",
+        "notas": "Avaliação inicial, paciente com colesterol alto",
+    },
+    {
+        "id": 6,
+        "data": "2023-09-25",
+        "hora": "10:00",
+        "status": "Realizada",
+        "notas": "Melhora nos exames laboratoriais",
+    },
+    {
+        "id": 7,
+        "data": "2023-10-10",
+        "hora": "11:00",
+        "status": "Realizada",
+        "notas": "Exames demonstrando normalização do colesterol",
+    },
+    {
+        "id": 8,
+        "data": "2023-10-25",
+        "hora": "09:30",
+        "status": "Cancelada",
+        "notas": "Paciente não pôde comparecer",
+    },
+]
+
+# Refeições consumidas por cada paciente: (id do paciente, id da refeição)
+CONSUMED_MEALS = [(1, 1), (1, 2), (1, 3), (1, 4), (2, 5), (2, 6), (2, 7), (2, 8)]
+
+
+def day_id(patient_id, date):
+    """Id do nó Dia de um paciente numa data ("AAAA-MM-DD")"""
+    return f"{patient_id}:{date}"
+
+
+def time_tree(meals, consumed):
+    """Árvore de tempo das refeições: Paciente -> Dia -> Refeicao
+
+    Retorna os nós Dia (um por paciente e data), os pares (paciente, dia) e
+    os pares (dia, refeição). Com ela, uma consulta por período percorre só
+    os dias do paciente no intervalo, e não todas as refeições dele.
     """
-    tx.run(query)
-    print("Nutricionistas criados com sucesso!")
-
-
-def load_patients(tx):
-    query = """
-    // Criar Pacientes
-    CREATE (p1:Paciente {id: 1, nome: "João Pereira", idade: 35, genero: "M", altura: 178, 
-            peso_inicial: 92, email: "joao@email.com", telefone: "21-88888-1111", 
-            restricoes: ["Glúten"], alergias: ["Amendoim"], 
-            objetivo: "Emagrecimento"})
-    CREATE (p2:Paciente {id: 2, nome: "Maria Santos", idade: 42, genero: "F", altura: 165, 
-            peso_inicial: 78, email: "maria@email.com", telefone: "21-88888-2222", 
-            restricoes: ["Lactose"], alergias: [], 
-            objetivo: "Controle de colesterol"})
-    CREATE (p3:Paciente {id: 3, nome: "Pedro Alves", idade: 28, genero: "M", altura: 182, 
-            peso_inicial: 75, email: "pedro@email.com", telefone: "21-88888-3333", 
-            restricoes: [], alergias: [], 
-            objetivo: "Ganho de massa muscular"})
-    CREATE (p4:Paciente {id: 4, nome: "Lúcia Ferreira", idade: 55, genero: "F", altura: 160, 
-            peso_inicial: 85, email: "lucia@email.com", telefone: "21-88888-4444", 
-            restricoes: ["Sódio"], alergias: ["Frutos do mar"], 
-            objetivo: "Controle de diabetes"})
-    CREATE (p5:Paciente {id: 5, nome: "Ricardo Gomes", idade: 30, genero: "M", altura: 175, 
-            peso_inicial: 88, email: "ricardo@email.com", telefone: "21-88888-5555", 
-            restricoes: [], alergias: ["Nozes"], 
-            objetivo: "Emagrecimento"})
+    dates = {meal["id"]: meal["data"] for meal in meals}
+    days, patient_days, day_meals = {}, [], []
+    for patient_id, meal_id in consumed:
+        key = day_id(patient_id, dates[meal_id])
+        if key not in days:
+            days[key] = {"id": key, "paciente_id": patient_id, "data": dates[meal_id]}
+            patient_days.append((patient_id, key))
+        day_meals.append((key, meal_id))
+    return list(days.values()), patient_days, day_meals
+
+
+DAYS, PATIENT_DAYS, DAY_MEALS = time_tree(MEALS, CONSUMED_MEALS)
+
+# Relacionamentos por tipo: (tipo, rótulo de origem, rótulo de destino, pares).
+# Cada par é (id de origem, id de destino) ou (id de origem, id de destino,
+# propriedades do relacionamento).
+RELATIONSHIPS = [
+    # --- Nutricionistas atendem Pacientes ---
+    ("ATENDE", "Nutricionista", "Paciente", [(1, 1), (1, 3), (2, 2), (3, 4), (3, 5)]),
+    # --- Nutricionistas criam Planos Alimentares ---
+    (
+        "CRIA",
+        "Nutricionista",
+        "PlanoAlimentar",
+        [(1, 1), (1, 2), (2, 4), (3, 3), (3, 5)],
+    ),
+    # --- Pacientes seguem Planos Alimentares ---
+    ("SEGUE", "Paciente", "PlanoAlimentar", [(1, 1), (2, 4), (3, 2), (4, 3), (5, 5)]),
+    # --- Planos Alimentares incluem Alimentos ---
+    (
+        "PLANO_INCLUI_ALIMENTO",
+        "PlanoAlimentar",
+        "Alimento",
+        [
+            (1, 2),
+            (1, 3),
+            (1, 4),
+            (2, 2),
+            (2, 5),
+            (2, 8),
+            (3, 4),
+            (3, 6),
+            (4, 5),
+            (4, 6),
+            (5, 5),
+            (5, 9),
+        ],
+    ),
+    # --- Planos Alimentares recomendam Receitas ---
+    (
+        "RECOMENDA",
+        "PlanoAlimentar",
+        "Receita",
+        [(1, 1), (1, 5), (2, 3), (2, 4), (3, 5), (4, 3), (5, 1), (5, 3)],
+    ),
+    # --- Receitas contêm Alimentos ---
+    (
+        "CONTEM",
+        "Receita",
+        "Alimento",
+        [
+            (1, 2, {"quantidade": "100g"}),
+            (1, 4, {"quantidade": "50g"}),
+            (1, 9, {"quantidade": "5ml"}),
+            (2, 10, {"quantidade": "1 unidade"}),
+            (3, 5, {"quantidade": "150g"}),
+            (3, 4, {"quantidade": "100g"}),
+            (3, 3, {"quantidade": "100g"}),
+            (4, 7, {"quantidade": "200g"}),
+            (4, 10, {"quantidade": "1 unidade"}),
+            (4, 8, {"quantidade": "30g"}),
+            (5, 4, {"quantidade": "50g"}),
+        ],
+    ),
+    # --- Pacientes consomem Refeições ---
+    ("CONSOME", "Paciente", "Refeicao", CONSUMED_MEALS),
+    # --- Árvore de tempo: Pacientes têm Dias, que têm Refeições ---
+    ("PACIENTE_TEM_DIA", "Paciente", "Dia", PATIENT_DAYS),
+    ("DIA_TEM_REFEICAO", "Dia", "Refeicao", DAY_MEALS),
+    # --- Refeições incluem Alimentos/Receitas ---
+    (
+        "REFEICAO_TEM_RECEITA",
+        "Refeicao",
+        "Receita",
+        [(1, 4), (2, 1), (4, 3), (5, 2), (6, 3), (8, 5)],
+    ),
+    ("REFEICAO_TEM_ALIMENTO", "Refeicao", "Alimento", [(3, 1), (3, 7), (7, 1)]),
+    # --- Pacientes possuem Medidas Corporais ---
+    (
+        "POSSUI",
+        "Paciente",
+        "MedidaCorporal",
+        [(1, 1), (1, 2), (1, 3), (2, 4), (2, 5), (2, 6)],
+    ),
+    # --- Mensagens entre Pacientes e Nutricionistas (um tipo por direção) ---
+    *message_relationships(MESSAGE_PARTIES),
+    # --- Conversas: participantes e mensagens encadeadas (FIRST/NEXT/LATEST) ---
+    *CONVERSATION_RELATIONSHIPS,
+    # --- Consultas entre Pacientes e Nutricionistas ---
+    (
+        "AGENDA",
+        "Paciente",
+        "Consulta",
+        [(1, 1), (1, 2), (1, 3), (1, 4), (2, 5), (2, 6), (2, 7), (2, 8)],
+    ),
+    (
+        "COM",
+        "Consulta",
+        "Nutricionista",
+        [(1, 1), (2, 1), (3, 1), (4, 1), (5, 2), (6, 2), (7, 2), (8, 2)],
+    ),
+]
+
+# Nós por fase da carga: (fase, rótulo, registros)
+NODE_LOADS = [
+    ("nutricionistas", "Nutricionista", NUTRITIONISTS),
+    ("pacientes", "Paciente", PATIENTS),
+    ("alimentos", "Alimento", FOODS),
+    ("receitas", "Receita", RECIPES),
+    ("planos_alimentares", "PlanoAlimentar", DIET_PLANS),
+    ("refeicoes", "Refeicao", MEALS),
+    ("dias", "Dia", DAYS),
+    ("medidas_corporais", "MedidaCorporal", MEASUREMENTS),
+    ("mensagens", "Mensagem", MESSAGES),
+    ("conversas", "Conversa", CONVERSATIONS),
+    ("consultas", "Consulta", APPOINTMENTS),
+]
+
+# Etapas da árvore de tempo, que a carga pode omitir (--no-time-tree)
+TIME_TREE_LABELS = {"Dia"}
+TIME_TREE_RELATIONSHIPS = {"PACIENTE_TEM_DIA", "DIA_TEM_REFEICAO"}
+
+
+def load_steps(time_tree=True):
+    """Etapas de nós e de relacionamentos da carga, no formato de NODE_LOADS/RELATIONSHIPS
+
+    Sem a árvore de tempo, as etapas de Dia ficam sem registros: a carga não
+    cria nós Dia e a sincronização remove os que houver. As consultas 2 e 3
+    de queries.py dependem da árvore.
     """
-    tx.run(query)
-    print("Pacientes criados com sucesso!")
-
-
-def load_foods(tx):
-    query = """
-    // Criar Alimentos
-    CREATE (a1:Alimento {id: 1, nome: "Maçã", porcao: "1 unidade (150g)", calorias: 95, 
-            proteinas: 0.5, carboidratos: 25, gorduras: 0.3, fibras: 4.4, grupo: "Frutas"})
-    CREATE (a2:Alimento {id: 2, nome: "Peito de Frango", porcao: "100g", calorias: 165, 
-            proteinas: 31, carboidratos: 0, gorduras: 3.6, fibras: 0, grupo: "Carnes"})
-    CREATE (a3:Alimento {id: 3, nome: "Arroz Integral", porcao: "100g cozido", calorias: 112, 
-            proteinas: 2.6, carboidratos: 23.5, gorduras: 0.9, fibras: 1.8, grupo: "Cereais"})
-    CREATE (a4:Alimento {id: 4, nome: "Brócolis", porcao: "100g", calorias: 34, 
-            proteinas: 2.8, carboidratos: 6.6, gorduras: 0.4, fibras: 2.6, grupo: "Vegetais"})
-    CREATE (a5:Alimento {id: 5, nome: "Salmão", porcao: "100g", calorias: 206, 
-            proteinas: 22, carboidratos: 0, gorduras: 13, fibras: 0, grupo: "Peixes"})
-    CREATE (a6:Alimento {id: 6, nome: "Lentilha", porcao: "100g cozida", calorias: 116, 
-            proteinas: 9, carboidratos: 20, gorduras: 0.4, fibras: 7.9, grupo: "Leguminosas"})
-    CREATE (a7:Alimento {id: 7, nome: "Iogurte Natural", porcao: "100g", calorias: 59, 
-            proteinas: 3.5, carboidratos: 4.7, gorduras: 3.3, fibras: 0, grupo: "Laticínios"})
-    CREATE (a8:Alimento {id: 8, nome: "Aveia", porcao: "30g", calorias: 117, 
-            proteinas: 4, carboidratos: 21, gorduras: 2, fibras: 3, grupo: "Cereais"})
-    CREATE (a9:Alimento {id: 9, nome: "Azeite", porcao: "1 colher (10ml)", calorias: 90, 
-            proteinas: 0, carboidratos: 0, gorduras: 10, fibras: 0, grupo: "Óleos"})
-    CREATE (a10:Alimento {id: 10, nome: "Banana", porcao: "1 unidade (120g)", calorias: 105, 
-            proteinas: 1.3, carboidratos: 27, gorduras: 0.4, fibras: 3.1, grupo: "Frutas"})
+    if time_tree:
+        return NODE_LOADS, RELATIONSHIPS
+    nodes = [
+        (name, label, [] if label in TIME_TREE_LABELS else rows)
+        for name, label, rows in NODE_LOADS
+    ]
+    relationships = [
+        (
+            rel_type,
+            from_label,
+            to_label,
+            [] if rel_type in TIME_TREE_RELATIONSHIPS else pairs,
+        )
+        for rel_type, from_label, to_label, pairs in RELATIONSHIPS
+    ]
+    return nodes, relationships
+
+
+def payload_size(rows):
+    """Estima os bytes enviados para um lote de parâmetros"""
+    return estimate_size(rows, lambda row: len(json.dumps(row, default=str)))
+
+
+def run_write(tx, query, rows):
+    """Executa uma escrita em lote e retorna as linhas e os bytes enviados"""
+    tx.run(query, rows=rows).consume()
+    return len(rows), len(query.encode("utf-8")) + payload_size(rows)
+
+
+def execute_write(session, work, *args):
+    """Executa uma função de transação com execute_write e a contabiliza.
+
+    O driver reexecuta a função em erros transitórios (líder trocado, deadlock,
+    conexão perdida); cada chamada após a primeira conta como nova tentativa.
+    Linhas e bytes só são somados depois do commit, uma única vez.
     """
-    tx.run(query)
-    print("Alimentos criados com sucesso!")
-
-
-def load_recipes(tx):
-    query = """
-    // Criar Receitas
-    CREATE (r1:Receita {id: 1, nome: "Salada de Frango com Abacate", 
-            instrucoes: "Corte o peito de frango em cubos e grelhe. Misture com abacate, tomate e folhas verdes. Tempere com azeite, limão e sal.", 
-            tempo_preparo: 20, dificuldade: "Fácil", calorias: 320})
-    CREATE (r2:Receita {id: 2, nome: "Bowl de Açaí com Frutas", 
-            instrucoes: "Misture açaí congelado batido com banana. Adicione granola, frutas frescas e mel.", 
-            tempo_preparo: 10, dificuldade: "Fácil", calorias: 450})
-    CREATE (r3:Receita {id: 3, nome: "Salmão Grelhado com Legumes", 
-            instrucoes: "Grelhe o filé de salmão. Refogue brócolis, cenoura e abobrinha. Sirva com arroz integral.", 
-            tempo_preparo: 30, dificuldade: "Médio", calorias: 480})
-    CREATE (r4:Receita {id: 4, nome: "Smoothie Proteico", 
-            instrucoes: "Bata no liquidificador iogurte, banana, aveia, pasta de amendoim e mel.", 
-            tempo_preparo: 5, dificuldade: "Fácil", calorias: 350})
-    CREATE (r5:Receita {id: 5, nome: "Omelete de Legumes", 
-            instrucoes: "Bata 2 ovos, adicione espinafre, tomate e queijo. Cozinhe em frigideira antiaderente.", 
-            tempo_preparo: 15, dificuldade: "Fácil", calorias: 280})
+    attempts = 0
+
+    def attempt(tx):
+        nonlocal attempts
+        attempts += 1
+        if attempts > 1:
+            count(retries=1)
+        return work(tx, *args)
+
+    with transaction():
+        rows, bytes_sent = session.execute_write(attempt)
+    count(rows=rows, bytes_sent=bytes_sent)
+    return rows
+
+
+def merge_nodes(tx, label, rows):
+    """Cria ou substitui um lote de nós de um rótulo, identificados por id"""
+    query = f"""
+    UNWIND $rows AS row
+    MERGE (n:{label} {{id: row.id}})
+    SET n = row, n.{UPDATED_AT_FIELD} = datetime()
     """
-    tx.run(query)
-    print("Receitas criadas com sucesso!")
-
-
-def load_diet_plans(tx):
-    query = """
-    // Criar Planos Alimentares
-    CREATE (pa1:PlanoAlimentar {id: 1, nome: "Emagrecimento Saudável", 
-            descricao: "Plano focado em déficit calórico moderado com alimentos nutritivos", 
-            objetivo: "Perda de peso", duracao: 90, calorias_diarias: 1800, 
-            proteinas: "30%", carboidratos: "40%", gorduras: "30%"})
-    CREATE (pa2:PlanoAlimentar {id: 2, nome: "Ganho de Massa", 
-            descricao: "Plano focado em superávit calórico com alta proteína", 
-            objetivo: "Hipertrofia", duracao: 120, calorias_diarias: 2800, 
-            proteinas: "35%", carboidratos: "45%", gorduras: "20%"})
-    CREATE (pa3:PlanoAlimentar {id: 3, nome: "Controle Glicêmico", 
-            descricao: "Plano para controle de diabetes com baixo índice glicêmico", 
-            objetivo: "Controle de glicemia", duracao: 180, calorias_diarias: 1600, 
-            proteinas: "25%", carboidratos: "35%", gorduras: "40%"})
-    CREATE (pa4:PlanoAlimentar {id: 4, nome: "Controle de Colesterol", 
-            descricao: "Plano para redução de colesterol LDL e aumento de HDL", 
-            objetivo: "Saúde cardiovascular", duracao: 90, calorias_diarias: 2000, 
-            proteinas: "25%", carboidratos: "50%", gorduras: "25%"})
-    CREATE (pa5:PlanoAlimentar {id: 5, nome: "Dieta Anti-inflamatória", 
-            descricao: "Plano rico em antioxidantes e ômega-3", 
-            objetivo: "Redução de inflamação", duracao: 60, calorias_diarias: 2200, 
-            proteinas: "20%", carboidratos: "55%", gorduras: "25%"})
+    return run_write(tx, query, rows)
+
+
+def merge_relationships(tx, rel_type, from_label, to_label, rows):
+    """Cria ou substitui um lote de relacionamentos entre nós identificados por id"""
+    query = f"""
+    UNWIND $rows AS row
+    MATCH (a:{from_label} {{id: row.de}}), (b:{to_label} {{id: row.para}})
+    MERGE (a)-[r:{rel_type}]->(b)
+    SET r = row.props, r.{HASH_FIELD} = row.{HASH_FIELD}, r.{UPDATED_AT_FIELD} = datetime()
     """
-    tx.run(query)
-    print("Planos alimentares criados com sucesso!")
-
-
-def load_meals(tx):
-    query = """
-    // Criar Refeições
-    CREATE (ref1:Refeicao {id: 1, tipo: "Café da manhã", data: "2023-10-18", 
-            hora: "08:00", calorias: 320, adesao: "Completa", registro_foto: true})
-    CREATE (ref2:Refeicao {id: 2, tipo: "Almoço", data: "2023-10-18", 
-            hora: "12:30", calorias: 580, adesao: "Parcial", registro_foto: true})
-    CREATE (ref3:Refeicao {id: 3, tipo: "Lanche", data: "2023-10-18", 
-            hora: "16:00", calorias: 180, adesao: "Completa", registro_foto: false})
-    CREATE (ref4:Refeicao {id: 4, tipo: "Jantar", data: "2023-10-18", 
-            hora: "20:00", calorias: 450, adesao: "Completa", registro_foto: true})
-    CREATE (ref5:Refeicao {id: 5, tipo: "Café da manhã", data: "2023-10-19", 
-            hora: "07:45", calorias: 340, adesao: "Completa", registro_foto: true})
-    CREATE (ref6:Refeicao {id: 6, tipo: "Almoço", data: "2023-10-19", 
-            hora: "13:00", calorias: 620, adesao: "Completa", registro_foto: true})
-    CREATE (ref7:Refeicao {id: 7, tipo: "Lanche", data: "2023-10-19", 
-            hora: "15:30", calorias: 200, adesao: "Parcial", registro_foto: false})
-    CREATE (ref8:Refeicao {id: 8, tipo: "Jantar", data: "2023-10-19", 
-            hora: "19:30", calorias: 380, adesao: "Não realizada", registro_foto: false})
+    return run_write(tx, query, rows)
+
+
+def relationship_tombstone(rel_type, from_label, to_label, start, end):
+    """Cláusulas que gravam o tombstone de um relacionamento removido"""
+    return (
+        f"MERGE (t:{GRAPH_TOMBSTONE} {{origem: '{from_label}', tipo: '{rel_type}', "
+        f"destino: '{to_label}', de: {start}, para: {end}}}) "
+        "SET t.deleted_at = datetime()"
+    )
+
+
+def retype_relationships(tx, rel_type, from_label, to_label, new_type, limit):
+    """Troca o tipo de até limit relacionamentos, mantendo as propriedades"""
+    query = f"""
+    MATCH (a:{from_label})-[r:{rel_type}]->(b:{to_label})
+    WITH a, r, b LIMIT $limit
+    CREATE (a)-[n:{new_type}]->(b)
+    SET n = properties(r), n.{UPDATED_AT_FIELD} = datetime()
+    DELETE r
+    {relationship_tombstone(rel_type, from_label, to_label, "a.id", "b.id")}
+    RETURN count(*) AS moved
     """
-    tx.run(query)
-    print("Refeições criadas com sucesso!")
-
-
-def load_measurements(tx):
-    query = """
-    // Criar Medidas Corporais
-    CREATE (m1:MedidaCorporal {id: 1, data: "2023-09-15", peso: 92, imc: 29.1, 
-            gordura_corporal: 28, cintura: 102, quadril: 106, pressao: "130/85"})
-    CREATE (m2:MedidaCorporal {id: 2, data: "2023-10-01", peso: 89.5, imc: 28.2, 
-            gordura_corporal: 26.8, cintura: 99, quadril: 105, pressao: "128/83"})
-    CREATE (m3:MedidaCorporal {id: 3, data: "2023-10-15", peso: 87.8, imc: 27.7, 
-            gordura_corporal: 25.5, cintura: 97, quadril: 104, pressao: "125/82"})
-    CREATE (m4:MedidaCorporal {id: 4, data: "2023-09-10", peso: 78, imc: 28.7, 
-            gordura_corporal: 32, cintura: 91, quadril: 110, pressao: "135/88"})
-    CREATE (m5:MedidaCorporal {id: 5, data: "2023-09-25", peso: 77.2, imc: 28.4, 
-            gordura_corporal: 31.5, cintura: 90, quadril: 109, pressao: "132/86"})
-    CREATE (m6:MedidaCorporal {id: 6, data: "2023-10-10", peso: 76.5, imc: 28.1, 
-            gordura_corporal: 30.8, cintura: 88, quadril: 108, pressao: "130/85"})
+    moved = tx.run(query, limit=limit).single()["moved"]
+    return moved, len(query.encode("utf-8"))
+
+
+def append_messages(tx, nutritionist_id, patient_id, sender, messages):
+    """Acrescenta mensagens, na ordem, ao fim da conversa do par (ver conversations.py)"""
+    if not messages:
+        return 0, 0
+    receiver = other_side(sender)
+    unread = UNREAD[receiver]
+    # O SET na conversa trava o nó antes de ler LATEST: anexos concorrentes
+    # à mesma conversa são serializados e a lista continua encadeada. As
+    # mensagens novas são encadeadas entre si com NEXT, na ordem da lista
+    query = f"""
+    MATCH (n:Nutricionista {{id: $nutricionista}}), (p:Paciente {{id: $paciente}})
+    MERGE (c:Conversa {{id: $conversa}})
+    ON CREATE SET c += $nova
+    MERGE (n)-[pn:{PARTICIPATES["Nutricionista"]}]->(c)
+    ON CREATE SET pn.{UPDATED_AT_FIELD} = datetime()
+    MERGE (p)-[pp:{PARTICIPATES["Paciente"]}]->(c)
+    ON CREATE SET pp.{UPDATED_AT_FIELD} = datetime()
+    SET c.mensagens = c.mensagens + size($mensagens),
+        c.{unread} = c.{unread}
+            + size([m IN $mensagens WHERE NOT coalesce(m.lida, false)]),
+        c.{UPDATED_AT_FIELD} = datetime()
+    WITH n, p, c
+    OPTIONAL MATCH (c)-[ultima:LATEST]->(anterior:Mensagem)
+    DELETE ultima
+    FOREACH (a IN CASE WHEN anterior IS NULL THEN [] ELSE [anterior] END |
+        {relationship_tombstone("LATEST", "Conversa", "Mensagem", "c.id", "a.id")})
+    WITH n, p, c, anterior
+    UNWIND range(0, size($mensagens) - 1) AS i
+    CREATE (m:Mensagem)
+    SET m = $mensagens[i], m.{UPDATED_AT_FIELD} = datetime()
+    CREATE ({sender[0].lower()})-[:{SENT[sender]} {{{UPDATED_AT_FIELD}: datetime()}}]->(m)
+    CREATE (m)-[:{RECEIVED[receiver]} {{{UPDATED_AT_FIELD}: datetime()}}]->({receiver[0].lower()})
+    WITH c, anterior, i, m ORDER BY i
+    WITH c, anterior, collect(m) AS novas
+    WITH c, anterior, novas, head(novas) AS primeira, last(novas) AS recente
+    FOREACH (_ IN CASE WHEN anterior IS NULL THEN [1] ELSE [] END |
+        CREATE (c)-[:FIRST {{{UPDATED_AT_FIELD}: datetime()}}]->(primeira))
+    FOREACH (a IN CASE WHEN anterior IS NULL THEN [] ELSE [anterior] END |
+        CREATE (a)-[:NEXT {{{UPDATED_AT_FIELD}: datetime()}}]->(primeira))
+    FOREACH (i IN range(0, size(novas) - 2) |
+        FOREACH (a IN [novas[i]] | FOREACH (b IN [novas[i + 1]] |
+            CREATE (a)-[:NEXT {{{UPDATED_AT_FIELD}: datetime()}}]->(b))))
+    CREATE (c)-[:LATEST {{{UPDATED_AT_FIELD}: datetime()}}]->(recente)
+    RETURN size(novas) AS appended
     """
-    tx.run(query)
-    print("Medidas corporais criadas com sucesso!")
-
-
-def load_messages(tx):
-    query = """
-    // Criar Mensagens
-    CREATE (msg1:Mensagem {id: 1, conteudo: "Como está se sentindo com a nova dieta?", 
-            data: "2023-10-15", hora: "14:30", lida: true})
-    CREATE (msg2:Mensagem {id: 2, conteudo: "Estou me adaptando bem, mas sinto fome à tarde", 
-            data: "2023-10-15", hora: "15:45", lida: true})
-    CREATE (msg3:Mensagem {id: 3, conteudo: "Vamos ajustar seu lanche da tarde para resolver isso", 
-            data: "2023-10-15", hora: "16:20", lida: true})
-    CREATE (msg4:Mensagem {id: 4, conteudo: "Lembrete: sua consulta é amanhã às 14h", 
-            data: "2023-10-16", hora: "09:00", lida: true})
-    CREATE (msg5:Mensagem {id: 5, conteudo: "Confirmado, estarei lá", 
-            data: "2023-10-16", hora: "09:15", lida: true})
-    CREATE (msg6:Mensagem {id: 6, conteudo: "Como está se sentindo após a última consulta?", 
-            data: "2023-10-20", hora: "11:00", lida: false})
+    record = tx.run(
+        query,
+        nutricionista=nutritionist_id,
+        paciente=patient_id,
+        conversa=conversation_id(nutritionist_id, patient_id),
+        nova=new_conversation(nutritionist_id, patient_id),
+        mensagens=messages,
+    ).single()
+    if record is None:
+        raise ValueError(
+            f"Participantes não encontrados: {nutritionist_id}, {patient_id}"
+        )
+    return record["appended"], payload_size(messages)
+
+
+def mark_read(tx, nutritionist_id, patient_id, reader):
+    """Marca como lidas as mensagens recebidas por reader na conversa do par"""
+    unread = UNREAD[reader]
+    conversa = conversation_id(nutritionist_id, patient_id)
+    reset = f"""
+    MATCH (c:Conversa {{id: $conversa}})
+    WITH c, c.{unread} AS pendentes
+    SET c.{unread} = 0, c.{UPDATED_AT_FIELD} = datetime()
+    RETURN pendentes
     """
-    tx.run(query)
-    print("Mensagens criadas com sucesso!")
-
-
-def load_appointments(tx):
-    query = """
-    // Criar Consultas
-    CREATE (c1:Consulta {id: 1, data: "2023-09-15", hora: "14:00", 
-            status: "Realizada", notas: "Avaliação inicial e definição de plano alimentar"})
-    CREATE (c2:Consulta {id: 2, data: "2023-10-01", hora: "15:30", 
-            status: "Realizada", notas: "Ajustes no plano devido à fome relatada"})
-    CREATE (c3:Consulta {id: 3, data: "2023-10-17", hora: "14:00", 
-            status: "Realizada", notas: "Progresso acima do esperado, reforço positivo"})
-    CREATE (c4:Consulta {id: 4, data: "2023-11-01", hora: "16:00", 
-            status: "Agendada", notas: ""})
-    CREATE (c5:Consulta {id: 5, data: "2023-09-10", hora: "09:30", 
-            status: "Realizada", notas: "Avaliação inicial, paciente com colesterol alto"})
-    CREATE (c6:Consulta {id: 6, data: "2023-09-25", hora: "10:00", 
-            status: "Realizada", notas: "Melhora nos exames laboratoriais"})
-    CREATE (c7:Consulta {id: 7, data: "2023-10-10", hora: "11:00", 
-            status: "Realizada", notas: "Exames demonstrando normalização do colesterol"})
-    CREATE (c8:Consulta {id: 8, data: "2023-10-25", hora: "09:30", 
-            status: "Cancelada", notas: "Paciente não pôde comparecer"})
+    record = tx.run(reset, conversa=conversa).single()
+    if record is None or not record["pendentes"]:
+        return 0, len(reset.encode("utf-8"))
+    # As não lidas estão no fim da lista: a busca volta a partir de LATEST e
+    # para ao encontrar tantas quanto o contador
+    query = f"""
+    MATCH (c:Conversa {{id: $conversa}})-[:LATEST]->(ultima:Mensagem)
+    MATCH (m:Mensagem)-[:NEXT*0..]->(ultima)
+    WHERE m.lida = false AND (m)-[:{RECEIVED[reader]}]->()
+    WITH m LIMIT $pendentes
+    SET m.lida = true, m.{UPDATED_AT_FIELD} = datetime()
+    RETURN count(m) AS marcadas
     """
-    tx.run(query)
-    print("Consultas criadas com sucesso!")
+    marked = tx.run(query, conversa=conversa, pendentes=record["pendentes"])
+    return marked.single()["marcadas"], len((reset + query).encode("utf-8"))
 
 
-def create_relationships(tx):
-    """Cria os relacionamentos entre entidades - versão corrigida com statements individuais"""
+def delete_nodes(tx, label, ids):
+    """Remove um lote de nós de um rótulo, com seus relacionamentos"""
+    query = f"""
+    UNWIND $rows AS id
+    MATCH (n:{label} {{id: id}})
+    DETACH DELETE n
+    MERGE (t:{GRAPH_TOMBSTONE} {{rotulo: '{label}', id: id}})
+    SET t.deleted_at = datetime()
+    """
+    return run_write(tx, query, ids)
 
-    # --- Nutricionistas atendem Pacientes ---
-    rel_queries = [
-        """
-        MATCH (n:Nutricionista {id: 1}), (p:Paciente {id: 1})
-        CREATE (n)-[:ATENDE]->(p)
-        """,
-        """
-        MATCH (n:Nutricionista {id: 1}), (p:Paciente {id: 3})
-        CREATE (n)-[:ATENDE]->(p)
-        """,
-        """
-        MATCH (n:Nutricionista {id: 2}), (p:Paciente {id: 2})
-        CREATE (n)-[:ATENDE]->(p)
-        """,
-        """
-        MATCH (n:Nutricionista {id: 3}), (p:Paciente {id: 4})
-        CREATE (n)-[:ATENDE]->(p)
-        """,
-        """
-        MATCH (n:Nutricionista {id: 3}), (p:Paciente {id: 5})
-        CREATE (n)-[:ATENDE]->(p)
-        """,
+
+def delete_relationships(tx, rel_type, from_label, to_label, keys):
+    """Remove um lote de relacionamentos identificados pelos ids das pontas"""
+    query = f"""
+    UNWIND $rows AS row
+    MATCH (:{from_label} {{id: row.de}})-[r:{rel_type}]->(:{to_label} {{id: row.para}})
+    DELETE r
+    {relationship_tombstone(rel_type, from_label, to_label, "row.de", "row.para")}
+    """
+    return run_write(tx, query, [{"de": de, "para": para} for de, para in keys])
+
+
+def relationship_rows(pairs):
+    """Converte os pares de RELATIONSHIPS em linhas de parâmetros"""
+    return [
+        {"de": pair[0], "para": pair[1], "props": pair[2] if len(pair) > 2 else {}}
+        for pair in pairs
     ]
 
-    # --- Nutricionistas criam Planos Alimentares ---
-    rel_queries.extend(
-        [
-            """
-        MATCH (n:Nutricionista {id: 1}), (pa:PlanoAlimentar {id: 1})
-        CREATE (n)-[:CRIA]->(pa)
-        """,
-            """
-        MATCH (n:Nutricionista {id: 1}), (pa:PlanoAlimentar {id: 2})
-        CREATE (n)-[:CRIA]->(pa)
-        """,
-            """
-        MATCH (n:Nutricionista {id: 2}), (pa:PlanoAlimentar {id: 4})
-        CREATE (n)-[:CRIA]->(pa)
-        """,
-            """
-        MATCH (n:Nutricionista {id: 3}), (pa:PlanoAlimentar {id: 3})
-        CREATE (n)-[:CRIA]->(pa)
-        """,
-            """
-        MATCH (n:Nutricionista {id: 3}), (pa:PlanoAlimentar {id: 5})
-        CREATE (n)-[:CRIA]->(pa)
-        """,
-        ]
-    )
 
-    # --- Pacientes seguem Planos Alimentares ---
-    rel_queries.extend(
-        [
-            """
-        MATCH (p:Paciente {id: 1}), (pa:PlanoAlimentar {id: 1})
-        CREATE (p)-[:SEGUE]->(pa)
-        """,
-            """
-        MATCH (p:Paciente {id: 2}), (pa:PlanoAlimentar {id: 4})
-        CREATE (p)-[:SEGUE]->(pa)
-        """,
-            """
-        MATCH (p:Paciente {id: 3}), (pa:PlanoAlimentar {id: 2})
-        CREATE (p)-[:SEGUE]->(pa)
-        """,
-            """
-        MATCH (p:Paciente {id: 4}), (pa:PlanoAlimentar {id: 3})
-        CREATE (p)-[:SEGUE]->(pa)
-        """,
-            """
-        MATCH (p:Paciente {id: 5}), (pa:PlanoAlimentar {id: 5})
-        CREATE (p)-[:SEGUE]->(pa)
-        """,
-        ]
-    )
+class Neo4jGraphStore(GraphStore):
+    """GraphStore sobre uma sessão do driver do Neo4j.
 
-    # --- Planos Alimentares incluem Alimentos ---
-    rel_queries.extend(
-        [
-            """
-        MATCH (pa:PlanoAlimentar {id: 1}), (a:Alimento {id: 2})
-        CREATE (pa)-[:INCLUI]->(a)
-        """,
-            """
-        MATCH (pa:PlanoAlimentar {id: 1}), (a:Alimento {id: 3})
-        CREATE (pa)-[:INCLUI]->(a)
-        """,
-            """
-        MATCH (pa:PlanoAlimentar {id: 1}), (a:Alimento {id: 4})
-        CREATE (pa)-[:INCLUI]->(a)
-        """,
-            """
-        MATCH (pa:PlanoAlimentar {id: 2}), (a:Alimento {id: 2})
-        CREATE (pa)-[:INCLUI]->(a)
-        """,
-            """
-        MATCH (pa:PlanoAlimentar {id: 2}), (a:Alimento {id: 5})
-        CREATE (pa)-[:INCLUI]->(a)
-        """,
-            """
-        MATCH (pa:PlanoAlimentar {id: 2}), (a:Alimento {id: 8})
-        CREATE (pa)-[:INCLUI]->(a)
-        """,
-            """
-        MATCH (pa:PlanoAlimentar {id: 3}), (a:Alimento {id: 4})
-        CREATE (pa)-[:INCLUI]->(a)
-        """,
-            """
-        MATCH (pa:PlanoAlimentar {id: 3}), (a:Alimento {id: 6})
-        CREATE (pa)-[:INCLUI]->(a)
-        """,
-            """
-        MATCH (pa:PlanoAlimentar {id: 4}), (a:Alimento {id: 5})
-        CREATE (pa)-[:INCLUI]->(a)
-        """,
-            """
-        MATCH (pa:PlanoAlimentar {id: 4}), (a:Alimento {id: 6})
-        CREATE (pa)-[:INCLUI]->(a)
-        """,
-            """
-        MATCH (pa:PlanoAlimentar {id: 5}), (a:Alimento {id: 5})
-        CREATE (pa)-[:INCLUI]->(a)
-        """,
-            """
-        MATCH (pa:PlanoAlimentar {id: 5}), (a:Alimento {id: 9})
-        CREATE (pa)-[:INCLUI]->(a)
-        """,
-        ]
-    )
+    Cada escrita é uma função de transação executada por execute_write, com
+    as novas tentativas do driver contabilizadas.
+    """
 
-    # --- Planos Alimentares recomendam Receitas ---
-    rel_queries.extend(
-        [
-            """
-        MATCH (pa:PlanoAlimentar {id: 1}), (r:Receita {id: 1})
-        CREATE (pa)-[:RECOMENDA]->(r)
-        """,
-            """
-        MATCH (pa:PlanoAlimentar {id: 1}), (r:Receita {id: 5})
-        CREATE (pa)-[:RECOMENDA]->(r)
-        """,
-            """
-        MATCH (pa:PlanoAlimentar {id: 2}), (r:Receita {id: 3})
-        CREATE (pa)-[:RECOMENDA]->(r)
-        """,
-            """
-        MATCH (pa:PlanoAlimentar {id: 2}), (r:Receita {id: 4})
-        CREATE (pa)-[:RECOMENDA]->(r)
-        """,
-            """
-        MATCH (pa:PlanoAlimentar {id: 3}), (r:Receita {id: 5})
-        CREATE (pa)-[:RECOMENDA]->(r)
-        """,
-            """
-        MATCH (pa:PlanoAlimentar {id: 4}), (r:Receita {id: 3})
-        CREATE (pa)-[:RECOMENDA]->(r)
-        """,
-            """
-        MATCH (pa:PlanoAlimentar {id: 5}), (r:Receita {id: 1})
-        CREATE (pa)-[:RECOMENDA]->(r)
-        """,
-            """
-        MATCH (pa:PlanoAlimentar {id: 5}), (r:Receita {id: 3})
-        CREATE (pa)-[:RECOMENDA]->(r)
-        """,
-        ]
-    )
+    def __init__(self, session):
+        self.session = session
 
-    # --- Receitas contêm Alimentos ---
-    rel_queries.extend(
-        [
-            """
-        MATCH (r:Receita {id: 1}), (a:Alimento {id: 2})
-        CREATE (r)-[:CONTEM {quantidade: "100g"}]->(a)
-        """,
-            """
-        MATCH (r:Receita {id: 1}), (a:Alimento {id: 4})
-        CREATE (r)-[:CONTEM {quantidade: "50g"}]->(a)
-        """,
-            """
-        MATCH (r:Receita {id: 1}), (a:Alimento {id: 9})
-        CREATE (r)-[:CONTEM {quantidade: "5ml"}]->(a)
-        """,
-            """
-        MATCH (r:Receita {id: 2}), (a:Alimento {id: 10})
-        CREATE (r)-[:CONTEM {quantidade: "1 unidade"}]->(a)
-        """,
-            """
-        MATCH (r:Receita {id: 3}), (a:Alimento {id: 5})
-        CREATE (r)-[:CONTEM {quantidade: "150g"}]->(a)
-        """,
-            """
-        MATCH (r:Receita {id: 3}), (a:Alimento {id: 4})
-        CREATE (r)-[:CONTEM {quantidade: "100g"}]->(a)
-        """,
-            """
-        MATCH (r:Receita {id: 3}), (a:Alimento {id: 3})
-        CREATE (r)-[:CONTEM {quantidade: "100g"}]->(a)
-        """,
-            """
-        MATCH (r:Receita {id: 4}), (a:Alimento {id: 7})
-        CREATE (r)-[:CONTEM {quantidade: "200g"}]->(a)
-        """,
-            """
-        MATCH (r:Receita {id: 4}), (a:Alimento {id: 10})
-        CREATE (r)-[:CONTEM {quantidade: "1 unidade"}]->(a)
-        """,
-            """
-        MATCH (r:Receita {id: 4}), (a:Alimento {id: 8})
-        CREATE (r)-[:CONTEM {quantidade: "30g"}]->(a)
-        """,
-            """
-        MATCH (r:Receita {id: 5}), (a:Alimento {id: 4})
-        CREATE (r)-[:CONTEM {quantidade: "50g"}]->(a)
-        """,
-        ]
-    )
+    def clear(self):
+        # Os tombstones ficam; o de reset faz o próximo delta substituir o grafo
+        with transaction():
+            self.session.run(
+                f"CALL {{ MATCH (n) WHERE NOT n:{GRAPH_TOMBSTONE} DETACH DELETE n }} "
+                f"MERGE (t:{GRAPH_TOMBSTONE} {{reset: true}}) "
+                "SET t.deleted_at = datetime()"
+            ).consume()
 
-    # --- Pacientes consomem Refeições ---
-    rel_queries.extend(
-        [
-            """
-        MATCH (p:Paciente {id: 1}), (r:Refeicao {id: 1})
-        CREATE (p)-[:CONSOME]->(r)
-        """,
-            """
-        MATCH (p:Paciente {id: 1}), (r:Refeicao {id: 2})
-        CREATE (p)-[:CONSOME]->(r)
-        """,
-            """
-        MATCH (p:Paciente {id: 1}), (r:Refeicao {id: 3})
-        CREATE (p)-[:CONSOME]->(r)
-        """,
-            """
-        MATCH (p:Paciente {id: 1}), (r:Refeicao {id: 4})
-        CREATE (p)-[:CONSOME]->(r)
-        """,
-            """
-        MATCH (p:Paciente {id: 2}), (r:Refeicao {id: 5})
-        CREATE (p)-[:CONSOME]->(r)
-        """,
-            """
-        MATCH (p:Paciente {id: 2}), (r:Refeicao {id: 6})
-        CREATE (p)-[:CONSOME]->(r)
-        """,
-            """
-        MATCH (p:Paciente {id: 2}), (r:Refeicao {id: 7})
-        CREATE (p)-[:CONSOME]->(r)
-        """,
-            """
-        MATCH (p:Paciente {id: 2}), (r:Refeicao {id: 8})
-        CREATE (p)-[:CONSOME]->(r)
-        """,
-        ]
-    )
+    def create_constraints(self, labels):
+        for label in labels:
+            with transaction():
+                self.session.run(
+                    f"CREATE CONSTRAINT {label.lower()}_id IF NOT EXISTS "
+                    f"FOR (n:{label}) REQUIRE n.id IS UNIQUE"
+                ).consume()
 
-    # --- Refeições incluem Alimentos/Receitas ---
-    rel_queries.extend(
-        [
-            """
-        MATCH (ref:Refeicao {id: 1}), (r:Receita {id: 4})
-        CREATE (ref)-[:INCLUI]->(r)
-        """,
-            """
-        MATCH (ref:Refeicao {id: 2}), (r:Receita {id: 1})
-        CREATE (ref)-[:INCLUI]->(r)
-        """,
-            """
-        MATCH (ref:Refeicao {id: 3}), (a:Alimento {id: 1})
-        CREATE (ref)-[:INCLUI]->(a)
-        """,
-            """
-        MATCH (ref:Refeicao {id: 3}), (a:Alimento {id: 7})
-        CREATE (ref)-[:INCLUI]->(a)
-        """,
-            """
-        MATCH (ref:Refeicao {id: 4}), (r:Receita {id: 3})
-        CREATE (ref)-[:INCLUI]->(r)
-        """,
-            """
-        MATCH (ref:Refeicao {id: 5}), (r:Receita {id: 2})
-        CREATE (ref)-[:INCLUI]->(r)
-        """,
-            """
-        MATCH (ref:Refeicao {id: 6}), (r:Receita {id: 3})
-        CREATE (ref)-[:INCLUI]->(r)
-        """,
-            """
-        MATCH (ref:Refeicao {id: 7}), (a:Alimento {id: 1})
-        CREATE (ref)-[:INCLUI]->(a)
-        """,
-            """
-        MATCH (ref:Refeicao {id: 8}), (r:Receita {id: 5})
-        CREATE (ref)-[:INCLUI]->(r)
-        """,
-        ]
-    )
+    def merge_nodes(self, label, rows):
+        execute_write(self.session, merge_nodes, label, rows)
 
-    # --- Pacientes possuem Medidas Corporais ---
-    rel_queries.extend(
-        [
-            """
-        MATCH (p:Paciente {id: 1}), (m:MedidaCorporal {id: 1})
-        CREATE (p)-[:POSSUI]->(m)
-        """,
-            """
-        MATCH (p:Paciente {id: 1}), (m:MedidaCorporal {id: 2})
-        CREATE (p)-[:POSSUI]->(m)
-        """,
-            """
-        MATCH (p:Paciente {id: 1}), (m:MedidaCorporal {id: 3})
-        CREATE (p)-[:POSSUI]->(m)
-        """,
-            """
-        MATCH (p:Paciente {id: 2}), (m:MedidaCorporal {id: 4})
-        CREATE (p)-[:POSSUI]->(m)
-        """,
-            """
-        MATCH (p:Paciente {id: 2}), (m:MedidaCorporal {id: 5})
-        CREATE (p)-[:POSSUI]->(m)
-        """,
-            """
-        MATCH (p:Paciente {id: 2}), (m:MedidaCorporal {id: 6})
-        CREATE (p)-[:POSSUI]->(m)
-        """,
-        ]
-    )
+    def merge_relationships(self, rel_type, from_label, to_label, rows):
+        execute_write(
+            self.session, merge_relationships, rel_type, from_label, to_label, rows
+        )
 
-    # --- Mensagens entre Pacientes e Nutricionistas ---
-    rel_queries.extend(
-        [
-            """
-        MATCH (n:Nutricionista {id: 1}), (msg:Mensagem {id: 1}), (p:Paciente {id: 1})
-        CREATE (n)-[:ENVIA]->(msg)-[:PARA]->(p)
-        """,
-            """
-        MATCH (p:Paciente {id: 1}), (msg:Mensagem {id: 2}), (n:Nutricionista {id: 1})
-        CREATE (p)-[:ENVIA]->(msg)-[:PARA]->(n)
-        """,
-            """
-        MATCH (n:Nutricionista {id: 1}), (msg:Mensagem {id: 3}), (p:Paciente {id: 1})
-        CREATE (n)-[:ENVIA]->(msg)-[:PARA]->(p)
-        """,
-            """
-        MATCH (n:Nutricionista {id: 1}), (msg:Mensagem {id: 4}), (p:Paciente {id: 1})
-        CREATE (n)-[:ENVIA]->(msg)-[:PARA]->(p)
-        """,
-            """
-        MATCH (p:Paciente {id: 1}), (msg:Mensagem {id: 5}), (n:Nutricionista {id: 1})
-        CREATE (p)-[:ENVIA]->(msg)-[:PARA]->(n)
-        """,
-            """
-        MATCH (n:Nutricionista {id: 2}), (msg:Mensagem {id: 6}), (p:Paciente {id: 2})
-        CREATE (n)-[:ENVIA]->(msg)-[:PARA]->(p)
-        """,
-        ]
+    def delete_nodes(self, label, ids):
+        execute_write(self.session, delete_nodes, label, ids)
+
+    def retype_relationships(self, rel_type, from_label, to_label, new_type, limit):
+        return execute_write(
+            self.session,
+            retype_relationships,
+            rel_type,
+            from_label,
+            to_label,
+            new_type,
+            limit,
+        )
+
+    def delete_relationships(self, rel_type, from_label, to_label, keys):
+        execute_write(
+            self.session, delete_relationships, rel_type, from_label, to_label, keys
+        )
+
+    def append_messages(self, nutritionist_id, patient_id, sender, messages):
+        execute_write(
+            self.session, append_messages, nutritionist_id, patient_id, sender, messages
+        )
+
+    def mark_read(self, nutritionist_id, patient_id, reader):
+        return execute_write(
+            self.session, mark_read, nutritionist_id, patient_id, reader
+        )
+
+    def latest_messages(self, nutritionist_id, patient_id, limit):
+        if limit < 1:
+            return []
+        # Na lista encadeada há um só caminho de cada comprimento até LATEST
+        result = self.session.run(
+            "MATCH (:Conversa {id: $conversa})-[:LATEST]->(ultima:Mensagem) "
+            f"MATCH caminho = (m:Mensagem)-[:NEXT*0..{int(limit) - 1}]->(ultima) "
+            "RETURN properties(m) AS props ORDER BY length(caminho)",
+            conversa=conversation_id(nutritionist_id, patient_id),
+        )
+        return [record["props"] for record in result]
+
+    def inbox(self, label, node_id):
+        result = self.session.run(
+            f"MATCH (:{label} {{id: $id}})-[:{PARTICIPATES[label]}]->(c:Conversa)"
+            "-[:LATEST]->(m:Mensagem) "
+            "RETURN properties(c) AS conversa, properties(m) AS ultima "
+            "ORDER BY m.data DESC, m.hora DESC",
+            id=node_id,
+        )
+        return [(record["conversa"], record["ultima"]) for record in result]
+
+    def node_hashes(self, label):
+        result = self.session.run(
+            f"MATCH (n:{label}) RETURN n.id AS id, n.{HASH_FIELD} AS hash"
+        )
+        return {record["id"]: record["hash"] for record in result}
+
+    def relationship_hashes(self, rel_type, from_label, to_label):
+        result = self.session.run(
+            f"MATCH (a:{from_label})-[r:{rel_type}]->(b:{to_label}) "
+            f"RETURN a.id AS de, b.id AS para, r.{HASH_FIELD} AS hash"
+        )
+        return {(record["de"], record["para"]): record["hash"] for record in result}
+
+    def relationships(self, rel_type, from_label, to_label):
+        # O resultado é lido aos poucos, em lotes de fetch_size registros
+        result = self.session.run(
+            f"MATCH (a:{from_label})-[r:{rel_type}]->(b:{to_label}) "
+            "RETURN a.id AS de, b.id AS para, properties(r) AS props "
+            "ORDER BY de, para"
+        )
+        for record in result:
+            yield record.data()
+
+    def node(self, label, node_id):
+        record = self.session.run(
+            f"MATCH (n:{label} {{id: $id}}) RETURN properties(n) AS props", id=node_id
+        ).single()
+        return record["props"] if record else None
+
+    def missing_nodes(self, label, ids):
+        result = self.session.run(
+            "UNWIND range(0, size($ids) - 1) AS i "
+            f"OPTIONAL MATCH (n:{label} {{id: $ids[i]}}) "
+            "WITH i, n WHERE n IS NULL RETURN $ids[i] AS id ORDER BY i",
+            ids=list(ids),
+        )
+        return [record["id"] for record in result]
+
+    def nodes(self, label, **properties):
+        where = " AND ".join(f"n.{key} = ${key}" for key in properties) or "true"
+        result = self.session.run(
+            f"MATCH (n:{label}) WHERE {where} RETURN properties(n) AS props "
+            "ORDER BY n.id",
+            **properties,
+        )
+        return [record["props"] for record in result]
+
+    def neighbors(self, label, node_id, rel_type, direction="out", other_label=None):
+        arrows = {"out": ("-", "->"), "in": ("<-", "-")}
+        if direction not in arrows:
+            raise ValueError(f"Direção inválida: {direction}")
+        left, right = arrows[direction]
+        other = f"m:{other_label}" if other_label else "m"
+        result = self.session.run(
+            f"MATCH (n:{label} {{id: $id}}){left}[r:{rel_type}]{right}({other}) "
+            "RETURN properties(r) AS rel, properties(m) AS node ORDER BY m.id",
+            id=node_id,
+        )
+        return [(record["rel"], record["node"]) for record in result]
+
+    def count_nodes(self, label=None):
+        pattern = f"(n:{label})" if label else "(n)"
+        return self.session.run(f"MATCH {pattern} RETURN count(n) AS n").single()["n"]
+
+    def count_relationships(self, rel_type=None):
+        pattern = f"()-[r:{rel_type}]->()" if rel_type else "()-[r]->()"
+        return self.session.run(f"MATCH {pattern} RETURN count(r) AS n").single()["n"]
+
+
+def apply_sync(plan, upsert, delete):
+    """Grava os registros alterados e remove os excluídos, em lotes"""
+    for batch in iter_batches(plan.upserts, BATCH_SIZE):
+        upsert(batch)
+    for batch in iter_batches(plan.deletes, BATCH_SIZE):
+        delete(batch)
+    count(skipped=plan.skipped)
+
+
+def create_constraints(store):
+    """Cria as restrições de unicidade de id usadas pelo MERGE de cada rótulo"""
+    store.create_constraints([label for _, label, _ in NODE_LOADS])
+    log("Restrições de unicidade criadas com sucesso!")
+
+
+def sync_nodes(store, label, rows):
+    """Sincroniza os nós de um rótulo, escrevendo só os novos, alterados ou removidos"""
+    plan = plan_sync(rows, store.node_hashes(label), lambda row: row["id"])
+    apply_sync(
+        plan,
+        lambda batch: store.merge_nodes(label, batch),
+        lambda batch: store.delete_nodes(label, batch),
     )
+    log(f"{label}: {plan.summary()}")
+    return plan
 
-    # --- Consultas entre Pacientes e Nutricionistas ---
-    rel_queries.extend(
-        [
-            """
-        MATCH (p:Paciente {id: 1}), (c:Consulta {id: 1}), (n:Nutricionista {id: 1})
-        CREATE (p)-[:AGENDA]->(c)-[:COM]->(n)
-        """,
-            """
-        MATCH (p:Paciente {id: 1}), (c:Consulta {id: 2}), (n:Nutricionista {id: 1})
-        CREATE (p)-[:AGENDA]->(c)-[:COM]->(n)
-        """,
-            """
-        MATCH (p:Paciente {id: 1}), (c:Consulta {id: 3}), (n:Nutricionista {id: 1})
-        CREATE (p)-[:AGENDA]->(c)-[:COM]->(n)
-        """,
-            """
-        MATCH (p:Paciente {id: 1}), (c:Consulta {id: 4}), (n:Nutricionista {id: 1})
-        CREATE (p)-[:AGENDA]->(c)-[:COM]->(n)
-        """,
-            """
-        MATCH (p:Paciente {id: 2}), (c:Consulta {id: 5}), (n:Nutricionista {id: 2})
-        CREATE (p)-[:AGENDA]->(c)-[:COM]->(n)
-        """,
-            """
-        MATCH (p:Paciente {id: 2}), (c:Consulta {id: 6}), (n:Nutricionista {id: 2})
-        CREATE (p)-[:AGENDA]->(c)-[:COM]->(n)
-        """,
-            """
-        MATCH (p:Paciente {id: 2}), (c:Consulta {id: 7}), (n:Nutricionista {id: 2})
-        CREATE (p)-[:AGENDA]->(c)-[:COM]->(n)
-        """,
-            """
-        MATCH (p:Paciente {id: 2}), (c:Consulta {id: 8}), (n:Nutricionista {id: 2})
-        CREATE (p)-[:AGENDA]->(c)-[:COM]->(n)
-        """,
-        ]
+
+def sync_relationships(store, time_tree=True):
+    """Sincroniza os relacionamentos de cada tipo com os dados canônicos"""
+    skipped = 0
+    for rel_type, from_label, to_label, pairs in load_steps(time_tree)[1]:
+        step = f"{rel_type}:{from_label}->{to_label}"
+        plan = plan_sync(
+            relationship_rows(pairs),
+            store.relationship_hashes(rel_type, from_label, to_label),
+            lambda row: (row["de"], row["para"]),
+        )
+        apply_sync(
+            plan,
+            lambda batch: store.merge_relationships(
+                rel_type, from_label, to_label, batch
+            ),
+            lambda batch: store.delete_relationships(
+                rel_type, from_label, to_label, batch
+            ),
+        )
+        skipped += plan.skipped
+        log(f"{step}: {plan.summary()}")
+
+    log(f"Total de {skipped} relacionamentos inalterados pulados.")
+
+
+def node_loads(snapshot=None, time_tree=True):
+    """Etapas de carga de nós, (fase, rótulo, linhas com _hash), na ordem de carga
+
+    Com um ``columnar.ColumnarSnapshot`` as linhas são leitores do snapshot,
+    que entregam os lotes já com o hash, sem montar a etapa inteira.
+    """
+    if snapshot is not None:
+        for name, label, rows in snapshot.nodes():
+            if time_tree or label not in TIME_TREE_LABELS:
+                yield name, label, rows
+        return
+    for name, label, rows in load_steps(time_tree)[0]:
+        yield name, label, [with_hash(row) for row in rows]
+
+
+def relationship_loads(snapshot=None, time_tree=True):
+    """Etapas de carga de relacionamentos, (tipo, origem, destino, linhas com _hash)"""
+    if snapshot is not None:
+        for rel_type, from_label, to_label, rows in snapshot.relationships():
+            if time_tree or rel_type not in TIME_TREE_RELATIONSHIPS:
+                yield rel_type, from_label, to_label, rows
+        return
+    for rel_type, from_label, to_label, pairs in load_steps(time_tree)[1]:
+        rows = [with_hash(row) for row in relationship_rows(pairs)]
+        yield rel_type, from_label, to_label, rows
+
+
+def load_nodes(store, journal, label, rows):
+    """Carrega os nós de um rótulo em lotes, pulando os já confirmados"""
+    written, skipped = run_batches(
+        journal,
+        label,
+        rows,
+        BATCH_SIZE,
+        lambda batch: store.merge_nodes(label, batch),
     )
+    log(f"{label}: {written} lote(s) escrito(s), {skipped} pulado(s)")
+
+
+def create_relationships(store, journal, snapshot=None, time_tree=True):
+    """Cria os relacionamentos em lotes por tipo, pulando os já confirmados"""
+    total = 0
+    for rel_type, from_label, to_label, rows in relationship_loads(snapshot, time_tree):
+        step = f"{rel_type}:{from_label}->{to_label}"
+
+        def write_batch(batch):
+            store.merge_relationships(rel_type, from_label, to_label, batch)
+
+        written, skipped = run_batches(journal, step, rows, BATCH_SIZE, write_batch)
+        total += len(rows)
+        log(f"{step}: {written} lote(s) escrito(s), {skipped} pulado(s)")
+
+    log(f"Total de {total} relacionamentos criados com sucesso!")
+
+
+def sync_all_data(store, time_tree=True):
+    """Sincroniza o banco com os dados canônicos, sem apagá-lo"""
+    with phase("restricoes"):
+        create_constraints(store)
+
+    for name, label, rows in load_steps(time_tree)[0]:
+        with phase(name):
+            sync_nodes(store, label, rows)
+
+    with phase("relacionamentos"):
+        sync_relationships(store, time_tree)
+
+
+def load_into(store, journal, resume=False, sync=False, snapshot=None, time_tree=True):
+    """Carrega ou sincroniza os dados canônicos num GraphStore
+
+    Com um ``snapshot`` colunar, os dados carregados são os dele. Com
+    time_tree=False a árvore de tempo (nós Dia) não é carregada.
+    """
+    if sync and snapshot is not None:
+        raise ValueError("A sincronização usa os dados canônicos, não um snapshot")
+    if sync:
+        log("Sincronizando apenas os registros novos, alterados ou removidos...")
+        sync_all_data(store, time_tree)
+        print("Dados sincronizados com sucesso!")
+        return
+
+    if resume:
+        log("Retomando a carga a partir do último lote confirmado...")
+    else:
+        # Limpar o banco antes de carregar novos dados
+        with phase("limpeza"):
+            store.clear()
+        journal.reset()
+        log("Banco de dados limpo com sucesso!")
+
+    with phase("restricoes"):
+        create_constraints(store)
+
+    # Carregar todos os nós e, por fim, os relacionamentos
+    for name, label, rows in node_loads(snapshot, time_tree):
+        with phase(name):
+            load_nodes(store, journal, label, rows)
+
+    with phase("relacionamentos"):
+        create_relationships(store, journal, snapshot, time_tree)
+
+    print("Todos os dados foram carregados com sucesso!")
 
-    # Executar cada query individualmente
-    for i, query in enumerate(rel_queries):
-        try:
-            tx.run(query)
-            # Imprimir progresso a cada 10 relacionamentos
-            if (i + 1) % 10 == 0:
-                print(f"Criados {i + 1} de {len(rel_queries)} relacionamentos...")
-        except Exception as e:
-            print(f"Erro ao criar relacionamento #{i + 1}: {str(e)}")
-            print(f"Query problemática: {query}")
 
-    print(f"Total de {len(rel_queries)} relacionamentos criados com sucesso!")
+def load_all_data(
+    quiet=False,
+    resume=False,
+    sync=False,
+    store=None,
+    journal=None,
+    snapshot=None,
+    time_tree=True,
+):
+    """Carrega todos os dados no banco Neo4j
 
+    Com resume=True o banco não é limpo e os lotes já registrados no journal
+    são pulados, retomando uma carga interrompida. Com sync=True o banco também
+    não é limpo: só os registros cujo hash de conteúdo mudou são escritos.
 
-def load_all_data():
-    """Carrega todos os dados no banco Neo4j"""
-    if not wait_for_neo4j():
+    Com um ``store`` (por exemplo um MemoryGraphStore) a carga é feita nele,
+    sem conexão com o servidor; o journal, se não for dado, fica em memória,
+    e as métricas saem como loader "neo4j_memory". Com um ``snapshot``
+    (columnar.ColumnarSnapshot), os lotes são lidos dele em vez de montados
+    a partir dos dados canônicos. Com time_tree=False a árvore de tempo
+    (Paciente -> Dia -> Refeicao) fica de fora, e uma sincronização a remove.
+    """
+    # Cargas em memória têm métricas próprias, sem sobrescrever as do servidor
+    run = start_run("neo4j" if store is None else "neo4j_memory", quiet=quiet)
+    if store is not None:
+        journal = journal or LoadJournal("neo4j", path=":memory:")
+        try:
+            load_into(
+                store,
+                journal,
+                resume=resume,
+                sync=sync,
+                snapshot=snapshot,
+                time_tree=time_tree,
+            )
+            return True
+        except Exception as e:
+            print(f"Erro ao carregar dados: {str(e)}")
+            return False
+        finally:
+            journal.close()
+            run.write()
+
+    with phase("conexao"):
+        connected = wait_for_neo4j()
+    if not connected:
+        run.write()
         return False
 
     driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+    journal = journal or LoadJournal("neo4j")
 
     try:
         with driver.session() as session:
-            # Limpar o banco antes de carregar novos dados
-            session.run("MATCH (n) DETACH DELETE n")
-            print("Banco de dados limpo com sucesso!")
-
-            # Carregar todos os nós
-            session.execute_write(load_nutritionists)
-            session.execute_write(load_patients)
-            session.execute_write(load_foods)
-            session.execute_write(load_recipes)
-            session.execute_write(load_diet_plans)
-            session.execute_write(load_meals)
-            session.execute_write(load_measurements)
-            session.execute_write(load_messages)
-            session.execute_write(load_appointments)
-
-            # Criar todos os relacionamentos
-            session.execute_write(create_relationships)
-
-        print("Todos os dados foram carregados com sucesso!")
+            load_into(
+                Neo4jGraphStore(session),
+                journal,
+                resume=resume,
+                sync=sync,
+                snapshot=snapshot,
+                time_tree=time_tree,
+            )
         return True
     except Exception as e:
         print(f"Erro ao carregar dados: {str(e)}")
         return False
     finally:
         driver.close()
+        journal.close()
+        run.write()
 
 
 def create_database_dump():
-    """Cria um dump do banco de dados"""
+    """Cria um dump lógico do banco, online e sem APOC (ver neo4j_dump.py)"""
+    from datetime import datetime
+
+    from neo4j_dump import export_database
+
+    driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
     try:
-        import datetime
-        import subprocess
-
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"neo4j_dump_{timestamp}.dump"
-
-        # Este comando assume que o Neo4j está em um container chamado diet_app_neo4j
-        command = f"docker exec diet_app_neo4j neo4j-admin dump --database=neo4j --to=/var/lib/neo4j/import/{filename}"
-        result = subprocess.run(
-            command,
-            shell=True,
-            check=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-        )
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        directory = f"./dumps/neo4j/neo4j_dump_{timestamp}"
+        manifest = export_database(driver, directory)
 
-        print(f"Dump criado com sucesso: {filename}")
-        print("Para copiar o arquivo para o seu computador, use:")
-        print(f"docker cp diet_app_neo4j:/var/lib/neo4j/import/{filename} ./{filename}")
+        print(f"Dump criado com sucesso: {directory}")
+        print(f"Rótulos exportados: {', '.join(manifest['nodes'])}")
+        print(f"Para restaurar, use: python neo4j_dump.py import {directory}")
 
         return True
     except Exception as e:
         print(f"Erro ao criar dump: {str(e)}")
         return False
+    finally:
+        driver.close()
+
+
+def parse_args(argv=None):
+    """Lê as opções de linha de comando do script de carga"""
+    parser = argparse.ArgumentParser(description="Carrega os dados no Neo4j.")
+    parser.add_argument(
+        "--quiet",
+        action="store_true",
+        help="não imprime mensagens de progresso durante a carga",
+    )
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--resume",
+        action="store_true",
+        help="retoma uma carga interrompida, pulando os lotes já confirmados",
+    )
+    mode.add_argument(
+        "--sync",
+        action="store_true",
+        help="sincroniza sem apagar o banco, escrevendo só os registros alterados",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        default="neo4j",
+        help="onde carregar: no servidor (padrão) ou num grafo em memória, sem servidor",
+    )
+    parser.add_argument(
+        "--snapshot",
+        metavar="DIR",
+        help="carrega os dados de um snapshot colunar (ver columnar.py)",
+    )
+    parser.add_argument(
+        "--no-time-tree",
+        dest="time_tree",
+        action="store_false",
+        help="não carrega a árvore de tempo (nós Dia) usada pelas consultas 2 e 3",
+    )
+    add_profile_argument(parser)
+    args = parser.parse_args(argv)
+    if args.backend == "memory" and args.resume:
+        parser.error("--resume não se aplica a --backend memory")
+    if args.snapshot and args.sync:
+        parser.error("--sync usa os dados canônicos e não se aplica a --snapshot")
+    return args
 
 
 if __name__ == "__main__":
-    if load_all_data():
+    args = parse_args()
+    store = MemoryGraphStore() if args.backend == "memory" else None
+    snapshot = None
+    if args.snapshot:
+        from columnar import ColumnarSnapshot
+
+        snapshot = ColumnarSnapshot(args.snapshot)
+    with profile(args.profile, "neo4j"):
+        success = load_all_data(
+            quiet=args.quiet,
+            resume=args.resume,
+            sync=args.sync,
+            store=store,
+            snapshot=snapshot,
+            time_tree=args.time_tree,
+        )
+    if store is not None:
+        print(
+            f"Grafo em memória: {store.count_nodes()} nós, "
+            f"{store.count_relationships()} relacionamentos"
+        )
+    if success:
         # Descomente a linha abaixo se quiser criar um dump automaticamente
         # create_database_dump()
         pass
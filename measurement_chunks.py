@@ -0,0 +1,405 @@
+"""
+Armazenamento compacto das medidas corporais em blocos mensais.
+
+Cada documento de ``measurements`` repete as chaves (``paciente_id``,
+``medidas.cintura``...) e guarda a pressão como texto ("130/85"); para quem
+se pesa todo dia numa balança conectada, isso é um documento por leitura.
+Aqui as medidas de um paciente em um mês viram um documento de
+``measurementChunks``::
+
+    {"_id": "1:2023-10", "paciente_id": 1, "mes": datetime(2023, 10, 1),
+     "inicio": ..., "fim": ..., "n": 3,
+     "colunas": {"_id": Binary, "data": Binary, "peso": Binary, ...},
+     "presentes": {"gordura_corporal": Binary, ...}, "geracao": ObjectId}
+
+Cada coluna é codificada por ``encode_deltas``: os valores viram inteiros
+(em ponto fixo, com a escala de FIELDS), guardados como a diferença para o
+anterior no menor tipo inteiro que comporta todas as diferenças, e o array
+vai como BSON binário. A pressão é separada em ``sistolica`` e
+``diastolica``. Valores ausentes ficam fora da coluna, com um bitmap em
+``presentes`` (só para as colunas com algum ausente).
+
+``read_measurements`` e ``read_columns`` leem só os blocos dos meses do
+intervalo pedido e, em cada bloco, decodificam primeiro as datas para
+decodificar as outras colunas só nas linhas do intervalo.
+
+A representação é opcional: ``measurements`` continua sendo a coleção
+canônica, e ``compact_measurements`` (ou ``python measurement_chunks.py``)
+gera os blocos a partir dela; ``add_measurements`` acrescenta leituras novas
+regravando só os blocos afetados.
+"""
+
+import argparse
+import struct
+from datetime import datetime
+from itertools import groupby
+
+import numpy as np
+from bson import Binary, ObjectId
+from pymongo import ReplaceOne
+
+from analytics import MeasurementColumns
+from checkpoint import iter_batches
+from mongo_dump import CURSOR_BATCH_SIZE
+
+CHUNKS = "measurementChunks"
+BATCH_SIZE = 500  # blocos por bulk_write
+
+# coluna: (caminho no documento, escala do ponto fixo)
+FIELDS = {
+    "peso": ("peso", 100),
+    "imc": ("imc", 100),
+    "gordura_corporal": ("gordura_corporal", 100),
+    "cintura": ("medidas.cintura", 100),
+    "quadril": ("medidas.quadril", 100),
+    "sistolica": (None, 1),
+    "diastolica": (None, 1),
+}
+# campo de MeasurementColumns: coluna do bloco
+COLUMN_FIELDS = {
+    "weight": "peso",
+    "bmi": "imc",
+    "body_fat": "gordura_corporal",
+    "waist": "cintura",
+    "hip": "quadril",
+}
+_INT_TYPES = (np.int8, np.int16, np.int32, np.int64)
+
+
+# --- codificação ---
+
+
+def encode_deltas(values):
+    """Inteiros como diferenças para o anterior, no menor tipo que as comporta.
+
+    O primeiro byte é o tamanho do tipo; o primeiro valor é a diferença para
+    zero.
+    """
+    values = np.asarray(values, dtype=np.int64)
+    deltas = np.diff(values, prepend=0)
+    for kind in _INT_TYPES:
+        limits = np.iinfo(kind)
+        if not len(deltas) or (
+            deltas.min() >= limits.min and deltas.max() <= limits.max
+        ):
+            break
+    kind = np.dtype(kind).newbyteorder("<")
+    return struct.pack("<B", kind.itemsize) + deltas.astype(kind).tobytes()
+
+
+def decode_deltas(data, count=-1):
+    """Inverso de ``encode_deltas``: os ``count`` primeiros inteiros, como int64.
+
+    Só as diferenças até ``count`` são lidas e somadas (todas com -1).
+    """
+    (itemsize,) = struct.unpack_from("<B", data)
+    deltas = np.frombuffer(data, dtype=f"<i{itemsize}", count=count, offset=1)
+    return np.cumsum(deltas, dtype=np.int64)
+
+
+def encode_fixed(values, scale):
+    """Números (NaN = ausente) em ponto fixo: (coluna, bitmap ou None).
+
+    ValueError se algum valor tem mais casas decimais do que a escala guarda.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    present = ~np.isnan(values)
+    scaled = np.round(values[present] * scale)
+    if not np.allclose(scaled / scale, values[present], rtol=0, atol=1e-9):
+        raise ValueError(f"Valor com mais precisão que 1/{scale}")
+    bitmap = None if present.all() else np.packbits(present).tobytes()
+    return encode_deltas(scaled.astype(np.int64)), bitmap
+
+
+def decode_fixed(data, scale, size, bitmap=None, first=0, last=None):
+    """Inverso de ``encode_fixed`` nas linhas [first, last), com NaN nos ausentes.
+
+    As diferenças depois de ``last`` não são decodificadas.
+    """
+    last = size if last is None else last
+    if bitmap is None:
+        return decode_deltas(data, last)[first:] / scale
+    bits = np.frombuffer(bitmap, dtype=np.uint8)
+    present = np.unpackbits(bits, count=last).astype(bool)
+    values = np.full(last, np.nan)
+    values[present] = decode_deltas(data, int(present.sum())) / scale
+    return values[first:]
+
+
+def split_pressure(pressure):
+    """Pressão "130/85" -> (130, 85); NaN nos dois sem pressão."""
+    if not pressure:
+        return np.nan, np.nan
+    systolic, diastolic = pressure.split("/")
+    return float(systolic), float(diastolic)
+
+
+def join_pressure(systolic, diastolic):
+    if np.isnan(systolic) or np.isnan(diastolic):
+        return None
+    return f"{int(systolic)}/{int(diastolic)}"
+
+
+def _value(document, path):
+    for key in path.split("."):
+        document = (document or {}).get(key)
+    return np.nan if document is None else document
+
+
+def month_start(day):
+    return datetime(day.year, day.month, 1)
+
+
+def chunk_id(patient_id, month):
+    return f"{patient_id}:{month:%Y-%m}"
+
+
+def _seconds(dates):
+    return np.asarray(dates, dtype="datetime64[s]").astype(np.int64)
+
+
+def encode_chunk(patient_id, documents, generation=None):
+    """Documento de ``measurementChunks`` das medidas de um paciente num mês.
+
+    As medidas são ordenadas por data; todas devem ser do mesmo mês.
+    """
+    documents = sorted(documents, key=lambda doc: (doc["data"], doc["_id"]))
+    month = month_start(documents[0]["data"])
+    if any(month_start(doc["data"]) != month for doc in documents):
+        raise ValueError("Medidas de meses diferentes no mesmo bloco")
+    values = {
+        name: [_value(doc, path) for doc in documents]
+        for name, (path, _) in FIELDS.items()
+        if path
+    }
+    pressures = [split_pressure(doc.get("pressao")) for doc in documents]
+    values["sistolica"] = [systolic for systolic, _ in pressures]
+    values["diastolica"] = [diastolic for _, diastolic in pressures]
+
+    columns = {
+        "_id": Binary(encode_deltas([doc["_id"] for doc in documents])),
+        "data": Binary(encode_deltas(_seconds([doc["data"] for doc in documents]))),
+    }
+    present = {}
+    for name, (_, scale) in FIELDS.items():
+        data, bitmap = encode_fixed(values[name], scale)
+        columns[name] = Binary(data)
+        if bitmap is not None:
+            present[name] = Binary(bitmap)
+    return {
+        "_id": chunk_id(patient_id, month),
+        "paciente_id": patient_id,
+        "mes": month,
+        "inicio": documents[0]["data"],
+        "fim": documents[-1]["data"],
+        "n": len(documents),
+        "colunas": columns,
+        "presentes": present,
+        "geracao": generation,
+    }
+
+
+def decode_chunk(chunk, start=None, end=None):
+    """Colunas de um bloco (dict de arrays) com data em [start, end].
+
+    As datas são decodificadas primeiro; das outras colunas só as
+    diferenças até a última linha do intervalo. ``data`` volta como
+    datetime64[s].
+    """
+    size = chunk["n"]
+    seconds = decode_deltas(chunk["colunas"]["data"])
+    first = 0 if start is None else int(np.searchsorted(seconds, _seconds(start)))
+    last = (
+        size
+        if end is None
+        else int(np.searchsorted(seconds, _seconds(end), side="right"))
+    )
+    last = max(first, last)
+    decoded = {
+        "_id": decode_deltas(chunk["colunas"]["_id"], last)[first:],
+        "data": seconds[first:last].astype("datetime64[s]"),
+    }
+    present = chunk.get("presentes") or {}
+    for name, (_, scale) in FIELDS.items():
+        decoded[name] = decode_fixed(
+            chunk["colunas"][name], scale, size, present.get(name), first, last
+        )
+    return decoded
+
+
+def chunk_documents(chunk, start=None, end=None):
+    """As medidas de um bloco no formato de ``measurements``."""
+    columns = decode_chunk(chunk, start, end)
+    documents = []
+    for i in range(len(columns["_id"])):
+        document = {
+            "_id": int(columns["_id"][i]),
+            "paciente_id": chunk["paciente_id"],
+            "data": columns["data"][i].astype(datetime),
+        }
+        for name, (path, _) in FIELDS.items():
+            value = columns[name][i]
+            if path is None or np.isnan(value):
+                continue
+            value = float(value)
+            if "." in path:
+                parent, key = path.split(".")
+                document.setdefault(parent, {})[key] = value
+            else:
+                document[path] = value
+        pressure = join_pressure(columns["sistolica"][i], columns["diastolica"][i])
+        if pressure is not None:
+            document["pressao"] = pressure
+        documents.append(document)
+    return documents
+
+
+# --- banco ---
+
+
+def create_chunk_indexes(db):
+    """Índice da leitura por paciente e mês"""
+    db[CHUNKS].create_index([("paciente_id", 1), ("mes", 1)])
+
+
+def _by_chunk(documents):
+    """Agrupa medidas já ordenadas por paciente e data em (paciente, docs do mês)."""
+    for (patient_id, _), group in groupby(
+        documents, key=lambda doc: (doc["paciente_id"], month_start(doc["data"]))
+    ):
+        yield patient_id, list(group)
+
+
+def compact_measurements(db, batch_size=BATCH_SIZE):
+    """Regrava ``measurementChunks`` a partir de ``measurements``; retorna os blocos."""
+    projection = {"paciente_id": 1, "data": 1, "pressao": 1}
+    projection.update((path, 1) for path, _ in FIELDS.values() if path)
+    cursor = (
+        db.measurements.find({}, projection)
+        .sort([("paciente_id", 1), ("data", 1)])
+        .batch_size(CURSOR_BATCH_SIZE)
+    )
+    # Cada execução marca os blocos que grava; no fim, os de outra geração
+    # são de pacientes ou meses que não têm mais medidas
+    generation = ObjectId()
+    written = 0
+    try:
+        chunks = (
+            encode_chunk(*group, generation=generation) for group in _by_chunk(cursor)
+        )
+        for batch in iter_batches(chunks, batch_size):
+            db[CHUNKS].bulk_write(
+                [
+                    ReplaceOne({"_id": chunk["_id"]}, chunk, upsert=True)
+                    for chunk in batch
+                ],
+                ordered=False,
+            )
+            written += len(batch)
+    finally:
+        cursor.close()
+    db[CHUNKS].delete_many({"geracao": {"$ne": generation}})
+    create_chunk_indexes(db)
+    return written
+
+
+def add_measurements(db, documents):
+    """Acrescenta medidas aos blocos, regravando só os meses afetados.
+
+    Uma medida com o mesmo _id de uma já guardada no bloco a substitui.
+    Retorna os _id dos blocos regravados.
+    """
+    documents = sorted(documents, key=lambda doc: (doc["paciente_id"], doc["data"]))
+    groups = {
+        chunk_id(patient_id, month_start(group[0]["data"])): (patient_id, group)
+        for patient_id, group in _by_chunk(documents)
+    }
+    existing = {
+        chunk["_id"]: chunk for chunk in db[CHUNKS].find({"_id": {"$in": list(groups)}})
+    }
+    requests = []
+    for key, (patient_id, group) in groups.items():
+        new_ids = {doc["_id"] for doc in group}
+        kept = [
+            doc
+            for doc in (chunk_documents(existing[key]) if key in existing else [])
+            if doc["_id"] not in new_ids
+        ]
+        chunk = encode_chunk(
+            patient_id, kept + group, existing.get(key, {}).get("geracao")
+        )
+        requests.append(ReplaceOne({"_id": key}, chunk, upsert=True))
+    if requests:
+        db[CHUNKS].bulk_write(requests, ordered=False)
+    return list(groups)
+
+
+def _chunks(db, patient_id=None, start=None, end=None):
+    query = {}
+    if patient_id is not None:
+        query["paciente_id"] = patient_id
+    months = {}
+    if start is not None:
+        months["$gte"] = month_start(start)
+    if end is not None:
+        months["$lte"] = month_start(end)
+    if months:
+        query["mes"] = months
+    return db[CHUNKS].find(query).sort([("paciente_id", 1), ("mes", 1)])
+
+
+def read_measurements(db, patient_id, start=None, end=None):
+    """Medidas do paciente com data em [start, end], como documentos."""
+    return [
+        document
+        for chunk in _chunks(db, patient_id, start, end)
+        for document in chunk_documents(chunk, start, end)
+    ]
+
+
+def read_columns(db, patient_id=None, start=None, end=None):
+    """``MeasurementColumns`` direto dos blocos, sem montar documentos."""
+    parts = {name: [] for name in ("patient", "time", *COLUMN_FIELDS)}
+    for chunk in _chunks(db, patient_id, start, end):
+        columns = decode_chunk(chunk, start, end)
+        parts["patient"].append(np.full(len(columns["_id"]), chunk["paciente_id"]))
+        parts["time"].append(columns["data"].astype(np.int64))
+        for name, field in COLUMN_FIELDS.items():
+            parts[name].append(columns[field])
+    joined = {
+        name: np.concatenate(values) if values else np.zeros(0)
+        for name, values in parts.items()
+    }
+    return MeasurementColumns(joined.pop("patient"), joined.pop("time"), **joined)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Gera os blocos mensais compactos das medidas corporais."
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=BATCH_SIZE,
+        help=f"Blocos por bulk_write (padrão: {BATCH_SIZE})",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Compacta ``measurements`` no banco configurado."""
+    from pymongo import MongoClient
+
+    from load_mongodb_data import MONGO_DB, MONGO_URI
+
+    args = parse_args(argv)
+    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
+    try:
+        written = compact_measurements(client[MONGO_DB], args.batch_size)
+    finally:
+        client.close()
+    print(f"{written} bloco(s) gravado(s) em {CHUNKS}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,662 @@
+"""
+Stand-in em memória do MongoDB, com a API do pymongo usada no projeto.
+
+``MemoryClient`` substitui o ``MongoClient`` nos loaders (``--backend
+memory``), nos dumps lógicos e nas fixtures de teste, sem servidor. Cobre o
+subconjunto da API que o código do projeto usa:
+
+- escrita: ``insert_one``/``insert_many``, ``bulk_write`` (InsertOne,
+  UpdateOne/UpdateMany, ReplaceOne, DeleteOne/DeleteMany), ``update_one``,
+  ``update_many``, ``replace_one``, ``delete_one``, ``delete_many``, ``drop``;
+  atualizações com operadores (``$set``, ``$unset``, ``$inc``,
+  ``$setOnInsert``, ``$currentDate``) ou em pipeline (``$set``/``$addFields``,
+  ``$unset``, ``$replaceWith``/``$replaceRoot``, com ``$literal`` e ``$$NOW``),
+  e upsert;
+- leitura: ``find`` com filtro, projeção, ``sort``/``skip``/``limit``,
+  ``find_one``, ``count_documents``, ``estimated_document_count`` e
+  ``distinct``; os filtros aceitam igualdade (também dentro de arrays e por
+  caminho com ponto), ``$eq``, ``$ne``, ``$gt``, ``$gte``, ``$lt``, ``$lte``,
+  ``$in``, ``$nin``, ``$exists``, ``$and``, ``$or`` e ``$nor``;
+- índices: ``create_index``, ``list_indexes`` e ``index_information`` (só
+  registram a definição; a única restrição aplicada é a unicidade de _id);
+- comandos ``ping`` e ``hello``.
+
+Os documentos são guardados como BSON, como no servidor: cada escrita paga
+a serialização que o driver faria e cada leitura devolve uma cópia. A
+agregação usa o interpretador de pipelines do mongomock (dependência de
+desenvolvimento), sobre uma cópia dos documentos.
+"""
+
+import functools
+from datetime import datetime, timezone
+
+import bson
+from pymongo import DeleteMany, DeleteOne, InsertOne, ReplaceOne, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from pymongo.results import BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+
+ID_INDEX = {"v": 2, "key": {"_id": 1}, "name": "_id_"}
+# Ordem de comparação entre tipos do BSON (valores ausentes contam como null)
+TYPE_ORDER = ((type(None), 0), ((int, float), 1), (str, 2), (dict, 3), (list, 4))
+TYPE_ORDER_LATE = ((bson.ObjectId, 5), (bool, 6), (datetime, 7))
+MISSING = object()
+
+
+def now():
+    """Hora atual em UTC, com a precisão de milissegundos do BSON ($$NOW)."""
+    moment = datetime.now(timezone.utc).replace(tzinfo=None)
+    return moment.replace(microsecond=moment.microsecond // 1000 * 1000)
+
+
+def _type_rank(value):
+    # bool é subclasse de int, por isso os tipos "tardios" vêm primeiro
+    for types, rank in TYPE_ORDER_LATE + TYPE_ORDER:
+        if isinstance(value, types):
+            return rank
+    return 8
+
+
+def sort_key(value):
+    """Chave que ordena valores de tipos diferentes como o MongoDB."""
+    if value is MISSING:
+        value = None
+    rank = _type_rank(value)
+    if rank in (0, 3, 4):
+        return (rank, repr(value))
+    return (rank, value)
+
+
+def _comparable(a, b):
+    return a is not MISSING and _type_rank(a) == _type_rank(b)
+
+
+def get_path(doc, path):
+    """Valores de um caminho com ponto; atravessa arrays como o MongoDB."""
+    values = [doc]
+    for part in path.split("."):
+        found = []
+        for value in values:
+            if isinstance(value, dict):
+                if part in value:
+                    found.append(value[part])
+            elif isinstance(value, list):
+                if part.isdigit() and int(part) < len(value):
+                    found.append(value[int(part)])
+                else:
+                    found.extend(
+                        item[part]
+                        for item in value
+                        if isinstance(item, dict) and part in item
+                    )
+        values = found
+    return values
+
+
+def _candidates(values):
+    """Valores a comparar: o próprio valor e, se for array, seus elementos."""
+    for value in values:
+        yield value
+        if isinstance(value, list):
+            yield from value
+
+
+def _compare(operator, value, expected):
+    if operator == "$eq":
+        return value == expected
+    if not _comparable(value, expected):
+        return False
+    if operator == "$gt":
+        return value > expected
+    if operator == "$gte":
+        return value >= expected
+    if operator == "$lt":
+        return value < expected
+    return value <= expected
+
+
+def _match_condition(values, condition):
+    if not isinstance(condition, dict) or not any(
+        key.startswith("$") for key in condition
+    ):
+        if condition is None and not values:
+            return True
+        return any(value == condition for value in _candidates(values))
+
+    for operator, expected in condition.items():
+        if operator in ("$eq", "$gt", "$gte", "$lt", "$lte"):
+            if expected is None and operator == "$eq" and not values:
+                continue
+            if not any(
+                _compare(operator, value, expected) for value in _candidates(values)
+            ):
+                return False
+        elif operator == "$ne":
+            if _match_condition(values, {"$eq": expected}):
+                return False
+        elif operator == "$in":
+            if not any(_match_condition(values, item) for item in expected):
+                return False
+        elif operator == "$nin":
+            if any(_match_condition(values, item) for item in expected):
+                return False
+        elif operator == "$exists":
+            if bool(values) != bool(expected):
+                return False
+        else:
+            raise NotImplementedError(f"Operador de consulta não suportado: {operator}")
+    return True
+
+
+def matches(doc, query):
+    """Indica se o documento satisfaz o filtro."""
+    for key, condition in (query or {}).items():
+        if key == "$and":
+            if not all(matches(doc, sub) for sub in condition):
+                return False
+        elif key == "$or":
+            if not any(matches(doc, sub) for sub in condition):
+                return False
+        elif key == "$nor":
+            if any(matches(doc, sub) for sub in condition):
+                return False
+        elif key.startswith("$"):
+            raise NotImplementedError(f"Operador de consulta não suportado: {key}")
+        elif not _match_condition(get_path(doc, key), condition):
+            return False
+    return True
+
+
+def _set_path(doc, path, value):
+    *parents, last = path.split(".")
+    for part in parents:
+        doc = doc.setdefault(part, {})
+    doc[last] = value
+
+
+def _unset_path(doc, path):
+    *parents, last = path.split(".")
+    for part in parents:
+        doc = doc.get(part)
+        if not isinstance(doc, dict):
+            return
+    doc.pop(last, None)
+
+
+def project(doc, projection):
+    """Aplica uma projeção de inclusão ou de exclusão (com caminhos com ponto)."""
+    if not projection:
+        return doc
+    if isinstance(projection, (list, tuple)):
+        projection = dict.fromkeys(projection, 1)
+    fields = {key: value for key, value in projection.items() if key != "_id"}
+    include_id = projection.get("_id", 1)
+    if any(fields.values()):
+        result = {"_id": doc["_id"]} if include_id and "_id" in doc else {}
+        for path in fields:
+            values = get_path(doc, path)
+            if values:
+                _set_path(result, path, values[0])
+        return result
+    for path in fields:
+        _unset_path(doc, path)
+    if not include_id:
+        doc.pop("_id", None)
+    return doc
+
+
+def _sort_spec(key_or_list, direction=None):
+    if isinstance(key_or_list, str):
+        return [(key_or_list, direction or 1)]
+    if isinstance(key_or_list, dict):
+        return list(key_or_list.items())
+    return list(key_or_list)
+
+
+def _sort(docs, spec):
+    # Ordenações estáveis da última chave para a primeira
+    for path, direction in reversed(spec):
+
+        def key(doc, path=path, direction=direction):
+            values = get_path(doc, path)
+            if not values:
+                return sort_key(MISSING)
+            keys = [sort_key(value) for value in _candidates(values)]
+            return min(keys) if direction == 1 else max(keys)
+
+        docs.sort(key=key, reverse=direction == -1)
+    return docs
+
+
+def _evaluate(expression, doc, clock):
+    """Avalia as expressões usadas nas atualizações em pipeline."""
+    if isinstance(expression, str):
+        if expression == "$$NOW":
+            return clock()
+        if expression.startswith("$") and not expression.startswith("$$"):
+            values = get_path(doc, expression[1:])
+            return values[0] if values else None
+        return expression
+    if isinstance(expression, dict):
+        if "$literal" in expression:
+            return expression["$literal"]
+        if any(key.startswith("$") for key in expression):
+            raise NotImplementedError(f"Expressão não suportada: {expression}")
+        return {key: _evaluate(value, doc, clock) for key, value in expression.items()}
+    if isinstance(expression, list):
+        return [_evaluate(item, doc, clock) for item in expression]
+    return expression
+
+
+def apply_update(doc, update, inserting=False):
+    """Aplica uma atualização (operadores ou pipeline) e retorna o novo documento."""
+    clock = functools.lru_cache(maxsize=None)(now)  # um único $$NOW por operação
+    doc_id = doc.get("_id", MISSING)
+    if isinstance(update, list):
+        for stage in update:
+            for operator, spec in stage.items():
+                if operator in ("$set", "$addFields"):
+                    values = {key: _evaluate(v, doc, clock) for key, v in spec.items()}
+                    for path, value in values.items():
+                        _set_path(doc, path, value)
+                elif operator == "$unset":
+                    for path in [spec] if isinstance(spec, str) else spec:
+                        _unset_path(doc, path)
+                elif operator in ("$replaceWith", "$replaceRoot"):
+                    if operator == "$replaceRoot":
+                        spec = spec["newRoot"]
+                    doc = dict(_evaluate(spec, doc, clock))
+                else:
+                    raise NotImplementedError(f"Estágio não suportado: {operator}")
+    else:
+        for operator, spec in update.items():
+            if operator == "$set" or (operator == "$setOnInsert" and inserting):
+                for path, value in spec.items():
+                    _set_path(doc, path, value)
+            elif operator == "$unset":
+                for path in spec:
+                    _unset_path(doc, path)
+            elif operator == "$currentDate":
+                for path in spec:
+                    _set_path(doc, path, clock())
+            elif operator == "$inc":
+                for path, amount in spec.items():
+                    values = get_path(doc, path)
+                    _set_path(doc, path, (values[0] if values else 0) + amount)
+            elif operator != "$setOnInsert":
+                raise NotImplementedError(
+                    f"Operador de atualização não suportado: {operator}"
+                )
+    if doc_id is not MISSING:
+        if doc.get("_id", doc_id) != doc_id:
+            raise OperationFailure("O campo imutável '_id' não pode ser alterado")
+        doc["_id"] = doc_id
+    return doc
+
+
+def _upsert_seed(query):
+    """Campos de igualdade do filtro, que um upsert copia para o documento novo."""
+    seed = {}
+    for key, condition in (query or {}).items():
+        if key.startswith("$"):
+            continue
+        if isinstance(condition, dict) and any(k.startswith("$") for k in condition):
+            if "$eq" not in condition:
+                continue
+            condition = condition["$eq"]
+        _set_path(seed, key, condition)
+    return seed
+
+
+class MemoryCursor:
+    """Cursor de find: sort, skip, limit e batch_size antes da iteração."""
+
+    def __init__(self, collection, query, projection):
+        self._collection = collection
+        self._query = query
+        self._projection = projection
+        self._sort = []
+        self._skip = 0
+        self._limit = 0
+        self._results = None
+
+    def sort(self, key_or_list, direction=None):
+        self._sort = _sort_spec(key_or_list, direction)
+        return self
+
+    def skip(self, skip):
+        self._skip = skip
+        return self
+
+    def limit(self, limit):
+        self._limit = limit
+        return self
+
+    def batch_size(self, batch_size):
+        return self
+
+    def _run(self):
+        docs = [
+            doc for doc in self._collection._documents() if matches(doc, self._query)
+        ]
+        if self._sort:
+            _sort(docs, self._sort)
+        docs = docs[self._skip :]
+        if self._limit:
+            docs = docs[: self._limit]
+        return (project(doc, self._projection) for doc in docs)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        # Como no pymongo, a consulta roda na primeira leitura
+        if self._results is None:
+            self._results = self._run()
+        return next(self._results)
+
+    def close(self):
+        self._results = iter(())
+
+
+class MemoryCollection:
+    """Coleção em memória, com a API do pymongo descrita no módulo."""
+
+    def __init__(self, database, name):
+        self.database = database
+        self.name = name
+        self.full_name = f"{database.name}.{name}"
+        self._docs = {}  # {chave de _id: BSON}
+        self._indexes = None  # a coleção passa a existir na primeira escrita
+
+    # --- armazenamento ---
+
+    def _ensure(self):
+        if self._indexes is None:
+            self._indexes = {"_id_": dict(ID_INDEX)}
+
+    @staticmethod
+    def _key(doc_id):
+        return bson.encode({"_id": doc_id})
+
+    def _store(self, doc):
+        self._ensure()
+        self._docs[self._key(doc["_id"])] = bson.encode(doc)
+
+    def _documents(self):
+        return [bson.decode(raw) for raw in list(self._docs.values())]
+
+    def _matching(self, query, limit=0):
+        if set(query or {}) == {"_id"} and not isinstance(query["_id"], dict):
+            raw = self._docs.get(self._key(query["_id"]))
+            return [bson.decode(raw)] if raw else []
+        found = []
+        for doc in self._documents():
+            if matches(doc, query):
+                found.append(doc)
+                if limit and len(found) == limit:
+                    break
+        return found
+
+    # --- escrita ---
+
+    def _insert(self, doc):
+        doc = dict(doc)
+        doc.setdefault("_id", bson.ObjectId())
+        if self._key(doc["_id"]) in self._docs:
+            raise DuplicateKeyError(
+                f"E11000 duplicate key error collection: {self.full_name} "
+                f"index: _id_ dup key: {{ _id: {doc['_id']!r} }}",
+                11000,
+            )
+        self._store(doc)
+        return doc["_id"]
+
+    def _update(self, query, update, upsert, multi, replace=False):
+        """Retorna (encontrados, modificados, _id inserido ou None)."""
+        docs = self._matching(query, limit=0 if multi else 1)
+        modified = 0
+        for doc in docs:
+            if replace:
+                new = {**update, "_id": doc["_id"]}
+            else:
+                new = apply_update(bson.decode(bson.encode(doc)), update)
+            if new != doc:
+                self._store(new)
+                modified += 1
+        if docs or not upsert:
+            return len(docs), modified, None
+        seed = _upsert_seed(query)
+        if replace:
+            new = {**update}
+            if "_id" in seed:
+                new.setdefault("_id", seed["_id"])
+        else:
+            new = apply_update(seed, update, inserting=True)
+        return 0, 0, self._insert(new)
+
+    def _delete(self, query, multi):
+        docs = self._matching(query, limit=0 if multi else 1)
+        for doc in docs:
+            del self._docs[self._key(doc["_id"])]
+        return len(docs)
+
+    def insert_one(self, document):
+        return InsertOneResult(self._insert(document), True)
+
+    def insert_many(self, documents, ordered=True):
+        ids, errors = [], []
+        for index, doc in enumerate(documents):
+            try:
+                ids.append(self._insert(doc))
+            except DuplicateKeyError as e:
+                errors.append({"index": index, "code": 11000, "errmsg": str(e)})
+                if ordered:
+                    break
+        if errors:
+            raise BulkWriteError(
+                {"writeErrors": errors, "nInserted": len(ids), "upserted": []}
+            )
+        return InsertManyResult(ids, True)
+
+    def update_one(self, filter, update, upsert=False):
+        return self._update_result(self._update(filter, update, upsert, multi=False))
+
+    def update_many(self, filter, update, upsert=False):
+        return self._update_result(self._update(filter, update, upsert, multi=True))
+
+    def replace_one(self, filter, replacement, upsert=False):
+        return self._update_result(
+            self._update(filter, replacement, upsert, multi=False, replace=True)
+        )
+
+    @staticmethod
+    def _update_result(outcome):
+        matched, modified, upserted_id = outcome
+        raw = {"n": matched or int(upserted_id is not None), "nModified": modified}
+        if upserted_id is not None:
+            raw["upserted"] = upserted_id
+        return UpdateResult(raw, True)
+
+    def delete_one(self, filter):
+        return DeleteResult({"n": self._delete(filter, multi=False)}, True)
+
+    def delete_many(self, filter):
+        return DeleteResult({"n": self._delete(filter, multi=True)}, True)
+
+    def bulk_write(self, requests, ordered=True):
+        result = {
+            "nInserted": 0,
+            "nUpserted": 0,
+            "nMatched": 0,
+            "nModified": 0,
+            "nRemoved": 0,
+            "upserted": [],
+            "writeErrors": [],
+        }
+        for index, request in enumerate(requests):
+            try:
+                self._apply_request(request, index, result)
+            except DuplicateKeyError as e:
+                result["writeErrors"].append(
+                    {"index": index, "code": 11000, "errmsg": str(e)}
+                )
+                if ordered:
+                    break
+        if result["writeErrors"]:
+            raise BulkWriteError(result)
+        return BulkWriteResult(result, True)
+
+    def _apply_request(self, request, index, result):
+        if isinstance(request, InsertOne):
+            self._insert(request._doc)
+            result["nInserted"] += 1
+            return
+        if isinstance(request, (DeleteOne, DeleteMany)):
+            multi = isinstance(request, DeleteMany)
+            result["nRemoved"] += self._delete(request._filter, multi)
+            return
+        if isinstance(request, (UpdateOne, UpdateMany, ReplaceOne)):
+            matched, modified, upserted_id = self._update(
+                request._filter,
+                request._doc,
+                request._upsert,
+                multi=isinstance(request, UpdateMany),
+                replace=isinstance(request, ReplaceOne),
+            )
+            result["nMatched"] += matched
+            result["nModified"] += modified
+            if upserted_id is not None:
+                result["nUpserted"] += 1
+                result["upserted"].append({"index": index, "_id": upserted_id})
+            return
+        raise NotImplementedError(f"Operação não suportada: {type(request).__name__}")
+
+    def drop(self):
+        self._docs.clear()
+        self._indexes = None
+
+    # --- leitura ---
+
+    def find(self, filter=None, projection=None, sort=None, skip=0, limit=0):
+        cursor = MemoryCursor(self, filter, projection).skip(skip).limit(limit)
+        return cursor.sort(sort) if sort else cursor
+
+    def find_one(self, filter=None, projection=None, sort=None):
+        if filter is not None and not isinstance(filter, dict):
+            filter = {"_id": filter}
+        return next(iter(self.find(filter, projection, sort=sort, limit=1)), None)
+
+    def count_documents(self, filter):
+        if not filter:
+            return len(self._docs)
+        return len(self._matching(filter))
+
+    def estimated_document_count(self):
+        return len(self._docs)
+
+    def distinct(self, key, filter=None):
+        values = []
+        for doc in self._matching(filter):
+            for value in _candidates(get_path(doc, key)):
+                if not isinstance(value, list) and value not in values:
+                    values.append(value)
+        return values
+
+    def aggregate(self, pipeline, **kwargs):
+        try:
+            from mongomock import aggregate
+        except ImportError:
+            raise NotImplementedError(
+                "A agregação em memória requer o pacote 'mongomock'."
+            ) from None
+        return aggregate.process_pipeline(
+            self._documents(), self.database, pipeline, None
+        )
+
+    # --- índices ---
+
+    def create_index(self, keys, **kwargs):
+        spec = _sort_spec(keys, 1)
+        name = kwargs.pop("name", None) or "_".join(f"{k}_{d}" for k, d in spec)
+        self._ensure()
+        self._indexes[name] = {"v": 2, "key": dict(spec), "name": name, **kwargs}
+        return name
+
+    def list_indexes(self):
+        return iter([dict(index) for index in (self._indexes or {}).values()])
+
+    def index_information(self):
+        return {
+            name: {"key": list(index["key"].items())}
+            for name, index in (self._indexes or {}).items()
+        }
+
+
+class MemoryDatabase:
+    """Banco em memória: coleções criadas sob demanda, como no pymongo."""
+
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+        self._collections = {}
+
+    def __getitem__(self, name):
+        if name not in self._collections:
+            self._collections[name] = MemoryCollection(self, name)
+        return self._collections[name]
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def get_collection(self, name):
+        return self[name]
+
+    def list_collection_names(self):
+        return [
+            name
+            for name, collection in self._collections.items()
+            if collection._indexes is not None
+        ]
+
+    def drop_collection(self, name):
+        self[name].drop()
+
+    def command(self, command, *args, **kwargs):
+        if command == "ping":
+            return {"ok": 1.0}
+        if command == "hello":
+            return {"isWritablePrimary": True, "localTime": now(), "ok": 1.0}
+        raise NotImplementedError(f"Comando não suportado: {command}")
+
+
+class MemoryClient:
+    """Cliente em memória, no lugar do MongoClient."""
+
+    def __init__(self, *args, **kwargs):
+        self._databases = {}
+
+    def __getitem__(self, name):
+        if name not in self._databases:
+            self._databases[name] = MemoryDatabase(self, name)
+        return self._databases[name]
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def get_database(self, name):
+        return self[name]
+
+    def list_database_names(self):
+        return [
+            name for name, db in self._databases.items() if db.list_collection_names()
+        ]
+
+    def drop_database(self, name):
+        self._databases.pop(name, None)
+
+    def close(self):
+        pass
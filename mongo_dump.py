@@ -0,0 +1,546 @@
+"""Exportação e importação lógica do MongoDB em Python puro.
+
+Alternativa ao ``mongodump``/``mongorestore`` que não depende do binário
+nem do Docker: basta o pymongo e acesso ao banco (``MONGO_URI``).
+
+Cada coleção é lida com um cursor em lotes, ordenado por ``_id``, e gravada
+em arquivos de chunk comprimidos (gzip, ou zstd se o pacote ``zstandard``
+estiver instalado), em BSON (o mesmo formato do ``mongodump``) ou NDJSON
+(Extended JSON canônico, legível e sem perda de tipos). As coleções são
+exportadas em paralelo e as definições de índices são gravadas junto dos
+dados. Estrutura gerada::
+
+    <destino>/manifest.json
+    <destino>/<coleção>/indexes.json
+    <destino>/<coleção>/progress.json
+    <destino>/<coleção>/000000.bson.gz
+    <destino>/<coleção>/000001.bson.gz
+    ...
+
+``progress.json`` guarda o último ``_id`` de cada chunk concluído; com
+``--resume`` a exportação continua a partir dele. O manifesto registra o
+tamanho e o SHA-256 de cada chunk, conferidos antes da importação, que
+também é paralela e idempotente (upsert por ``_id``).
+
+Dumps incrementais (``--since <dump anterior>``) exportam só os documentos
+com ``updated_at`` posterior à marca d'água do dump anterior, mais os
+tombstones das remoções (``<coleção>/tombstones.json``). O manifesto aponta
+para o dump pai, formando uma cadeia; importar um delta restaura o dump
+completo da base e reaplica os deltas em ordem. A marca d'água é a hora do
+servidor no início da exportação menos ``DUMP_WATERMARK_MARGIN`` segundos,
+para não perder lotes carimbados antes do início mas confirmados depois; os
+deltas podem repetir alguns documentos, o que a importação tolera.
+Tombstones anteriores ao dump mais antigo mantido podem ser descartados com
+``prune-tombstones``.
+
+Uso:
+    python mongo_dump.py export dumps/mongodb/logico [--format ndjson] [--resume]
+    python mongo_dump.py export dumps/mongodb/delta1 --since dumps/mongodb/logico
+    python mongo_dump.py import dumps/mongodb/logico [--drop]
+    python mongo_dump.py prune-tombstones dumps/mongodb/logico
+"""
+
+import argparse
+import gzip
+import hashlib
+import io
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import bson
+from bson import json_util
+from pymongo import ReplaceOne
+
+from sync import TOMBSTONES, UPDATED_AT_FIELD
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+FORMATS = ("bson", "ndjson")
+COMPRESSIONS = ("gzip", "zstd", "none")
+CURSOR_BATCH_SIZE = 1000
+CHUNK_DOCUMENTS = 10000  # documentos por arquivo de chunk
+IMPORT_BATCH_SIZE = 1000
+MAX_WORKERS = 4
+# Recuo da marca d'água: cobre escritas carimbadas ($$NOW) antes do início da
+# exportação mas confirmadas depois dele
+WATERMARK_MARGIN = timedelta(seconds=int(os.getenv("DUMP_WATERMARK_MARGIN", "300")))
+
+JSON_OPTIONS = json_util.CANONICAL_JSON_OPTIONS
+SUFFIXES = {"gzip": ".gz", "zstd": ".zst", "none": ""}
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def open_chunk(path, mode, compression):
+    """Abre um arquivo de chunk comprimido em modo binário ("rb" ou "wb").
+
+    ``none`` grava sem compressão, para dumps que vão para o repositório
+    deduplicado (dump_store.py), que comprime por chunk.
+    """
+    if compression == "none":
+        return open(path, mode)
+    if compression == "gzip":
+        return gzip.open(path, mode)
+    if compression == "zstd":
+        if zstandard is None:
+            raise ValueError("Compressão zstd requer o pacote 'zstandard'.")
+        return zstandard.open(path, mode)
+    raise ValueError(f"Compressão desconhecida: {compression}")
+
+
+def file_checksum(path):
+    """Tamanho e SHA-256 de um arquivo como está em disco (já comprimido)."""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        while block := f.read(HASH_BLOCK_SIZE):
+            digest.update(block)
+            size += len(block)
+    return {"bytes": size, "sha256": digest.hexdigest()}
+
+
+def verify_chunks(directory, checksums):
+    """Confere os chunks com os checksums do manifesto antes de importá-los.
+
+    Levanta ValueError no primeiro chunk truncado ou alterado. Dumps gravados
+    antes dos checksums (``checksums`` None) não são conferidos.
+    """
+    for name, expected in (checksums or {}).items():
+        actual = file_checksum(Path(directory) / name)
+        if actual != expected:
+            raise ValueError(
+                f"Chunk corrompido: {Path(directory) / name} tem {actual['bytes']} "
+                f"bytes (sha256 {actual['sha256'][:12]}), o manifesto registra "
+                f"{expected['bytes']} (sha256 {expected['sha256'][:12]})"
+            )
+
+
+def chunk_name(number, fmt, compression):
+    return f"{number:06d}.{fmt}{SUFFIXES[compression]}"
+
+
+def write_documents(f, documents, fmt):
+    """Grava os documentos no chunk aberto, no formato escolhido."""
+    for doc in documents:
+        if fmt == "bson":
+            f.write(bson.encode(doc))
+        else:
+            line = json_util.dumps(doc, json_options=JSON_OPTIONS) + "\n"
+            f.write(line.encode("utf-8"))
+
+
+def read_documents(f, fmt):
+    """Lê os documentos de um chunk aberto."""
+    if fmt == "bson":
+        yield from bson.decode_file_iter(f)
+    else:
+        # O leitor zstd não itera por linhas; o buffer cobre os dois casos
+        for line in io.BufferedReader(f):
+            if line.strip():
+                yield json_util.loads(line, json_options=JSON_OPTIONS)
+
+
+def _write_json(path, data):
+    """Grava JSON de forma atômica (arquivo temporário e rename)."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(json_util.dumps(data, json_options=JSON_OPTIONS, indent=2))
+    os.replace(tmp_path, path)
+
+
+def _read_json(path):
+    with open(path, encoding="utf-8") as f:
+        return json_util.loads(f.read(), json_options=JSON_OPTIONS)
+
+
+def index_definitions(collection):
+    """Retorna as definições dos índices da coleção, exceto o de _id."""
+    definitions = []
+    for index in collection.list_indexes():
+        index = dict(index)
+        if index["name"] == "_id_":
+            continue
+        index.pop("v", None)
+        index.pop("ns", None)
+        index["key"] = list(index["key"].items())
+        definitions.append(index)
+    return definitions
+
+
+def server_time(db):
+    """Hora atual do servidor (UTC), o mesmo relógio do $$NOW dos loaders."""
+    return db.command("hello")["localTime"]
+
+
+def export_tombstones(db, name, directory, since):
+    """Grava as remoções da coleção posteriores a since em tombstones.json.
+
+    ``reset`` indica que a coleção inteira foi apagada (carga completa) e
+    deve ser substituída na restauração; ``deleted`` lista os _id removidos.
+    """
+    reset = False
+    deleted = []
+    query = {"collection": name, "deleted_at": {"$gt": since}}
+    for tombstone in db[TOMBSTONES].find(query).sort("deleted_at", 1):
+        if tombstone["document_id"] is None:
+            reset = True
+            deleted = []
+        else:
+            deleted.append(tombstone["document_id"])
+    _write_json(directory / "tombstones.json", {"reset": reset, "deleted": deleted})
+
+
+def export_collection(
+    db, name, directory, fmt="bson", compression="gzip", resume=False, since=None
+):
+    """Exporta uma coleção em chunks ordenados por _id.
+
+    Com resume=True continua a partir do último chunk concluído registrado em
+    progress.json. Com since (dump incremental) só exporta os documentos com
+    updated_at posterior, mais os tombstones das remoções. Retorna o
+    progresso final da coleção.
+    """
+    collection = db[name]
+    directory = Path(directory) / name
+    directory.mkdir(parents=True, exist_ok=True)
+    progress_path = directory / "progress.json"
+
+    if resume and progress_path.exists():
+        progress = _read_json(progress_path)
+        if progress["format"] != fmt or progress["compression"] != compression:
+            raise ValueError(
+                f"{name}: exportação anterior usa {progress['format']}/"
+                f"{progress['compression']}"
+            )
+        if progress["done"]:
+            return progress
+    else:
+        progress = {
+            "format": fmt,
+            "compression": compression,
+            # Início da primeira tentativa: vira a marca d'água do dump
+            "started_at": server_time(db),
+            "chunks": [],
+            "documents": 0,
+            "last_id": None,
+            "done": False,
+        }
+
+    _write_json(directory / "indexes.json", index_definitions(collection))
+    if since is not None:
+        export_tombstones(db, name, directory, since)
+
+    query = {}
+    if since is not None:
+        query[UPDATED_AT_FIELD] = {"$gt": since}
+    if progress["last_id"] is not None:
+        query["_id"] = {"$gt": progress["last_id"]}
+    cursor = collection.find(query).sort("_id", 1).batch_size(CURSOR_BATCH_SIZE)
+
+    buffer = []
+
+    def flush():
+        number = len(progress["chunks"])
+        filename = chunk_name(number, fmt, compression)
+        with open_chunk(directory / filename, "wb", compression) as f:
+            write_documents(f, buffer, fmt)
+        progress["chunks"].append(
+            {
+                "file": filename,
+                "documents": len(buffer),
+                "last_id": buffer[-1]["_id"],
+                **file_checksum(directory / filename),
+            }
+        )
+        progress["documents"] += len(buffer)
+        progress["last_id"] = buffer[-1]["_id"]
+        # O progresso só avança depois que o chunk foi gravado por completo
+        _write_json(progress_path, progress)
+        buffer.clear()
+
+    try:
+        for doc in cursor:
+            buffer.append(doc)
+            if len(buffer) == CHUNK_DOCUMENTS:
+                flush()
+        if buffer:
+            flush()
+    finally:
+        cursor.close()
+
+    progress["done"] = True
+    _write_json(progress_path, progress)
+    return progress
+
+
+def export_database(
+    db,
+    directory,
+    fmt="bson",
+    compression="gzip",
+    resume=False,
+    collections=None,
+    max_workers=MAX_WORKERS,
+    since_dump=None,
+):
+    """Exporta as coleções do banco em paralelo e grava o manifesto.
+
+    Com since_dump (diretório do dump anterior da cadeia) o dump é
+    incremental: contém só o que mudou desde a marca d'água daquele dump, e o
+    manifesto aponta para ele como pai.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    start = time.perf_counter()
+
+    since = parent = None
+    names = set(collections or db.list_collection_names())
+    if since_dump is not None:
+        since_dump = Path(since_dump)
+        since = _read_json(since_dump / "manifest.json")["watermark"]
+        parent = os.path.relpath(since_dump, directory)
+        if not collections:
+            # Coleções apagadas desde o dump anterior também entram no delta
+            names.update(
+                db[TOMBSTONES].distinct("collection", {"deleted_at": {"$gt": since}})
+            )
+    names.discard(TOMBSTONES)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            name: executor.submit(
+                export_collection, db, name, directory, fmt, compression, resume, since
+            )
+            for name in sorted(names)
+        }
+        results = {name: future.result() for name, future in futures.items()}
+
+    manifest = {
+        "database": db.name,
+        "kind": "full" if since is None else "incremental",
+        "parent": parent,
+        "since": since,
+        # O próximo delta exporta tudo o que foi carimbado depois do início
+        # desta exportação, com uma margem para escritas ainda em andamento
+        "watermark": min(
+            (progress["started_at"] for progress in results.values()),
+            default=server_time(db),
+        )
+        - WATERMARK_MARGIN,
+        "format": fmt,
+        "compression": compression,
+        "exported_at": datetime.now().isoformat(timespec="seconds"),
+        "seconds": round(time.perf_counter() - start, 3),
+        "collections": {
+            name: {
+                "documents": progress["documents"],
+                "chunks": [chunk["file"] for chunk in progress["chunks"]],
+                "checksums": {
+                    chunk["file"]: {"bytes": chunk["bytes"], "sha256": chunk["sha256"]}
+                    for chunk in progress["chunks"]
+                    if "sha256" in chunk
+                },
+            }
+            for name, progress in results.items()
+        },
+    }
+    _write_json(directory / "manifest.json", manifest)
+    return manifest
+
+
+def import_collection(
+    db, name, directory, fmt, compression, drop=False, checksums=None
+):
+    """Importa os chunks de uma coleção e recria seus índices.
+
+    Os chunks são conferidos com ``checksums`` (do manifesto) antes de
+    qualquer escrita. Com drop=True a coleção é recriada e os documentos são inseridos
+    diretamente; sem ela a escrita usa upsert por _id, então importar sobre
+    dados existentes (ou reimportar o mesmo dump) é seguro. Em um dump
+    incremental os tombstones são aplicados antes dos documentos.
+    Retorna o número de documentos lidos.
+    """
+    collection = db[name]
+    directory = Path(directory) / name
+    verify_chunks(directory, checksums)
+
+    tombstones_path = directory / "tombstones.json"
+    if tombstones_path.exists():
+        tombstones = _read_json(tombstones_path)
+        drop = drop or tombstones["reset"]
+        if tombstones["deleted"] and not drop:
+            collection.delete_many({"_id": {"$in": tombstones["deleted"]}})
+
+    if drop:
+        collection.drop()
+
+    def write(batch):
+        if drop:
+            collection.insert_many(batch, ordered=False)
+        else:
+            requests = [ReplaceOne({"_id": d["_id"]}, d, upsert=True) for d in batch]
+            collection.bulk_write(requests, ordered=False)
+
+    progress = _read_json(directory / "progress.json")
+    total = 0
+    for chunk in progress["chunks"]:
+        with open_chunk(directory / chunk["file"], "rb", compression) as f:
+            batch = []
+            for doc in read_documents(f, fmt):
+                batch.append(doc)
+                if len(batch) == IMPORT_BATCH_SIZE:
+                    write(batch)
+                    total += len(batch)
+                    batch = []
+            if batch:
+                write(batch)
+                total += len(batch)
+
+    for index in _read_json(directory / "indexes.json"):
+        keys = [tuple(key) for key in index.pop("key")]
+        collection.create_index(keys, **index)
+    return total
+
+
+def dump_chain(directory):
+    """Retorna a cadeia de dumps até o completo: [base, delta1, ..., directory]."""
+    chain = [Path(directory)]
+    manifest = _read_json(chain[0] / "manifest.json")
+    while manifest.get("kind") == "incremental":
+        parent = (chain[0] / manifest["parent"]).resolve()
+        chain.insert(0, parent)
+        manifest = _read_json(parent / "manifest.json")
+    return chain
+
+
+def import_database(db, directory, drop=False, max_workers=MAX_WORKERS):
+    """Importa um dump lógico em paralelo; retorna documentos por coleção.
+
+    Se o dump for incremental, restaura o dump completo da base da cadeia e
+    reaplica os deltas em ordem. ``drop`` vale para o dump completo.
+    """
+    counts = {}
+    for position, dump_dir in enumerate(dump_chain(directory)):
+        manifest = _read_json(dump_dir / "manifest.json")
+        fmt, compression = manifest["format"], manifest["compression"]
+        drop_base = drop and position == 0
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                name: executor.submit(
+                    import_collection,
+                    db,
+                    name,
+                    dump_dir,
+                    fmt,
+                    compression,
+                    drop_base,
+                    summary.get("checksums"),
+                )
+                for name, summary in manifest["collections"].items()
+            }
+            for name, future in futures.items():
+                counts[name] = counts.get(name, 0) + future.result()
+    return counts
+
+
+def prune_tombstones(db, oldest_dump):
+    """Remove os tombstones anteriores à marca d'água do dump mais antigo mantido.
+
+    Nenhuma cadeia que ainda pode ser restaurada começa antes dele, então
+    esses tombstones não entram em nenhum delta futuro. Retorna quantos
+    foram removidos.
+    """
+    cutoff = _read_json(Path(oldest_dump) / "manifest.json")["watermark"]
+    return db[TOMBSTONES].delete_many({"deleted_at": {"$lt": cutoff}}).deleted_count
+
+
+def parse_args(argv=None):
+    """Lê as opções de linha de comando."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="exporta o banco para um diretório")
+    export.add_argument("directory", type=Path)
+    export.add_argument("--format", choices=FORMATS, default="bson")
+    export.add_argument("--compression", choices=COMPRESSIONS, default="gzip")
+    export.add_argument(
+        "--resume",
+        action="store_true",
+        help="continua uma exportação interrompida a partir do último _id",
+    )
+    export.add_argument("--collection", action="append", dest="collections")
+    export.add_argument(
+        "--since",
+        type=Path,
+        dest="since_dump",
+        help="dump anterior da cadeia; exporta só o que mudou desde ele",
+    )
+
+    restore = commands.add_parser(
+        "import", help="importa um dump lógico (com a cadeia de deltas, se houver)"
+    )
+    restore.add_argument("directory", type=Path)
+    restore.add_argument(
+        "--drop", action="store_true", help="apaga as coleções antes de importar"
+    )
+    prune = commands.add_parser(
+        "prune-tombstones",
+        help="remove tombstones anteriores ao dump mais antigo mantido",
+    )
+    prune.add_argument("oldest_dump", type=Path)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Executa a exportação ou a importação no banco configurado."""
+    from pymongo import MongoClient
+
+    from load_mongodb_data import MONGO_DB, MONGO_URI
+
+    args = parse_args(argv)
+    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
+    try:
+        db = client[MONGO_DB]
+        if args.command == "export":
+            manifest = export_database(
+                db,
+                args.directory,
+                args.format,
+                args.compression,
+                args.resume,
+                args.collections,
+                since_dump=args.since_dump,
+            )
+            documents = sum(c["documents"] for c in manifest["collections"].values())
+            print(
+                f"Exportados {documents} documentos de "
+                f"{len(manifest['collections'])} coleções para {args.directory} "
+                f"em {manifest['seconds']}s (dump {manifest['kind']})"
+            )
+        elif args.command == "prune-tombstones":
+            removed = prune_tombstones(db, args.oldest_dump)
+            print(f"Removidos {removed} tombstones anteriores a {args.oldest_dump}")
+        else:
+            counts = import_database(db, args.directory, drop=args.drop)
+            print(
+                f"Importados {sum(counts.values())} documentos de "
+                f"{len(counts)} coleções de {args.directory}"
+            )
+        return True
+    except Exception as e:
+        print(f"Erro: {e}")
+        return False
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
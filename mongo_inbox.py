@@ -0,0 +1,254 @@
+"""
+Caixa de entrada das mensagens no MongoDB.
+
+``messages`` é uma coleção plana (``de_id``/``de_tipo``/``para_id``/
+``para_tipo``, ``lida``); listar as conversas de alguém a partir dela exige
+agrupar todas as mensagens e resolver os nomes com ``$lookup``. A coleção
+``inbox`` guarda um documento por par nutricionista–paciente, com _id
+``"<nutricionista>:<paciente>"``::
+
+    {
+        "_id": "1:1",
+        "nutricionista": {"id": 1, "nome": "Ana Silva"},
+        "paciente": {"id": 1, "nome": "João Pereira"},
+        "mensagens": 5,
+        "nao_lidas": {"nutricionista": 0, "paciente": 0},
+        "ultima": {"_id": 5, "de_tipo": "paciente", "previa": "...",
+                   "data": datetime(...), "hora": "09:15"},
+    }
+
+O loader monta a coleção em lote a partir das mensagens canônicas
+(``inbox_documents``). Depois da carga, ``send_message`` e ``mark_read``
+gravam a mensagem e mantêm o resumo com ``$inc``/``$set`` num único
+``update_one`` por par, atômico no documento; ``list_inbox`` é uma leitura
+pelo índice (participante, data e hora da última mensagem).
+
+A mensagem e o resumo são duas escritas: se o processo cair entre elas, o
+resumo fica atrás das mensagens até ``rebuild_inbox`` (ou a próxima carga).
+"""
+
+from pymongo import DESCENDING, UpdateOne
+
+from sync import UPDATED_AT_FIELD
+
+INBOX = "inbox"
+SIDES = ("nutricionista", "paciente")
+PREVIEW_CHARS = 80
+
+# Coleção com os nomes de cada lado
+PARTICIPANT_COLLECTIONS = {"nutricionista": "nutritionists", "paciente": "patients"}
+
+
+def inbox_id(nutritionist_id, patient_id):
+    """_id do resumo de um par nutricionista–paciente"""
+    return f"{nutritionist_id}:{patient_id}"
+
+
+def other_side(side):
+    """O outro lado da conversa: "paciente" para "nutricionista" e vice-versa"""
+    if side not in SIDES:
+        raise ValueError(f"Participante inválido: {side}")
+    return SIDES[1 - SIDES.index(side)]
+
+
+def pair_of(message):
+    """(id do nutricionista, id do paciente) de uma mensagem"""
+    ids = {
+        message["de_tipo"]: message["de_id"],
+        message["para_tipo"]: message["para_id"],
+    }
+    return ids["nutricionista"], ids["paciente"]
+
+
+def preview(message):
+    """Resumo da mensagem guardado como a última da conversa"""
+    return {
+        "_id": message["_id"],
+        "de_tipo": message["de_tipo"],
+        "previa": message["conteudo"][:PREVIEW_CHARS],
+        "data": message["data"],
+        "hora": message["hora"],
+    }
+
+
+def _sent_order(message):
+    return message["data"], message["hora"], message["_id"]
+
+
+def inbox_documents(messages, nutritionists, patients):
+    """Documentos de ``inbox`` para as mensagens dadas, em ordem de _id.
+
+    ``nutritionists`` e ``patients`` são os documentos (com _id e nome) dos
+    participantes.
+    """
+    names = {
+        "nutricionista": {doc["_id"]: doc["nome"] for doc in nutritionists},
+        "paciente": {doc["_id"]: doc["nome"] for doc in patients},
+    }
+    documents = {}
+    for message in sorted(messages, key=_sent_order):
+        nutritionist_id, patient_id = pair_of(message)
+        key = inbox_id(nutritionist_id, patient_id)
+        if key not in documents:
+            documents[key] = {
+                "_id": key,
+                "nutricionista": {
+                    "id": nutritionist_id,
+                    "nome": names["nutricionista"].get(nutritionist_id),
+                },
+                "paciente": {
+                    "id": patient_id,
+                    "nome": names["paciente"].get(patient_id),
+                },
+                "mensagens": 0,
+                "nao_lidas": {side: 0 for side in SIDES},
+            }
+        document = documents[key]
+        document["mensagens"] += 1
+        if not message.get("lida"):
+            document["nao_lidas"][message["para_tipo"]] += 1
+        document["ultima"] = preview(message)
+    return [documents[key] for key in sorted(documents)]
+
+
+def create_inbox_indexes(db):
+    """Índices da listagem: por participante, da conversa mais recente à mais antiga"""
+    for side in SIDES:
+        db[INBOX].create_index(
+            [
+                (f"{side}.id", 1),
+                ("ultima.data", DESCENDING),
+                ("ultima.hora", DESCENDING),
+            ]
+        )
+
+
+def rebuild_inbox(db):
+    """Refaz ``inbox`` a partir de ``messages``, em lote; retorna os resumos gravados."""
+    documents = inbox_documents(
+        db.messages.find(),
+        db[PARTICIPANT_COLLECTIONS["nutricionista"]].find({}, {"nome": 1}),
+        db[PARTICIPANT_COLLECTIONS["paciente"]].find({}, {"nome": 1}),
+    )
+    requests = [
+        UpdateOne(
+            {"_id": doc["_id"]},
+            [
+                {"$replaceWith": {"$literal": doc}},
+                {"$set": {UPDATED_AT_FIELD: "$$NOW"}},
+            ],
+            upsert=True,
+        )
+        for doc in documents
+    ]
+    db[INBOX].delete_many({"_id": {"$nin": [doc["_id"] for doc in documents]}})
+    if requests:
+        db[INBOX].bulk_write(requests, ordered=False)
+    return len(documents)
+
+
+def send_message(db, message):
+    """Grava a mensagem e atualiza o resumo do par com $inc/$set.
+
+    ``message`` tem os campos de ``messages`` (_id, de_id, de_tipo, para_id,
+    para_tipo, conteudo, data, hora, lida); os nomes em ``de``/``para`` vêm
+    do resumo do par. O resumo é criado na primeira mensagem do par, com os
+    nomes lidos dos participantes. Retorna False, sem alterar nada, se a
+    mensagem já estava gravada.
+    """
+    if message["para_tipo"] != other_side(message["de_tipo"]):
+        raise ValueError(
+            f"Mensagem entre {message['de_tipo']} e {message['para_tipo']}"
+        )
+    nutritionist_id, patient_id = pair_of(message)
+    key = {"_id": inbox_id(nutritionist_id, patient_id)}
+    update = {
+        "$inc": {
+            "mensagens": 1,
+            f"nao_lidas.{message['para_tipo']}": 0 if message.get("lida") else 1,
+        },
+        "$set": {"ultima": preview(message)},
+        "$currentDate": {UPDATED_AT_FIELD: True},
+    }
+    summary = db[INBOX].find_one(key, {side: 1 for side in SIDES})
+    if summary is None:
+        # Primeira mensagem do par: os nomes são lidos antes de qualquer
+        # escrita; se outro processo criar o resumo antes, $setOnInsert não
+        # faz nada e o $inc vale do mesmo jeito
+        ids = {"nutricionista": nutritionist_id, "paciente": patient_id}
+        participants = {
+            side: {"id": ids[side], "nome": _name(db, side, ids[side])}
+            for side in SIDES
+        }
+        update["$setOnInsert"] = {
+            **participants,
+            f"nao_lidas.{message['de_tipo']}": 0,
+        }
+    else:
+        participants = {side: summary[side] for side in SIDES}
+    # Referências estendidas da mensagem (ver extended_references.py)
+    message = {
+        **message,
+        "de": participants[message["de_tipo"]],
+        "para": participants[message["para_tipo"]],
+    }
+
+    # $setOnInsert: reenviar uma mensagem já gravada (mesmo _id) não a altera
+    # nem conta de novo no resumo
+    result = db.messages.update_one(
+        {"_id": message["_id"]},
+        {"$setOnInsert": message, "$currentDate": {UPDATED_AT_FIELD: True}},
+        upsert=True,
+    )
+    if result.upserted_id is None:
+        return False
+    db[INBOX].update_one(key, update, upsert=summary is None)
+    return True
+
+
+def mark_read(db, nutritionist_id, patient_id, reader):
+    """Marca como lidas as mensagens recebidas por ``reader`` ("nutricionista" ou
+    "paciente") do par e desconta-as do contador; retorna quantas marcou."""
+    sender = other_side(reader)
+    ids = {"nutricionista": nutritionist_id, "paciente": patient_id}
+    result = db.messages.update_many(
+        {
+            "de_tipo": sender,
+            "de_id": ids[sender],
+            "para_tipo": reader,
+            "para_id": ids[reader],
+            "lida": False,
+        },
+        {"$set": {"lida": True}, "$currentDate": {UPDATED_AT_FIELD: True}},
+    )
+    if result.modified_count:
+        # Desconta só as marcadas aqui: uma mensagem enviada entre as duas
+        # escritas continua não lida e contada
+        db[INBOX].update_one(
+            {"_id": inbox_id(nutritionist_id, patient_id)},
+            {
+                "$inc": {f"nao_lidas.{reader}": -result.modified_count},
+                "$currentDate": {UPDATED_AT_FIELD: True},
+            },
+        )
+    return result.modified_count
+
+
+def list_inbox(db, side, participant_id, limit=0):
+    """Conversas do participante, da última mensagem mais recente à mais antiga"""
+    other_side(side)
+    return list(
+        db[INBOX]
+        .find({f"{side}.id": participant_id})
+        .sort([("ultima.data", DESCENDING), ("ultima.hora", DESCENDING)])
+        .limit(limit)
+    )
+
+
+def _name(db, side, participant_id):
+    document = db[PARTICIPANT_COLLECTIONS[side]].find_one(
+        {"_id": participant_id}, {"nome": 1}
+    )
+    if document is None:
+        raise ValueError(f"{side} {participant_id} não encontrado")
+    return document["nome"]
@@ -0,0 +1,729 @@
+"""Exportação e importação lógica do Neo4j em Python puro, sem APOC.
+
+Alternativa ao ``neo4j-admin database dump``, que roda dentro do container e
+em algumas versões exige parar o banco. A exportação é online e só precisa
+do driver e de acesso ao banco (``NEO4J_URI``).
+
+Os nós são lidos por rótulo e os relacionamentos por tipo (um fluxo por
+trinca origem-tipo-destino), em páginas definidas por faixas de ``id``
+(paginação por chave: ``WHERE n.id > $depois ORDER BY n.id LIMIT``), nunca
+por ``SKIP``, cujo custo cresce com o deslocamento. A ordenação por ``id``
+usa o índice da restrição de unicidade criada pelo loader. Cada página é
+uma transação de leitura curta, então a memória fica limitada ao tamanho da
+página e o banco continua atendendo escritas; como no ``mongodump`` sem
+oplog, o resultado não é um instantâneo de um único ponto no tempo.
+
+Rótulos e trincas de relacionamento são exportados em paralelo, em NDJSON
+ou CSV, comprimidos com gzip ou zstd (ou sem compressão, para o repositório
+deduplicado de ``dump_store.py``). Estrutura gerada::
+
+    <destino>/manifest.json
+    <destino>/nodes/<Rótulo>/000000.ndjson.gz
+    <destino>/relationships/<Origem>-<TIPO>-<Destino>/000000.ndjson.gz
+
+No NDJSON cada linha de nó é o mapa de propriedades e cada linha de
+relacionamento é ``{"de": id, "para": id, "props": {...}}``. No CSV a
+primeira linha lista as colunas (``id`` e as propriedades, ou ``de``,
+``para`` e as propriedades) e cada célula é o valor em JSON, para que os
+tipos sobrevivam à ida e volta. Tipos temporais do Neo4j são gravados como
+``{"$neo4j": tipo, ...}``.
+
+O manifesto registra o tamanho e o SHA-256 de cada chunk. A importação os
+confere antes de ler cada fluxo, recria as restrições de unicidade de
+``id``, carrega os nós de todos os rótulos em paralelo e depois os
+relacionamentos, com ``MERGE``, de modo que reimportar o mesmo dump é seguro.
+
+Dumps incrementais (``--since <dump anterior>``) seguem os do
+``mongo_dump.py``: exportam só os nós e relacionamentos com ``updated_at``
+posterior à marca d'água do dump anterior, mais os nós ``_Tombstone`` das
+remoções (``tombstones.json``), e o manifesto aponta para o dump pai.
+Importar um delta restaura a base da cadeia e reaplica os deltas em ordem,
+cada um com os tombstones antes dos dados. A marca d'água é a hora do
+servidor no início da exportação menos ``DUMP_WATERMARK_MARGIN`` segundos.
+
+Uso:
+    python neo4j_dump.py export dumps/neo4j/logico [--format csv] [--compression zstd]
+    python neo4j_dump.py export dumps/neo4j/delta1 --since dumps/neo4j/logico
+    python neo4j_dump.py import dumps/neo4j/logico [--drop]
+    python neo4j_dump.py prune-tombstones dumps/neo4j/logico
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from neo4j.time import Date, DateTime, Duration, Time
+
+from checkpoint import iter_batches
+from mongo_dump import SUFFIXES, WATERMARK_MARGIN, dump_chain, file_checksum, open_chunk, verify_chunks
+from sync import GRAPH_TOMBSTONE, UPDATED_AT_FIELD
+
+FORMATS = ("ndjson", "csv")
+COMPRESSIONS = ("gzip", "zstd", "none")
+PAGE_SIZE = int(os.getenv("NEO4J_EXPORT_PAGE_SIZE", "5000"))
+CHUNK_ROWS = 100000  # linhas por arquivo de chunk
+IMPORT_BATCH_SIZE = 1000
+MAX_WORKERS = 4
+
+TEMPORAL_TYPES = {"Date": Date, "DateTime": DateTime, "Time": Time}
+
+
+def quote(name):
+    """Escapa um rótulo ou tipo de relacionamento para uso em Cypher."""
+    return "`" + name.replace("`", "``") + "`"
+
+
+def encode_value(value):
+    """Converte recursivamente os tipos do driver que o JSON não representa.
+
+    Duration é uma tupla e seria gravada como lista pelo json, por isso a
+    conversão é feita antes da serialização e não no ``default``.
+    """
+    if isinstance(value, dict):
+        return {key: encode_value(item) for key, item in value.items()}
+    if isinstance(value, Duration):
+        return {
+            "$neo4j": "Duration",
+            "months": value.months,
+            "days": value.days,
+            "seconds": value.seconds,
+            "nanoseconds": value.nanoseconds,
+        }
+    if isinstance(value, (list, tuple)):
+        return [encode_value(item) for item in value]
+    for name, temporal_type in TEMPORAL_TYPES.items():
+        if isinstance(value, temporal_type):
+            return {"$neo4j": name, "value": value.iso_format()}
+    return value
+
+
+def decode_value(value):
+    """Reconstrói os tipos temporais gravados por encode_value (object_hook)."""
+    if isinstance(value, dict) and "$neo4j" in value:
+        kind = value["$neo4j"]
+        if kind == "Duration":
+            return Duration(
+                months=value["months"],
+                days=value["days"],
+                seconds=value["seconds"],
+                nanoseconds=value["nanoseconds"],
+            )
+        return TEMPORAL_TYPES[kind].from_iso_format(value["value"])
+    return value
+
+
+def _dumps(value):
+    return json.dumps(encode_value(value), ensure_ascii=False)
+
+
+def _loads(text):
+    return json.loads(text, object_hook=decode_value)
+
+
+def chunk_name(number, fmt, compression):
+    return f"{number:06d}.{fmt}{SUFFIXES[compression]}"
+
+
+class ChunkWriter:
+    """Grava linhas em arquivos de chunk numerados, trocando a cada CHUNK_ROWS."""
+
+    def __init__(self, directory, fmt, compression, columns=None):
+        self.directory = Path(directory)
+        self.fmt = fmt
+        self.compression = compression
+        self.columns = columns
+        self.chunks = []
+        self.checksums = {}  # {chunk: {"bytes", "sha256"}}
+        self.rows = 0
+        self._file = None
+        self._text = None
+        self._csv = None
+        self._chunk_rows = 0
+
+    def _open(self):
+        # O diretório só é criado com a primeira linha: fluxos vazios não geram nada
+        self.directory.mkdir(parents=True, exist_ok=True)
+        name = chunk_name(len(self.chunks), self.fmt, self.compression)
+        self.chunks.append(name)
+        self._file = open_chunk(self.directory / name, "wb", self.compression)
+        self._text = io.TextIOWrapper(self._file, encoding="utf-8", newline="")
+        self._chunk_rows = 0
+        if self.fmt == "csv":
+            self._csv = csv.writer(self._text)
+            self._csv.writerow(self.columns)
+
+    def write(self, row):
+        if self._file is None or self._chunk_rows == CHUNK_ROWS:
+            self.close()
+            self._open()
+        if self.fmt == "csv":
+            self._csv.writerow(
+                [
+                    "" if column not in row else _dumps(row[column])
+                    for column in self.columns
+                ]
+            )
+        else:
+            self._text.write(_dumps(row) + "\n")
+        self._chunk_rows += 1
+        self.rows += 1
+
+    def close(self):
+        if self._text is not None:
+            self._text.close()
+            name = self.chunks[-1]
+            self.checksums[name] = file_checksum(self.directory / name)
+        self._file = self._text = self._csv = None
+
+
+def read_rows(path, fmt, compression):
+    """Lê as linhas de um arquivo de chunk."""
+    with open_chunk(path, "rb", compression) as f:
+        text = io.TextIOWrapper(io.BufferedReader(f), encoding="utf-8", newline="")
+        if fmt == "csv":
+            for record in csv.DictReader(text):
+                yield {key: _loads(cell) for key, cell in record.items() if cell != ""}
+        else:
+            for line in text:
+                if line.strip():
+                    yield _loads(line)
+
+
+def iter_pages(fetch_page, page_size=PAGE_SIZE):
+    """Percorre um conjunto por páginas de chave crescente.
+
+    ``fetch_page(depois, limite)`` retorna até ``limite`` pares (chave,
+    linhas) com chave maior que ``depois`` (None na primeira página), em
+    ordem de chave.
+    """
+    after = None
+    while True:
+        page = fetch_page(after, page_size)
+        if not page:
+            return
+        yield page
+        if len(page) < page_size:
+            return
+        after = page[-1][0]
+
+
+def node_labels(session):
+    """Rótulos do banco, sem o dos tombstones (que não entram nos dumps)."""
+    return [
+        record["label"]
+        for record in session.run("CALL db.labels() YIELD label")
+        if record["label"] != GRAPH_TOMBSTONE
+    ]
+
+
+def relationship_patterns(session):
+    """Retorna as trincas (origem, tipo, destino) do esquema do banco.
+
+    O esquema vem das estatísticas do banco e pode listar combinações sem
+    relacionamentos; elas não geram arquivos nem entram no manifesto.
+    """
+    patterns = set()
+    result = session.run(
+        "CALL db.schema.visualization() YIELD relationships RETURN relationships"
+    )
+    for record in result:
+        for rel in record["relationships"]:
+            for start in rel.start_node.labels:
+                for end in rel.end_node.labels:
+                    patterns.add((start, rel.type, end))
+    return sorted(patterns)
+
+
+def property_keys(session, match, variable):
+    """Chaves de propriedade presentes no padrão (para o cabeçalho do CSV)."""
+    query = f"{match} UNWIND keys({variable}) AS key RETURN DISTINCT key ORDER BY key"
+    return [record["key"] for record in session.run(query)]
+
+
+def _read_page(session, query, after, limit, since=None):
+    def work(tx):
+        return list(tx.run(query, after=after, limit=limit, since=since))
+
+    return session.execute_read(work)
+
+
+def _keyset_filter(variable, after):
+    # A primeira página não tem limite inferior; IS NOT NULL mantém o índice
+    if after is None:
+        return f"{variable}.id IS NOT NULL"
+    return f"{variable}.id > $after"
+
+
+def _since_filter(variable, since):
+    """Condição dos dumps incrementais: carimbados depois da marca d'água."""
+    if since is None:
+        return "true"
+    return f"{variable}.{UPDATED_AT_FIELD} > datetime($since)"
+
+
+def server_time(session):
+    """Hora atual do servidor, o mesmo relógio do datetime() dos loaders."""
+    return session.run("RETURN datetime() AS now").single()["now"].to_native()
+
+
+def export_label(
+    driver, label, directory, fmt, compression, page_size=PAGE_SIZE, since=None
+):
+    """Exporta os nós de um rótulo em páginas de id; retorna o resumo.
+
+    Com since (ISO 8601) só exporta os nós com updated_at posterior.
+    """
+    match = f"MATCH (n:{quote(label)})"
+    with driver.session() as session:
+        columns = None
+        if fmt == "csv":
+            keys = property_keys(session, match, "n")
+            columns = ["id"] + [key for key in keys if key != "id"]
+        writer = ChunkWriter(
+            Path(directory) / "nodes" / label, fmt, compression, columns
+        )
+
+        def fetch(after, limit):
+            query = (
+                f"{match} WHERE {_keyset_filter('n', after)} "
+                f"AND {_since_filter('n', since)} "
+                "RETURN n.id AS key, properties(n) AS props ORDER BY n.id LIMIT $limit"
+            )
+            return [
+                (r["key"], r["props"])
+                for r in _read_page(session, query, after, limit, since)
+            ]
+
+        try:
+            for page in iter_pages(fetch, page_size):
+                for _, props in page:
+                    writer.write(props)
+        finally:
+            writer.close()
+    return {"rows": writer.rows, "chunks": writer.chunks, "checksums": writer.checksums}
+
+
+def pattern_directory(start, rel_type, end):
+    return f"{start}-{rel_type}-{end}"
+
+
+def export_relationships(
+    driver, pattern, directory, fmt, compression, page_size=PAGE_SIZE, since=None
+):
+    """Exporta os relacionamentos de uma trinca, paginando pelo id da origem.
+
+    Cada página cobre uma faixa de ids dos nós de origem e traz todos os
+    relacionamentos do tipo que saem deles (com since, só os carimbados
+    depois da marca d'água).
+    """
+    start, rel_type, end = pattern
+    match = f"MATCH (a:{quote(start)})-[r:{quote(rel_type)}]->(b:{quote(end)})"
+    with driver.session() as session:
+        columns = None
+        if fmt == "csv":
+            columns = ["de", "para"] + property_keys(session, match, "r")
+        writer = ChunkWriter(
+            Path(directory) / "relationships" / pattern_directory(*pattern),
+            fmt,
+            compression,
+            columns,
+        )
+
+        def fetch(after, limit):
+            query = (
+                f"MATCH (a:{quote(start)}) WHERE {_keyset_filter('a', after)} "
+                "WITH a ORDER BY a.id LIMIT $limit "
+                f"RETURN a.id AS key, [(a)-[r:{quote(rel_type)}]->(b:{quote(end)}) "
+                f"WHERE {_since_filter('r', since)} "
+                "| {para: b.id, props: properties(r)}] AS rels"
+            )
+            return [
+                (r["key"], r["rels"])
+                for r in _read_page(session, query, after, limit, since)
+            ]
+
+        try:
+            for page in iter_pages(fetch, page_size):
+                for source, rels in page:
+                    for rel in rels:
+                        if fmt == "csv":
+                            writer.write(
+                                {"de": source, "para": rel["para"], **rel["props"]}
+                            )
+                        else:
+                            writer.write(
+                                {
+                                    "de": source,
+                                    "para": rel["para"],
+                                    "props": rel["props"],
+                                }
+                            )
+        finally:
+            writer.close()
+    return {
+        "from": start,
+        "type": rel_type,
+        "to": end,
+        "directory": pattern_directory(*pattern),
+        "rows": writer.rows,
+        "chunks": writer.chunks,
+        "checksums": writer.checksums,
+    }
+
+
+def export_tombstones(driver, directory, since):
+    """Grava em tombstones.json as remoções posteriores a since.
+
+    ``reset`` indica que o grafo inteiro foi apagado (carga completa) e deve
+    ser substituído na restauração; ``nodes`` lista os ids removidos por
+    rótulo e ``relationships`` os pares removidos por trinca.
+    """
+    tombstones = {"reset": False, "nodes": {}, "relationships": []}
+    query = (
+        f"MATCH (t:{quote(GRAPH_TOMBSTONE)}) WHERE t.deleted_at > datetime($since) "
+        "RETURN properties(t) AS props ORDER BY t.deleted_at"
+    )
+    with driver.session() as session:
+        for record in session.run(query, since=since):
+            props = record["props"]
+            if props.get("reset"):
+                tombstones = {"reset": True, "nodes": {}, "relationships": []}
+            elif "rotulo" in props:
+                tombstones["nodes"].setdefault(props["rotulo"], []).append(props["id"])
+            else:
+                tombstones["relationships"].append(
+                    {
+                        key: props[key]
+                        for key in ("origem", "tipo", "destino", "de", "para")
+                    }
+                )
+    path = Path(directory) / "tombstones.json"
+    path.write_text(_dumps(tombstones), encoding="utf-8")
+    return tombstones
+
+
+def export_database(
+    driver,
+    directory,
+    fmt="ndjson",
+    compression="gzip",
+    max_workers=MAX_WORKERS,
+    page_size=PAGE_SIZE,
+    since_dump=None,
+):
+    """Exporta nós e relacionamentos em paralelo e grava o manifesto.
+
+    Com since_dump (diretório do dump anterior da cadeia) o dump é
+    incremental: contém só o que mudou desde a marca d'água daquele dump, e o
+    manifesto aponta para ele como pai.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    start = time.perf_counter()
+
+    since = parent = None
+    if since_dump is not None:
+        since_dump = Path(since_dump)
+        since = _read_manifest(since_dump)["watermark"]
+        parent = os.path.relpath(since_dump, directory)
+
+    with driver.session() as session:
+        # O próximo delta exporta tudo o que foi carimbado depois do início
+        # desta exportação, com uma margem para escritas ainda em andamento
+        watermark = server_time(session) - WATERMARK_MARGIN
+        labels = node_labels(session)
+        patterns = relationship_patterns(session)
+    if since is not None:
+        export_tombstones(driver, directory, since)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        node_futures = {
+            label: executor.submit(
+                export_label,
+                driver,
+                label,
+                directory,
+                fmt,
+                compression,
+                page_size,
+                since,
+            )
+            for label in labels
+        }
+        rel_futures = [
+            executor.submit(
+                export_relationships,
+                driver,
+                pattern,
+                directory,
+                fmt,
+                compression,
+                page_size,
+                since,
+            )
+            for pattern in patterns
+        ]
+        nodes = {label: future.result() for label, future in node_futures.items()}
+        relationships = [future.result() for future in rel_futures]
+
+    manifest = {
+        "kind": "full" if since is None else "incremental",
+        "parent": parent,
+        "since": since,
+        "watermark": watermark.isoformat(),
+        "format": fmt,
+        "compression": compression,
+        "page_size": page_size,
+        "exported_at": datetime.now().isoformat(timespec="seconds"),
+        "seconds": round(time.perf_counter() - start, 3),
+        "nodes": nodes,
+        # Trincas do esquema sem relacionamentos não entram no dump
+        "relationships": [rel for rel in relationships if rel["rows"]],
+    }
+    tmp_path = directory / "manifest.json.tmp"
+    tmp_path.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    os.replace(tmp_path, directory / "manifest.json")
+    return manifest
+
+
+def _read_manifest(directory):
+    with open(Path(directory) / "manifest.json", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_batches(driver, query, rows, **parameters):
+    """Grava as linhas em transações de IMPORT_BATCH_SIZE; retorna o total."""
+
+    def work(tx, batch):
+        tx.run(query, rows=batch, **parameters).consume()
+
+    total = 0
+    with driver.session() as session:
+        for batch in iter_batches(rows, IMPORT_BATCH_SIZE):
+            session.execute_write(work, batch)
+            total += len(batch)
+    return total
+
+
+def _chunk_rows(directory, chunks, fmt, compression):
+    for chunk in chunks:
+        yield from read_rows(Path(directory) / chunk, fmt, compression)
+
+
+def import_label(driver, label, directory, fmt, compression, chunks, checksums=None):
+    directory = Path(directory) / "nodes" / label
+    verify_chunks(directory, checksums)
+    query = f"UNWIND $rows AS row MERGE (n:{quote(label)} {{id: row.id}}) SET n = row"
+    rows = _chunk_rows(directory, chunks, fmt, compression)
+    return _write_batches(driver, query, rows)
+
+
+def import_relationships(driver, rel, directory, fmt, compression):
+    query = (
+        f"UNWIND $rows AS row "
+        f"MATCH (a:{quote(rel['from'])} {{id: row.de}}) "
+        f"MATCH (b:{quote(rel['to'])} {{id: row.para}}) "
+        f"MERGE (a)-[r:{quote(rel['type'])}]->(b) SET r = row.props"
+    )
+    directory = Path(directory) / "relationships" / rel["directory"]
+    verify_chunks(directory, rel.get("checksums"))
+    rows = _chunk_rows(directory, rel["chunks"], fmt, compression)
+    if fmt == "csv":
+        rows = (
+            {
+                "de": row.pop("de"),
+                "para": row.pop("para"),
+                "props": row,
+            }
+            for row in rows
+        )
+    return _write_batches(driver, query, rows)
+
+
+def _drop_graph(session):
+    session.run("MATCH (n) CALL { WITH n DETACH DELETE n } IN TRANSACTIONS").consume()
+
+
+def apply_tombstones(driver, directory):
+    """Aplica as remoções de um dump incremental (tombstones.json), se houver."""
+    path = Path(directory) / "tombstones.json"
+    if not path.exists():
+        return
+    tombstones = _loads(path.read_text(encoding="utf-8"))
+    if tombstones["reset"]:
+        with driver.session() as session:
+            _drop_graph(session)
+        return
+    for label, ids in tombstones["nodes"].items():
+        _write_batches(
+            driver,
+            f"UNWIND $rows AS id MATCH (n:{quote(label)} {{id: id}}) DETACH DELETE n",
+            ids,
+        )
+    patterns = {}
+    for rel in tombstones["relationships"]:
+        pattern = (rel["origem"], rel["tipo"], rel["destino"])
+        patterns.setdefault(pattern, []).append(rel)
+    for (start, rel_type, end), rels in patterns.items():
+        _write_batches(
+            driver,
+            f"UNWIND $rows AS row MATCH (:{quote(start)} {{id: row.de}})"
+            f"-[r:{quote(rel_type)}]->(:{quote(end)} {{id: row.para}}) DELETE r",
+            rels,
+        )
+
+
+def import_dump(driver, directory, drop=False, max_workers=MAX_WORKERS):
+    """Importa um único dump da cadeia; retorna as linhas por rótulo e trinca."""
+    directory = Path(directory)
+    manifest = _read_manifest(directory)
+    fmt, compression = manifest["format"], manifest["compression"]
+
+    with driver.session() as session:
+        if drop:
+            _drop_graph(session)
+        for label in manifest["nodes"]:
+            session.run(
+                f"CREATE CONSTRAINT {label.lower()}_id IF NOT EXISTS "
+                f"FOR (n:{quote(label)}) REQUIRE n.id IS UNIQUE"
+            ).consume()
+    apply_tombstones(driver, directory)
+
+    counts = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            label: executor.submit(
+                import_label,
+                driver,
+                label,
+                directory,
+                fmt,
+                compression,
+                node["chunks"],
+                node.get("checksums"),
+            )
+            for label, node in manifest["nodes"].items()
+        }
+        counts.update({label: future.result() for label, future in futures.items()})
+
+        futures = {
+            rel["directory"]: executor.submit(
+                import_relationships, driver, rel, directory, fmt, compression
+            )
+            for rel in manifest["relationships"]
+        }
+        counts.update({name: future.result() for name, future in futures.items()})
+    return counts
+
+
+def import_database(driver, directory, drop=False, max_workers=MAX_WORKERS):
+    """Importa um dump lógico; retorna as linhas gravadas por rótulo e trinca.
+
+    Os nós de todos os rótulos são importados em paralelo antes dos
+    relacionamentos, que precisam das duas pontas. Deadlocks entre
+    transações paralelas são reexecutados pelo execute_write do driver. Se o
+    dump for incremental, restaura a base da cadeia e reaplica os deltas em
+    ordem; ``drop`` vale para a base.
+    """
+    counts = {}
+    for position, dump_dir in enumerate(dump_chain(directory)):
+        drop_base = drop and position == 0
+        for name, rows in import_dump(driver, dump_dir, drop_base, max_workers).items():
+            counts[name] = counts.get(name, 0) + rows
+    return counts
+
+
+def prune_tombstones(driver, oldest_dump):
+    """Remove os tombstones anteriores à marca d'água do dump mais antigo mantido.
+
+    Retorna quantos foram removidos.
+    """
+    cutoff = _read_manifest(oldest_dump)["watermark"]
+    with driver.session() as session:
+        return session.run(
+            f"MATCH (t:{quote(GRAPH_TOMBSTONE)}) "
+            "WHERE t.deleted_at < datetime($cutoff) "
+            "DELETE t RETURN count(t) AS removed",
+            cutoff=cutoff,
+        ).single()["removed"]
+
+
+def parse_args(argv=None):
+    """Lê as opções de linha de comando."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="exporta o grafo para um diretório")
+    export.add_argument("directory", type=Path)
+    export.add_argument("--format", choices=FORMATS, default="ndjson")
+    export.add_argument("--compression", choices=COMPRESSIONS, default="gzip")
+    export.add_argument("--page-size", type=int, default=PAGE_SIZE)
+    export.add_argument(
+        "--since",
+        type=Path,
+        dest="since_dump",
+        help="dump anterior da cadeia: exporta só o que mudou desde ele",
+    )
+
+    restore = commands.add_parser("import", help="importa um dump lógico")
+    restore.add_argument("directory", type=Path)
+    restore.add_argument(
+        "--drop", action="store_true", help="apaga o grafo antes de importar"
+    )
+
+    prune = commands.add_parser(
+        "prune-tombstones",
+        help="remove tombstones anteriores ao dump mais antigo mantido",
+    )
+    prune.add_argument("oldest_dump", type=Path)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Executa a exportação ou a importação no banco configurado."""
+    from neo4j import GraphDatabase
+
+    from load_data import NEO4J_PASSWORD, NEO4J_URI, NEO4J_USER
+
+    args = parse_args(argv)
+    driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+    try:
+        if args.command == "export":
+            manifest = export_database(
+                driver,
+                args.directory,
+                args.format,
+                args.compression,
+                page_size=args.page_size,
+                since_dump=args.since_dump,
+            )
+            nodes = sum(node["rows"] for node in manifest["nodes"].values())
+            rels = sum(rel["rows"] for rel in manifest["relationships"])
+            print(
+                f"Exportados {nodes} nós e {rels} relacionamentos para "
+                f"{args.directory} em {manifest['seconds']}s"
+            )
+        elif args.command == "import":
+            counts = import_database(driver, args.directory, drop=args.drop)
+            print(f"Importadas {sum(counts.values())} linhas de {args.directory}")
+        else:
+            removed = prune_tombstones(driver, args.oldest_dump)
+            print(f"Removidos {removed} tombstones anteriores a {args.oldest_dump}")
+        return True
+    except Exception as e:
+        print(f"Erro: {e}")
+        return False
+    finally:
+        driver.close()
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
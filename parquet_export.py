@@ -0,0 +1,527 @@
+"""Exportação analítica dos dois bancos para Parquet particionado.
+
+Os relatórios de adesão, calorias e evolução de peso deixam de rodar sobre os
+bancos operacionais: as coleções ``meals``, ``measurements``, ``patients``,
+``foods`` e ``recipes`` do MongoDB e os relacionamentos do grafo são gravados
+em arquivos Parquet (colunar, com dicionário nas strings e compressão zstd),
+particionados no estilo Hive, legíveis por ``pyarrow.dataset``, DuckDB,
+Spark ou pandas::
+
+    <destino>/_state.json
+    <destino>/meals/mes=2023-10/paciente=07/part-<execução>.parquet
+    <destino>/measurements/mes=2023-09/paciente=07/part-<execução>.parquet
+    <destino>/patients/paciente=07/part-<execução>.parquet
+    <destino>/foods/part-<execução>.parquet
+    <destino>/meals/_removidos/part-<execução>.parquet
+    <destino>/grafo/<Origem>-<TIPO>-<Destino>/[paciente=07/]part-<execução>.parquet
+
+``mes`` é o mês do campo ``data`` e ``paciente`` o balde do paciente
+(CRC32 do id módulo ``PATIENT_BUCKETS``), de modo que um relatório de um mês
+ou de um grupo de pacientes lê só os arquivos das suas partições. Cada
+coleção tem um esquema fixo (``schemas()``): campos fora dele não são
+exportados e números vão como float64 onde os dados misturam inteiros e
+decimais.
+
+As coleções são lidas com cursores em lotes e cada partição acumula linhas
+até ``ROW_GROUP_ROWS`` antes de gravar um row group. A exportação é
+incremental: ``_state.json`` guarda a marca d'água (hora do servidor no
+início, menos a margem de ``mongo_dump``) e a execução seguinte acrescenta,
+em novos arquivos, só os documentos com ``updated_at`` posterior, e os ids
+removidos desde então (tombstones) em ``_removidos``. Um documento alterado
+aparece em mais de um arquivo; ``read_collection`` devolve a versão mais
+recente de cada ``_id`` sem os removidos. O grafo não tem carimbo de tempo e
+é regravado por inteiro a cada execução.
+
+Uso:
+    python parquet_export.py export analytics/            # incremental
+    python parquet_export.py export analytics/ --full     # do zero
+    python parquet_export.py read analytics/ meals
+"""
+
+import argparse
+import itertools
+import json
+import os
+import shutil
+import sys
+import time
+import zlib
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import numpy as np
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    np = pa = ds = pq = None
+
+from mongo_dump import CURSOR_BATCH_SIZE, WATERMARK_MARGIN, server_time
+from sync import META_FIELDS, TOMBSTONES, UPDATED_AT_FIELD
+
+STATE = "_state.json"
+REMOVED = "_removidos"
+GRAPH = "grafo"
+PATIENT_BUCKETS = int(os.getenv("EXPORT_PATIENT_BUCKETS", "16"))
+ROW_GROUP_ROWS = 128 * 1024
+# Linhas acumuladas em todas as partições antes de gravar os buffers
+MAX_BUFFERED_ROWS = 512 * 1024
+COMPRESSION = "zstd"
+NO_DATE = "sem-data"
+
+# coleção: (campo do paciente, campo de data); None quando não particiona
+COLLECTIONS = {
+    "meals": ("paciente_id", "data"),
+    "measurements": ("paciente_id", "data"),
+    "patients": ("_id", None),
+    "foods": (None, None),
+    "recipes": (None, None),
+}
+
+
+def require_pyarrow():
+    if pa is None:
+        raise RuntimeError(
+            "A exportação Parquet requer os pacotes 'numpy' e 'pyarrow'."
+        )
+
+
+def schemas():
+    """Esquema Arrow de cada coleção exportada."""
+    timestamp = pa.timestamp("ms")
+    ids = pa.list_(pa.int64())
+    strings = pa.list_(pa.string())
+    control = [(UPDATED_AT_FIELD, timestamp)]
+    return {
+        "meals": pa.schema(
+            [
+                ("_id", pa.int64()),
+                ("paciente_id", pa.int64()),
+                ("data", timestamp),
+                ("tipo", pa.string()),
+                ("hora", pa.string()),
+                ("calorias", pa.float64()),
+                ("adesao", pa.string()),
+                ("registro_foto", pa.bool_()),
+                ("alimentos", ids),
+                ("receitas", ids),
+                *control,
+            ]
+        ),
+        "measurements": pa.schema(
+            [
+                ("_id", pa.int64()),
+                ("paciente_id", pa.int64()),
+                ("data", timestamp),
+                ("peso", pa.float64()),
+                ("imc", pa.float64()),
+                ("gordura_corporal", pa.float64()),
+                (
+                    "medidas",
+                    pa.struct([("cintura", pa.float64()), ("quadril", pa.float64())]),
+                ),
+                ("pressao", pa.string()),
+                *control,
+            ]
+        ),
+        # Sem os dados de contato (email, telefone), que não servem aos relatórios
+        "patients": pa.schema(
+            [
+                ("_id", pa.int64()),
+                ("nome", pa.string()),
+                ("idade", pa.int64()),
+                ("genero", pa.string()),
+                ("altura", pa.float64()),
+                ("peso_inicial", pa.float64()),
+                ("restricoes", strings),
+                ("alergias", strings),
+                ("objetivo", pa.string()),
+                ("nutricionista_id", pa.int64()),
+                *control,
+            ]
+        ),
+        "foods": pa.schema(
+            [
+                ("_id", pa.int64()),
+                ("nome", pa.string()),
+                ("porcao", pa.string()),
+                ("calorias", pa.float64()),
+                ("proteinas", pa.float64()),
+                ("carboidratos", pa.float64()),
+                ("gorduras", pa.float64()),
+                ("fibras", pa.float64()),
+                ("grupo", pa.string()),
+                *control,
+            ]
+        ),
+        # Sem as instruções, texto livre
+        "recipes": pa.schema(
+            [
+                ("_id", pa.int64()),
+                ("nome", pa.string()),
+                ("tempo_preparo", pa.int64()),
+                ("dificuldade", pa.string()),
+                ("calorias", pa.float64()),
+                (
+                    "ingredientes",
+                    pa.list_(
+                        pa.struct(
+                            [("food_id", pa.int64()), ("quantidade", pa.string())]
+                        )
+                    ),
+                ),
+                *control,
+            ]
+        ),
+    }
+
+
+def patient_bucket(patient_id):
+    """Balde do paciente: CRC32 do id em texto, módulo PATIENT_BUCKETS."""
+    return zlib.crc32(str(patient_id).encode()) % PATIENT_BUCKETS
+
+
+def partition_of(row, patient_field, date_field):
+    """Diretório da partição da linha, relativo ao da tabela."""
+    parts = []
+    if date_field is not None:
+        value = row.get(date_field)
+        parts.append(f"mes={value.strftime('%Y-%m') if value else NO_DATE}")
+    if patient_field is not None:
+        parts.append(f"paciente={patient_bucket(row.get(patient_field)):02d}")
+    return "/".join(parts)
+
+
+class PartitionedWriter:
+    """Grava linhas em arquivos Parquet por partição, em row groups.
+
+    Cada partição tem um arquivo por execução, aberto na primeira linha e
+    gravado em row groups de até ``ROW_GROUP_ROWS`` linhas. Os arquivos são
+    gravados com nome oculto (ignorado pelos leitores) e renomeados em
+    ``close``.
+    """
+
+    def __init__(self, directory, schema, run_id, partition):
+        self.directory = Path(directory)
+        self.schema = schema
+        self.run_id = run_id
+        self.partition = partition  # linha -> diretório da partição
+        self.rows = 0
+        self._buffers = {}
+        self._writers = {}
+        self._buffered = 0
+
+    def write(self, rows):
+        for row in rows:
+            self._buffers.setdefault(self.partition(row), []).append(row)
+        self._buffered += len(rows)
+        for key, buffer in self._buffers.items():
+            if len(buffer) >= ROW_GROUP_ROWS:
+                self._flush(key)
+        if self._buffered > MAX_BUFFERED_ROWS:
+            for key in list(self._buffers):
+                self._flush(key)
+
+    def _flush(self, key):
+        buffer = self._buffers.pop(key, [])
+        if not buffer:
+            return
+        if key not in self._writers:
+            path = self.directory / key / f".part-{self.run_id}.parquet"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._writers[key] = (
+                path,
+                pq.ParquetWriter(
+                    path, self.schema, compression=COMPRESSION, use_dictionary=True
+                ),
+            )
+        table = pa.Table.from_pylist(buffer, schema=self.schema)
+        self._writers[key][1].write_table(table, row_group_size=ROW_GROUP_ROWS)
+        self.rows += len(buffer)
+        self._buffered -= len(buffer)
+
+    def close(self):
+        """Grava o que falta e publica os arquivos; retorna as partições gravadas."""
+        for key in list(self._buffers):
+            self._flush(key)
+        for path, writer in self._writers.values():
+            writer.close()
+            path.rename(path.with_name(path.name[1:]))
+        return sorted(self._writers)
+
+    def abort(self):
+        for path, writer in self._writers.values():
+            writer.close()
+            path.unlink(missing_ok=True)
+
+
+def _write_json(path, data):
+    partial = path.with_name(path.name + ".part")
+    with open(partial, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False, default=str)
+    os.replace(partial, path)
+
+
+def read_state(directory):
+    path = Path(directory) / STATE
+    if not path.exists():
+        return None
+    with open(path, encoding="utf-8") as f:
+        state = json.load(f)
+    state["watermark"] = datetime.fromisoformat(state["watermark"])
+    return state
+
+
+def removed_ids(db, name, since):
+    """Ids removidos da coleção depois de since; None se ela foi apagada inteira."""
+    removed = []
+    query = {"collection": name, "deleted_at": {"$gt": since}}
+    for tombstone in db[TOMBSTONES].find(query).sort("deleted_at", 1):
+        if tombstone["document_id"] is None:
+            return None
+        removed.append(
+            {"_id": tombstone["document_id"], "deleted_at": tombstone["deleted_at"]}
+        )
+    return removed
+
+
+def export_collection(db, name, directory, run_id, since=None):
+    """Exporta a coleção (toda, ou só o que mudou desde since); retorna o resumo."""
+    patient_field, date_field = COLLECTIONS[name]
+    schema = schemas()[name]
+    target = Path(directory) / name
+    summary = {"mode": "full" if since is None else "incremental"}
+
+    if since is not None:
+        removed = removed_ids(db, name, since)
+        if removed is None:
+            # A coleção foi recarregada do zero: a exportação também
+            since, summary["mode"] = None, "full"
+        elif removed:
+            removals = pa.Table.from_pylist(
+                removed,
+                schema=pa.schema(
+                    [("_id", pa.int64()), ("deleted_at", pa.timestamp("ms"))]
+                ),
+            )
+            (target / REMOVED).mkdir(parents=True, exist_ok=True)
+            pq.write_table(removals, target / REMOVED / f"part-{run_id}.parquet")
+        summary["removed"] = len(removed or [])
+    if since is None:
+        shutil.rmtree(target, ignore_errors=True)
+
+    query = {} if since is None else {UPDATED_AT_FIELD: {"$gt": since}}
+    projection = {field: 1 for field in schema.names}
+    writer = PartitionedWriter(
+        target, schema, run_id, lambda row: partition_of(row, patient_field, date_field)
+    )
+    cursor = (
+        db[name].find(query, projection).sort("_id", 1).batch_size(CURSOR_BATCH_SIZE)
+    )
+    batch = []
+    try:
+        for doc in cursor:
+            batch.append(doc)
+            if len(batch) == CURSOR_BATCH_SIZE:
+                writer.write(batch)
+                batch = []
+        writer.write(batch)
+        summary["partitions"] = writer.close()
+    except BaseException:
+        writer.abort()
+        raise
+    finally:
+        cursor.close()
+    summary["rows"] = writer.rows
+    return summary
+
+
+def graph_patterns():
+    """Trincas (tipo, origem, destino) do modelo de grafo dos loaders."""
+    from load_data import RELATIONSHIPS
+
+    return sorted({(rel_type, start, end) for rel_type, start, end, _ in RELATIONSHIPS})
+
+
+def export_relationships(store, rel_type, from_label, to_label, directory, run_id):
+    """Regrava os relacionamentos da trinca, particionados pelo paciente se houver."""
+    target = Path(directory) / GRAPH / f"{from_label}-{rel_type}-{to_label}"
+    patient_end = (
+        "de" if from_label == "Paciente" else "para" if to_label == "Paciente" else None
+    )
+
+    def flatten(row):
+        props = {
+            key: value for key, value in row["props"].items() if key not in META_FIELDS
+        }
+        return {"de": row["de"], "para": row["para"], **props}
+
+    rows = (flatten(row) for row in store.relationships(rel_type, from_label, to_label))
+    first = list(itertools.islice(rows, CURSOR_BATCH_SIZE))
+    previous = sorted(target.rglob("part-*.parquet")) if target.exists() else []
+    if not first:
+        shutil.rmtree(target, ignore_errors=True)
+        return {"rows": 0}
+
+    schema = pa.Table.from_pylist(first).schema
+    writer = PartitionedWriter(
+        target, schema, run_id, lambda row: partition_of(row, patient_end, None)
+    )
+    try:
+        writer.write(first)
+        while batch := list(itertools.islice(rows, CURSOR_BATCH_SIZE)):
+            writer.write(batch)
+        writer.close()
+    except BaseException:
+        writer.abort()
+        raise
+    # Os arquivos anteriores só saem depois que os novos estão publicados
+    for path in previous:
+        path.unlink()
+    return {"rows": writer.rows}
+
+
+def export_all(db, store, directory, full=False, collections=None):
+    """Exporta as coleções (incrementalmente, se houver estado) e o grafo.
+
+    ``db`` é um banco pymongo (ou MemoryClient); ``store`` um GraphStore, ou
+    None para pular o grafo. Retorna o estado gravado em _state.json.
+    """
+    require_pyarrow()
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    started = time.perf_counter()
+    previous = None if full else read_state(directory)
+    since = previous["watermark"] if previous else None
+    # Tudo o que for carimbado a partir daqui entra na próxima execução
+    watermark = server_time(db) - WATERMARK_MARGIN
+    run_id = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+
+    state = {
+        "run": run_id,
+        "since": since,
+        "watermark": watermark,
+        "collections": {},
+        "graph": {},
+    }
+    for name in collections or COLLECTIONS:
+        state["collections"][name] = export_collection(
+            db, name, directory, run_id, since
+        )
+    if store is not None:
+        for rel_type, from_label, to_label in graph_patterns():
+            key = f"{from_label}-{rel_type}-{to_label}"
+            state["graph"][key] = export_relationships(
+                store, rel_type, from_label, to_label, directory, run_id
+            )
+    state["seconds"] = round(time.perf_counter() - started, 3)
+    # A marca d'água só avança depois que todos os arquivos foram publicados
+    _write_json(directory / STATE, state)
+    return state
+
+
+def read_collection(directory, name, where=None):
+    """Lê a coleção exportada: a versão mais recente de cada _id, sem os removidos.
+
+    ``where`` é uma expressão de ``pyarrow.dataset`` (por exemplo
+    ``ds.field("mes") == "2023-10"``), aplicada antes da leitura dos arquivos.
+    """
+    require_pyarrow()
+    target = Path(directory) / name
+    table = ds.dataset(target, format="parquet", partitioning="hive").to_table(
+        filter=where
+    )
+    if not table.num_rows:
+        return table
+    table = table.sort_by([("_id", "ascending"), (UPDATED_AT_FIELD, "ascending")])
+    ids = table.column("_id").to_numpy()
+    latest = np.append(ids[1:] != ids[:-1], True)
+    table = table.filter(pa.array(latest))
+    if (target / REMOVED).exists():
+        removals = pq.read_table(target / REMOVED)
+        deleted = dict(
+            zip(
+                removals.column("_id").to_pylist(),
+                removals.column("deleted_at").to_pylist(),
+            )
+        )
+        keep = [
+            deleted.get(_id) is None or updated > deleted[_id]
+            for _id, updated in zip(
+                table.column("_id").to_pylist(),
+                table.column(UPDATED_AT_FIELD).to_pylist(),
+            )
+        ]
+        table = table.filter(pa.array(keep, pa.bool_()))
+    return table
+
+
+def parse_args(argv=None):
+    """Lê as opções de linha de comando."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="exporta os dois bancos para Parquet")
+    export.add_argument("directory", type=Path)
+    export.add_argument(
+        "--full", action="store_true", help="ignora a marca d'água e exporta tudo"
+    )
+    export.add_argument("--no-graph", action="store_true", help="exporta só o MongoDB")
+
+    read = commands.add_parser("read", help="mostra uma coleção exportada")
+    read.add_argument("directory", type=Path)
+    read.add_argument("collection", choices=sorted(COLLECTIONS))
+    read.add_argument("--month", help="só o mês dado (AAAA-MM)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == "read":
+        require_pyarrow()
+        where = ds.field("mes") == args.month if args.month else None
+        table = read_collection(args.directory, args.collection, where)
+        for row in table.slice(0, 10).to_pylist():
+            print(row)
+        print(f"{table.num_rows} linhas")
+        return True
+
+    from neo4j import GraphDatabase
+    from pymongo import MongoClient
+
+    from load_data import NEO4J_PASSWORD, NEO4J_URI, NEO4J_USER, Neo4jGraphStore
+    from load_mongodb_data import MONGO_DB, MONGO_URI
+
+    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
+    driver = (
+        None
+        if args.no_graph
+        else GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+    )
+    try:
+        if driver is None:
+            state = export_all(client[MONGO_DB], None, args.directory, full=args.full)
+        else:
+            with driver.session() as session:
+                state = export_all(
+                    client[MONGO_DB],
+                    Neo4jGraphStore(session),
+                    args.directory,
+                    full=args.full,
+                )
+    finally:
+        client.close()
+        if driver is not None:
+            driver.close()
+
+    for name, summary in state["collections"].items():
+        print(f"{name}: {summary['rows']} linha(s) ({summary['mode']})")
+    for key, summary in state["graph"].items():
+        print(f"{GRAPH}/{key}: {summary['rows']} linha(s)")
+    print(f"Marca d'água: {state['watermark']} ({state['seconds']} s)")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
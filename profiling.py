@@ -0,0 +1,150 @@
+"""Modos de perfil dos scripts de carga (opção ``--profile``).
+
+- ``cprofile``: perfil determinístico da execução inteira, gravado como
+  arquivo pstats (``python -m pstats runs/neo4j.pstats``).
+- ``tracemalloc``: maiores alocações de cada fase da carga, comparando
+  snapshots do início e do fim da fase.
+- ``sampling``: amostragem periódica da pilha da thread principal, de baixo
+  custo, gravada no formato "folded" usado por flamegraph.pl e speedscope.
+  Cada pilha começa pelo nome da fase em que foi amostrada.
+
+Os arquivos são gravados no mesmo diretório do resumo da execução
+(``RUN_OUTPUT_DIR``). A divisão entre CPU do cliente e espera pelo servidor
+de cada fase está no próprio resumo (``cpu_seconds``/``wait_seconds``).
+"""
+
+import cProfile
+import json
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+import instrumentation
+
+PROFILE_MODES = ("cprofile", "tracemalloc", "sampling")
+TRACEMALLOC_FRAMES = 10
+TOP_ALLOCATIONS = 15
+SAMPLING_INTERVAL = 0.005  # segundos
+
+
+class AllocationTracer:
+    """Registra as maiores alocações de cada fase com tracemalloc."""
+
+    def __init__(self, limit=TOP_ALLOCATIONS):
+        self.limit = limit
+        self.phases = {}
+
+    @contextmanager
+    def phase(self, name):
+        before = tracemalloc.take_snapshot()
+        try:
+            yield
+        finally:
+            after = tracemalloc.take_snapshot()
+            stats = after.compare_to(before, "lineno")
+            self.phases[name] = [
+                {
+                    "local": str(stat.traceback[0]),
+                    "bytes": stat.size_diff,
+                    "blocos": stat.count_diff,
+                }
+                for stat in stats[: self.limit]
+            ]
+
+
+class SamplingProfiler(threading.Thread):
+    """Amostra periodicamente a pilha de uma thread."""
+
+    def __init__(self, thread_id, interval=SAMPLING_INTERVAL):
+        super().__init__(name="sampling-profiler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({Path(code.co_filename).name})")
+                frame = frame.f_back
+            stack.append(instrumentation.current_phase_name())
+            self.samples[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def folded(self):
+        """Retorna as amostras no formato "folded" (pilha contagem por linha)."""
+        return "".join(f"{stack} {n}\n" for stack, n in self.samples.most_common())
+
+
+@contextmanager
+def profile(mode, name, directory=None):
+    """Executa o bloco sob o modo de perfil escolhido e grava o resultado.
+
+    Com ``mode`` vazio o bloco é executado sem perfil.
+    """
+    if not mode:
+        yield
+        return
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Modo de perfil desconhecido: {mode}")
+
+    directory = Path(directory or instrumentation.RUN_OUTPUT_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    start = time.perf_counter()
+
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            path = directory / f"{name}.pstats"
+            profiler.dump_stats(path)
+
+    elif mode == "tracemalloc":
+        tracer = AllocationTracer()
+        instrumentation.add_phase_hook(tracer.phase)
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+        try:
+            yield
+        finally:
+            tracemalloc.stop()
+            instrumentation.remove_phase_hook(tracer.phase)
+            path = directory / f"{name}_allocations.json"
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(tracer.phases, f, indent=2, ensure_ascii=False)
+
+    else:
+        sampler = SamplingProfiler(threading.get_ident())
+        sampler.start()
+        try:
+            yield
+        finally:
+            sampler.stop()
+            path = directory / f"{name}.folded"
+            path.write_text(sampler.folded(), encoding="utf-8")
+
+    elapsed = time.perf_counter() - start
+    print(f"Perfil ({mode}) gravado em {path} ({elapsed:.1f}s)")
+
+
+def add_profile_argument(parser):
+    """Adiciona a opção --profile a um parser de linha de comando."""
+    parser.add_argument(
+        "--profile",
+        choices=PROFILE_MODES,
+        help="grava um perfil da carga junto ao resumo da execução",
+    )
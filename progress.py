@@ -0,0 +1,284 @@
+"""
+Tendências das medidas corporais, para todos os pacientes de uma vez.
+
+A consulta 6 devolve as medidas cruas de um paciente. Aqui, sobre as colunas
+de ``analytics.MeasurementColumns`` (ordenadas por paciente e data), cada
+cálculo é vetorizado na coorte inteira, com os grupos de cada paciente
+tratados por deslocamentos e ``np.add.reduceat``:
+
+- ``rolling_mean``: média móvel das últimas ``window`` medidas do paciente;
+- ``weekly_rate``: variação por semana desde a medida anterior;
+- ``trend``: reta de mínimos quadrados por paciente (inclinação por semana);
+- ``project``: o valor da reta no fim do plano e a data em que ela chega à
+  meta;
+- ``bmi_check``: o IMC recalculado do peso e da ``altura`` do paciente,
+  comparado ao ``imc`` gravado.
+
+Os planos não têm data de início nem peso-alvo numérico: o fim do plano é
+contado da primeira medida do paciente (mais ``duracao`` dias), e as metas
+são um dict paciente -> peso, por padrão o peso do IMC HEALTHY_BMI na altura
+do paciente (``healthy_weights``).
+
+``ProgressCache`` guarda os resultados por paciente; ``append`` de medidas
+novas invalida só os pacientes delas, e a próxima leitura recalcula os
+invalidados juntos, numa passada vetorizada sobre as linhas deles.
+
+Uso::
+
+    columns = MeasurementColumns.from_mongodb(db)
+    heights, durations = patient_heights(db), plan_durations(db)
+    cache = ProgressCache(columns, heights, durations)
+    cache.get(1)["projected"]                   # peso previsto no fim do plano
+    cache.append(MeasurementColumns.from_rows(novas))
+"""
+
+import numpy as np
+
+ROLLING_WINDOW = 3  # medidas
+BMI_TOLERANCE = 0.1
+HEALTHY_BMI = 24.9
+DAY = 86400
+WEEK = 7 * DAY
+
+
+def _row_starts(columns):
+    """Índice da primeira linha do paciente, para cada linha."""
+    _, starts, sizes = columns.patient_groups()
+    return np.repeat(starts, sizes)
+
+
+def _per_row(mapping, patients):
+    """Valores de um dict paciente -> número alinhados às linhas (NaN sem valor)."""
+    keys = np.array(sorted(mapping), dtype=np.int64)
+    values = np.array([mapping[key] for key in keys], dtype=np.float64)
+    result = np.full(len(patients), np.nan)
+    if not len(keys):
+        return result
+    positions = np.minimum(np.searchsorted(keys, patients), len(keys) - 1)
+    found = keys[positions] == patients
+    result[found] = values[positions[found]]
+    return result
+
+
+def rolling_mean(columns, name, window=ROLLING_WINDOW):
+    """Média das últimas ``window`` medidas do paciente, em cada linha.
+
+    A janela não passa para o paciente anterior e ignora valores ausentes
+    (NaN); sem nenhum valor na janela o resultado é NaN.
+    """
+    values = columns[name]
+    valid = ~np.isnan(values)
+    sums = np.concatenate(([0.0], np.cumsum(np.where(valid, values, 0.0))))
+    counts = np.concatenate(([0], np.cumsum(valid)))
+    rows = np.arange(len(values))
+    first = np.maximum(rows - window + 1, _row_starts(columns))
+    total = sums[rows + 1] - sums[first]
+    count = counts[rows + 1] - counts[first]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(count > 0, total / count, np.nan)
+
+
+def weekly_rate(columns, name):
+    """Variação por semana desde a medida anterior do paciente (NaN na primeira)."""
+    values = columns[name]
+    rate = np.full(len(values), np.nan)
+    if len(values) < 2:
+        return rate
+    elapsed = np.diff(columns.time).astype(np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rate[1:] = np.diff(values) / elapsed * WEEK
+    rate[1:][elapsed <= 0] = np.nan
+    rate[_row_starts(columns) == np.arange(len(values))] = np.nan
+    return rate
+
+
+def trend(columns, name="weight"):
+    """Reta de mínimos quadrados das medidas de cada paciente.
+
+    Retorna (pacientes, início em segundos, valor da reta no início,
+    inclinação por semana), com o tempo contado da primeira medida do
+    paciente. Com menos de duas medidas válidas em datas distintas, a
+    inclinação é NaN.
+    """
+    patients, starts, sizes = columns.patient_groups()
+    if not len(starts):
+        empty = np.zeros(0)
+        return patients, columns.time[starts], empty, empty
+    values = columns[name]
+    valid = ~np.isnan(values)
+    weeks = (columns.time - np.repeat(columns.time[starts], sizes)) / WEEK
+    x = np.where(valid, weeks, 0.0)
+    y = np.where(valid, values, 0.0)
+    n = np.add.reduceat(valid.astype(np.float64), starts)
+    sx, sy = np.add.reduceat(x, starts), np.add.reduceat(y, starts)
+    sxx, sxy = np.add.reduceat(x * x, starts), np.add.reduceat(x * y, starts)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        denominator = n * sxx - sx * sx
+        slope = np.where(denominator > 0, (n * sxy - sx * sy) / denominator, np.nan)
+        intercept = np.where(
+            n > 0, (sy - np.nan_to_num(slope) * sx) / np.maximum(n, 1), np.nan
+        )
+    return patients, columns.time[starts], intercept, slope
+
+
+def project(columns, durations, goals=None, name="weight"):
+    """Projeção da reta de cada paciente até o fim do plano e até a meta.
+
+    ``durations`` mapeia paciente -> ``duracao`` do plano em dias, contada
+    da primeira medida; ``goals`` mapeia paciente -> valor-alvo. Retorna um
+    dict de arrays por paciente: ``patient``, ``slope`` (por semana),
+    ``plan_end`` e ``projected`` (valor da reta nessa data), ``goal`` e
+    ``goal_date`` (quando a reta chega à meta; NaT se ela não vai na direção
+    da meta ou o paciente não tem meta).
+    """
+    patients, first, intercept, slope = trend(columns, name)
+    duration = _per_row(durations, patients)
+    goal = _per_row(goals or {}, patients)
+    plan_end = first + duration * DAY
+    with np.errstate(invalid="ignore", divide="ignore"):
+        projected = intercept + slope * (duration * DAY / WEEK)
+        weeks_to_goal = (goal - intercept) / slope
+    reaches = np.isfinite(weeks_to_goal) & (weeks_to_goal >= 0)
+    goal_date = np.full(len(patients), np.datetime64("NaT"), dtype="datetime64[s]")
+    goal_date[reaches] = (first[reaches] + weeks_to_goal[reaches] * WEEK).astype(
+        "datetime64[s]"
+    )
+    plan_dates = np.full(len(patients), np.datetime64("NaT"), dtype="datetime64[s]")
+    has_plan = ~np.isnan(plan_end)
+    plan_dates[has_plan] = plan_end[has_plan].astype("datetime64[s]")
+    return {
+        "patient": patients,
+        "slope": slope,
+        "plan_end": plan_dates,
+        "projected": projected,
+        "goal": goal,
+        "goal_date": goal_date,
+    }
+
+
+def recomputed_bmi(columns, heights):
+    """IMC de cada linha a partir do peso e da altura do paciente (em cm)."""
+    meters = _per_row(heights, columns.patient) / 100
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return columns["weight"] / (meters * meters)
+
+
+def bmi_check(columns, heights, tolerance=BMI_TOLERANCE):
+    """(IMC recalculado, linhas cujo ``imc`` gravado difere mais que ``tolerance``).
+
+    Linhas sem ``imc``, peso ou altura não entram nas divergências.
+    """
+    bmi = recomputed_bmi(columns, heights)
+    with np.errstate(invalid="ignore"):
+        wrong = np.abs(columns["bmi"] - bmi) > tolerance
+    return bmi, np.flatnonzero(wrong)
+
+
+def healthy_weights(heights, bmi=HEALTHY_BMI):
+    """Meta padrão por paciente: o peso do IMC ``bmi`` na altura dele."""
+    return {
+        patient: round(bmi * (height / 100) ** 2, 1)
+        for patient, height in heights.items()
+        if height
+    }
+
+
+def patient_heights(db):
+    """Altura (cm) de cada paciente."""
+    return {
+        doc["_id"]: doc["altura"]
+        for doc in db.patients.find({"altura": {"$ne": None}}, {"altura": 1})
+    }
+
+
+def plan_durations(db):
+    """``duracao`` do plano de cada paciente; com mais de um, o de maior _id."""
+    cursor = db.dietPlans.find(
+        {"paciente_id": {"$ne": None}}, {"paciente_id": 1, "duracao": 1}
+    ).sort("_id", 1)
+    return {doc["paciente_id"]: doc.get("duracao") or 0 for doc in cursor}
+
+
+def _select(columns, patients):
+    """Linhas só dos pacientes dados, na mesma classe de colunas."""
+    rows = np.isin(columns.patient, patients)
+    return type(columns)(
+        columns.patient[rows],
+        columns.time[rows],
+        **{name: values[rows] for name, values in columns.columns.items()},
+    )
+
+
+class ProgressCache:
+    """Análises de progresso por paciente, recalculadas só quando invalidadas.
+
+    ``get`` devolve, para um paciente, as séries da consulta 6 com a média
+    móvel e a variação semanal do peso, o IMC recalculado e as divergências,
+    e a tendência com a projeção. Pacientes invalidados (por ``append`` ou
+    ``invalidate``) são recalculados juntos na próxima leitura.
+    """
+
+    def __init__(self, columns, heights, durations, goals=None, window=ROLLING_WINDOW):
+        self.columns = columns
+        self.heights = heights
+        self.durations = durations
+        self.goals = healthy_weights(heights) if goals is None else goals
+        self.window = window
+        self._results = {}
+        self._stale = set()
+        self.invalidate()
+
+    def invalidate(self, patients=None):
+        """Marca pacientes (todos, sem argumento) para recálculo."""
+        if patients is None:
+            self._results.clear()
+            self._stale = {int(p) for p in np.unique(self.columns.patient)}
+        else:
+            self._stale.update(int(p) for p in patients)
+
+    def append(self, other):
+        """Intercala medidas novas e invalida os pacientes delas."""
+        self.columns.append(other)
+        self.invalidate(np.unique(other.patient))
+        return self
+
+    def get(self, patient_id):
+        """Resultados do paciente; None se ele não tem medidas."""
+        if patient_id in self._stale:
+            self.refresh()
+        return self._results.get(patient_id)
+
+    def refresh(self):
+        """Recalcula todos os pacientes invalidados numa passada."""
+        if not self._stale:
+            return 0
+        stale = np.array(sorted(self._stale), dtype=np.int64)
+        # Sem resultados guardados, todos estão invalidados: usa as colunas inteiras
+        part = _select(self.columns, stale) if self._results else self.columns
+        average = rolling_mean(part, "weight", self.window)
+        rate = weekly_rate(part, "weight")
+        bmi, wrong = bmi_check(part, self.heights)
+        mismatched = np.zeros(len(part), dtype=bool)
+        mismatched[wrong] = True
+        projection = project(part, self.durations, self.goals)
+        patients, starts, sizes = part.patient_groups()
+        for i, patient in enumerate(patients.tolist()):
+            rows = slice(starts[i], starts[i] + sizes[i])
+            self._results[patient] = {
+                "date": part.time[rows].astype("datetime64[s]"),
+                **{name: values[rows] for name, values in part.columns.items()},
+                "weight_average": average[rows],
+                "weight_rate": rate[rows],
+                "bmi_recomputed": bmi[rows],
+                "bmi_mismatch": mismatched[rows],
+                **{
+                    name: values[i]
+                    for name, values in projection.items()
+                    if name != "patient"
+                },
+            }
+        for patient in self._stale - set(patients.tolist()):
+            self._results.pop(patient, None)
+        refreshed = len(self._stale)
+        self._stale = set()
+        return refreshed
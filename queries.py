@@ -0,0 +1,282 @@
+"""Consultas documentadas em docs/consultas, em formato executável.
+
+Os textos Cypher são idênticos aos da documentação. As consultas MongoDB
+são a tradução direta dos exemplos em JavaScript para as estruturas usadas
+pelo pymongo: consultas ``find`` têm ``filter``/``projection``/``sort`` e
+agregações têm ``pipeline``.
+"""
+
+from datetime import datetime
+
+NEO4J_QUERIES = {
+    1: """
+MATCH (n:Nutricionista {nome: "Ana Silva"})-[:ATENDE]->(p:Paciente)
+RETURN n.nome AS Nutricionista, p.nome AS Paciente, p.objetivo AS Objetivo
+""",
+    2: """
+MATCH (p:Paciente {nome: "João Pereira"})-[:PACIENTE_TEM_DIA]->(d:Dia)
+WHERE d.data >= "2023-10-18" AND d.data <= "2023-10-19"
+MATCH (d)-[:DIA_TEM_REFEICAO]->(r:Refeicao)
+RETURN p.nome AS Paciente, r.tipo AS TipoRefeicao, r.data AS Data,
+       r.calorias AS Calorias, r.adesao AS Adesao
+ORDER BY r.data, r.hora
+""",
+    3: """
+MATCH (p:Paciente {nome: "João Pereira"})-[:PACIENTE_TEM_DIA]->(d:Dia {data: "2023-10-18"})
+MATCH (d)-[:DIA_TEM_REFEICAO]->(r:Refeicao)
+RETURN p.nome AS Paciente, d.data AS Data, SUM(r.calorias) AS TotalCalorias
+""",
+    4: """
+MATCH (p:Paciente)-[:SEGUE]->(pa:PlanoAlimentar)-[:RECOMENDA]->(r:Receita)
+WHERE "Glúten" IN p.restricoes
+RETURN p.nome AS Paciente, r.nome AS ReceitaAdequada, r.calorias AS Calorias
+""",
+    5: """
+MATCH (p:Paciente)-[:CONSOME]->(r:Refeicao)
+WITH p, COUNT(r) AS totalRefeicoes,
+     SUM(CASE WHEN r.adesao = "Completa" THEN 1 ELSE 0 END) AS refeicoesCompletas
+WHERE (refeicoesCompletas * 1.0 / totalRefeicoes) < 0.8
+RETURN p.nome AS Paciente, totalRefeicoes, refeicoesCompletas,
+       (refeicoesCompletas * 1.0 / totalRefeicoes) AS TaxaAdesao
+ORDER BY TaxaAdesao
+""",
+    6: """
+MATCH (p:Paciente {nome: "João Pereira"})-[:POSSUI]->(m:MedidaCorporal)
+RETURN p.nome AS Paciente, m.data AS Data, m.peso AS Peso, m.imc AS IMC,
+       m.gordura_corporal AS GorduraCorporal, m.cintura AS Cintura
+ORDER BY m.data
+""",
+    7: """
+MATCH (pa:PlanoAlimentar)-[:PLANO_INCLUI_ALIMENTO]->(a:Alimento)
+RETURN a.nome AS Alimento, a.grupo AS Grupo, COUNT(pa) AS NumeroDeRecomendacoes
+ORDER BY NumeroDeRecomendacoes DESC
+""",
+    8: """
+CALL {
+  MATCH (n:Nutricionista)-[:NUTRICIONISTA_ENVIA]->(m:Mensagem)-[:PARA_PACIENTE]->(p:Paciente)
+  RETURN n.nome AS Remetente, p.nome AS Destinatario, m
+  UNION ALL
+  MATCH (p:Paciente)-[:PACIENTE_ENVIA]->(m:Mensagem)-[:PARA_NUTRICIONISTA]->(n:Nutricionista)
+  RETURN p.nome AS Remetente, n.nome AS Destinatario, m
+}
+RETURN Remetente, Destinatario, m.data AS Data, m.hora AS Hora, m.conteudo AS Mensagem
+ORDER BY Data, Hora
+""",
+    9: """
+MATCH (r:Receita)-[:CONTEM]->(a:Alimento {nome: "Brócolis"})
+RETURN r.nome AS Receita, r.calorias AS Calorias, r.dificuldade AS Dificuldade,
+       r.tempo_preparo AS TempoPreparo
+""",
+    10: """
+MATCH (p:Paciente)-[:AGENDA]->(c:Consulta {status: "Agendada"})-[:COM]->(n:Nutricionista)
+RETURN p.nome AS Paciente, n.nome AS Nutricionista, c.data AS Data, c.hora AS Hora
+ORDER BY c.data, c.hora
+""",
+}
+
+MONGODB_QUERIES = {
+    1: {
+        "collection": "patients",
+        "filter": {"nutricionista_id": 1},
+        "projection": {"nome": 1, "idade": 1, "objetivo": 1, "_id": 0},
+    },
+    2: {
+        "collection": "meals",
+        "filter": {
+            "paciente_id": 1,
+            "data": {"$gte": datetime(2023, 10, 18), "$lte": datetime(2023, 10, 19)},
+        },
+        "projection": {
+            "tipo": 1,
+            "data": 1,
+            "hora": 1,
+            "calorias": 1,
+            "adesao": 1,
+            "_id": 0,
+        },
+        "sort": {"data": 1, "hora": 1},
+    },
+    3: {
+        "collection": "meals",
+        "pipeline": [
+            {"$match": {"paciente_id": 1}},
+            {
+                "$group": {
+                    "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$data"}},
+                    "totalCalorias": {"$sum": "$calorias"},
+                }
+            },
+            {"$sort": {"_id": 1}},
+        ],
+    },
+    4: {
+        "collection": "patients",
+        "pipeline": [
+            {"$match": {"restricoes": "Glúten"}},
+            {
+                "$lookup": {
+                    "from": "dietPlans",
+                    "localField": "_id",
+                    "foreignField": "paciente_id",
+                    "as": "planos",
+                }
+            },
+            {"$unwind": "$planos"},
+            {
+                "$lookup": {
+                    "from": "recipes",
+                    "localField": "planos.receitas_recomendadas",
+                    "foreignField": "_id",
+                    "as": "receitas",
+                }
+            },
+            {"$unwind": "$receitas"},
+            {
+                "$project": {
+                    "paciente": "$nome",
+                    "receita": "$receitas.nome",
+                    "calorias": "$receitas.calorias",
+                    "_id": 0,
+                }
+            },
+        ],
+    },
+    5: {
+        "collection": "meals",
+        "pipeline": [
+            {
+                "$group": {
+                    "_id": "$paciente_id",
+                    "totalRefeicoes": {"$sum": 1},
+                    "refeicoesCompletas": {
+                        "$sum": {"$cond": [{"$eq": ["$adesao", "Completa"]}, 1, 0]}
+                    },
+                }
+            },
+            {
+                "$project": {
+                    "paciente_id": "$_id",
+                    "totalRefeicoes": 1,
+                    "refeicoesCompletas": 1,
+                    "taxaAdesao": {
+                        "$divide": ["$refeicoesCompletas", "$totalRefeicoes"]
+                    },
+                    "_id": 0,
+                }
+            },
+            {"$match": {"taxaAdesao": {"$lt": 0.8}}},
+            {
+                "$lookup": {
+                    "from": "patients",
+                    "localField": "paciente_id",
+                    "foreignField": "_id",
+                    "as": "paciente",
+                }
+            },
+            {"$unwind": "$paciente"},
+            {
+                "$project": {
+                    "nome": "$paciente.nome",
+                    "totalRefeicoes": 1,
+                    "refeicoesCompletas": 1,
+                    "taxaAdesao": 1,
+                }
+            },
+            {"$sort": {"taxaAdesao": 1}},
+        ],
+    },
+    6: {
+        "collection": "measurements",
+        "filter": {"paciente_id": 1},
+        "projection": {
+            "data": 1,
+            "peso": 1,
+            "imc": 1,
+            "gordura_corporal": 1,
+            "medidas.cintura": 1,
+            "_id": 0,
+        },
+        "sort": {"data": 1},
+    },
+    7: {
+        "collection": "dietPlans",
+        "pipeline": [
+            {"$unwind": "$alimentos_recomendados"},
+            {"$group": {"_id": "$alimentos_recomendados", "contagem": {"$sum": 1}}},
+            {
+                "$lookup": {
+                    "from": "foods",
+                    "localField": "_id",
+                    "foreignField": "_id",
+                    "as": "alimento",
+                }
+            },
+            {"$unwind": "$alimento"},
+            {
+                "$project": {
+                    "nome": "$alimento.nome",
+                    "grupo": "$alimento.grupo",
+                    "recomendacoes": "$contagem",
+                    "_id": 0,
+                }
+            },
+            {"$sort": {"recomendacoes": -1}},
+        ],
+    },
+    8: {
+        "collection": "messages",
+        "pipeline": [
+            {
+                "$project": {
+                    "remetente": "$de.nome",
+                    "destinatario": "$para.nome",
+                    "data": 1,
+                    "hora": 1,
+                    "conteudo": 1,
+                    "_id": 0,
+                }
+            },
+            {"$sort": {"data": 1, "hora": 1}},
+        ],
+    },
+    9: {
+        "collection": "recipes",
+        "pipeline": [
+            {"$match": {"ingredientes.food_id": 4}},
+            {
+                "$lookup": {
+                    "from": "foods",
+                    "localField": "ingredientes.food_id",
+                    "foreignField": "_id",
+                    "as": "alimentos",
+                }
+            },
+            {"$match": {"alimentos.nome": "Brócolis"}},
+            {
+                "$project": {
+                    "nome": 1,
+                    "calorias": 1,
+                    "dificuldade": 1,
+                    "tempo_preparo": 1,
+                    "_id": 0,
+                }
+            },
+        ],
+    },
+    10: {
+        "collection": "appointments",
+        "pipeline": [
+            {"$match": {"status": "Agendada"}},
+            {
+                "$project": {
+                    "paciente": "$paciente.nome",
+                    "nutricionista": "$nutricionista.nome",
+                    "data": 1,
+                    "hora": 1,
+                    "_id": 0,
+                }
+            },
+            {"$sort": {"data": 1, "hora": 1}},
+        ],
+    },
+}
@@ -0,0 +1,374 @@
+"""Verifica os planos de execução das consultas documentadas.
+
+Executa ``EXPLAIN`` em cada consulta Cypher e ``explain`` (verbosidade
+``queryPlanner``) em cada consulta MongoDB de ``queries.py`` e sinaliza os
+operadores que indicam varredura completa ou ordenação em memória.
+
+Os achados já conhecidos ficam em ``fixtures/query_plans/accepted.json``; a
+verificação só falha quando aparece um achado fora dessa linha de base, e
+avisa quando um achado aceito deixa de ocorrer (a linha de base pode encolher).
+Cada plano gravado guarda a consulta que o gerou; a verificação offline falha
+quando ela não é mais a de ``queries.py``.
+Os relatórios de coorte, que percorrem o conjunto inteiro por definição, têm
+suas varreduras aceitas ali, como os demais achados.
+
+Uso:
+    python query_plans.py                  # verifica nos bancos em execução
+    python query_plans.py --offline        # verifica os planos gravados
+    python query_plans.py --record         # grava os planos atuais
+    python query_plans.py --accept         # aceita os achados atuais
+"""
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+from queries import MONGODB_QUERIES, NEO4J_QUERIES
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures" / "query_plans"
+BASELINE_FILE = "accepted.json"
+
+FLAGGED_NEO4J_OPERATORS = {"AllNodesScan", "NodeByLabelScan", "CartesianProduct"}
+FLAGGED_MONGODB_STAGES = {"COLLSCAN", "SORT"}
+
+# Campos do explain que dependem do servidor ou da execução (host, versão do
+# build, hashes do cache de planos) e não fazem parte do plano em si; ficam
+# fora dos fixtures para que a gravação seja reproduzível e não exponha o host.
+VOLATILE_MONGODB_FIELDS = {
+    "serverInfo",
+    "serverParameters",
+    "queryHash",
+    "planCacheKey",
+    "planCacheShapeHash",
+    "$clusterTime",
+    "operationTime",
+}
+
+
+def neo4j_operators(plan):
+    """Percorre a árvore do plano Neo4j e retorna os nomes dos operadores."""
+    operators = []
+    stack = [plan]
+    while stack:
+        node = stack.pop()
+        # Neo4j 5 sufixa o nome com o runtime, ex.: "NodeByLabelScan@neo4j"
+        operators.append(node["operatorType"].split("@")[0])
+        stack.extend(node.get("children", []))
+    return operators
+
+
+def mongodb_stages(explain):
+    """Retorna os estágios dos planos vencedores de um resultado de explain.
+
+    Agregações podem conter vários planos (um por ``$cursor``); planos
+    rejeitados são ignorados.
+    """
+    stages = []
+
+    def collect(node):
+        if isinstance(node, dict):
+            if "stage" in node:
+                stages.append(node["stage"])
+            for value in node.values():
+                collect(value)
+        elif isinstance(node, list):
+            for item in node:
+                collect(item)
+
+    def find_winning(node):
+        if isinstance(node, dict):
+            for key, value in node.items():
+                if key == "winningPlan":
+                    collect(value)
+                elif key != "rejectedPlans":
+                    find_winning(value)
+        elif isinstance(node, list):
+            for item in node:
+                find_winning(item)
+
+    find_winning(explain)
+    return stages
+
+
+def check_neo4j_plan(plan):
+    """Retorna os operadores sinalizados no plano da consulta Cypher."""
+    return sorted({op for op in neo4j_operators(plan) if op in FLAGGED_NEO4J_OPERATORS})
+
+
+def check_mongodb_plan(explain):
+    """Retorna os estágios sinalizados no plano da consulta MongoDB."""
+    return sorted(
+        {stage for stage in mongodb_stages(explain) if stage in FLAGGED_MONGODB_STAGES}
+    )
+
+
+def explain_neo4j(session, query):
+    """Executa EXPLAIN e retorna o plano como dicionário."""
+    return session.run("EXPLAIN " + query).consume().plan
+
+
+def explain_mongodb(db, spec):
+    """Executa explain com verbosidade queryPlanner para uma consulta."""
+    if "pipeline" in spec:
+        command = {"aggregate": spec["collection"], "pipeline": spec["pipeline"]}
+        command["cursor"] = {}
+    else:
+        command = {"find": spec["collection"], "filter": spec["filter"]}
+        for key in ("projection", "sort"):
+            if key in spec:
+                command[key] = spec[key]
+    return db.command("explain", command, verbosity="queryPlanner")
+
+
+def collect_plans():
+    """Coleta os planos das consultas documentadas nos bancos em execução."""
+    from neo4j import GraphDatabase
+    from pymongo import MongoClient
+
+    from load_data import NEO4J_PASSWORD, NEO4J_URI, NEO4J_USER
+    from load_mongodb_data import MONGO_DB, MONGO_URI
+
+    driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+    try:
+        with driver.session() as session:
+            neo4j_plans = {
+                number: explain_neo4j(session, query)
+                for number, query in NEO4J_QUERIES.items()
+            }
+    finally:
+        driver.close()
+
+    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
+    try:
+        db = client[MONGO_DB]
+        mongodb_plans = {
+            number: explain_mongodb(db, spec)
+            for number, spec in MONGODB_QUERIES.items()
+        }
+    finally:
+        client.close()
+
+    return neo4j_plans, mongodb_plans
+
+
+def strip_volatile(explain):
+    """Remove do resultado de explain os campos que variam entre servidores."""
+    if isinstance(explain, dict):
+        return {
+            key: strip_volatile(value)
+            for key, value in explain.items()
+            if key not in VOLATILE_MONGODB_FIELDS
+        }
+    if isinstance(explain, list):
+        return [strip_volatile(item) for item in explain]
+    return explain
+
+
+def recorded_query(query):
+    """Forma gravada de uma consulta de queries.py.
+
+    O texto Cypher sem as quebras das pontas, ou a especificação MongoDB como
+    JSON (datas como texto).
+    """
+    if isinstance(query, str):
+        return query.strip()
+    return json.loads(json.dumps(query, default=str))
+
+
+def _read_fixtures(directory):
+    """Lê os fixtures: {consulta: {"query": ..., "plan": ...}} por banco."""
+    fixtures = []
+    for name in ("neo4j.json", "mongodb.json"):
+        with open(Path(directory) / name, encoding="utf-8") as f:
+            fixtures.append({int(k): v for k, v in json.load(f).items()})
+    return tuple(fixtures)
+
+
+def load_fixtures(directory=FIXTURES_DIR):
+    """Carrega os planos gravados em disco."""
+    return tuple(
+        {number: fixture["plan"] for number, fixture in fixtures.items()}
+        for fixtures in _read_fixtures(directory)
+    )
+
+
+def stale_fixtures(directory=FIXTURES_DIR):
+    """Retorna os planos gravados de outra versão da consulta.
+
+    Um plano fica desatualizado quando a consulta gravada com ele difere da
+    de queries.py; retorna esses planos como (banco, consulta).
+    """
+    stale = []
+    for database, queries, fixtures in zip(
+        ("Neo4j", "MongoDB"),
+        (NEO4J_QUERIES, MONGODB_QUERIES),
+        _read_fixtures(directory),
+    ):
+        for number, fixture in sorted(fixtures.items()):
+            if number not in queries or fixture["query"] != recorded_query(
+                queries[number]
+            ):
+                stale.append((database, number))
+    return stale
+
+
+def record_fixtures(neo4j_plans, mongodb_plans, directory=FIXTURES_DIR):
+    """Grava os planos em disco para verificação offline, com as consultas."""
+    os.makedirs(directory, exist_ok=True)
+    mongodb_plans = {number: strip_volatile(p) for number, p in mongodb_plans.items()}
+    for name, queries, plans in (
+        ("neo4j.json", NEO4J_QUERIES, neo4j_plans),
+        ("mongodb.json", MONGODB_QUERIES, mongodb_plans),
+    ):
+        fixtures = {
+            number: {"query": recorded_query(queries[number]), "plan": plan}
+            for number, plan in plans.items()
+        }
+        _write_json(Path(directory) / name, fixtures)
+
+
+def _write_json(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False, default=str)
+        f.write("\n")
+
+
+def load_baseline(directory=FIXTURES_DIR):
+    """Carrega os achados aceitos como um conjunto de (banco, consulta, item)."""
+    path = Path(directory) / BASELINE_FILE
+    if not path.exists():
+        return set()
+    with open(path, encoding="utf-8") as f:
+        accepted = json.load(f)
+    return {
+        (database, int(number), item)
+        for database, queries in accepted.items()
+        for number, items in queries.items()
+        for item in items
+    }
+
+
+def record_baseline(findings, directory=FIXTURES_DIR):
+    """Grava os achados atuais como a linha de base aceita."""
+    accepted = {}
+    for database, number, flagged in findings:
+        accepted.setdefault(database, {})[str(number)] = flagged
+    os.makedirs(directory, exist_ok=True)
+    _write_json(Path(directory) / BASELINE_FILE, accepted)
+
+
+def missing_plans(neo4j_plans, mongodb_plans):
+    """Retorna as consultas documentadas sem plano, como (banco, consulta)."""
+    missing = []
+    for database, queries, plans in (
+        ("Neo4j", NEO4J_QUERIES, neo4j_plans),
+        ("MongoDB", MONGODB_QUERIES, mongodb_plans),
+    ):
+        missing.extend(
+            (database, number) for number in sorted(set(queries) - set(plans))
+        )
+    return missing
+
+
+def check_plans(neo4j_plans, mongodb_plans):
+    """Retorna a lista de problemas encontrados como (banco, consulta, itens)."""
+    findings = []
+    for number, plan in sorted(neo4j_plans.items()):
+        flagged = check_neo4j_plan(plan)
+        if flagged:
+            findings.append(("Neo4j", number, flagged))
+    for number, explain in sorted(mongodb_plans.items()):
+        flagged = check_mongodb_plan(explain)
+        if flagged:
+            findings.append(("MongoDB", number, flagged))
+    return findings
+
+
+def compare_baseline(findings, baseline):
+    """Separa os achados novos dos aceitos.
+
+    Retorna ``(novos, resolvidos)``: os novos no formato de ``check_plans`` e
+    os itens da linha de base que não ocorrem mais, como (banco, consulta, item).
+    """
+    current = {
+        (database, number, item)
+        for database, number, flagged in findings
+        for item in flagged
+    }
+    new = []
+    for database, number, flagged in findings:
+        items = [item for item in flagged if (database, number, item) not in baseline]
+        if items:
+            new.append((database, number, items))
+    return new, sorted(baseline - current)
+
+
+def main(argv=None):
+    """Verifica os planos e retorna False se houver achado fora da linha de base."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--offline", action="store_true", help="usa os planos gravados em disco"
+    )
+    mode.add_argument(
+        "--record", action="store_true", help="grava os planos atuais em disco"
+    )
+    parser.add_argument(
+        "--accept",
+        action="store_true",
+        help="grava os achados atuais como linha de base aceita",
+    )
+    parser.add_argument("--fixtures", default=FIXTURES_DIR, type=Path)
+    args = parser.parse_args(argv)
+
+    stale = []
+    if args.offline:
+        neo4j_plans, mongodb_plans = load_fixtures(args.fixtures)
+        stale = stale_fixtures(args.fixtures)
+    else:
+        neo4j_plans, mongodb_plans = collect_plans()
+        if args.record:
+            record_fixtures(neo4j_plans, mongodb_plans, args.fixtures)
+            print(f"Planos gravados em {args.fixtures}")
+
+    for database, number in missing_plans(neo4j_plans, mongodb_plans):
+        print(f"Sem plano gravado: {database} consulta {number} (grave com --record)")
+    for database, number in stale:
+        print(
+            f"Plano de outra versão da consulta: {database} consulta {number} "
+            "(regrave com --record)"
+        )
+
+    findings = check_plans(neo4j_plans, mongodb_plans)
+    if args.accept:
+        record_baseline(findings, args.fixtures)
+        print(f"Achados de {len(findings)} consulta(s) aceitos em {args.fixtures}")
+        return True
+
+    new, resolved = compare_baseline(findings, load_baseline(args.fixtures))
+    for database, number, item in resolved:
+        print(
+            f"Resolvido: {database} consulta {number}: {item} (atualize com --accept)"
+        )
+    accepted = sum(len(f) for *_, f in findings) - sum(len(f) for *_, f in new)
+    print(f"{accepted} achado(s) já aceito(s) na linha de base.")
+
+    for database, number, flagged in new:
+        print(f"{database} consulta {number}: {', '.join(flagged)}")
+
+    if new:
+        print(f"\n{len(new)} consulta(s) com novos achados sem suporte de índice.")
+        return False
+    if stale:
+        print(f"\n{len(stale)} plano(s) gravado(s) não correspondem a queries.py.")
+        return False
+
+    print("Nenhuma varredura completa ou ordenação em memória nova encontrada.")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,284 @@
+"""
+Lembretes das próximas consultas.
+
+A consulta 10 lista as consultas com status "Agendada"; a mensagem 4 dos
+dados de exemplo é um lembrete digitado à mão ("Lembrete: sua consulta é
+amanhã às 14h"). ``send_reminders`` gera esses lembretes em lote para as
+consultas das próximas ``hours`` horas:
+
+- as consultas saem de uma leitura por faixa no índice (status, data, hora)
+  de ``appointments``, que já as devolve na ordem em que vencem (a mais
+  próxima primeiro), lidas do cursor em lotes de ``chunk_size``;
+- cada lote vira mensagens do nutricionista para o paciente em ``messages``
+  (um ``bulk_write``), atualiza os resumos de ``inbox`` (um ``UpdateOne`` por
+  par) e, com um ``GraphStore``, vira nós Mensagem no fim das conversas
+  (uma leitura para achar os que faltam e uma transação por conversa).
+
+Cada lembrete tem uma chave (``lembrete``) com a consulta e o horário dela,
+e o _id da mensagem é derivado dessa chave; rodar o job de novo, ou depois
+de uma falha no meio, não duplica lembretes, e uma consulta remarcada
+ganha um lembrete novo.
+"""
+
+import argparse
+import hashlib
+import sys
+from datetime import datetime, time, timedelta
+
+from pymongo import UpdateOne
+
+from checkpoint import iter_batches
+from instrumentation import count, log, phase, start_run
+from mongo_inbox import INBOX, inbox_id, preview
+from scheduling import BOOKED, interval
+from sync import UPDATED_AT_FIELD
+
+HOURS = 24
+CHUNK_SIZE = 1000
+# Os _id dos lembretes ficam acima de 2**62, longe dos ids sequenciais
+REMINDER_ID_BASE = 1 << 62
+
+
+def reminder_key(appointment):
+    """Chave de deduplicação: a consulta e o horário para o qual foi lembrada"""
+    start, _ = interval(appointment)
+    return f"consulta:{appointment['_id']}:{start.isoformat(timespec='minutes')}"
+
+
+def reminder_id(key):
+    """_id inteiro (int64) e estável da mensagem de lembrete de uma chave"""
+    digest = hashlib.sha256(key.encode("utf-8")).digest()
+    return REMINDER_ID_BASE | int.from_bytes(digest[:7], "big")
+
+
+def reminder_text(start, now):
+    """Texto no formato do lembrete dos dados de exemplo"""
+    days = (start.date() - now.date()).days
+    when = {0: "hoje", 1: "amanhã"}.get(days, f"em {start:%d/%m}")
+    hour = f"{start.hour}h" + (f"{start.minute:02d}" if start.minute else "")
+    return f"Lembrete: sua consulta é {when} às {hour}"
+
+
+def reminder_message(appointment, now):
+    """Documento de ``messages`` do lembrete de uma consulta"""
+    key = reminder_key(appointment)
+    start, _ = interval(appointment)
+    return {
+        "_id": reminder_id(key),
+        "lembrete": key,
+        "de_id": appointment["nutricionista_id"],
+        "de_tipo": "nutricionista",
+        "para_id": appointment["paciente_id"],
+        "para_tipo": "paciente",
+        "de": appointment["nutricionista"],
+        "para": appointment["paciente"],
+        "conteudo": reminder_text(start, now),
+        "data": datetime.combine(now.date(), time()),
+        "hora": f"{now:%H:%M}",
+        "lida": False,
+    }
+
+
+def graph_message(message):
+    """Propriedades do nó Mensagem de um lembrete"""
+    return {
+        "id": message["_id"],
+        "lembrete": message["lembrete"],
+        "conteudo": message["conteudo"],
+        "data": message["data"].date().isoformat(),
+        "hora": message["hora"],
+        "lida": message["lida"],
+    }
+
+
+def create_reminder_indexes(db):
+    """Índice da leitura por faixa das consultas agendadas"""
+    db.appointments.create_index([("status", 1), ("data", 1), ("hora", 1)])
+
+
+def due_appointments(db, now, hours=HOURS, chunk_size=CHUNK_SIZE):
+    """Consultas agendadas que começam em (now, now + hours], da mais próxima"""
+    until = now + timedelta(hours=hours)
+    first_day = datetime.combine(now.date(), time())
+    last_day = datetime.combine(until.date(), time())
+    cursor = (
+        db.appointments.find(
+            {"status": BOOKED, "data": {"$gte": first_day, "$lte": last_day}}
+        )
+        .sort([("status", 1), ("data", 1), ("hora", 1)])
+        .batch_size(chunk_size)
+    )
+    for appointment in cursor:
+        start, _ = interval(appointment)
+        if now < start <= until:
+            yield appointment
+
+
+def _write_messages(db, messages):
+    """Grava os lembretes que ainda não existem; retorna os novos"""
+    result = db.messages.bulk_write(
+        [
+            UpdateOne({"_id": message["_id"]}, {"$setOnInsert": message}, upsert=True)
+            for message in messages
+        ],
+        ordered=False,
+    )
+    created = set(result.upserted_ids.values())
+    new = [message for message in messages if message["_id"] in created]
+    if new:
+        db.messages.bulk_write(
+            [
+                UpdateOne(
+                    {"_id": message["_id"]},
+                    {"$currentDate": {UPDATED_AT_FIELD: True}},
+                )
+                for message in new
+            ],
+            ordered=False,
+        )
+    return new
+
+
+def _update_inbox(db, messages):
+    """Soma os lembretes novos nos resumos dos pares, um UpdateOne por par"""
+    by_pair = {}
+    for message in messages:
+        by_pair.setdefault((message["de_id"], message["para_id"]), []).append(message)
+    db[INBOX].bulk_write(
+        [
+            UpdateOne(
+                {"_id": inbox_id(*pair)},
+                {
+                    "$inc": {"mensagens": len(sent), "nao_lidas.paciente": len(sent)},
+                    "$set": {"ultima": preview(sent[-1])},
+                    "$currentDate": {UPDATED_AT_FIELD: True},
+                    "$setOnInsert": {
+                        "nutricionista": sent[-1]["de"],
+                        "paciente": sent[-1]["para"],
+                        "nao_lidas.nutricionista": 0,
+                    },
+                },
+                upsert=True,
+            )
+            for pair, sent in by_pair.items()
+        ],
+        ordered=False,
+    )
+
+
+def _append_to_graph(db, store, messages, new):
+    """Acrescenta às conversas os lembretes que ainda não estão no grafo.
+
+    Uma leitura confere o lote inteiro e cada conversa recebe os seus
+    lembretes numa só transação.
+    """
+    absent = set(store.missing_nodes("Mensagem", [m["_id"] for m in messages]))
+    missing = [m for m in messages if m["_id"] in absent]
+    # Um lembrete de uma execução anterior vai para o grafo como foi gravado
+    written = {message["_id"]: message for message in new}
+    earlier = [m["_id"] for m in missing if m["_id"] not in written]
+    if earlier:
+        written.update(
+            (doc["_id"], doc) for doc in db.messages.find({"_id": {"$in": earlier}})
+        )
+    by_pair = {}
+    for message in missing:
+        message = written[message["_id"]]
+        by_pair.setdefault((message["de_id"], message["para_id"]), []).append(
+            graph_message(message)
+        )
+    for (nutritionist_id, patient_id), batch in by_pair.items():
+        store.append_messages(nutritionist_id, patient_id, "Nutricionista", batch)
+    return len(missing)
+
+
+def send_reminders(db, store=None, now=None, hours=HOURS, chunk_size=CHUNK_SIZE):
+    """Gera os lembretes das consultas das próximas ``hours`` horas.
+
+    Retorna {"consultas": lidas, "mensagens": novas em messages,
+    "grafo": novos nós Mensagem}. Sem ``store`` só o MongoDB é escrito.
+    """
+    now = now or datetime.now()
+    totals = {"consultas": 0, "mensagens": 0, "grafo": 0}
+    appointments = due_appointments(db, now, hours, chunk_size)
+    for chunk in iter_batches(appointments, chunk_size):
+        messages = [reminder_message(appointment, now) for appointment in chunk]
+        new = _write_messages(db, messages)
+        if new:
+            _update_inbox(db, new)
+        totals["consultas"] += len(chunk)
+        totals["mensagens"] += len(new)
+        if store is not None:
+            # Todos do lote, não só os novos: o grafo pode ter ficado para trás
+            # se a execução anterior parou entre os dois bancos
+            totals["grafo"] += _append_to_graph(db, store, messages, new)
+        count(len(new), skipped=len(chunk) - len(new))
+    return totals
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Gera lembretes das próximas consultas agendadas."
+    )
+    parser.add_argument(
+        "--hours",
+        type=int,
+        default=HOURS,
+        help=f"Janela em horas a partir de agora (padrão: {HOURS})",
+    )
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument(
+        "--no-graph", action="store_true", help="Não escreve os nós Mensagem no Neo4j"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    from neo4j import GraphDatabase
+    from pymongo import MongoClient
+
+    from load_data import NEO4J_PASSWORD, NEO4J_URI, NEO4J_USER, Neo4jGraphStore
+    from load_mongodb_data import MONGO_DB, MONGO_URI
+
+    run = start_run("reminders")
+    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
+    driver = (
+        None
+        if args.no_graph
+        else GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+    )
+    try:
+        with phase("lembretes"):
+            if driver is None:
+                totals = send_reminders(
+                    client[MONGO_DB], hours=args.hours, chunk_size=args.chunk_size
+                )
+            else:
+                with driver.session() as session:
+                    totals = send_reminders(
+                        client[MONGO_DB],
+                        Neo4jGraphStore(session),
+                        hours=args.hours,
+                        chunk_size=args.chunk_size,
+                    )
+        log(
+            f"{totals['consultas']} consulta(s) nas próximas {args.hours} h: "
+            f"{totals['mensagens']} lembrete(s) novo(s) no MongoDB, "
+            f"{totals['grafo']} no Neo4j"
+        )
+        return True
+    except Exception as e:
+        print(f"Erro ao gerar os lembretes: {str(e)}")
+        return False
+    finally:
+        client.close()
+        if driver is not None:
+            driver.close()
+        run.write()
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,285 @@
+"""
+Agenda dos nutricionistas: conflitos, horários livres e marcação de consultas.
+
+Um documento de ``appointments`` só tem ``data``, ``hora`` e ``status``;
+nada impedia marcar duas consultas no mesmo horário do mesmo nutricionista.
+``Schedule`` mantém, por nutricionista, um índice de intervalos em listas
+ordenadas pelo início, carregado uma vez do MongoDB (``Schedule.from_mongodb``):
+
+- ``conflicts`` acha as consultas que se sobrepõem a um intervalo com duas
+  buscas binárias (O(log n + k));
+- ``free_slots`` lista os intervalos livres de um dia no horário de
+  atendimento, a partir das mesmas buscas;
+- ``book`` recebe um lote de pedidos, recusa os que conflitam com a agenda ou
+  entre si e grava os aceitos.
+
+As consultas ocupam ``duracao`` minutos (DEFAULT_DURATION sem o campo); só as
+com status em BLOCKING ocupam a agenda.
+
+Concorrência otimista: cada nutricionista tem um documento em ``agendas`` com
+um número de versão. ``book`` insere as consultas e depois avança a versão
+com ``update_one({"_id": nutricionista, "versao": lida}, {"$inc": ...})``
+(upsert: a primeira marcação cria a agenda com a versão 1); se
+outro processo marcou algo nesse meio tempo, a versão não bate, as consultas
+inseridas são apagadas e a agenda daquele nutricionista é relida do banco
+antes de tentar de novo (até MAX_RETRIES vezes). Ids duplicados (outro
+processo usou o mesmo ``_id``) também fazem reler e tentar de novo.
+"""
+
+from bisect import bisect_left, bisect_right
+from datetime import datetime, time, timedelta
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from extended_references import embed_references
+from mongo_inbox import PARTICIPANT_COLLECTIONS
+from sync import UPDATED_AT_FIELD
+
+AGENDAS = "agendas"
+BOOKED = "Agendada"
+BLOCKING = ("Agendada", "Realizada")
+DEFAULT_DURATION = 60  # minutos
+OPENING = time(8, 0)
+CLOSING = time(18, 0)
+MAX_RETRIES = 5
+
+
+class ScheduleConflict(RuntimeError):
+    """A agenda mudou no banco em todas as tentativas de gravar o lote."""
+
+
+def interval(document):
+    """(início, fim) de uma consulta, como datetime"""
+    hour, minute = map(int, document["hora"].split(":"))
+    start = datetime.combine(document["data"].date(), time(hour, minute))
+    return start, start + timedelta(minutes=document.get("duracao", DEFAULT_DURATION))
+
+
+def as_datetime(day):
+    """O dia (date ou datetime) à meia-noite, como ``data`` é gravado"""
+    return datetime.combine(day.date() if isinstance(day, datetime) else day, time())
+
+
+class NutritionistSchedule:
+    """Consultas de um nutricionista em listas ordenadas pelo início.
+
+    ``_reach`` guarda, para cada posição, o maior fim até ela: com ele a
+    busca do primeiro intervalo que pode tocar um horário é binária mesmo
+    que a agenda já tenha sobreposições antigas.
+    """
+
+    def __init__(self, version=0):
+        self.version = version
+        self._starts = []
+        self._ends = []
+        self._ids = []
+        self._reach = []
+
+    def __len__(self):
+        return len(self._starts)
+
+    def add(self, appointment_id, start, end):
+        index = bisect_right(self._starts, start)
+        self._starts.insert(index, start)
+        self._ends.insert(index, end)
+        self._ids.insert(index, appointment_id)
+        self._reach.insert(index, max(end, self._reach[index - 1]) if index else end)
+        for i in range(index + 1, len(self._reach)):
+            if self._reach[i] >= end:
+                break
+            self._reach[i] = end
+
+    def conflicts(self, start, end):
+        """Ids das consultas que se sobrepõem a [start, end)"""
+        first = bisect_right(self._reach, start)
+        last = bisect_left(self._starts, end)
+        return [self._ids[i] for i in range(first, last) if self._ends[i] > start]
+
+    def busy(self, start, end):
+        """Intervalos ocupados que tocam [start, end), em ordem de início"""
+        first = bisect_right(self._reach, start)
+        last = bisect_left(self._starts, end)
+        return [
+            (self._starts[i], self._ends[i])
+            for i in range(first, last)
+            if self._ends[i] > start
+        ]
+
+    def free_slots(
+        self, day, duration=DEFAULT_DURATION, opening=OPENING, closing=CLOSING
+    ):
+        """Intervalos livres de pelo menos ``duration`` minutos no dia"""
+        cursor = datetime.combine(as_datetime(day).date(), opening)
+        closes = datetime.combine(cursor.date(), closing)
+        needed = timedelta(minutes=duration)
+        slots = []
+        for start, end in self.busy(cursor, closes) + [(closes, closes)]:
+            if start - cursor >= needed:
+                slots.append((cursor, start))
+            cursor = max(cursor, end)
+        return slots
+
+
+class Schedule:
+    """Índice de intervalos de todos os nutricionistas, ligado a um banco."""
+
+    def __init__(self, db):
+        self.db = db
+        self.nutritionists = {}
+        self._next_id = 1
+
+    @classmethod
+    def from_mongodb(cls, db):
+        """Lê as consultas que ocupam a agenda e as versões das agendas."""
+        schedule = cls(db)
+        schedule._load()
+        return schedule
+
+    def _load(self, nutritionist_id=None):
+        query = {"status": {"$in": list(BLOCKING)}}
+        versions = {}
+        if nutritionist_id is None:
+            self.nutritionists = {}
+            versions = {doc["_id"]: doc["versao"] for doc in self.db[AGENDAS].find()}
+        else:
+            query["nutricionista_id"] = nutritionist_id
+            agenda = self.db[AGENDAS].find_one({"_id": nutritionist_id})
+            versions[nutritionist_id] = agenda["versao"] if agenda else 0
+            self.nutritionists[nutritionist_id] = NutritionistSchedule()
+        projection = {"nutricionista_id": 1, "data": 1, "hora": 1, "duracao": 1}
+        for doc in self.db.appointments.find(query, projection):
+            self.agenda(doc["nutricionista_id"]).add(doc["_id"], *interval(doc))
+        for key, version in versions.items():
+            self.agenda(key).version = version
+        last = self.db.appointments.find_one({}, {"_id": 1}, sort=[("_id", -1)])
+        self._next_id = last["_id"] + 1 if last else 1
+
+    def agenda(self, nutritionist_id):
+        if nutritionist_id not in self.nutritionists:
+            self.nutritionists[nutritionist_id] = NutritionistSchedule()
+        return self.nutritionists[nutritionist_id]
+
+    def conflicts(self, nutritionist_id, day, hour, duration=DEFAULT_DURATION):
+        """Ids das consultas do nutricionista que se sobrepõem ao horário"""
+        start, end = interval(
+            {"data": as_datetime(day), "hora": hour, "duracao": duration}
+        )
+        return self.agenda(nutritionist_id).conflicts(start, end)
+
+    def free_slots(self, nutritionist_id, day, duration=DEFAULT_DURATION, **hours):
+        return self.agenda(nutritionist_id).free_slots(day, duration, **hours)
+
+    def book(self, requests):
+        """Marca um lote de consultas; retorna o _id de cada uma ou None.
+
+        Cada pedido tem ``nutricionista_id``, ``paciente_id``, ``data``,
+        ``hora`` e, opcionalmente, ``duracao`` e outros campos do documento.
+        Pedidos que conflitam com a agenda ou com um pedido anterior do mesmo
+        lote são recusados (None); os outros são gravados com status
+        "Agendada", uma versão de agenda por nutricionista envolvido.
+        """
+        requests = self._with_names(requests)
+        by_nutritionist = {}
+        for position, request in enumerate(requests):
+            by_nutritionist.setdefault(request["nutricionista_id"], []).append(
+                (position, request)
+            )
+        results = [None] * len(requests)
+        for nutritionist_id, batch in by_nutritionist.items():
+            for _ in range(MAX_RETRIES):
+                accepted = self._accept(nutritionist_id, batch)
+                if self._persist(nutritionist_id, accepted):
+                    break
+                self._load(nutritionist_id)
+            else:
+                raise ScheduleConflict(
+                    f"Agenda do nutricionista {nutritionist_id} mudou em "
+                    f"{MAX_RETRIES} tentativas"
+                )
+            for position, document in accepted:
+                results[position] = document["_id"]
+        return results
+
+    def _with_names(self, requests):
+        """Pedidos com as referências estendidas; ValueError se falta alguém"""
+        participants = {}
+        for side, id_field in (
+            ("nutricionista", "nutricionista_id"),
+            ("paciente", "paciente_id"),
+        ):
+            ids = sorted({request[id_field] for request in requests})
+            participants[side] = list(
+                self.db[PARTICIPANT_COLLECTIONS[side]].find(
+                    {"_id": {"$in": ids}}, {"nome": 1}
+                )
+            )
+            missing = set(ids) - {doc["_id"] for doc in participants[side]}
+            if missing:
+                raise ValueError(f"{side} não encontrado: {sorted(missing)}")
+        return embed_references(
+            "appointments",
+            requests,
+            participants["nutricionista"],
+            participants["paciente"],
+        )
+
+    def _accept(self, nutritionist_id, batch):
+        """(posição, documento) dos pedidos sem conflito, com _id reservado"""
+        agenda = self.agenda(nutritionist_id)
+        taken = NutritionistSchedule()
+        accepted = []
+        for position, request in batch:
+            document = {
+                **request,
+                "data": as_datetime(request["data"]),
+                "status": BOOKED,
+            }
+            document.setdefault("duracao", DEFAULT_DURATION)
+            start, end = interval(document)
+            if agenda.conflicts(start, end) or taken.conflicts(start, end):
+                continue
+            document["_id"] = self._next_id + len(accepted)
+            taken.add(document["_id"], start, end)
+            accepted.append((position, document))
+        return accepted
+
+    def _persist(self, nutritionist_id, accepted):
+        """Grava o lote e avança a versão; False se a agenda mudou no banco."""
+        if not accepted:
+            return True
+        agenda = self.agenda(nutritionist_id)
+        documents = [document for _, document in accepted]
+        ids = [document["_id"] for document in documents]
+        try:
+            self.db.appointments.insert_many(documents)
+        except BulkWriteError as error:
+            # Outro processo usou um desses _id; as inseridas antes dele são nossas
+            self._delete(ids[: error.details["nInserted"]])
+            return False
+        try:
+            self.db[AGENDAS].update_one(
+                {"_id": nutritionist_id, "versao": agenda.version},
+                {"$inc": {"versao": 1}, "$currentDate": {UPDATED_AT_FIELD: True}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            # A agenda existe com outra versão: alguém marcou antes
+            self._delete(ids)
+            return False
+        self.db.appointments.bulk_write(
+            [
+                UpdateOne({"_id": key}, {"$currentDate": {UPDATED_AT_FIELD: True}})
+                for key in ids
+            ],
+            ordered=False,
+        )
+        agenda.version += 1
+        for document in documents:
+            agenda.add(document["_id"], *interval(document))
+        self._next_id = max(self._next_id, ids[-1] + 1)
+        return True
+
+    def _delete(self, ids):
+        if ids:
+            self.db.appointments.delete_many({"_id": {"$in": ids}})
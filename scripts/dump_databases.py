@@ -3,12 +3,60 @@
 Script para geração automática de dumps do Neo4j e MongoDB.
 Este script é uma alternativa à utilização do Makefile para ambientes
 onde não é possível executar comandos make.
+
+Os dois dumps rodam em paralelo e, por padrão, são lógicos: ``neo4j_dump.py``
+e ``mongo_dump.py`` leem os bancos online pelos drivers (``NEO4J_URI`` e
+``MONGO_URI``), sem Docker, ``neo4j-admin`` nem ``mongodump``, e por isso
+também rodam em CI. A compressão é zstd quando o pacote ``zstandard`` está
+instalado ou gzip caso contrário. O ``manifest.json`` de cada dump lógico
+registra o tamanho e o SHA-256 de cada chunk, conferidos na importação.
+
+``--neo4j-mode admin`` e ``--mongodb-mode archive`` usam as ferramentas dos
+containers (``neo4j-admin database dump --to-stdout`` e ``mongodump
+--archive``): a saída é transmitida ao host por um pipe e comprimida no
+caminho, sem cópia intermediária, e ao lado do dump é gravado um manifesto
+JSON com o checksum SHA-256, os tamanhos e os tempos.
+
+Com ``--store <repositório>`` os dumps vão, sem compressão, para o
+repositório deduplicado de ``dump_store.py`` em vez de arquivos com
+timestamp: cada dump vira um snapshot que só ocupa os chunks novos.
+
+Para restaurar:
+    python neo4j_dump.py import dumps/neo4j/<dump> --drop
+    python mongo_dump.py import dumps/mongodb/<dump> --drop
+    zstd -dc dumps/mongodb/<dump>.archive.zst | docker exec -i diet_app_mongodb \\
+        mongorestore --uri "$MONGO_URI" --archive
 """
 
-import subprocess
-import os
+import argparse
 import datetime
+import gzip
+import hashlib
+import json
+import os
+import subprocess
 import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+CHUNK_SIZE = 1024 * 1024  # bytes lidos do pipe por vez
+COMPRESSIONS = ("zstd", "gzip")
+DEFAULT_COMPRESSION = "zstd" if zstandard is not None else "gzip"
+NEO4J_MODES = ("logical", "admin")
+MONGODB_MODES = ("logical", "archive")
+
+# Raiz do projeto, onde ficam mongo_dump.py e os loaders
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+NEO4J_CONTAINER = "diet_app_neo4j"
+MONGODB_CONTAINER = "diet_app_mongodb"
 
 
 def print_header(message):
@@ -33,7 +81,7 @@ def check_docker_container(container_name):
             check=True,
         )
         return bool(result.stdout.strip())
-    except subprocess.SubprocessError:
+    except (subprocess.SubprocessError, FileNotFoundError):
         return False
 
 
@@ -43,115 +91,377 @@ def create_directory(directory):
     print(f"Diretório '{directory}' disponível.")
 
 
-def dump_neo4j():
-    """Cria um dump do banco Neo4j."""
+class _HashingWriter:
+    """Arquivo de saída que calcula o SHA-256 e o tamanho do que é gravado."""
+
+    def __init__(self, f):
+        self._f = f
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self.sha256.update(data)
+        self.size += len(data)
+        return self._f.write(data)
+
+    def flush(self):
+        self._f.flush()
+
+
+def _compressor(compression, raw):
+    """Abre um fluxo de compressão sobre o arquivo de saída."""
+    if compression == "zstd":
+        if zstandard is None:
+            raise ValueError("Compressão zstd requer o pacote 'zstandard'.")
+        return zstandard.ZstdCompressor(threads=-1).stream_writer(raw, closefd=False)
+    if compression == "gzip":
+        # mtime fixo para que o mesmo conteúdo gere o mesmo checksum
+        return gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6, mtime=0)
+    raise ValueError(f"Compressão desconhecida: {compression}")
+
+
+def stream_dump(command, path, compression=DEFAULT_COMPRESSION):
+    """Executa o comando de dump e grava sua saída comprimida em path.
+
+    A saída é lida do pipe em blocos e comprimida à medida que chega; o
+    arquivo só recebe o nome final quando o comando termina com sucesso.
+    Retorna o manifesto do dump.
+    """
+    started_at = datetime.datetime.now()
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    tmp_path = f"{path}.part"
+    raw_bytes = 0
+
+    try:
+        with open(tmp_path, "wb") as f:
+            output = _HashingWriter(f)
+            with subprocess.Popen(command, stdout=subprocess.PIPE) as process:
+                with _compressor(compression, output) as compressed:
+                    while True:
+                        chunk = process.stdout.read(CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        raw_bytes += len(chunk)
+                        compressed.write(chunk)
+            if process.returncode != 0:
+                # Só o início do comando, para não expor credenciais no log
+                raise subprocess.CalledProcessError(process.returncode, command[:4])
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    seconds = time.perf_counter() - start
+    manifest = {
+        "file": os.path.basename(path),
+        "compression": compression,
+        "sha256": output.sha256.hexdigest(),
+        "raw_bytes": raw_bytes,
+        "compressed_bytes": output.size,
+        "ratio": round(raw_bytes / output.size, 2) if output.size else None,
+        "started_at": started_at.isoformat(timespec="seconds"),
+        "seconds": round(seconds, 3),
+        "cpu_seconds": round(time.process_time() - cpu_start, 3),
+        "throughput_mib_s": round(raw_bytes / seconds / 2**20, 2)
+        if seconds
+        else None,
+    }
+    with open(f"{path}.manifest.json", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def stream_to_store(command, store, name, filename):
+    """Executa o comando de dump e grava sua saída como snapshot no repositório.
+
+    A saída é cortada em chunks à medida que chega do pipe; o snapshot só
+    passa a existir quando o comando termina com sucesso (chunks de uma
+    execução interrompida ficam órfãos e saem no próximo gc).
+    """
+    with subprocess.Popen(command, stdout=subprocess.PIPE) as process:
+        entry = store.add_stream(process.stdout, filename)
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, command[:4])
+    return store.commit(name, [entry], source=" ".join(command[:4]))
+
+
+def _store_message(manifest):
+    return (
+        f"snapshot {manifest['name']}, {manifest['size']} bytes, "
+        f"{manifest['stored_bytes']} bytes novos"
+    )
+
+
+def logical_dump(database, dumps_dir, name, compression, store, export):
+    """Executa um dump lógico em dumps_dir/name ou como snapshot no repositório.
+
+    ``export(diretório, compressão)`` grava o dump e retorna um resumo para a
+    mensagem final. Com repositório, o dump é gravado sem compressão em um
+    diretório temporário, que o repositório deduplica e comprime por chunk.
+    """
+    if store is not None:
+        staging = tempfile.TemporaryDirectory(prefix=f"{name}_")
+        directory, compression = staging.name, "none"
+    else:
+        staging = None
+        directory = f"{dumps_dir}/{name}"
+        create_directory(dumps_dir)
+
+    try:
+        print(f"Exportando dump lógico do {database} para {directory}...")
+        summary = export(directory, compression)
+        if store is not None:
+            summary = _store_message(store.snapshot(directory, name))
+            directory = store.root
+    finally:
+        if staging is not None:
+            staging.cleanup()
+
+    print(f"Dump do {database} criado com sucesso: {directory} ({summary})")
+    return True
+
+
+def _suffix(compression):
+    return ".zst" if compression == "zstd" else ".gz"
+
+
+def dump_neo4j(compression=DEFAULT_COMPRESSION, mode="logical", store=None):
+    """Cria um dump do banco Neo4j, lógico (padrão) ou pelo neo4j-admin."""
     print_header("GERANDO DUMP DO NEO4J")
 
-    container_name = "diet_app_neo4j"
+    if mode == "admin":
+        return dump_neo4j_admin(compression, store)
+
+    from neo4j import GraphDatabase
+    from neo4j.exceptions import Neo4jError, ServiceUnavailable
+
+    from load_data import NEO4J_PASSWORD, NEO4J_URI, NEO4J_USER
+    from neo4j_dump import export_database
+
+    def export(directory, compression):
+        manifest = export_database(driver, directory, compression=compression)
+        return f"{len(manifest['nodes'])} rótulos em {manifest['seconds']}s"
+
+    driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+    try:
+        return logical_dump(
+            "Neo4j",
+            "./dumps/neo4j",
+            f"neo4j_dump_{create_timestamp()}",
+            compression,
+            store,
+            export,
+        )
+    except (Neo4jError, ServiceUnavailable, OSError) as e:
+        print(f"Erro ao criar dump do Neo4j: {e}")
+        return False
+    finally:
+        driver.close()
+
+
+def dump_neo4j_admin(compression=DEFAULT_COMPRESSION, store=None):
+    """Cria um dump com o neo4j-admin do container, transmitido e comprimido até o host."""
     dumps_dir = "./dumps/neo4j"
-    timestamp = create_timestamp()
-    filename = f"neo4j_dump_{timestamp}.dump"
+    name = f"neo4j_dump_{create_timestamp()}"
+    filename = f"{name}.dump{_suffix(compression)}"
 
-    if not check_docker_container(container_name):
-        print(f"Erro: Container {container_name} não está em execução.")
+    if not check_docker_container(NEO4J_CONTAINER):
+        print(f"Erro: Container {NEO4J_CONTAINER} não está em execução.")
         return False
 
     create_directory(dumps_dir)
 
-    try:
-        # Criar o dump dentro do container
-        print("Executando comando de dump no container Neo4j...")
-        dump_cmd = [
-            "docker", "exec", container_name,
-            "neo4j-admin", "database", "dump", "neo4j",
-            "--to-path=/var/lib/neo4j/import"
-        ]
-        subprocess.run(dump_cmd, check=True)
-        # Copiar o dump para o host
-        print(f"Copiando dump para {dumps_dir}/{filename}...")
-        copy_cmd = [
-            "docker", "cp",
-            f"{container_name}:/var/lib/neo4j/import/{filename}",
-            f"{dumps_dir}/{filename}"
-        ]
-        subprocess.run(copy_cmd, check=True)
-
-        print(f"Dump do Neo4j criado com sucesso: {dumps_dir}/{filename}")
+    dump_cmd = [
+        "docker",
+        "exec",
+        NEO4J_CONTAINER,
+        "neo4j-admin",
+        "database",
+        "dump",
+        "neo4j",
+        "--to-stdout",
+    ]
+    if store is not None:
+        try:
+            manifest = stream_to_store(dump_cmd, store, name, "neo4j.dump")
+        except (subprocess.SubprocessError, OSError) as e:
+            print(f"Erro ao criar dump do Neo4j: {e}")
+            return False
+        print(f"Dump do Neo4j criado com sucesso: {_store_message(manifest)}")
         return True
-    except subprocess.SubprocessError as e:
+
+    try:
+        print(f"Transmitindo dump do Neo4j para {dumps_dir}/{filename}...")
+        manifest = stream_dump(dump_cmd, f"{dumps_dir}/{filename}", compression)
+    except (subprocess.SubprocessError, OSError) as e:
         print(f"Erro ao criar dump do Neo4j: {e}")
         return False
 
+    print(
+        f"Dump do Neo4j criado com sucesso: {dumps_dir}/{filename} "
+        f"({manifest['compressed_bytes']} bytes em {manifest['seconds']}s)"
+    )
+    return True
+
 
-def dump_mongodb():
-    """Cria um dump do banco MongoDB."""
+def dump_mongodb(compression=DEFAULT_COMPRESSION, mode="logical", store=None):
+    """Cria um dump do banco MongoDB, lógico (padrão) ou pelo mongodump."""
     print_header("GERANDO DUMP DO MONGODB")
 
-    container_name = "diet_app_mongodb"
+    if mode == "archive":
+        return dump_mongodb_archive(compression, store)
+
+    from pymongo import MongoClient
+    from pymongo.errors import PyMongoError
+
+    from load_mongodb_data import MONGO_DB, MONGO_URI
+    from mongo_dump import export_database
+
+    def export(directory, compression):
+        manifest = export_database(client[MONGO_DB], directory, compression=compression)
+        return f"{len(manifest['collections'])} coleções em {manifest['seconds']}s"
+
+    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
+    try:
+        return logical_dump(
+            "MongoDB",
+            "./dumps/mongodb",
+            f"mongodb_dump_{create_timestamp()}",
+            compression,
+            store,
+            export,
+        )
+    except (PyMongoError, OSError) as e:
+        print(f"Erro ao criar dump do MongoDB: {e}")
+        return False
+    finally:
+        client.close()
+
+
+def dump_mongodb_archive(compression=DEFAULT_COMPRESSION, store=None):
+    """Cria um dump com o mongodump do container, transmitido e comprimido até o host."""
+    from load_mongodb_data import MONGO_DB, MONGO_URI
+
     dumps_dir = "./dumps/mongodb"
-    timestamp = create_timestamp()
-    directory = f"mongodb_dump_{timestamp}"
+    name = f"mongodb_dump_{create_timestamp()}"
+    filename = f"{name}.archive{_suffix(compression)}"
 
-    if not check_docker_container(container_name):
-        print(f"Erro: Container {container_name} não está em execução.")
+    if not check_docker_container(MONGODB_CONTAINER):
+        print(f"Erro: Container {MONGODB_CONTAINER} não está em execução.")
         return False
 
     create_directory(dumps_dir)
 
-    try:
-        # Criar o dump dentro do container
-        print("Executando comando de dump no container MongoDB...")
-        dump_cmd = [
-            "docker", "exec", container_name,
-            "mongodump", "--username", "admin", "--password", "senha123",
-            "--authenticationDatabase", "admin", "--db", "diet_app",
-            f"--out=/data/db/{directory}"
-        ]
-        subprocess.run(dump_cmd, check=True)
-
-        # Copiar o dump para o host
-        print(f"Copiando dump para {dumps_dir}/{directory}...")
-        copy_cmd = [
-            "docker", "cp",
-            f"{container_name}:/data/db/{directory}",
-            f"{dumps_dir}/{directory}"
-        ]
-        subprocess.run(copy_cmd, check=True)
-
-        print(f"Dump do MongoDB criado com sucesso: {dumps_dir}/{directory}")
+    # A URI (com as credenciais) vem do ambiente, como nos loaders
+    dump_cmd = [
+        "docker",
+        "exec",
+        MONGODB_CONTAINER,
+        "mongodump",
+        "--uri",
+        MONGO_URI,
+        "--db",
+        MONGO_DB,
+        "--archive",
+    ]
+    if store is not None:
+        try:
+            manifest = stream_to_store(dump_cmd, store, name, "mongodb.archive")
+        except (subprocess.SubprocessError, OSError) as e:
+            print(f"Erro ao criar dump do MongoDB: {e}")
+            return False
+        print(f"Dump do MongoDB criado com sucesso: {_store_message(manifest)}")
         return True
-    except subprocess.SubprocessError as e:
+
+    try:
+        print(f"Transmitindo dump do MongoDB para {dumps_dir}/{filename}...")
+        manifest = stream_dump(dump_cmd, f"{dumps_dir}/{filename}", compression)
+    except (subprocess.SubprocessError, OSError) as e:
         print(f"Erro ao criar dump do MongoDB: {e}")
         return False
 
-
-def main():
+    print(
+        f"Dump do MongoDB criado com sucesso: {dumps_dir}/{filename} "
+        f"({manifest['compressed_bytes']} bytes em {manifest['seconds']}s)"
+    )
+    return True
+
+
+DUMPERS = {"neo4j": dump_neo4j, "mongodb": dump_mongodb}
+
+
+def parse_args(argv=None):
+    """Lê as opções de linha de comando."""
+    parser = argparse.ArgumentParser(description="Gera dumps do Neo4j e do MongoDB.")
+    parser.add_argument(
+        "banco",
+        nargs="?",
+        type=str.lower,
+        choices=sorted(DUMPERS),
+        help="banco a exportar (padrão: ambos, em paralelo)",
+    )
+    parser.add_argument(
+        "--compression",
+        choices=COMPRESSIONS,
+        default=DEFAULT_COMPRESSION,
+        help=f"algoritmo de compressão (padrão: {DEFAULT_COMPRESSION})",
+    )
+    parser.add_argument(
+        "--neo4j-mode",
+        choices=NEO4J_MODES,
+        default="logical",
+        help="logical: neo4j_dump.py via driver, online (padrão); "
+        "admin: neo4j-admin no container",
+    )
+    parser.add_argument(
+        "--mongodb-mode",
+        choices=MONGODB_MODES,
+        default="logical",
+        help="logical: mongo_dump.py via pymongo (padrão); "
+        "archive: mongodump no container",
+    )
+    parser.add_argument(
+        "--store",
+        type=Path,
+        help="grava os dumps como snapshots no repositório deduplicado "
+        "(ver dump_store.py), em vez de arquivos com timestamp",
+    )
+    return parser.parse_args(argv)
+
+
+def run_dumper(name, args):
+    """Executa o dump de um banco com as opções da linha de comando."""
+    from dump_store import ChunkStore
+
+    store = ChunkStore(args.store) if args.store else None
+    mode = args.mongodb_mode if name == "mongodb" else args.neo4j_mode
+    return DUMPERS[name](args.compression, mode, store)
+
+
+def main(argv=None):
     """Função principal que coordena a geração de dumps."""
+    args = parse_args(argv)
     print_header("GERADOR DE DUMPS - SISTEMA DE ACOMPANHAMENTO DE DIETAS")
 
     # Determinar quais bancos incluir no dump
-    if len(sys.argv) > 1:
-        if sys.argv[1].lower() == "neo4j":
-            return dump_neo4j()
-        elif sys.argv[1].lower() == "mongodb":
-            return dump_mongodb()
-        else:
-            print(f"Erro: Banco '{sys.argv[1]}' não reconhecido.")
-            print("Uso: python dump_databases.py [neo4j|mongodb]")
-            return False
+    if args.banco:
+        return run_dumper(args.banco, args)
 
-    # Se nenhum banco for especificado, fazer dump de ambos
-    neo4j_success = dump_neo4j()
-    mongodb_success = dump_mongodb()
+    # Se nenhum banco for especificado, fazer dump de ambos em paralelo
+    with ThreadPoolExecutor(max_workers=len(DUMPERS)) as executor:
+        futures = {name: executor.submit(run_dumper, name, args) for name in DUMPERS}
+        results = {name: future.result() for name, future in futures.items()}
 
     # Exibir resumo final
     print_header("RESUMO DOS DUMPS")
-    print(f"Neo4j: {'SUCESSO' if neo4j_success else 'FALHA'}")
-    print(f"MongoDB: {'SUCESSO' if mongodb_success else 'FALHA'}")
+    print(f"Neo4j: {'SUCESSO' if results['neo4j'] else 'FALHA'}")
+    print(f"MongoDB: {'SUCESSO' if results['mongodb'] else 'FALHA'}")
 
-    return neo4j_success and mongodb_success
+    return all(results.values())
 
 
 if __name__ == "__main__":
     success = main()
-    sys.exit(0 if success else 1)
\ No newline at end of file
+    sys.exit(0 if success else 1)
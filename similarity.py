@@ -0,0 +1,489 @@
+"""
+Pacientes parecidos: vetores de características e k vizinhos mais próximos.
+
+Nada no projeto relaciona pacientes além de um plano em comum. Aqui cada
+paciente vira uma linha de uma matriz NumPy com as características de
+FEATURES:
+
+- a distribuição das calorias entre proteínas, carboidratos e gorduras dos
+  alimentos das refeições (de ``alimentos`` e dos ingredientes das
+  ``receitas``; as quantidades são texto livre, então cada alimento conta
+  uma porção);
+- as calorias médias por dia e a taxa de adesão (``analytics.MealColumns``);
+- a trajetória do peso: a inclinação da reta por semana e a variação total,
+  relativas ao primeiro peso (``progress.trend``).
+
+As colunas são padronizadas (média 0, desvio 1; o ausente vira a média) e
+as linhas normalizadas, para que a similaridade do cosseno seja um produto
+escalar. ``top_k`` acha os vizinhos em multiplicações por blocos: um bloco
+de QUERY_BLOCK pacientes contra faixas de candidatos, com no máximo
+``block_elements`` similaridades em memória por vez, guardando só os k
+melhores de cada linha. A matriz n x n nunca existe, e os blocos podem ser
+repartidos entre processos (``workers``).
+
+``SimilarityIndex`` guarda os vizinhos de todos os pacientes e os atualiza
+de forma incremental: quando os vetores de alguns pacientes mudam (ou
+chegam pacientes novos), só as similaridades com eles são calculadas, e as
+listas dos demais são refeitas por intercalação. As listas guardam ``slack``
+vizinhos a mais; uma lista que fica com menos de k vizinhos confiáveis é
+recalculada por inteiro.
+
+Uso::
+
+    index = SimilarityIndex.from_mongodb(db)
+    index.neighbours_of(1)                      # [(paciente, similaridade), ...]
+    plan_suggestions(index, 1, patient_plans(db), successful_patients(meals))
+    index.update(ids, raw)                      # vetores novos de alguns pacientes
+"""
+
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import numpy as np
+
+from analytics import ADHERENCE_THRESHOLD, MealColumns, MeasurementColumns, group_starts
+from mongo_dump import CURSOR_BATCH_SIZE
+from progress import trend
+
+FEATURES = (
+    "protein_share",
+    "carbs_share",
+    "fat_share",
+    "daily_calories",
+    "adherence",
+    "weight_slope",
+    "weight_change",
+)
+K = 10
+SLACK = 5
+QUERY_BLOCK = 256
+BLOCK_ELEMENTS = 1 << 22  # similaridades por bloco (16 MiB em float32)
+SEED_WIDTH = 512
+# kcal por grama de proteína, carboidrato e gordura
+ENERGY = np.array([4.0, 4.0, 9.0])
+
+
+# --- características ---
+
+
+def _align(ids, keys, values):
+    """Valores das chaves ``keys`` nas posições de ``ids`` (NaN sem valor)."""
+    keys = np.asarray(keys, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64)
+    result = np.full((len(ids),) + values.shape[1:], np.nan)
+    if not len(keys):
+        return result
+    order = np.argsort(keys, kind="stable")
+    keys, values = keys[order], values[order]
+    positions = np.minimum(np.searchsorted(keys, ids), len(keys) - 1)
+    found = keys[positions] == ids
+    result[found] = values[positions[found]]
+    return result
+
+
+def macro_shares(db):
+    """Por paciente: (ids, fração das calorias de proteína, carboidrato e gordura)."""
+    foods = list(db.foods.find({}, {"proteinas": 1, "carboidratos": 1, "gorduras": 1}))
+    food_ids = np.array([doc["_id"] for doc in foods], dtype=np.int64)
+    grams = np.array(
+        [
+            [doc.get(name) or 0 for name in ("proteinas", "carboidratos", "gorduras")]
+            for doc in foods
+        ],
+        dtype=np.float64,
+    ).reshape(-1, 3)
+    ingredients = {
+        doc["_id"]: [item["food_id"] for item in doc.get("ingredientes") or []]
+        for doc in db.recipes.find({}, {"ingredientes": 1})
+    }
+
+    patients, eaten = [], []
+    cursor = db.meals.find(
+        {}, {"paciente_id": 1, "alimentos": 1, "receitas": 1}
+    ).batch_size(CURSOR_BATCH_SIZE)
+    try:
+        for meal in cursor:
+            items = list(meal.get("alimentos") or [])
+            for recipe_id in meal.get("receitas") or []:
+                items.extend(ingredients.get(recipe_id, []))
+            patients.extend([meal["paciente_id"]] * len(items))
+            eaten.extend(items)
+    finally:
+        cursor.close()
+
+    energy = _align(np.asarray(eaten, dtype=np.int64), food_ids, grams * ENERGY)
+    energy = np.nan_to_num(energy)
+    ids, inverse = np.unique(np.asarray(patients, dtype=np.int64), return_inverse=True)
+    totals = np.zeros((len(ids), 3))
+    np.add.at(totals, inverse, energy)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return ids, totals / totals.sum(axis=1, keepdims=True)
+
+
+def feature_matrix(ids, meals, measurements, macros):
+    """Matriz (len(ids) x len(FEATURES)) das características, NaN onde falta.
+
+    ``macros`` é o (ids, frações) de ``macro_shares``.
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    matrix = np.full((len(ids), len(FEATURES)), np.nan)
+    matrix[:, 0:3] = _align(ids, *macros)
+
+    day_patients, _, day_totals = meals.daily_calories()
+    starts = group_starts(day_patients)
+    if len(starts):
+        days = np.diff(np.append(starts, len(day_patients)))
+        average = np.add.reduceat(day_totals, starts) / days
+        matrix[:, 3] = _align(ids, day_patients[starts], average)
+    patients, _, _, rates = meals.adherence()
+    matrix[:, 4] = _align(ids, patients, rates)
+
+    patients, _, _, slope = trend(measurements)
+    _, first, change = measurements.weight_change()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        matrix[:, 5] = _align(ids, patients, slope / first * 100)
+        matrix[:, 6] = _align(ids, patients, change / first * 100)
+    return matrix
+
+
+def fit_scale(raw):
+    """(média, desvio) de cada coluna, ignorando ausentes; desvio 1 se constante."""
+    if not len(raw):
+        return np.zeros(raw.shape[1]), np.ones(raw.shape[1])
+    with warnings.catch_warnings():
+        # Coluna sem nenhum valor: nanmean avisa e devolve NaN
+        warnings.simplefilter("ignore", RuntimeWarning)
+        center = np.nanmean(raw, axis=0)
+        spread = np.nanstd(raw, axis=0)
+    center = np.nan_to_num(center)
+    spread = np.where(np.isfinite(spread) & (spread > 0), spread, 1.0)
+    return center, spread
+
+
+def normalize(raw, center, spread):
+    """Linhas padronizadas e de norma 1 (float32); ausente vira a média."""
+    scaled = np.nan_to_num((np.asarray(raw, dtype=np.float64) - center) / spread)
+    norms = np.linalg.norm(scaled, axis=1, keepdims=True)
+    return (scaled / np.where(norms > 0, norms, 1.0)).astype(np.float32)
+
+
+# --- vizinhos ---
+
+
+def _merge(best_idx, best, idx, scores, k):
+    """Os k maiores de duas listas de candidatos por linha, em ordem (-1 = vazio)."""
+    candidates_idx = np.concatenate([best_idx, idx], axis=1)
+    candidates = np.concatenate([best, scores], axis=1)
+    if candidates.shape[1] > k:
+        part = np.argpartition(-candidates, k - 1, axis=1)[:, :k]
+        candidates_idx = np.take_along_axis(candidates_idx, part, axis=1)
+        candidates = np.take_along_axis(candidates, part, axis=1)
+    order = np.argsort(-candidates, axis=1, kind="stable")
+    return (
+        np.take_along_axis(candidates_idx, order, axis=1),
+        np.take_along_axis(candidates, order, axis=1),
+    )
+
+
+def _empty(rows, k):
+    return (
+        np.full((rows, k), -1, dtype=np.int64),
+        np.full((rows, k), -np.inf, dtype=np.float32),
+    )
+
+
+def _block_candidates(scores, threshold, k):
+    """(linhas, posições, similaridades) que podem entrar nos k melhores.
+
+    Só valores acima do k-ésimo melhor de cada linha contam. Com poucos
+    desses (o normal depois das primeiras faixas), eles saem de uma
+    comparação, sem ``argpartition``; as linhas são completadas com -1/-inf.
+    """
+    above = scores > threshold[:, None]
+    counts = above.sum(axis=1)
+    hot = np.flatnonzero(counts)
+    if not len(hot):
+        return hot, None, None
+    widest = int(counts.max())
+    if widest * 4 >= scores.shape[1]:
+        scores = scores[hot]
+        part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        return hot, part, np.take_along_axis(scores, part, axis=1)
+    rows, columns = np.nonzero(above)
+    slot = np.arange(len(rows)) - (np.cumsum(counts) - counts)[rows]
+    position = np.zeros(len(scores), dtype=np.int64)
+    position[hot] = np.arange(len(hot))
+    part, values = _empty(len(hot), widest)
+    part[position[rows], slot] = columns
+    values[position[rows], slot] = scores[rows, columns]
+    return hot, part, values
+
+
+def _top_k_rows(vectors, rows, k, block_elements=BLOCK_ELEMENTS):
+    """Vizinhos das linhas ``rows`` contra todas, em faixas de candidatos."""
+    queries = vectors[rows]
+    width = max(2 * k, block_elements // max(1, len(rows)))
+    best_idx, best = _empty(len(rows), k)
+    # Uma primeira faixa estreita dá um k-ésimo melhor para filtrar as outras
+    seed = min(width, SEED_WIDTH)
+    for start, end in zip(
+        [0, *range(seed, len(vectors), width)],
+        [seed, *range(seed + width, len(vectors) + width, width)],
+    ):
+        block = vectors[start:end]
+        scores = queries @ block.T
+        own = rows - start
+        inside = (own >= 0) & (own < len(block))
+        scores[np.flatnonzero(inside), own[inside]] = -np.inf
+        if scores.shape[1] <= k:
+            hot = np.arange(len(rows))
+            part = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+            values = scores
+        else:
+            hot, part, values = _block_candidates(scores, best[:, -1], k)
+        if not len(hot):
+            continue
+        best_idx[hot], best[hot] = _merge(
+            best_idx[hot], best[hot], np.where(part >= 0, part + start, -1), values, k
+        )
+    best_idx[np.isneginf(best)] = -1
+    return best_idx, best
+
+
+_worker_vectors = None
+
+
+def _init_worker(vectors):
+    # Executado uma vez em cada processo do pool
+    global _worker_vectors
+    _worker_vectors = vectors
+
+
+def _worker_top_k(rows, k, block_elements):
+    return _top_k_rows(_worker_vectors, rows, k, block_elements)
+
+
+def top_k(vectors, k=K, rows=None, block_elements=BLOCK_ELEMENTS, workers=1):
+    """Os k vizinhos de maior cosseno de cada linha (ou das ``rows``), sem ela mesma.
+
+    Retorna (índices, similaridades), cada um len(rows) x k, da mais parecida
+    para a menos; sem vizinhos suficientes, o índice é -1 e a similaridade
+    -inf. Com ``workers`` > 1 os blocos de QUERY_BLOCK linhas são repartidos
+    entre processos.
+    """
+    rows = np.arange(len(vectors)) if rows is None else np.asarray(rows, np.int64)
+    if not len(rows) or not k:
+        return _empty(len(rows), k)
+    blocks = [rows[i : i + QUERY_BLOCK] for i in range(0, len(rows), QUERY_BLOCK)]
+    if workers <= 1 or len(blocks) == 1:
+        results = [_top_k_rows(vectors, block, k, block_elements) for block in blocks]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(vectors,)
+        ) as executor:
+            results = list(
+                executor.map(_worker_top_k, blocks, repeat(k), repeat(block_elements))
+            )
+    return (
+        np.concatenate([idx for idx, _ in results]),
+        np.concatenate([scores for _, scores in results]),
+    )
+
+
+class SimilarityIndex:
+    """Vizinhos de todos os pacientes, com atualização incremental.
+
+    Os pacientes ficam nas linhas na ordem em que chegaram; as listas de
+    vizinhos guardam posições de linha. A padronização é a do momento da
+    construção: vetores novos usam a mesma média e desvio (reconstruir o
+    índice os recalcula).
+    """
+
+    def __init__(
+        self,
+        ids,
+        raw,
+        k=K,
+        slack=SLACK,
+        block_elements=BLOCK_ELEMENTS,
+        workers=1,
+    ):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self._rows = {int(patient): row for row, patient in enumerate(self.ids)}
+        self.center, self.spread = fit_scale(np.asarray(raw, dtype=np.float64))
+        self.vectors = normalize(raw, self.center, self.spread)
+        self.k = k
+        self.stored = k + slack
+        self.block_elements = block_elements
+        self.workers = workers
+        self.neighbours, self.scores = top_k(
+            self.vectors, self.stored, None, block_elements, workers
+        )
+
+    @classmethod
+    def from_mongodb(cls, db, **options):
+        """Índice de todos os pacientes, com as características lidas do banco."""
+        ids = [doc["_id"] for doc in db.patients.find({}, {"_id": 1}).sort("_id", 1)]
+        raw = feature_matrix(
+            ids,
+            MealColumns.from_mongodb(db),
+            MeasurementColumns.from_mongodb(db),
+            macro_shares(db),
+        )
+        return cls(ids, raw, **options)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def neighbours_of(self, patient_id, k=None):
+        """[(paciente, similaridade)] dos k mais parecidos, do mais parecido."""
+        row = self._rows[patient_id]
+        k = self.k if k is None else min(k, self.stored)
+        return [
+            (int(self.ids[neighbour]), float(score))
+            for neighbour, score in zip(self.neighbours[row, :k], self.scores[row, :k])
+            if neighbour >= 0
+        ]
+
+    def update(self, ids, raw):
+        """Troca (ou acrescenta) os vetores dos pacientes ``ids``.
+
+        As listas dos pacientes alterados são recalculadas; as dos demais
+        perdem os alterados e recebem as similaridades novas com eles, em
+        blocos. Retorna quantas listas foram recalculadas por inteiro.
+        """
+        ids = [int(patient) for patient in ids]
+        vectors = normalize(raw, self.center, self.spread)
+        new = [patient for patient in ids if patient not in self._rows]
+        if new:
+            first = len(self.ids)
+            self.ids = np.append(self.ids, np.asarray(new, dtype=np.int64))
+            self._rows.update((p, first + i) for i, p in enumerate(new))
+            self.vectors = np.vstack(
+                [self.vectors, np.zeros((len(new), self.vectors.shape[1]), np.float32)]
+            )
+            padding = _empty(len(new), self.stored)
+            self.neighbours = np.vstack([self.neighbours, padding[0]])
+            self.scores = np.vstack([self.scores, padding[1]])
+        changed = np.array([self._rows[patient] for patient in ids], dtype=np.int64)
+        self.vectors[changed] = vectors
+
+        stale = self._merge_changed(changed)
+        refresh = np.union1d(changed, stale)
+        if len(refresh):
+            idx, scores = top_k(
+                self.vectors,
+                self.stored,
+                refresh,
+                self.block_elements,
+                self.workers,
+            )
+            self.neighbours[refresh], self.scores[refresh] = idx, scores
+        return len(refresh)
+
+    def _merge_changed(self, changed):
+        """Intercala as similaridades com ``changed``; retorna as listas a recalcular.
+
+        Depois de tirar os alterados, a lista de uma linha tem os m melhores
+        entre os não alterados. Se ela não tem todos eles, um candidato
+        alterado abaixo do último desses m pode ter à frente um não alterado
+        que a lista não guardou: a lista é cortada nesse ponto, e se ficar
+        com menos de k vizinhos é recalculada.
+        """
+        size = len(self.ids)
+        is_changed = np.zeros(size, dtype=bool)
+        is_changed[changed] = True
+        others = size - len(changed) - 1  # não alterados, fora a própria linha
+        targets = self.vectors[changed]
+        width = max(1, self.block_elements // max(1, len(changed)))
+        stale = []
+        for start in range(0, size, width):
+            rows = np.arange(start, min(start + width, size))
+            rows = rows[~is_changed[rows]]
+            if not len(rows):
+                continue
+            idx, scores = self.neighbours[rows], self.scores[rows]
+            drop = (idx < 0) | is_changed[np.maximum(idx, 0)]
+            idx = np.where(drop, -1, idx)
+            scores = np.where(drop, -np.inf, scores).astype(np.float32)
+            kept = (~drop).sum(axis=1)
+            floor = np.where(
+                kept < others,
+                np.min(np.where(drop, np.inf, scores), axis=1),
+                -np.inf,
+            )
+            new_scores = self.vectors[rows] @ targets.T
+            new_scores[new_scores < floor[:, None]] = -np.inf
+            new_idx = np.where(
+                np.isneginf(new_scores), -1, np.broadcast_to(changed, new_scores.shape)
+            )
+            idx, scores = _merge(idx, scores, new_idx, new_scores, self.stored)
+            self.neighbours[rows], self.scores[rows] = idx, scores
+            trusted = (idx >= 0).sum(axis=1)
+            stale.append(rows[trusted < min(self.k, size - 1)])
+        return np.concatenate(stale) if stale else np.zeros(0, dtype=np.int64)
+
+    def save(self, path):
+        """Grava o índice num .npz, para não recalcular os vizinhos ao iniciar."""
+        np.savez(
+            path,
+            ids=self.ids,
+            vectors=self.vectors,
+            center=self.center,
+            spread=self.spread,
+            neighbours=self.neighbours,
+            scores=self.scores,
+            k=self.k,
+        )
+
+    @classmethod
+    def load(cls, path, block_elements=BLOCK_ELEMENTS, workers=1):
+        with np.load(path) as data:
+            index = cls.__new__(cls)
+            index.ids = data["ids"]
+            index.vectors = data["vectors"]
+            index.center, index.spread = data["center"], data["spread"]
+            index.neighbours, index.scores = data["neighbours"], data["scores"]
+            index.k = int(data["k"])
+        index._rows = {int(patient): row for row, patient in enumerate(index.ids)}
+        index.stored = index.neighbours.shape[1]
+        index.block_elements = block_elements
+        index.workers = workers
+        return index
+
+
+# --- sugestões ---
+
+
+def patient_plans(db):
+    """Plano de cada paciente; com mais de um, o de maior _id."""
+    cursor = db.dietPlans.find({"paciente_id": {"$ne": None}}, {"paciente_id": 1}).sort(
+        "_id", 1
+    )
+    return {doc["paciente_id"]: doc["_id"] for doc in cursor}
+
+
+def successful_patients(meals, threshold=ADHERENCE_THRESHOLD):
+    """Pacientes com taxa de adesão de pelo menos ``threshold`` (o oposto da consulta 5)."""
+    patients, _, _, rates = meals.adherence()
+    return {int(patient) for patient in patients[rates >= threshold]}
+
+
+def plan_suggestions(index, patient_id, plans, succeeded, k=None):
+    """Planos dos vizinhos com sucesso ("pacientes como este foram bem no plano X").
+
+    Soma a similaridade dos vizinhos com sucesso por plano; retorna
+    [(plano, peso, vizinhos)] do mais indicado para o menos.
+    """
+    totals = {}
+    for neighbour, score in index.neighbours_of(patient_id, k):
+        plan = plans.get(neighbour)
+        if plan is None or neighbour not in succeeded or score <= 0:
+            continue
+        weight, patients = totals.get(plan, (0.0, []))
+        totals[plan] = (weight + score, patients + [neighbour])
+    return sorted(
+        ((plan, weight, patients) for plan, (weight, patients) in totals.items()),
+        key=lambda item: -item[1],
+    )
@@ -0,0 +1,328 @@
+"""
+Fixtures de teste a partir de um snapshot binário do conjunto de dados.
+
+Em vez de cada classe de teste rodar ``load_all_data()`` nos dois bancos, o
+conjunto de dados canônico dos loaders (com o ``_hash`` que eles gravam) é
+montado uma única vez e guardado em ``.snapshots/dataset-<digest>.bson.gz``:
+uma sequência de documentos BSON comprimida, identificada pelo digest dos
+fontes que definem os dados e remontada só quando eles mudam. Dele saem as
+fixtures:
+
+- Neo4j: o grafo é restaurado uma vez por processo, numa única transação, e
+  cada teste roda numa transação explícita desfeita no ``tearDown``; os
+  testes podem alterar o grafo à vontade sem recarregá-lo.
+- MongoDB: as coleções são restauradas uma vez por processo num banco
+  modelo (``<MONGO_DB>_snapshot``) e clonadas no servidor, com ``$out``, para
+  o banco de trabalho antes de cada teste. Com ``FIXTURE_BACKEND=memory`` o
+  snapshot é restaurado num ``memory_mongo.MemoryClient``, sem servidor.
+- Grafo em memória: ``memory_graph()`` devolve um ``MemoryGraphStore`` novo
+  com o grafo do snapshot, para testes que usam a interface GraphStore.
+
+Uso::
+
+    class MeusTestes(Neo4jSnapshotTestCase):
+        def test_algo(self):
+            self.tx.run("MATCH (p:Paciente) DETACH DELETE p")  # desfeito ao final
+"""
+
+import functools
+import hashlib
+import os
+import unittest
+from datetime import datetime, timezone
+from pathlib import Path
+
+from mongo_dump import SUFFIXES, open_chunk, read_documents, write_documents
+from sync import DATASET_SOURCES, HASH_FIELD, UPDATED_AT_FIELD, with_hash
+
+SNAPSHOT_DIR = Path(
+    os.getenv("FIXTURE_SNAPSHOT_DIR", Path(__file__).resolve().parent / ".snapshots")
+)
+# "server" usa os bancos do docker-compose; "memory", stand-ins em memória
+BACKEND = os.getenv("FIXTURE_BACKEND", "server")
+COMPRESSION = "gzip"
+# Sobe quando o formato do arquivo muda, invalidando os snapshots antigos
+FORMAT_VERSION = 1
+# Linhas por documento BSON do arquivo (bem abaixo do limite de 16 MB)
+ROWS_PER_RECORD = 1000
+TEMPLATE_SUFFIX = "_snapshot"
+# Fontes do conjunto de dados e deste módulo, que define o formato do arquivo
+SOURCES = DATASET_SOURCES + ("snapshot_fixtures.py",)
+
+
+class Snapshot:
+    """Conjunto de dados de teste: nós, relacionamentos e coleções."""
+
+    __slots__ = ("digest", "created_at", "nodes", "relationships", "collections")
+
+    def __init__(self, digest, created_at, nodes, relationships, collections):
+        self.digest = digest
+        self.created_at = created_at
+        self.nodes = nodes  # {rótulo: [linhas]}
+        self.relationships = relationships  # [(tipo, origem, destino, [linhas])]
+        self.collections = collections  # {coleção: [documentos]}
+
+
+def source_digest():
+    """Digest dos fontes que definem o conjunto de dados e do formato."""
+    digest = hashlib.sha256(f"snapshot-v{FORMAT_VERSION}".encode())
+    root = Path(__file__).resolve().parent
+    for name in SOURCES:
+        digest.update((root / name).read_bytes())
+    return digest.hexdigest()
+
+
+def build_dataset(digest):
+    """Monta o conjunto de dados canônico dos loaders, com o _hash gravado."""
+    import load_data
+    import load_mongodb_data
+
+    nodes = {
+        label: [with_hash(row) for row in rows]
+        for _, label, rows in load_data.NODE_LOADS
+    }
+    relationships = [
+        (
+            rel_type,
+            from_label,
+            to_label,
+            [with_hash(row) for row in load_data.relationship_rows(pairs)],
+        )
+        for rel_type, from_label, to_label, pairs in load_data.RELATIONSHIPS
+    ]
+    collections = {
+        name: [with_hash(doc) for doc in documents]
+        for _, name, documents in load_mongodb_data.COLLECTION_LOADS
+    }
+    created_at = datetime.now(timezone.utc).replace(microsecond=0, tzinfo=None)
+    return Snapshot(digest, created_at, nodes, relationships, collections)
+
+
+def _records(snapshot):
+    """Documentos BSON do arquivo: um cabeçalho e as linhas em blocos."""
+    yield {"digest": snapshot.digest, "created_at": snapshot.created_at}
+    sections = [
+        ("node", label, None, None, rows) for label, rows in snapshot.nodes.items()
+    ]
+    sections += [
+        ("relationship", rel_type, from_label, to_label, rows)
+        for rel_type, from_label, to_label, rows in snapshot.relationships
+    ]
+    sections += [
+        ("collection", name, None, None, documents)
+        for name, documents in snapshot.collections.items()
+    ]
+    for index, (kind, name, from_label, to_label, rows) in enumerate(sections):
+        for start in range(0, max(len(rows), 1), ROWS_PER_RECORD):
+            yield {
+                "section": index,
+                "kind": kind,
+                "name": name,
+                "from": from_label,
+                "to": to_label,
+                "rows": rows[start : start + ROWS_PER_RECORD],
+            }
+
+
+def write_snapshot(snapshot, path):
+    """Grava o snapshot no arquivo, de forma atômica."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(path.name + ".part")
+    with open_chunk(partial, "wb", COMPRESSION) as f:
+        write_documents(f, _records(snapshot), "bson")
+    os.replace(partial, path)
+
+
+def read_snapshot(path):
+    """Lê um snapshot gravado por write_snapshot."""
+    with open_chunk(path, "rb", COMPRESSION) as f:
+        records = read_documents(f, "bson")
+        header = next(records)
+        nodes, relationships, collections = {}, {}, {}
+        for record in records:
+            key = record["section"]
+            if record["kind"] == "node":
+                nodes.setdefault(record["name"], []).extend(record["rows"])
+            elif record["kind"] == "relationship":
+                if key not in relationships:
+                    relationships[key] = (
+                        record["name"],
+                        record["from"],
+                        record["to"],
+                        [],
+                    )
+                relationships[key][3].extend(record["rows"])
+            else:
+                collections.setdefault(record["name"], []).extend(record["rows"])
+    return Snapshot(
+        header["digest"],
+        header["created_at"],
+        nodes,
+        [relationships[key] for key in sorted(relationships)],
+        collections,
+    )
+
+
+def snapshot_path(digest):
+    return SNAPSHOT_DIR / f"dataset-{digest[:16]}.bson{SUFFIXES[COMPRESSION]}"
+
+
+@functools.lru_cache(maxsize=None)
+def load_snapshot():
+    """Retorna o snapshot dos dados atuais, gravando-o se ainda não existir.
+
+    O arquivo é identificado pelo digest dos fontes dos loaders; se eles
+    mudam, um novo arquivo é montado e o anterior fica órfão (pode ser
+    apagado). Dentro do processo o snapshot é lido uma única vez.
+    """
+    digest = source_digest()
+    path = snapshot_path(digest)
+    if path.exists():
+        return read_snapshot(path)
+    snapshot = build_dataset(digest)
+    write_snapshot(snapshot, path)
+    return snapshot
+
+
+# --- Neo4j ---
+
+
+def _restore_graph(tx, snapshot):
+    tx.run("MATCH (n) DETACH DELETE n").consume()
+    for label, rows in snapshot.nodes.items():
+        tx.run(
+            f"UNWIND $rows AS row CREATE (n:{label}) SET n = row", rows=rows
+        ).consume()
+    for rel_type, from_label, to_label, rows in snapshot.relationships:
+        tx.run(
+            f"""
+            UNWIND $rows AS row
+            MATCH (a:{from_label} {{id: row.de}}), (b:{to_label} {{id: row.para}})
+            CREATE (a)-[r:{rel_type}]->(b)
+            SET r = row.props, r.{HASH_FIELD} = row.{HASH_FIELD}
+            """,
+            rows=rows,
+        ).consume()
+
+
+def restore_neo4j(driver, snapshot):
+    """Substitui o grafo pelo do snapshot, numa única transação."""
+    from load_data import NODE_LOADS, Neo4jGraphStore
+
+    with driver.session() as session:
+        Neo4jGraphStore(session).create_constraints(
+            [label for _, label, _ in NODE_LOADS]
+        )
+        session.execute_write(_restore_graph, snapshot)
+
+
+def restore_graph_store(store, snapshot):
+    """Grava o grafo do snapshot num GraphStore (o banco deve estar vazio)."""
+    for label, rows in snapshot.nodes.items():
+        store.merge_nodes(label, rows)
+    for rel_type, from_label, to_label, rows in snapshot.relationships:
+        store.merge_relationships(rel_type, from_label, to_label, rows)
+
+
+def memory_graph():
+    """Um MemoryGraphStore novo com o grafo do snapshot."""
+    from graph_store import MemoryGraphStore
+
+    store = MemoryGraphStore()
+    restore_graph_store(store, load_snapshot())
+    return store
+
+
+@functools.lru_cache(maxsize=None)
+def neo4j_driver():
+    """Driver compartilhado pelos testes, com o grafo do snapshot restaurado."""
+    from neo4j import GraphDatabase
+
+    from load_data import NEO4J_PASSWORD, NEO4J_URI, NEO4J_USER
+
+    driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+    restore_neo4j(driver, load_snapshot())
+    return driver
+
+
+class Neo4jSnapshotTestCase(unittest.TestCase):
+    """Cada teste recebe em ``self.tx`` uma transação sobre o grafo do snapshot.
+
+    A transação é desfeita ao final do teste, então o grafo volta ao estado
+    do snapshot sem ser recarregado.
+    """
+
+    def setUp(self):
+        super().setUp()
+        session = neo4j_driver().session()
+        self.addCleanup(session.close)
+        self.tx = session.begin_transaction()
+        self.addCleanup(self.tx.rollback)
+
+
+# --- MongoDB ---
+
+
+def restore_mongodb(db, snapshot):
+    """Substitui as coleções de db pelas do snapshot (também em MemoryClient).
+
+    updated_at, que os loaders preenchem com o relógio do servidor, recebe
+    o horário em que o snapshot foi montado.
+    """
+    for name, documents in snapshot.collections.items():
+        db[name].drop()
+        if documents:
+            db[name].insert_many(
+                [{**doc, UPDATED_AT_FIELD: snapshot.created_at} for doc in documents]
+            )
+
+
+def clone_mongodb(template, target):
+    """Copia cada coleção do banco modelo para target, dentro do servidor."""
+    names = set(template.list_collection_names())
+    for name in names:
+        template[name].aggregate(
+            [{"$match": {}}, {"$out": {"db": target.name, "coll": name}}]
+        )
+    for name in set(target.list_collection_names()) - names:
+        target[name].drop()
+
+
+@functools.lru_cache(maxsize=None)
+def mongo_client():
+    """Cliente compartilhado pelos testes e o banco modelo do snapshot.
+
+    Com FIXTURE_BACKEND=memory, retorna um MemoryClient e nenhum modelo.
+    """
+    if BACKEND == "memory":
+        from memory_mongo import MemoryClient
+
+        return MemoryClient(), None
+
+    from pymongo import MongoClient
+
+    from load_mongodb_data import MONGO_DB, MONGO_URI
+
+    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
+    template = client[MONGO_DB + TEMPLATE_SUFFIX]
+    restore_mongodb(template, load_snapshot())
+    return client, template
+
+
+class MongoSnapshotTestCase(unittest.TestCase):
+    """Cada teste recebe em ``self.db`` o banco de trabalho com as coleções do snapshot.
+
+    No servidor, as coleções são clonadas do banco modelo antes de cada
+    teste; em memória, são restauradas do snapshot.
+    """
+
+    def setUp(self):
+        super().setUp()
+        from load_mongodb_data import MONGO_DB
+
+        client, template = mongo_client()
+        self.db = client[MONGO_DB]
+        if template is None:
+            restore_mongodb(self.db, load_snapshot())
+        else:
+            clone_mongodb(template, self.db)
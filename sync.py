@@ -0,0 +1,102 @@
+"""Sincronização incremental por hash de conteúdo.
+
+Em vez de apagar e recarregar o banco, o modo ``--sync`` dos loaders calcula
+um hash de cada registro a partir dos dados canônicos e o compara com o hash
+gravado no destino (campo ``_hash`` no MongoDB, propriedade ``_hash`` nos nós
+e relacionamentos do Neo4j). Só registros novos, alterados ou removidos são
+escritos; os demais são contados como pulados.
+
+No MongoDB, todo documento escrito pelo loader recebe ``updated_at`` e toda
+remoção deixa um tombstone na coleção ``_tombstones``. É a partir deles que
+os dumps incrementais (``mongo_dump.py --since``) exportam só o que mudou
+desde o dump anterior. No Neo4j é igual: nós e relacionamentos escritos pelo
+loader recebem a propriedade ``updated_at`` e cada remoção deixa um nó
+``_Tombstone``, lidos por ``neo4j_dump.py --since``.
+"""
+
+import hashlib
+import json
+from datetime import date, datetime
+
+HASH_FIELD = "_hash"
+UPDATED_AT_FIELD = "updated_at"
+# Campos de controle gravados pelos loaders, fora do conteúdo canônico
+META_FIELDS = (HASH_FIELD, UPDATED_AT_FIELD)
+TOMBSTONES = "_tombstones"
+# Rótulo dos tombstones no Neo4j: {rotulo, id} de um nó, {origem, tipo,
+# destino, de, para} de um relacionamento ou {reset: true} do grafo inteiro
+GRAPH_TOMBSTONE = "_Tombstone"
+# Módulos que definem o conjunto de dados canônico dos loaders; os snapshots
+# de teste (snapshot_fixtures) e colunar (columnar) são refeitos quando o
+# digest deles muda
+DATASET_SOURCES = (
+    "load_data.py",
+    "load_mongodb_data.py",
+    "conversations.py",
+    "mongo_inbox.py",
+    "extended_references.py",
+    "sync.py",
+)
+
+
+def _encode(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Tipo não serializável: {type(value).__name__}")
+
+
+def content_hash(record):
+    """Calcula o hash SHA-256 da forma canônica (JSON ordenado) do registro."""
+    canonical = {k: v for k, v in record.items() if k not in META_FIELDS}
+    payload = json.dumps(
+        canonical,
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=_encode,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def with_hash(record):
+    """Retorna uma cópia do registro com o hash de conteúdo no campo _hash."""
+    return {**record, HASH_FIELD: content_hash(record)}
+
+
+class SyncPlan:
+    """Registros a gravar e chaves a remover para igualar o destino à origem."""
+
+    __slots__ = ("upserts", "deletes", "skipped")
+
+    def __init__(self, upserts, deletes, skipped):
+        self.upserts = upserts
+        self.deletes = deletes
+        self.skipped = skipped
+
+    def summary(self):
+        return (
+            f"{len(self.upserts)} gravado(s), {len(self.deletes)} removido(s), "
+            f"{self.skipped} inalterado(s)"
+        )
+
+
+def plan_sync(records, stored_hashes, key):
+    """Compara os registros canônicos com os hashes gravados no destino.
+
+    ``stored_hashes`` mapeia a chave de cada registro do destino ao seu hash
+    (ou None, para registros gravados sem hash); ``key(record)`` extrai a
+    chave de um registro canônico. Os registros a gravar já saem com o hash.
+    """
+    upserts = []
+    skipped = 0
+    seen = set()
+    for record in records:
+        record_key = key(record)
+        seen.add(record_key)
+        hashed = with_hash(record)
+        if stored_hashes.get(record_key) == hashed[HASH_FIELD]:
+            skipped += 1
+        else:
+            upserts.append(hashed)
+    deletes = [k for k in stored_hashes if k not in seen]
+    return SyncPlan(upserts, deletes, skipped)
@@ -0,0 +1,106 @@
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+import numpy as np
+
+import analytics
+import instrumentation
+import load_mongodb_data
+import parquet_export
+from memory_mongo import MemoryClient
+from queries import MONGODB_QUERIES
+
+
+class AnalyticsTests(unittest.TestCase):
+    """Test the NumPy reports against the documented MongoDB aggregations."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Load the canonical data into an in-memory client once."""
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.object(
+            instrumentation, "RUN_OUTPUT_DIR", tmp
+        ):
+            client = MemoryClient()
+            load_mongodb_data.load_all_data(quiet=True, client=client)
+        cls.db = client[load_mongodb_data.MONGO_DB]
+        cls.names = {doc["_id"]: doc["nome"] for doc in cls.db.patients.find()}
+
+    def setUp(self):
+        """Read the meal and measurement columns."""
+        self.meals = analytics.MealColumns.from_mongodb(self.db)
+        self.measurements = analytics.MeasurementColumns.from_mongodb(self.db)
+
+    def aggregate(self, number):
+        query = MONGODB_QUERIES[number]
+        return list(self.db[query["collection"]].aggregate(query["pipeline"]))
+
+    def test_daily_calories_matches_query_3(self):
+        """Test if the per-day calories of patient 1 match query 3."""
+        _, days, totals = self.meals.daily_calories(patient_id=1)
+        expected = self.aggregate(3)
+        self.assertEqual([str(day) for day in days], [row["_id"] for row in expected])
+        self.assertEqual(totals.tolist(), [row["totalCalorias"] for row in expected])
+
+    def test_adherence_matches_query_5(self):
+        """Test if the low-adherence report matches query 5, row by row."""
+        expected = [{key: row[key] for key in sorted(row)} for row in self.aggregate(5)]
+        rows = analytics.adherence_below(self.meals, self.names)
+        self.assertEqual(
+            [{key: row[key] for key in sorted(row)} for row in rows], expected
+        )
+
+    def test_progress_matches_query_6(self):
+        """Test if the measurements of patient 1 come in date order, like query 6."""
+        query = MONGODB_QUERIES[6]
+        expected = list(
+            self.db.measurements.find(query["filter"], query["projection"]).sort(
+                list(query["sort"].items())
+            )
+        )
+        series = self.measurements.progress(patient_id=1)
+        self.assertEqual(series["weight"].tolist(), [doc["peso"] for doc in expected])
+        self.assertEqual(
+            series["waist"].tolist(), [doc["medidas"]["cintura"] for doc in expected]
+        )
+
+    def test_append_keeps_patient_order(self):
+        """Test if appended rows are merged as if the arrays were rebuilt."""
+        day = datetime(2023, 10, 18)
+        new = [
+            {"paciente_id": 3, "data": day, "calorias": 500, "adesao": "Completa"},
+            {"paciente_id": 1, "data": day + timedelta(days=1), "calorias": 100},
+            {"paciente_id": 1, "data": day, "calorias": 70, "adesao": "Parcial"},
+        ]
+        self.meals.append(analytics.MealColumns.from_rows(new))
+        rebuilt = analytics.MealColumns.from_rows([*self.db.meals.find(), *new])
+
+        self.assertTrue(np.array_equal(self.meals.key, rebuilt.key))
+        self.assertTrue(np.all(np.diff(self.meals.key) >= 0))
+        _, days, totals = self.meals.daily_calories(patient_id=1)
+        self.assertEqual(totals.tolist(), [1600, 100])
+        self.assertEqual(str(days[1]), "2023-10-19")
+
+    def test_empty_columns(self):
+        """Test if the reports work with no rows."""
+        empty = analytics.MealColumns.from_rows([])
+        self.assertEqual(len(empty.daily_calories()[2]), 0)
+        self.assertEqual(analytics.adherence_below(empty, self.names), [])
+
+    @unittest.skipIf(parquet_export.pa is None, "pyarrow não instalado")
+    def test_from_parquet_export(self):
+        """Test if the columns read from the Parquet export equal those from MongoDB."""
+        with tempfile.TemporaryDirectory() as tmp:
+            parquet_export.export_all(self.db, None, tmp)
+            meals = analytics.MealColumns.from_parquet(tmp)
+            measurements = analytics.MeasurementColumns.from_parquet(tmp)
+        self.assertTrue(np.array_equal(meals.key, self.meals.key))
+        self.assertTrue(np.array_equal(meals["complete"], self.meals["complete"]))
+        self.assertTrue(
+            np.array_equal(measurements["waist"], self.measurements["waist"])
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+from checkpoint import BatchSizeMismatch, LoadJournal, iter_batches, run_batches
+
+
+class LoadJournalTests(unittest.TestCase):
+    """Test batch splitting and resuming from the load journal."""
+
+    def setUp(self):
+        """Open an in-memory journal for each test."""
+        self.journal = LoadJournal("neo4j", path=":memory:")
+
+    def tearDown(self):
+        """Close the journal."""
+        self.journal.close()
+
+    def test_iter_batches(self):
+        """Test if rows are split into batches of at most batch_size items."""
+        self.assertEqual(list(iter_batches(range(5), 2)), [[0, 1], [2, 3], [4]])
+        self.assertEqual(list(iter_batches([], 2)), [])
+
+    def test_last_batch_recorded_per_step(self):
+        """Test if the last committed batch is tracked per step."""
+        self.assertEqual(self.journal.last_batch("Paciente"), -1)
+        self.journal.record("Paciente", 0, 2, 2)
+        self.journal.record("Paciente", 1, 2, 2)
+        self.assertEqual(self.journal.last_batch("Paciente"), 1)
+        self.assertEqual(self.journal.last_batch("Alimento"), -1)
+
+    def test_journal_isolated_per_loader(self):
+        """Test if progress of one loader does not affect another."""
+        self.journal.record("Paciente", 3, 2, 2)
+        other = LoadJournal("mongodb", path=":memory:")
+        self.addCleanup(other.close)
+        self.assertEqual(other.last_batch("Paciente"), -1)
+
+    def test_resume_skips_committed_batches(self):
+        """Test if an interrupted step resumes after the last committed batch."""
+        written = []
+
+        def fail_on_third(batch):
+            if len(written) == 2:
+                raise RuntimeError("conexão perdida")
+            written.append(batch)
+
+        with self.assertRaises(RuntimeError):
+            run_batches(self.journal, "Alimento", range(10), 3, fail_on_third)
+        self.assertEqual(self.journal.last_batch("Alimento"), 1)
+
+        resumed = []
+        result = run_batches(self.journal, "Alimento", range(10), 3, resumed.append)
+        self.assertEqual(result, (2, 2))
+        self.assertEqual(resumed, [[6, 7, 8], [9]])
+
+    def test_resume_with_other_batch_size_refused(self):
+        """Test if resuming with a different batch size raises BatchSizeMismatch."""
+        run_batches(self.journal, "Alimento", range(4), 2, lambda batch: None)
+        with self.assertRaises(BatchSizeMismatch):
+            run_batches(self.journal, "Alimento", range(10), 3, lambda batch: None)
+        self.assertEqual(self.journal.last_batch("Alimento"), 1)
+
+    def test_legacy_journal_migrated(self):
+        """Test if a journal without batch_size gains the column and refuses resume."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = str(Path(directory) / "journal.sqlite3")
+            conn = sqlite3.connect(path)
+            conn.execute(
+                "CREATE TABLE batches (loader TEXT NOT NULL, step TEXT NOT NULL, "
+                "batch INTEGER NOT NULL, rows INTEGER NOT NULL, "
+                "committed_at TEXT NOT NULL, PRIMARY KEY (loader, step))"
+            )
+            conn.execute(
+                "INSERT INTO batches VALUES ('neo4j', 'Alimento', 0, 3, '2024-01-01')"
+            )
+            conn.commit()
+            conn.close()
+
+            journal = LoadJournal("neo4j", path=path)
+            try:
+                self.assertIsNone(journal.batch_size("Alimento"))
+                with self.assertRaises(BatchSizeMismatch):
+                    run_batches(journal, "Alimento", range(10), 3, lambda b: None)
+            finally:
+                journal.close()
+
+    def test_reset_discards_progress(self):
+        """Test if reset makes the next load start from the first batch."""
+        self.journal.record("Alimento", 4, 1, 1)
+        self.journal.reset()
+        self.assertEqual(self.journal.last_batch("Alimento"), -1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+from unittest import mock
+
+import columnar
+import instrumentation
+import load_data
+import load_mongodb_data
+from checkpoint import LoadJournal
+from graph_store import MemoryGraphStore
+from memory_mongo import MemoryClient
+from sync import HASH_FIELD, content_hash
+
+
+@unittest.skipIf(columnar.pa is None, "pyarrow não instalado")
+class ColumnarSnapshotTests(unittest.TestCase):
+    """Test the Arrow snapshot of the dataset and the loaders reading it."""
+
+    def setUp(self):
+        """Build snapshots in a temporary directory and keep run metrics there."""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+        patcher = mock.patch.object(instrumentation, "RUN_OUTPUT_DIR", tmp.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def snapshot(self, patients=None):
+        directory = columnar.ensure_snapshot(patients, root=self.root)
+        return columnar.ColumnarSnapshot(directory)
+
+    def test_canonical_rows_round_trip(self):
+        """Test if the canonical rows come back with the hash of the source data."""
+        snapshot = self.snapshot()
+        readers = {label: reader for _, label, reader in snapshot.nodes()}
+        for _, label, rows in load_data.NODE_LOADS:
+            self.assertEqual(len(readers[label]), len(rows))
+        (patient, *_) = next(readers["Paciente"].iter_batches(10))
+        source = load_data.NODE_LOADS[1][2][0]
+        self.assertEqual(patient, {**source, HASH_FIELD: content_hash(source)})
+
+        collections = {name: reader for _, name, reader in snapshot.collections()}
+        meal = next(iter(collections["meals"]))
+        self.assertIsInstance(meal["data"], datetime)
+        recipe = next(iter(collections["recipes"]))
+        self.assertEqual(
+            recipe["ingredientes"][0], {"food_id": 2, "quantidade": "100g"}
+        )
+
+    def test_batches_start_at_offset(self):
+        """Test if iter_batches starts at the given batch without reading earlier ones."""
+        reader = self.snapshot(patients=50).nodes()[1][2]
+        batches = list(reader.iter_batches(20, start=1))
+        self.assertEqual([len(batch) for batch in batches], [20, 10])
+        self.assertEqual(batches[0][0]["id"], 21)
+
+    def test_snapshot_is_reused(self):
+        """Test if a second request for the same dataset does not rebuild it."""
+        first = columnar.ensure_snapshot(patients=30, root=self.root)
+        with mock.patch.object(columnar, "build_snapshot") as build:
+            second = columnar.ensure_snapshot(patients=30, root=self.root)
+        build.assert_not_called()
+        self.assertEqual(first, second)
+        self.assertNotEqual(
+            first, columnar.ensure_snapshot(patients=30, seed=1, root=self.root)
+        )
+
+    def test_generated_dataset_is_consistent(self):
+        """Test if generated rows match their stored hash and relationships point to nodes."""
+        snapshot = self.snapshot(patients=200)
+        for _, label, reader in snapshot.nodes():
+            if label in ("Alimento", "Receita", "PlanoAlimentar"):
+                continue  # catálogo canônico, com o hash dos dados de origem
+            for row in reader:
+                self.assertEqual(row[HASH_FIELD], content_hash(row))
+
+        store = MemoryGraphStore()
+        self.assertTrue(
+            load_data.load_all_data(quiet=True, store=store, snapshot=snapshot)
+        )
+        self.assertEqual(store.count_nodes("Paciente"), 200)
+        self.assertEqual(
+            store.count_nodes("Refeicao"), 200 * columnar.MEALS_PER_PATIENT
+        )
+        self.assertEqual(store.count_nodes("Dia"), 200)
+        self.assertEqual(
+            store.count_relationships("DIA_TEM_REFEICAO"),
+            200 * columnar.MEALS_PER_PATIENT,
+        )
+        relationships = sum(len(reader) for *_, reader in snapshot.relationships())
+        self.assertEqual(store.count_relationships(), relationships)
+
+    def test_mongo_loader_reads_snapshot(self):
+        """Test if the MongoDB loader writes every document of the snapshot."""
+        snapshot = self.snapshot(patients=100)
+        client = MemoryClient()
+        self.assertTrue(
+            load_mongodb_data.load_all_data(
+                quiet=True, client=client, snapshot=snapshot
+            )
+        )
+        db = client[load_mongodb_data.MONGO_DB]
+        for _, name, reader in snapshot.collections():
+            self.assertEqual(db[name].count_documents({}), len(reader))
+        measurement = db.measurements.find_one({"_id": 1})
+        self.assertEqual(set(measurement["medidas"]), {"cintura", "quadril"})
+
+    def test_resume_skips_batches_without_reading_them(self):
+        """Test if a resumed load from the snapshot only reads the pending batches."""
+        batch_size = load_data.BATCH_SIZE
+        load_data.BATCH_SIZE = 40
+        self.addCleanup(setattr, load_data, "BATCH_SIZE", batch_size)
+        snapshot = self.snapshot(patients=100)
+        store = MemoryGraphStore()
+        journal = LoadJournal("neo4j", path=":memory:")
+        journal.close = lambda: None
+        load_data.load_all_data(
+            quiet=True, store=store, journal=journal, snapshot=snapshot
+        )
+        journal.record("Paciente", 1, 40, 40)
+        store.delete_nodes("Paciente", [1, 81])
+
+        load_data.load_all_data(
+            quiet=True, store=store, journal=journal, resume=True, snapshot=snapshot
+        )
+        self.assertIsNone(store.node("Paciente", 1))
+        self.assertIsNotNone(store.node("Paciente", 81))
+        phase = instrumentation.current_run().phases["pacientes"]
+        self.assertEqual((phase.transactions, phase.rows), (1, 20))
+
+    def test_sync_from_snapshot_refused(self):
+        """Test if sync, which compares canonical hashes, refuses a snapshot."""
+        with self.assertRaises(SystemExit), mock.patch("sys.stderr"):
+            load_data.parse_args(["--sync", "--snapshot", str(self.root)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+import tempfile
+import unittest
+from unittest import mock
+
+import conversations
+import instrumentation
+import load_data
+from graph_store import MemoryGraphStore
+
+
+def message(message_id, day, hour, read=False):
+    return {
+        "id": message_id,
+        "conteudo": f"Mensagem {message_id}",
+        "data": day,
+        "hora": hour,
+        "lida": read,
+    }
+
+
+class ConversationThreadTests(unittest.TestCase):
+    """Test the Conversa threads built by the loader and kept by the append API."""
+
+    def setUp(self):
+        """Load the canonical data into an in-memory store."""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patcher = mock.patch.object(instrumentation, "RUN_OUTPUT_DIR", tmp.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.store = MemoryGraphStore()
+        load_data.load_all_data(quiet=True, store=self.store)
+
+    def chain(self, nutritionist_id, patient_id):
+        """Message ids walking from FIRST through NEXT."""
+        key = conversations.conversation_id(nutritionist_id, patient_id)
+        ((_, node),) = self.store.neighbors("Conversa", key, "FIRST")
+        ids = [node["id"]]
+        while True:
+            following = self.store.neighbors("Mensagem", ids[-1], "NEXT")
+            if not following:
+                return ids
+            ids.append(following[0][1]["id"])
+
+    def test_loader_builds_threads_in_send_order(self):
+        """Test if each pair has one thread chained by date and hour."""
+        self.assertEqual(self.store.count_nodes("Conversa"), 2)
+        self.assertEqual(self.chain(1, 1), [1, 2, 3, 4, 5])
+        thread = self.store.node("Conversa", "2:2")
+        self.assertEqual(thread["mensagens"], 1)
+        self.assertEqual(thread["nao_lidas_paciente"], 1)
+        self.assertEqual(thread["nao_lidas_nutricionista"], 0)
+
+    def test_append_moves_latest_and_counts_unread(self):
+        """Test if appended messages extend the chain and the receiver's counter."""
+        self.store.append_message(1, 1, "Paciente", message(7, "2023-10-21", "10:00"))
+        self.store.append_message(
+            1, 1, "Nutricionista", message(8, "2023-10-21", "11:00")
+        )
+        self.assertEqual(self.chain(1, 1), [1, 2, 3, 4, 5, 7, 8])
+        self.assertEqual(
+            [m["id"] for m in self.store.latest_messages(1, 1, 3)], [8, 7, 5]
+        )
+        thread = self.store.node("Conversa", "1:1")
+        self.assertEqual(thread["mensagens"], 7)
+        self.assertEqual(thread["nao_lidas_nutricionista"], 1)
+        self.assertEqual(thread["nao_lidas_paciente"], 1)
+        self.assertEqual(
+            [
+                node["id"]
+                for _, node in self.store.neighbors("Mensagem", 7, "PARA_NUTRICIONISTA")
+            ],
+            [1],
+        )
+        self.assertEqual(self.store.count_relationships("LATEST"), 2)
+
+    def test_append_batch_keeps_order(self):
+        """Test if messages appended together are chained in the given order."""
+        self.store.append_messages(
+            1,
+            1,
+            "Nutricionista",
+            [
+                message(7, "2023-10-21", "10:00"),
+                message(8, "2023-10-21", "11:00", True),
+            ],
+        )
+        self.assertEqual(self.chain(1, 1), [1, 2, 3, 4, 5, 7, 8])
+        thread = self.store.node("Conversa", "1:1")
+        self.assertEqual((thread["mensagens"], thread["nao_lidas_paciente"]), (7, 1))
+        self.assertEqual(self.store.count_relationships("LATEST"), 2)
+        self.assertEqual(self.store.missing_nodes("Mensagem", [8, 99, 7]), [99])
+
+    def test_append_creates_thread(self):
+        """Test if the first message of a new pair creates its thread."""
+        self.store.append_message(
+            1, 3, "Nutricionista", message(9, "2023-10-22", "08:00")
+        )
+        thread = self.store.node("Conversa", "1:3")
+        self.assertEqual((thread["mensagens"], thread["nao_lidas_paciente"]), (1, 1))
+        self.assertEqual(self.chain(1, 3), [9])
+        inbox = self.store.inbox("Nutricionista", 1)
+        self.assertEqual([latest["id"] for _, latest in inbox], [9, 5])
+
+    def test_append_needs_both_participants(self):
+        """Test if a message to a missing patient is rejected without writes."""
+        with self.assertRaises(ValueError):
+            self.store.append_message(
+                1, 99, "Nutricionista", message(10, "2023-10-22", "08:00")
+            )
+        self.assertIsNone(self.store.node("Mensagem", 10))
+        self.assertIsNone(self.store.node("Conversa", "1:99"))
+
+    def test_mark_read_resets_counter(self):
+        """Test if only the reader's unread messages are marked as read."""
+        self.store.append_message(2, 2, "Paciente", message(11, "2023-10-21", "09:00"))
+        self.assertEqual(self.store.mark_read(2, 2, "Paciente"), 1)
+        self.assertTrue(self.store.node("Mensagem", 6)["lida"])
+        self.assertFalse(self.store.node("Mensagem", 11)["lida"])
+        thread = self.store.node("Conversa", "2:2")
+        self.assertEqual(thread["nao_lidas_paciente"], 0)
+        self.assertEqual(thread["nao_lidas_nutricionista"], 1)
+        self.assertEqual(self.store.mark_read(2, 2, "Paciente"), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
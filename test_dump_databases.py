@@ -0,0 +1,105 @@
+import gzip
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from datetime import datetime
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "scripts"))
+
+import dump_databases  # noqa: E402
+
+import mongo_dump  # noqa: E402
+from memory_mongo import MemoryClient  # noqa: E402
+
+PAYLOAD = b"neo4j-dump-block" * 100000
+
+
+class StreamDumpTests(unittest.TestCase):
+    """Test streaming a dump command's output into a compressed file."""
+
+    def setUp(self):
+        """Create a temporary dumps directory."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.dir = Path(self.tmp.name)
+
+    def command(self, code):
+        return [sys.executable, "-c", code]
+
+    def test_gzip_stream_and_manifest(self):
+        """Test if the output is compressed and described by the manifest."""
+        path = self.dir / "dump.gz"
+        code = "import sys; sys.stdout.buffer.write(b'neo4j-dump-block' * 100000)"
+        manifest = dump_databases.stream_dump(self.command(code), str(path), "gzip")
+
+        self.assertEqual(gzip.decompress(path.read_bytes()), PAYLOAD)
+        self.assertEqual(manifest["raw_bytes"], len(PAYLOAD))
+        self.assertEqual(manifest["compressed_bytes"], path.stat().st_size)
+        saved = json.loads((self.dir / "dump.gz.manifest.json").read_text())
+        self.assertEqual(saved["sha256"], manifest["sha256"])
+
+    def test_failed_command_leaves_no_file(self):
+        """Test if a failing dump command removes the partial output."""
+        path = self.dir / "dump.gz"
+        with self.assertRaises(subprocess.CalledProcessError):
+            dump_databases.stream_dump(
+                self.command("import sys; sys.exit(2)"), str(path), "gzip"
+            )
+        self.assertEqual(list(self.dir.iterdir()), [])
+
+
+class LogicalMongoDumpTests(unittest.TestCase):
+    """Test the default MongoDB dump, which needs neither Docker nor mongodump."""
+
+    def test_logical_dump_without_docker(self):
+        """Test if the MongoDB dump goes through mongo_dump over MONGO_URI."""
+        client = MemoryClient()
+        client.diet_app.patients.insert_many([{"_id": i} for i in range(3)])
+
+        with tempfile.TemporaryDirectory() as directory:
+            cwd = os.getcwd()
+            os.chdir(directory)
+            self.addCleanup(os.chdir, cwd)
+            with mock.patch("pymongo.MongoClient", return_value=client), mock.patch(
+                "mongo_dump.server_time", return_value=datetime(2025, 3, 19)
+            ), mock.patch.object(dump_databases, "check_docker_container") as docker:
+                with redirect_stdout(io.StringIO()):
+                    self.assertTrue(dump_databases.main(["mongodb"]))
+
+            docker.assert_not_called()
+            (dump,) = Path(directory, "dumps", "mongodb").iterdir()
+            manifest = mongo_dump._read_json(dump / "manifest.json")
+            self.assertEqual(manifest["collections"]["patients"]["documents"], 3)
+
+    def test_logical_dump_into_store(self):
+        """Test if --store records the uncompressed logical dump as a snapshot."""
+        import dump_store
+
+        client = MemoryClient()
+        client.diet_app.patients.insert_many([{"_id": i} for i in range(3)])
+
+        with tempfile.TemporaryDirectory() as directory:
+            store_dir = Path(directory) / "store"
+            with mock.patch("pymongo.MongoClient", return_value=client), mock.patch(
+                "mongo_dump.server_time", return_value=datetime(2025, 3, 19)
+            ):
+                with redirect_stdout(io.StringIO()):
+                    self.assertTrue(
+                        dump_databases.main(["mongodb", "--store", str(store_dir)])
+                    )
+
+            (snapshot,) = dump_store.ChunkStore(store_dir).snapshots()
+            paths = {entry["path"] for entry in snapshot["files"]}
+            self.assertIn("patients/000000.bson", paths)
+            self.assertIn("manifest.json", paths)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import io
+import os
+import random
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import dump_store
+
+
+def payload(size, seed):
+    """Deterministic pseudo-random bytes (incompressible, like a real dump)."""
+    return random.Random(seed).randbytes(size)
+
+
+class ChunkingTests(unittest.TestCase):
+    """Test content-defined chunking."""
+
+    def test_chunks_rebuild_input_within_bounds(self):
+        """Test if chunks concatenate to the input and respect the size limits."""
+        data = payload(1_500_000, 1)
+        chunks = list(dump_store.iter_chunks(io.BytesIO(data)))
+        self.assertEqual(b"".join(chunks), data)
+        for chunk in chunks[:-1]:
+            self.assertGreaterEqual(len(chunk), dump_store.MIN_CHUNK)
+            self.assertLessEqual(len(chunk), dump_store.MAX_CHUNK)
+
+    def test_insertion_only_changes_nearby_chunks(self):
+        """Test if inserting bytes in the middle keeps the other chunks."""
+        data = payload(1_500_000, 2)
+        edited = data[:700_000] + b"novo paciente" + data[700_000:]
+        before = set(dump_store.iter_chunks(io.BytesIO(data)))
+        after = list(dump_store.iter_chunks(io.BytesIO(edited)))
+        changed = [chunk for chunk in after if chunk not in before]
+        self.assertLessEqual(len(changed), 2)
+        self.assertGreater(len(after), 10)
+
+
+class ChunkStoreTests(unittest.TestCase):
+    """Test snapshots, deduplication, restore, gc and verify."""
+
+    def setUp(self):
+        """Create a store and a dump directory in a temporary directory."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = Path(self.tmp.name)
+        self.store = dump_store.ChunkStore(self.root / "store")
+        self.dump = self.root / "dump"
+        (self.dump / "patients").mkdir(parents=True)
+        (self.dump / "patients" / "000000.bson").write_bytes(payload(600_000, 3))
+        (self.dump / "manifest.json").write_text('{"database": "diet_app"}')
+
+    def test_snapshot_restore_round_trip(self):
+        """Test if a restored snapshot is byte-identical to the source."""
+        self.store.snapshot(self.dump, "dia_1", max_workers=2)
+        target = self.root / "restaurado"
+        self.store.restore("dia_1", target)
+        for path in self.dump.rglob("*"):
+            if path.is_file():
+                restored = target / path.relative_to(self.dump)
+                self.assertEqual(restored.read_bytes(), path.read_bytes())
+
+    def test_unchanged_snapshot_stores_nothing_new(self):
+        """Test if a second identical snapshot adds no chunk bytes."""
+        first = self.store.snapshot(self.dump, "dia_1")
+        second = self.store.snapshot(self.dump, "dia_2")
+        self.assertGreater(first["stored_bytes"], 0)
+        self.assertEqual(second["stored_bytes"], 0)
+        stats = self.store.stats()
+        self.assertEqual(stats["logical_bytes"], 2 * first["size"])
+
+    def test_gc_removes_expired_snapshots_and_orphan_chunks(self):
+        """Test if gc drops old snapshots and only the chunks nothing references."""
+        self.store.snapshot(self.dump, "dia_1")
+        (self.dump / "patients" / "000000.bson").write_bytes(payload(600_000, 4))
+        self.store.snapshot(self.dump, "dia_2")
+        for path in self.store._chunk_files():
+            old = time.time() - 2 * dump_store.GC_GRACE_SECONDS
+            os.utime(path, (old, old))
+
+        later = datetime.now() + timedelta(days=1)
+        snapshots, chunks, freed = self.store.gc(keep_days=0, now=later)
+        self.assertEqual(snapshots, ["dia_1", "dia_2"])
+        self.assertEqual(self.store._chunk_files(), [])
+
+        self.store.snapshot(self.dump, "dia_3")
+        self.assertEqual(self.store.gc(keep_days=90), ([], 0, 0))
+        self.assertEqual(self.store.verify(), [])
+
+    def test_gc_keeps_recent_orphan_chunks(self):
+        """Test if chunks of a snapshot still being written survive gc."""
+        self.store.put_chunk(b"chunk de um snapshot em andamento")
+        self.assertEqual(self.store.gc(), ([], 0, 0))
+
+    def test_verify_reports_corrupt_chunk(self):
+        """Test if verify and restore detect a chunk whose bytes changed."""
+        self.store.snapshot(self.dump, "dia_1")
+        path, other = sorted(self.store._chunk_files())[:2]
+        digest = path.stem
+        path.write_bytes(other.read_bytes())
+
+        problems = self.store.verify()
+        self.assertEqual(len(problems), 1)
+        self.assertIn(digest, problems[0])
+        with self.assertRaises(dump_store.CorruptChunk):
+            self.store.restore("dia_1", self.root / "restaurado")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+import tempfile
+import unittest
+from datetime import datetime
+from unittest import mock
+
+import extended_references
+import instrumentation
+import load_mongodb_data
+import mongo_inbox
+from memory_mongo import MemoryClient
+from queries import MONGODB_QUERIES
+
+
+class ExtendedReferenceTests(unittest.TestCase):
+    """Test the embedded participant names and their propagation."""
+
+    def setUp(self):
+        """Load the canonical data into an in-memory client."""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patcher = mock.patch.object(instrumentation, "RUN_OUTPUT_DIR", tmp.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        client = MemoryClient()
+        load_mongodb_data.load_all_data(quiet=True, client=client)
+        self.db = client[load_mongodb_data.MONGO_DB]
+        self.names = {
+            side: {doc["_id"]: doc["nome"] for doc in self.db[collection].find()}
+            for side, collection in mongo_inbox.PARTICIPANT_COLLECTIONS.items()
+        }
+
+    def aggregate(self, number):
+        query = MONGODB_QUERIES[number]
+        return list(self.db[query["collection"]].aggregate(query["pipeline"]))
+
+    def test_query_8_reads_embedded_names(self):
+        """Test if query 8 returns the sender and receiver names of each message."""
+        expected = [
+            (
+                self.names[m["de_tipo"]][m["de_id"]],
+                self.names[m["para_tipo"]][m["para_id"]],
+            )
+            for m in sorted(
+                load_mongodb_data.MESSAGES, key=lambda m: (m["data"], m["hora"])
+            )
+        ]
+        rows = self.aggregate(8)
+        self.assertEqual([(r["remetente"], r["destinatario"]) for r in rows], expected)
+        self.assertEqual(rows[0]["conteudo"], "Como está se sentindo com a nova dieta?")
+
+    def test_query_10_reads_embedded_names(self):
+        """Test if query 10 returns both names of the scheduled appointments."""
+        expected = [
+            (
+                self.names["paciente"][a["paciente_id"]],
+                self.names["nutricionista"][a["nutricionista_id"]],
+            )
+            for a in sorted(
+                load_mongodb_data.APPOINTMENTS, key=lambda a: (a["data"], a["hora"])
+            )
+            if a["status"] == "Agendada"
+        ]
+        rows = self.aggregate(10)
+        self.assertTrue(expected)
+        self.assertEqual([(r["paciente"], r["nutricionista"]) for r in rows], expected)
+
+    def test_rename_propagates_to_every_copy(self):
+        """Test if renaming a nutritionist updates messages, appointments and inbox."""
+        modified = extended_references.rename_participant(
+            self.db, "nutricionista", 1, "Ana Souza"
+        )
+        self.assertEqual(
+            self.db.messages.count_documents(
+                {
+                    "de_tipo": "nutricionista",
+                    "de_id": 1,
+                    "de.nome": {"$ne": "Ana Souza"},
+                }
+            ),
+            0,
+        )
+        self.assertEqual(
+            self.db.messages.count_documents({"para.nome": "Ana Silva"}), 0
+        )
+        self.assertEqual(
+            self.db.appointments.count_documents({"nutricionista.nome": "Ana Silva"}),
+            0,
+        )
+        self.assertEqual(
+            self.db[mongo_inbox.INBOX].find_one({"_id": "1:1"})["nutricionista"][
+                "nome"
+            ],
+            "Ana Souza",
+        )
+        # O paciente 1 tem o mesmo id, mas é outro participante
+        self.assertEqual(
+            self.db.appointments.find_one({"_id": 1})["paciente"]["nome"],
+            "João Pereira",
+        )
+        self.assertEqual(modified["messages"], 5)
+        self.assertEqual(
+            extended_references.propagate_names(self.db),
+            {"messages": 0, "appointments": 0, mongo_inbox.INBOX: 0},
+        )
+
+    def test_propagate_repairs_out_of_band_changes(self):
+        """Test if the job fixes copies after a name changed directly in the source."""
+        self.db.patients.update_one({"_id": 2}, {"$set": {"nome": "Maria S."}})
+        modified = extended_references.propagate_names(self.db, batch_size=1)
+        self.assertEqual(modified["messages"], 1)
+        self.assertEqual(modified[mongo_inbox.INBOX], 1)
+        self.assertEqual(
+            self.db.messages.find_one({"_id": 6})["para"]["nome"], "Maria S."
+        )
+
+    def test_rename_unknown_participant(self):
+        """Test if renaming a missing patient raises ValueError."""
+        with self.assertRaises(ValueError):
+            extended_references.rename_participant(self.db, "paciente", 99, "Ninguém")
+
+    def test_sent_messages_carry_names(self):
+        """Test if messages written through the inbox embed both names."""
+        mongo_inbox.send_message(
+            self.db,
+            {
+                "_id": 7,
+                "de_id": 3,
+                "de_tipo": "paciente",
+                "para_id": 1,
+                "para_tipo": "nutricionista",
+                "conteudo": "Olá",
+                "data": datetime(2023, 10, 22),
+                "hora": "08:00",
+                "lida": False,
+            },
+        )
+        doc = self.db.messages.find_one({"_id": 7})
+        self.assertEqual(doc["de"], {"id": 3, "nome": self.names["paciente"][3]})
+        self.assertEqual(doc["para"], {"id": 1, "nome": "Ana Silva"})
+
+
+if __name__ == "__main__":
+    unittest.main()
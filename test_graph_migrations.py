@@ -0,0 +1,87 @@
+import tempfile
+import unittest
+from unittest import mock
+
+import graph_migrations
+import instrumentation
+import load_data
+from graph_store import MemoryGraphStore
+from queries import NEO4J_QUERIES
+
+
+class RelationshipTypeMigrationTests(unittest.TestCase):
+    """Test the batched migration of the overloaded relationship types."""
+
+    def setUp(self):
+        """Load the canonical data into an in-memory store."""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patcher = mock.patch.object(instrumentation, "RUN_OUTPUT_DIR", tmp.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.store = MemoryGraphStore()
+        load_data.load_all_data(quiet=True, store=self.store)
+        self.run = instrumentation.start_run("neo4j_migration", quiet=True)
+
+    def types(self):
+        return {
+            (new, from_label, to_label): self.store.relationship_hashes(
+                new, from_label, to_label
+            )
+            for _, from_label, to_label, new in graph_migrations.RELATIONSHIP_RENAMES
+        }
+
+    def test_loader_uses_one_type_per_label_pair(self):
+        """Test if no loaded relationship type links more than one label pair."""
+        pairs = {}
+        for rel_type, from_label, to_label, _ in load_data.RELATIONSHIPS:
+            pairs.setdefault(rel_type, set()).add((from_label, to_label))
+        self.assertTrue(all(len(labels) == 1 for labels in pairs.values()))
+        for old in ("INCLUI", "ENVIA", "PARA"):
+            self.assertEqual(self.store.count_relationships(old), 0)
+
+    def test_reverse_then_forward_round_trip(self):
+        """Test if migrating back and forth in small batches keeps every property."""
+        before = self.types()
+        moved = graph_migrations.migrate_relationship_types(
+            self.store, batch_size=2, reverse=True
+        )
+        self.assertEqual(self.store.count_relationships("PLANO_INCLUI_ALIMENTO"), 0)
+        for old in ("INCLUI", "ENVIA", "PARA"):
+            expected = sum(
+                len(before[new, from_label, to_label])
+                for current, from_label, to_label, new in (
+                    graph_migrations.RELATIONSHIP_RENAMES
+                )
+                if current == old
+            )
+            self.assertEqual(moved[old], expected)
+            self.assertEqual(self.store.count_relationships(old), expected)
+
+        moved = graph_migrations.migrate_relationship_types(self.store, batch_size=2)
+        self.assertEqual(self.types(), before)
+        self.assertEqual(moved["PARA_PACIENTE"], 4)
+        for old in ("INCLUI", "ENVIA", "PARA"):
+            self.assertEqual(self.store.count_relationships(old), 0)
+
+    def test_batches_counted_as_transactions(self):
+        """Test if each batch is one transaction of its phase."""
+        graph_migrations.migrate_relationship_types(
+            self.store, batch_size=2, reverse=True
+        )
+        stats = self.run.phases["PlanoAlimentar-INCLUI-Alimento"]
+        rows = len(
+            self.store.relationship_hashes("INCLUI", "PlanoAlimentar", "Alimento")
+        )
+        self.assertEqual(stats.rows, rows)
+        self.assertEqual(stats.transactions, rows // 2 + 1)
+
+    def test_queries_use_new_types(self):
+        """Test if the documented queries no longer mention the old types."""
+        for query in NEO4J_QUERIES.values():
+            for old in (":INCLUI]", ":ENVIA]", ":PARA]"):
+                self.assertNotIn(old, query)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,192 @@
+import tempfile
+import unittest
+from unittest import mock
+
+import instrumentation
+import load_data
+from checkpoint import LoadJournal
+from graph_store import MemoryGraphStore
+from sync import HASH_FIELD
+
+
+def load(store, **kwargs):
+    return load_data.load_all_data(quiet=True, store=store, **kwargs)
+
+
+class MemoryGraphStoreTests(unittest.TestCase):
+    """Test the in-memory adjacency-list graph store."""
+
+    def setUp(self):
+        """Create a store with two patients and one nutritionist."""
+        self.store = MemoryGraphStore()
+        self.store.merge_nodes("Nutricionista", [{"id": 1, "nome": "Ana"}])
+        self.store.merge_nodes(
+            "Paciente", [{"id": 1, "nome": "João"}, {"id": 2, "nome": "Maria"}]
+        )
+        self.store.merge_relationships(
+            "ATENDE",
+            "Nutricionista",
+            "Paciente",
+            [
+                {"de": 1, "para": 2, "props": {"desde": "2024"}, HASH_FIELD: "h2"},
+                {"de": 1, "para": 1, "props": {}, HASH_FIELD: "h1"},
+                {"de": 1, "para": 9, "props": {}, HASH_FIELD: "h9"},
+            ],
+        )
+
+    def test_merge_replaces_properties(self):
+        """Test if merging a node replaces its properties and drops nulls."""
+        self.store.merge_nodes("Paciente", [{"id": 1, "idade": 35, "email": None}])
+        self.assertEqual(self.store.node("Paciente", 1), {"id": 1, "idade": 35})
+        self.assertEqual(self.store.count_nodes("Paciente"), 2)
+
+    def test_relationship_needs_both_ends(self):
+        """Test if relationships to missing nodes are skipped, like MATCH."""
+        self.assertEqual(
+            self.store.relationship_hashes("ATENDE", "Nutricionista", "Paciente"),
+            {(1, 2): "h2", (1, 1): "h1"},
+        )
+
+    def test_neighbors_in_both_directions(self):
+        """Test if neighbors are returned in id order from either end."""
+        patients = self.store.neighbors("Nutricionista", 1, "ATENDE")
+        self.assertEqual([node["nome"] for _, node in patients], ["João", "Maria"])
+        self.assertEqual(patients[1][0], {"desde": "2024", HASH_FIELD: "h2"})
+        ((_, nutritionist),) = self.store.neighbors(
+            "Paciente", 2, "ATENDE", direction="in"
+        )
+        self.assertEqual(nutritionist["nome"], "Ana")
+
+    def test_relationships_in_key_order(self):
+        """Test if relationships are listed by (de, para) with their properties."""
+        rows = list(self.store.relationships("ATENDE", "Nutricionista", "Paciente"))
+        self.assertEqual([(row["de"], row["para"]) for row in rows], [(1, 1), (1, 2)])
+        self.assertEqual(rows[1]["props"], {"desde": "2024", HASH_FIELD: "h2"})
+
+    def test_detach_delete(self):
+        """Test if deleting a node also removes its relationships."""
+        self.store.delete_nodes("Paciente", [2])
+        self.assertEqual(self.store.count_relationships("ATENDE"), 1)
+        self.assertEqual(
+            self.store.neighbors("Nutricionista", 1, "ATENDE")[0][1]["id"], 1
+        )
+
+    def test_map_properties_rejected(self):
+        """Test if nested maps are refused, as Neo4j does."""
+        with self.assertRaises(TypeError):
+            self.store.merge_nodes("Paciente", [{"id": 3, "medidas": {"peso": 80}}])
+
+
+class GraphLoaderTests(unittest.TestCase):
+    """Test the Neo4j loader against the in-memory store."""
+
+    def setUp(self):
+        """Write the run metrics to a temporary directory."""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patcher = mock.patch.object(instrumentation, "RUN_OUTPUT_DIR", tmp.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_full_load(self):
+        """Test if every node and relationship ends up in the store."""
+        store = MemoryGraphStore()
+        self.assertTrue(load(store))
+        self.assertEqual(
+            store.count_nodes(), sum(len(rows) for _, _, rows in load_data.NODE_LOADS)
+        )
+        self.assertEqual(
+            store.count_relationships(),
+            sum(len(pairs) for *_, pairs in load_data.RELATIONSHIPS),
+        )
+        self.assertEqual(
+            store.constraints, {label for _, label, _ in load_data.NODE_LOADS}
+        )
+
+    def test_batches_are_counted(self):
+        """Test if each batch is one transaction with its rows."""
+        batch_size = load_data.BATCH_SIZE
+        load_data.BATCH_SIZE = 2
+        self.addCleanup(setattr, load_data, "BATCH_SIZE", batch_size)
+
+        load(MemoryGraphStore())
+        phase = instrumentation.current_run().phases["pacientes"]
+        self.assertEqual((phase.transactions, phase.rows), (3, 5))
+
+    def test_resume_skips_committed_batches(self):
+        """Test if a resumed load does not rewrite committed batches."""
+        store = MemoryGraphStore()
+        journal = LoadJournal("neo4j", path=":memory:")
+        journal.close = lambda: None
+        self.assertTrue(load(store, journal=journal))
+
+        store.delete_nodes("Paciente", [1])
+        self.assertTrue(load(store, journal=journal, resume=True))
+        self.assertIsNone(store.node("Paciente", 1))
+
+    def test_sync_rewrites_only_changes(self):
+        """Test if sync restores a deleted node and skips the rest."""
+        store = MemoryGraphStore()
+        load(store)
+        store.delete_nodes("Paciente", [1])
+
+        self.assertTrue(load(store, sync=True))
+        self.assertEqual(store.node("Paciente", 1)["nome"], "João Pereira")
+        phase = instrumentation.current_run().phases["pacientes"]
+        self.assertEqual((phase.rows, phase.skipped), (1, 4))
+
+    def test_documented_query_1(self):
+        """Test if the patients of Ana Silva can be found with store lookups."""
+        store = MemoryGraphStore()
+        load(store)
+        (ana,) = store.nodes("Nutricionista", nome="Ana Silva")
+        patients = store.neighbors(
+            "Nutricionista", ana["id"], "ATENDE", other_label="Paciente"
+        )
+        self.assertEqual(
+            [node["nome"] for _, node in patients], ["João Pereira", "Pedro Alves"]
+        )
+
+    def test_time_tree_matches_consome(self):
+        """Test if the meals reached through the days of a patient are those it consumed."""
+        store = MemoryGraphStore()
+        load(store)
+        (joao,) = store.nodes("Paciente", nome="João Pereira")
+        consumed = store.neighbors("Paciente", joao["id"], "CONSOME")
+        days = store.neighbors("Paciente", joao["id"], "PACIENTE_TEM_DIA")
+        through_days = [
+            meal
+            for _, day in days
+            if "2023-10-18" <= day["data"] <= "2023-10-19"
+            for _, meal in store.neighbors("Dia", day["id"], "DIA_TEM_REFEICAO")
+        ]
+        self.assertEqual(
+            sorted(meal["id"] for meal in through_days),
+            sorted(meal["id"] for _, meal in consumed),
+        )
+        self.assertTrue(
+            all(meal["data"] == day["data"] for _, day in days for meal in through_days)
+        )
+        self.assertEqual(
+            [day["id"] for _, day in days], [load_data.day_id(joao["id"], "2023-10-18")]
+        )
+
+    def test_time_tree_is_optional(self):
+        """Test if the time tree is left out without the flag and synced away."""
+        store = MemoryGraphStore()
+        self.assertTrue(load(store, time_tree=False))
+        self.assertEqual(store.count_nodes("Dia"), 0)
+        self.assertEqual(store.count_relationships("PACIENTE_TEM_DIA"), 0)
+        self.assertEqual(
+            store.count_relationships("CONSOME"), len(load_data.CONSUMED_MEALS)
+        )
+
+        store = MemoryGraphStore()
+        load(store)
+        self.assertTrue(load(store, sync=True, time_tree=False))
+        self.assertEqual(store.count_nodes("Dia"), 0)
+        self.assertEqual(store.count_relationships("DIA_TEM_REFEICAO"), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,176 @@
+import io
+import json
+import tempfile
+import time
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+
+import instrumentation
+import profiling
+
+
+class InstrumentationTests(unittest.TestCase):
+    """Test per-phase counters and the metrics exports."""
+
+    def test_counters_are_attributed_to_current_phase(self):
+        """Test if counters inside a phase are added to that phase only."""
+        run = instrumentation.start_run("teste", quiet=True)
+        with instrumentation.phase("pacientes"):
+            with instrumentation.transaction():
+                instrumentation.count(rows=5, bytes_sent=100)
+            instrumentation.count(retries=1)
+        with instrumentation.phase("refeicoes"):
+            instrumentation.count(rows=8)
+
+        summary = run.summary()
+        phases = {p["name"]: p for p in summary["phases"]}
+        self.assertEqual(phases["pacientes"]["rows"], 5)
+        self.assertEqual(phases["pacientes"]["bytes_sent"], 100)
+        self.assertEqual(phases["pacientes"]["retries"], 1)
+        self.assertEqual(phases["pacientes"]["transactions"], 1)
+        self.assertEqual(phases["refeicoes"]["rows"], 8)
+        self.assertEqual(summary["rows"], 13)
+
+    def test_quiet_mode_suppresses_progress(self):
+        """Test if log() prints nothing in quiet mode."""
+        instrumentation.start_run("teste", quiet=True)
+        output = io.StringIO()
+        with redirect_stdout(output):
+            instrumentation.log("progresso")
+        self.assertEqual(output.getvalue(), "")
+
+    def test_write_exports_prometheus_and_json(self):
+        """Test if the .prom file and the JSON summary are written."""
+        run = instrumentation.start_run("teste", quiet=True)
+        with instrumentation.phase("alimentos"):
+            instrumentation.count(rows=10)
+
+        with tempfile.TemporaryDirectory() as directory:
+            prom_path, json_path = run.write(directory)
+            prom = Path(prom_path).read_text(encoding="utf-8")
+            summary = json.loads(Path(json_path).read_text(encoding="utf-8"))
+
+        self.assertIn(
+            'diet_app_loader_phase_rows_written{loader="teste",phase="alimentos"} 10',
+            prom,
+        )
+        self.assertEqual(summary["loader"], "teste")
+        self.assertEqual(summary["phases"][0]["name"], "alimentos")
+
+    def test_wait_time_is_split_from_cpu_time(self):
+        """Test if time blocked outside the process is reported as wait time."""
+        run = instrumentation.start_run("teste", quiet=True)
+        with instrumentation.phase("espera"):
+            time.sleep(0.05)
+
+        stats = run.summary()["phases"][0]
+        self.assertGreaterEqual(stats["wait_seconds"], 0.04)
+        self.assertLess(stats["cpu_seconds"], stats["wait_seconds"])
+
+
+class TransientError(Exception):
+    """Stand-in for a transient driver error."""
+
+
+class FakeResult:
+    def consume(self):
+        return None
+
+
+class FlakyTransaction:
+    """Transaction whose run() fails while the shared failure budget lasts."""
+
+    def __init__(self, session):
+        self.session = session
+
+    def run(self, query, **parameters):
+        if self.session.failures:
+            self.session.failures -= 1
+            raise TransientError()
+        return FakeResult()
+
+
+class FlakySession:
+    """Session whose execute_write retries the work like the driver does."""
+
+    def __init__(self, failures):
+        self.failures = failures
+
+    def execute_write(self, work):
+        while True:
+            try:
+                return work(FlakyTransaction(self))
+            except TransientError:
+                continue
+
+
+class LoaderRetryTests(unittest.TestCase):
+    """Test that retries made inside the drivers are counted."""
+
+    def test_neo4j_transaction_function_retries_counted(self):
+        """Test if re-invocations of a transaction function count as retries."""
+        import load_data
+
+        run = instrumentation.start_run("teste", quiet=True)
+        with instrumentation.phase("pacientes"):
+            load_data.execute_write(
+                FlakySession(failures=2), load_data.merge_nodes, "Paciente", [{"id": 1}]
+            )
+
+        stats = run.summary()["phases"][0]
+        self.assertEqual(stats["retries"], 2)
+        self.assertEqual(stats["transactions"], 1)
+        self.assertEqual(stats["rows"], 1)
+
+    def test_mongodb_retryable_write_failures_counted(self):
+        """Test if only retryable failures of write commands count as retries."""
+        from types import SimpleNamespace
+
+        from load_mongodb_data import WriteRetryCounter
+
+        counter = WriteRetryCounter()
+        run = instrumentation.start_run("teste", quiet=True)
+        with instrumentation.phase("refeicoes"):
+            for command_name, failure in [
+                ("update", {"errmsg": "conexão perdida", "errtype": "AutoReconnect"}),
+                ("insert", {"code": 91, "errorLabels": ["RetryableWriteError"]}),
+                ("update", {"code": 11000}),
+                ("find", {"errmsg": "conexão perdida", "errtype": "AutoReconnect"}),
+            ]:
+                counter.failed(
+                    SimpleNamespace(command_name=command_name, failure=failure)
+                )
+
+        self.assertEqual(run.summary()["phases"][0]["retries"], 2)
+
+
+class ProfilingTests(unittest.TestCase):
+    """Test the profile modes of the loader entry points."""
+
+    def test_tracemalloc_records_allocations_per_phase(self):
+        """Test if each phase gets its own top allocations."""
+        with tempfile.TemporaryDirectory() as directory:
+            with redirect_stdout(io.StringIO()):
+                with profiling.profile("tracemalloc", "teste", directory):
+                    instrumentation.start_run("teste", quiet=True)
+                    with instrumentation.phase("pacientes"):
+                        data = [str(i) * 20 for i in range(20000)]
+            allocations = json.loads(
+                (Path(directory) / "teste_allocations.json").read_text()
+            )
+
+        self.assertEqual(len(data), 20000)
+        self.assertIn("pacientes", allocations)
+        self.assertGreater(allocations["pacientes"][0]["bytes"], 0)
+        self.assertEqual(instrumentation.PHASE_HOOKS, [])
+
+    def test_unknown_mode_rejected(self):
+        """Test if an unknown profile mode raises ValueError."""
+        with self.assertRaises(ValueError):
+            with profiling.profile("perf", "teste"):
+                pass
+
+
+if __name__ == "__main__":
+    unittest.main()
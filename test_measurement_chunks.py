@@ -0,0 +1,132 @@
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+import numpy as np
+
+import analytics
+import instrumentation
+import load_mongodb_data
+import measurement_chunks
+from memory_mongo import MemoryClient
+from sync import HASH_FIELD, UPDATED_AT_FIELD
+
+
+def stored(document):
+    """A measurement without the loader's bookkeeping fields."""
+    return {
+        key: value
+        for key, value in document.items()
+        if key not in (HASH_FIELD, UPDATED_AT_FIELD)
+    }
+
+
+class MeasurementChunksTests(unittest.TestCase):
+    """Test the delta-encoded monthly chunks of the measurements."""
+
+    def setUp(self):
+        """Load the canonical data into an in-memory client and compact it."""
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.object(
+            instrumentation, "RUN_OUTPUT_DIR", tmp
+        ):
+            client = MemoryClient()
+            load_mongodb_data.load_all_data(quiet=True, client=client)
+        self.db = client[load_mongodb_data.MONGO_DB]
+        self.written = measurement_chunks.compact_measurements(self.db)
+
+    def test_delta_encoding_uses_smallest_type(self):
+        """Test if the deltas round-trip and use the smallest integer type."""
+        for values, itemsize in (
+            ([5, 6, 7, 9], 1),
+            ([1000, 1300, 900], 2),
+            ([1_696_118_400, 1_696_204_800], 4),
+            ([0, 2**40], 8),
+            ([], 1),
+        ):
+            data = measurement_chunks.encode_deltas(values)
+            self.assertEqual(data[0], itemsize)
+            self.assertEqual(len(data), 1 + itemsize * len(values))
+            self.assertEqual(measurement_chunks.decode_deltas(data).tolist(), values)
+        data = measurement_chunks.encode_deltas([5, 6, 7, 9])
+        self.assertEqual(measurement_chunks.decode_deltas(data, 2).tolist(), [5, 6])
+
+    def test_fixed_point_rejects_extra_precision(self):
+        """Test if values finer than the scale are refused instead of rounded."""
+        data, bitmap = measurement_chunks.encode_fixed([89.5, np.nan, 87.8], 100)
+        decoded = measurement_chunks.decode_fixed(data, 100, 3, bitmap)
+        np.testing.assert_array_equal(decoded, [89.5, np.nan, 87.8])
+        with self.assertRaises(ValueError):
+            measurement_chunks.encode_fixed([89.555], 100)
+
+    def test_compact_round_trip(self):
+        """Test if every measurement is read back from the chunks unchanged."""
+        self.assertEqual(self.written, 4)
+        chunk = self.db[measurement_chunks.CHUNKS].find_one({"_id": "1:2023-10"})
+        self.assertEqual(chunk["n"], 2)
+        for patient_id in (1, 2):
+            expected = [
+                stored(doc)
+                for doc in self.db.measurements.find({"paciente_id": patient_id}).sort(
+                    "data", 1
+                )
+            ]
+            self.assertEqual(
+                measurement_chunks.read_measurements(self.db, patient_id), expected
+            )
+
+    def test_compact_removes_stale_chunks(self):
+        """Test if compacting again drops the chunks of months with no measurements."""
+        self.db.measurements.delete_many({"paciente_id": 2})
+        self.assertEqual(measurement_chunks.compact_measurements(self.db), 2)
+        chunks = self.db[measurement_chunks.CHUNKS]
+        self.assertEqual(chunks.count_documents({"paciente_id": 2}), 0)
+        self.assertEqual(len(chunks.distinct("geracao")), 1)
+
+    def test_range_reads_only_requested_rows(self):
+        """Test if a range read returns only the measurements in the range."""
+        rows = measurement_chunks.read_measurements(
+            self.db, 1, datetime(2023, 9, 20), datetime(2023, 10, 1)
+        )
+        self.assertEqual([row["_id"] for row in rows], [2])
+        self.assertEqual(rows[0]["pressao"], "128/83")
+        empty = measurement_chunks.read_measurements(
+            self.db, 1, datetime(2023, 10, 2), datetime(2023, 10, 14)
+        )
+        self.assertEqual(empty, [])
+
+    def test_add_measurements_rewrites_affected_chunk(self):
+        """Test if new readings rewrite only their month and keep missing fields out."""
+        day = datetime(2023, 10, 20)
+        new = [
+            {"_id": 100 + i, "paciente_id": 1, "data": day + timedelta(days=i)}
+            for i in range(3)
+        ]
+        for document in new:
+            document["peso"] = 87.0 - document["_id"] % 100 / 10
+        new[1]["pressao"] = "120/80"
+        before = self.db[measurement_chunks.CHUNKS].find_one({"_id": "1:2023-09"})
+
+        written = measurement_chunks.add_measurements(self.db, new)
+
+        self.assertEqual(written, ["1:2023-10"])
+        self.assertEqual(
+            self.db[measurement_chunks.CHUNKS].find_one({"_id": "1:2023-09"}), before
+        )
+        rows = measurement_chunks.read_measurements(self.db, 1, day)
+        self.assertEqual(rows, new)
+        chunk = self.db[measurement_chunks.CHUNKS].find_one({"_id": "1:2023-10"})
+        self.assertEqual(chunk["n"], 5)
+        self.assertIn("imc", chunk["presentes"])
+
+    def test_read_columns_matches_measurements(self):
+        """Test if the columns decoded from the chunks equal those from the documents."""
+        expected = analytics.MeasurementColumns.from_mongodb(self.db)
+        columns = measurement_chunks.read_columns(self.db)
+        self.assertTrue(np.array_equal(columns.key, expected.key))
+        for name in expected.FIELDS:
+            np.testing.assert_array_equal(columns[name], expected[name])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,178 @@
+import tempfile
+import unittest
+from datetime import datetime, timezone
+from unittest import mock
+
+from pymongo import DeleteOne, InsertOne, ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+import instrumentation
+import load_mongodb_data
+from memory_mongo import MemoryClient
+from sync import HASH_FIELD, TOMBSTONES, UPDATED_AT_FIELD
+
+
+class MemoryCollectionTests(unittest.TestCase):
+    """Test the pymongo-compatible in-memory collection."""
+
+    def setUp(self):
+        """Fill a collection with a few patients."""
+        self.client = MemoryClient()
+        self.patients = self.client.diet_app.patients
+        self.patients.insert_many(
+            [
+                {"_id": 1, "nome": "João", "idade": 35, "restricoes": ["Glúten"]},
+                {"_id": 2, "nome": "Maria", "idade": 42, "medidas": {"peso": 78}},
+                {"_id": 3, "nome": "Pedro", "idade": None},
+            ]
+        )
+
+    def ids(self, *args, **kwargs):
+        return [doc["_id"] for doc in self.patients.find(*args, **kwargs)]
+
+    def test_filters(self):
+        """Test if equality, array membership, dotted paths and operators match."""
+        self.assertEqual(self.ids({"restricoes": "Glúten"}), [1])
+        self.assertEqual(self.ids({"medidas.peso": {"$gte": 70}}), [2])
+        self.assertEqual(self.ids({"idade": {"$gt": 30}}), [1, 2])
+        self.assertEqual(self.ids({"idade": None}), [3])
+        self.assertEqual(self.ids({"medidas": {"$exists": False}}), [1, 3])
+        self.assertEqual(self.ids({"$or": [{"_id": 1}, {"nome": "Pedro"}]}), [1, 3])
+        self.assertEqual(self.ids({"_id": {"$nin": [1, 2]}}), [3])
+
+    def test_sort_projection_and_limit(self):
+        """Test if sort puts null first and projections keep dotted fields."""
+        cursor = self.patients.find({}, {"nome": 1, "_id": 0}).sort("idade", -1)
+        self.assertEqual(
+            list(cursor), [{"nome": "Maria"}, {"nome": "João"}, {"nome": "Pedro"}]
+        )
+        self.assertEqual(
+            self.patients.find_one({"_id": 2}, {"medidas.peso": 1}),
+            {"_id": 2, "medidas": {"peso": 78}},
+        )
+        self.assertEqual(self.ids(sort=[("_id", -1)], limit=2), [3, 2])
+
+    def test_pipeline_upsert_sets_server_time(self):
+        """Test if the loader's $replaceWith/$$NOW upsert inserts and replaces."""
+        before = datetime.now(timezone.utc).replace(microsecond=0, tzinfo=None)
+        update = [
+            {"$replaceWith": {"$literal": {"_id": 4, "nome": "Lúcia"}}},
+            {"$set": {UPDATED_AT_FIELD: "$$NOW"}},
+        ]
+        result = self.patients.bulk_write([UpdateOne({"_id": 4}, update, upsert=True)])
+        self.assertEqual((result.upserted_count, result.matched_count), (1, 0))
+        result = self.patients.bulk_write([UpdateOne({"_id": 4}, update, upsert=True)])
+        self.assertEqual((result.upserted_count, result.matched_count), (0, 1))
+        doc = self.patients.find_one({"_id": 4})
+        self.assertEqual(doc["nome"], "Lúcia")
+        self.assertGreaterEqual(doc[UPDATED_AT_FIELD], before)
+
+    def test_upsert_copies_filter_fields(self):
+        """Test if an upsert without _id seeds the new document from the filter."""
+        tombstones = self.client.diet_app[TOMBSTONES]
+        tombstones.update_one(
+            {"collection": "patients", "document_id": 1},
+            [{"$set": {"deleted_at": "$$NOW"}}],
+            upsert=True,
+        )
+        (doc,) = tombstones.find()
+        self.assertEqual((doc["collection"], doc["document_id"]), ("patients", 1))
+
+    def test_operator_update_sets_server_time(self):
+        """Test if $inc/$currentDate update in place and $setOnInsert only inserts."""
+        before = datetime.now(timezone.utc).replace(microsecond=0, tzinfo=None)
+        update = {
+            "$inc": {"visitas.total": 1},
+            "$currentDate": {UPDATED_AT_FIELD: True},
+            "$setOnInsert": {"nome": "Novo"},
+        }
+        self.patients.update_one({"_id": 1}, update)
+        self.patients.update_one({"_id": 8}, update, upsert=True)
+        for doc_id, name in ((1, "João"), (8, "Novo")):
+            doc = self.patients.find_one({"_id": doc_id})
+            self.assertEqual((doc["nome"], doc["visitas"]), (name, {"total": 1}))
+            self.assertGreaterEqual(doc[UPDATED_AT_FIELD], before)
+
+    def test_bulk_write_and_duplicates(self):
+        """Test if mixed bulk operations apply and duplicate ids are reported."""
+        result = self.patients.bulk_write(
+            [
+                InsertOne({"_id": 5, "nome": "Ricardo"}),
+                ReplaceOne({"_id": 1}, {"nome": "João P."}),
+                DeleteOne({"_id": 3}),
+            ]
+        )
+        self.assertEqual(
+            (result.inserted_count, result.modified_count, result.deleted_count),
+            (1, 1, 1),
+        )
+        self.assertEqual(self.patients.find_one({"_id": 1})["nome"], "João P.")
+        with self.assertRaises(DuplicateKeyError):
+            self.patients.insert_one({"_id": 5})
+        with self.assertRaises(BulkWriteError) as raised:
+            self.patients.insert_many([{"_id": 5}, {"_id": 6}], ordered=False)
+        self.assertEqual(raised.exception.details["nInserted"], 1)
+
+    def test_stored_documents_are_copies(self):
+        """Test if changing a returned or inserted document leaves the store alone."""
+        doc = {"_id": 7, "alergias": ["Nozes"]}
+        self.patients.insert_one(doc)
+        doc["alergias"].append("Amendoim")
+        self.patients.find_one({"_id": 7})["alergias"].append("Leite")
+        self.assertEqual(self.patients.find_one({"_id": 7})["alergias"], ["Nozes"])
+
+    def test_collections_and_indexes(self):
+        """Test if collections exist after the first write and keep index definitions."""
+        db = self.client.diet_app
+        self.assertEqual(db.list_collection_names(), ["patients"])
+        self.patients.create_index([("nome", 1)], name="nome_1")
+        self.assertEqual(
+            [index["name"] for index in self.patients.list_indexes()],
+            ["_id_", "nome_1"],
+        )
+        self.patients.drop()
+        self.assertEqual(db.list_collection_names(), [])
+        self.assertEqual(db.command("ping")["ok"], 1.0)
+
+
+class MongoLoaderTests(unittest.TestCase):
+    """Test the MongoDB loader against the in-memory client."""
+
+    def setUp(self):
+        """Write the run metrics to a temporary directory."""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patcher = mock.patch.object(instrumentation, "RUN_OUTPUT_DIR", tmp.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = MemoryClient()
+        self.db = self.client[load_mongodb_data.MONGO_DB]
+
+    def load(self, **kwargs):
+        return load_mongodb_data.load_all_data(quiet=True, client=self.client, **kwargs)
+
+    def test_full_load(self):
+        """Test if every collection is loaded with hash and updated_at."""
+        self.assertTrue(self.load())
+        for _, name, documents in load_mongodb_data.COLLECTION_LOADS:
+            self.assertEqual(self.db[name].count_documents({}), len(documents))
+        patient = self.db.patients.find_one({"_id": 1})
+        self.assertIn(HASH_FIELD, patient)
+        self.assertIsInstance(patient[UPDATED_AT_FIELD], datetime)
+
+    def test_sync_removes_extra_documents_with_tombstone(self):
+        """Test if sync deletes unknown documents and leaves a tombstone."""
+        self.load()
+        self.db.patients.insert_one({"_id": 99, "nome": "Fora dos dados"})
+
+        self.assertTrue(self.load(sync=True))
+        self.assertIsNone(self.db.patients.find_one({"_id": 99}))
+        self.assertEqual(
+            self.db[TOMBSTONES].count_documents({"collection": "patients"}), 1
+        )
+        phase = instrumentation.current_run().phases["pacientes"]
+        self.assertEqual((phase.rows, phase.skipped), (1, 5))
+
+
+if __name__ == "__main__":
+    unittest.main()
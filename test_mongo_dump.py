@@ -0,0 +1,215 @@
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import mongo_dump
+from memory_mongo import MemoryClient
+from sync import TOMBSTONES
+
+NOW = datetime(2025, 3, 19, 23, 24, 48)
+
+
+def use_clock(test, now=NOW):
+    """Make mongo_dump read the server time from test.now, a controllable clock."""
+    test.now = now
+    server_time = mongo_dump.server_time
+    mongo_dump.server_time = lambda db: test.now
+    test.addCleanup(setattr, mongo_dump, "server_time", server_time)
+
+
+class MongoLogicalDumpTests(unittest.TestCase):
+    """Test the logical export/import against an in-memory MongoDB stand-in."""
+
+    def setUp(self):
+        """Fill a stand-in database and use small chunks."""
+        self.db = MemoryClient().diet_app
+        self.db.patients.insert_many(
+            [
+                {"_id": i, "nome": f"Paciente {i}", "criado_em": datetime(2024, 1, i)}
+                for i in range(1, 26)
+            ]
+        )
+        self.db.patients.create_index([("nome", 1)], name="nome_1")
+        self.db.foods.insert_many([{"nome": f"Alimento {i}"} for i in range(7)])
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.dir = Path(self.tmp.name)
+
+        chunk_documents = mongo_dump.CHUNK_DOCUMENTS
+        mongo_dump.CHUNK_DOCUMENTS = 10
+        self.addCleanup(setattr, mongo_dump, "CHUNK_DOCUMENTS", chunk_documents)
+        use_clock(self)
+
+    def assertRoundTrip(self, fmt, compression):
+        manifest = mongo_dump.export_database(self.db, self.dir, fmt, compression)
+        self.assertEqual(manifest["collections"]["patients"]["documents"], 25)
+        self.assertEqual(len(manifest["collections"]["patients"]["chunks"]), 3)
+
+        target = MemoryClient().restored
+        counts = mongo_dump.import_database(target, self.dir, drop=True)
+        self.assertEqual(counts, {"foods": 7, "patients": 25})
+        self.assertEqual(
+            list(target.patients.find().sort("_id", 1)),
+            list(self.db.patients.find().sort("_id", 1)),
+        )
+        self.assertIn("nome_1", target.patients.index_information())
+
+    def test_bson_round_trip(self):
+        """Test if a gzip BSON dump restores documents, types and indexes."""
+        self.assertRoundTrip("bson", "gzip")
+
+    def test_ndjson_round_trip(self):
+        """Test if an NDJSON dump keeps datetimes and ObjectIds."""
+        self.assertRoundTrip("ndjson", "gzip")
+
+    def test_corrupted_chunk_rejected(self):
+        """Test if a chunk that differs from the manifest checksum stops the import."""
+        manifest = mongo_dump.export_database(self.db, self.dir, "bson", "gzip")
+        checksums = manifest["collections"]["patients"]["checksums"]
+        self.assertEqual(
+            sorted(checksums), manifest["collections"]["patients"]["chunks"]
+        )
+        path = self.dir / "patients" / "000001.bson.gz"
+        self.assertEqual(checksums[path.name]["bytes"], path.stat().st_size)
+        path.write_bytes(path.read_bytes()[:-4])
+
+        target = MemoryClient().restored
+        target.patients.insert_one({"_id": 99})
+        with self.assertRaisesRegex(ValueError, "000001.bson.gz"):
+            mongo_dump.import_database(target, self.dir, drop=True)
+        self.assertEqual(target.patients.count_documents({}), 1)
+
+    def test_resume_continues_after_last_id(self):
+        """Test if an interrupted export resumes from the last written chunk."""
+        mongo_dump.export_collection(self.db, "patients", self.dir)
+        progress_path = self.dir / "patients" / "progress.json"
+        progress = mongo_dump._read_json(progress_path)
+        # Simula uma interrupção depois do primeiro chunk
+        progress["chunks"] = progress["chunks"][:1]
+        progress.update(documents=10, last_id=10, done=False)
+        mongo_dump._write_json(progress_path, progress)
+        self.db.patients.delete_many({"_id": {"$lte": 10}})
+
+        progress = mongo_dump.export_collection(
+            self.db, "patients", self.dir, resume=True
+        )
+        self.assertTrue(progress["done"])
+        self.assertEqual(progress["documents"], 25)
+        self.assertEqual(progress["last_id"], 25)
+
+
+class MongoIncrementalDumpTests(unittest.TestCase):
+    """Test incremental dumps built from updated_at and tombstones."""
+
+    def setUp(self):
+        """Fill a stand-in database stamped as the loaders do."""
+        use_clock(self)
+        self.db = MemoryClient().diet_app
+        loaded_at = NOW - timedelta(days=1)
+        self.db.patients.insert_many(
+            [
+                {"_id": i, "nome": f"Paciente {i}", "updated_at": loaded_at}
+                for i in range(1, 11)
+            ]
+        )
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.dir = Path(self.tmp.name)
+
+    def churn(self):
+        """Update one patient, delete another and add a new one."""
+        self.now = now = NOW + timedelta(hours=1)
+        self.db.patients.update_one(
+            {"_id": 3}, {"$set": {"nome": "Paciente 3 (editado)", "updated_at": now}}
+        )
+        self.db.patients.delete_one({"_id": 5})
+        self.db[TOMBSTONES].insert_one(
+            {"collection": "patients", "document_id": 5, "deleted_at": now}
+        )
+        self.db.patients.insert_one({"_id": 11, "nome": "Novo", "updated_at": now})
+
+    def test_delta_contains_only_churn(self):
+        """Test if the delta exports changed documents and tombstones only."""
+        mongo_dump.export_database(self.db, self.dir / "base")
+        self.churn()
+        manifest = mongo_dump.export_database(
+            self.db, self.dir / "delta", since_dump=self.dir / "base"
+        )
+        self.assertEqual(manifest["kind"], "incremental")
+        self.assertEqual(manifest["collections"]["patients"]["documents"], 2)
+        self.assertNotIn(TOMBSTONES, manifest["collections"])
+        tombstones = mongo_dump._read_json(
+            self.dir / "delta" / "patients" / "tombstones.json"
+        )
+        self.assertEqual(tombstones, {"reset": False, "deleted": [5]})
+
+    def test_write_committed_after_export_start_not_lost(self):
+        """Test if a batch stamped before the export but committed after it is kept."""
+        mongo_dump.export_database(self.db, self.dir / "base")
+        stamped = NOW - timedelta(seconds=10)
+        self.db.patients.insert_one(
+            {"_id": 20, "nome": "Atrasado", "updated_at": stamped}
+        )
+        self.now = NOW + timedelta(hours=1)
+        manifest = mongo_dump.export_database(
+            self.db, self.dir / "delta", since_dump=self.dir / "base"
+        )
+        self.assertEqual(manifest["collections"]["patients"]["documents"], 1)
+
+    def test_prune_tombstones_before_oldest_dump(self):
+        """Test if only tombstones older than the oldest kept dump are pruned."""
+        self.db[TOMBSTONES].insert_many(
+            [
+                {
+                    "collection": "patients",
+                    "document_id": 1,
+                    "deleted_at": NOW - timedelta(days=2),
+                },
+                {"collection": "patients", "document_id": 2, "deleted_at": NOW},
+            ]
+        )
+        mongo_dump.export_database(self.db, self.dir / "base")
+        self.assertEqual(mongo_dump.prune_tombstones(self.db, self.dir / "base"), 1)
+        self.assertEqual(self.db[TOMBSTONES].find_one()["document_id"], 2)
+
+    def test_restore_replays_chain(self):
+        """Test if importing a delta restores base plus deltas in order."""
+        mongo_dump.export_database(self.db, self.dir / "base")
+        self.churn()
+        mongo_dump.export_database(
+            self.db, self.dir / "delta", since_dump=self.dir / "base"
+        )
+        self.assertEqual(
+            mongo_dump.dump_chain(self.dir / "delta"),
+            [(self.dir / "base").resolve(), self.dir / "delta"],
+        )
+
+        target = MemoryClient().restored
+        mongo_dump.import_database(target, self.dir / "delta", drop=True)
+        self.assertEqual(
+            list(target.patients.find().sort("_id", 1)),
+            list(self.db.patients.find().sort("_id", 1)),
+        )
+
+    def test_collection_reset_replaces_collection(self):
+        """Test if a full reload tombstone makes the delta replace the collection."""
+        mongo_dump.export_database(self.db, self.dir / "base")
+        self.now = now = NOW + timedelta(hours=1)
+        self.db.patients.drop()
+        self.db[TOMBSTONES].insert_one(
+            {"collection": "patients", "document_id": None, "deleted_at": now}
+        )
+        self.db.patients.insert_one({"_id": 1, "nome": "Única", "updated_at": now})
+        mongo_dump.export_database(
+            self.db, self.dir / "delta", since_dump=self.dir / "base"
+        )
+
+        target = MemoryClient().restored
+        mongo_dump.import_database(target, self.dir / "delta", drop=True)
+        self.assertEqual(target.patients.count_documents({}), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
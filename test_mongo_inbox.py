@@ -0,0 +1,151 @@
+import tempfile
+import unittest
+from datetime import datetime
+from unittest import mock
+
+import instrumentation
+import load_mongodb_data
+import mongo_inbox
+from memory_mongo import MemoryClient
+from sync import HASH_FIELD, UPDATED_AT_FIELD
+
+
+def message(message_id, sender, sender_id, receiver_id, day, hour, read=False):
+    return {
+        "_id": message_id,
+        "de_id": sender_id,
+        "de_tipo": sender,
+        "para_id": receiver_id,
+        "para_tipo": mongo_inbox.other_side(sender),
+        "conteudo": f"Mensagem {message_id}",
+        "data": datetime.fromisoformat(day),
+        "hora": hour,
+        "lida": read,
+    }
+
+
+class InboxTests(unittest.TestCase):
+    """Test the inbox summaries built by the loader and kept by send/mark_read."""
+
+    def setUp(self):
+        """Load the canonical data into an in-memory client."""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patcher = mock.patch.object(instrumentation, "RUN_OUTPUT_DIR", tmp.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        client = MemoryClient()
+        load_mongodb_data.load_all_data(quiet=True, client=client)
+        self.db = client[load_mongodb_data.MONGO_DB]
+
+    def summary(self, key):
+        return self.db[mongo_inbox.INBOX].find_one({"_id": key})
+
+    def test_loader_builds_one_summary_per_pair(self):
+        """Test if the loaded inbox counts messages and unread ones per side."""
+        self.assertEqual(self.db[mongo_inbox.INBOX].count_documents({}), 2)
+        summary = self.summary("2:2")
+        self.assertEqual(summary["mensagens"], 1)
+        self.assertEqual(summary["nao_lidas"], {"nutricionista": 0, "paciente": 1})
+        self.assertEqual(summary["nutricionista"], {"id": 2, "nome": "Carlos Mendes"})
+        self.assertEqual(self.summary("1:1")["ultima"]["_id"], 5)
+
+    def test_send_updates_counters_and_preview(self):
+        """Test if a new message increments the receiver's counter and the preview."""
+        mongo_inbox.send_message(
+            self.db, message(7, "paciente", 1, 1, "2023-10-21", "10:00")
+        )
+        summary = self.summary("1:1")
+        self.assertEqual(summary["mensagens"], 6)
+        self.assertEqual(summary["nao_lidas"], {"nutricionista": 1, "paciente": 0})
+        self.assertEqual(summary["ultima"]["previa"], "Mensagem 7")
+        self.assertIsInstance(summary[UPDATED_AT_FIELD], datetime)
+        self.assertIsNotNone(self.db.messages.find_one({"_id": 7}))
+
+    def test_send_creates_summary_with_names(self):
+        """Test if the first message of a new pair creates its summary."""
+        mongo_inbox.send_message(
+            self.db, message(8, "nutricionista", 1, 3, "2023-10-22", "08:00")
+        )
+        summary = self.summary("1:3")
+        self.assertEqual(summary["mensagens"], 1)
+        self.assertEqual(summary["nao_lidas"], {"nutricionista": 0, "paciente": 1})
+        self.assertEqual(summary["paciente"]["nome"], "Pedro Alves")
+        inbox = mongo_inbox.list_inbox(self.db, "nutricionista", 1)
+        self.assertEqual([doc["_id"] for doc in inbox], ["1:3", "1:1"])
+        self.assertEqual(len(mongo_inbox.list_inbox(self.db, "paciente", 3, 1)), 1)
+
+    def test_send_rejects_unknown_participant(self):
+        """Test if a message to a missing patient is rejected without writes."""
+        with self.assertRaises(ValueError):
+            mongo_inbox.send_message(
+                self.db, message(9, "nutricionista", 1, 99, "2023-10-22", "08:00")
+            )
+        self.assertIsNone(self.db.messages.find_one({"_id": 9}))
+        self.assertIsNone(self.summary("1:99"))
+
+    def test_mark_read_resets_counter(self):
+        """Test if only the reader's unread messages are marked as read."""
+        mongo_inbox.send_message(
+            self.db, message(10, "paciente", 2, 2, "2023-10-21", "09:00")
+        )
+        self.assertEqual(mongo_inbox.mark_read(self.db, 2, 2, "paciente"), 1)
+        self.assertTrue(self.db.messages.find_one({"_id": 6})["lida"])
+        self.assertFalse(self.db.messages.find_one({"_id": 10})["lida"])
+        self.assertEqual(
+            self.summary("2:2")["nao_lidas"], {"nutricionista": 1, "paciente": 0}
+        )
+        self.assertEqual(mongo_inbox.mark_read(self.db, 2, 2, "paciente"), 0)
+
+    def test_resent_message_counted_once(self):
+        """Test if sending a message with an existing _id changes nothing."""
+        new = message(12, "paciente", 1, 1, "2023-10-21", "10:00")
+        self.assertTrue(mongo_inbox.send_message(self.db, new))
+        before = self.summary("1:1")
+        self.assertFalse(mongo_inbox.send_message(self.db, {**new, "conteudo": "x"}))
+        self.assertEqual(self.summary("1:1"), before)
+        self.assertEqual(
+            self.db.messages.find_one({"_id": 12})["conteudo"], new["conteudo"]
+        )
+
+    def test_mark_read_keeps_message_sent_meanwhile(self):
+        """Test if a message sent between mark_read's two writes stays unread."""
+        update_many = self.db.messages.update_many
+
+        def send_after(*args, **kwargs):
+            result = update_many(*args, **kwargs)
+            mongo_inbox.send_message(
+                self.db, message(13, "nutricionista", 2, 2, "2023-10-21", "11:00")
+            )
+            return result
+
+        with mock.patch.object(self.db.messages, "update_many", send_after):
+            self.assertEqual(mongo_inbox.mark_read(self.db, 2, 2, "paciente"), 1)
+        self.assertEqual(self.summary("2:2")["nao_lidas"]["paciente"], 1)
+        self.assertFalse(self.db.messages.find_one({"_id": 13})["lida"])
+
+    def test_rebuild_matches_incremental_updates(self):
+        """Test if rebuilding from messages gives the incrementally kept summaries."""
+        mongo_inbox.send_message(
+            self.db, message(11, "nutricionista", 1, 3, "2023-10-22", "08:00")
+        )
+        mongo_inbox.mark_read(self.db, 1, 1, "nutricionista")
+
+        def summaries():
+            return {
+                doc["_id"]: {
+                    k: v
+                    for k, v in doc.items()
+                    if k not in (HASH_FIELD, UPDATED_AT_FIELD)
+                }
+                for doc in self.db[mongo_inbox.INBOX].find()
+            }
+
+        expected = summaries()
+        self.db[mongo_inbox.INBOX].insert_one({"_id": "9:9"})
+        self.assertEqual(mongo_inbox.rebuild_inbox(self.db), 3)
+        self.assertEqual(summaries(), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,361 @@
+import re
+import tempfile
+import unittest
+from datetime import timezone
+from pathlib import Path
+
+from neo4j.time import Date, DateTime, Duration
+
+import neo4j_dump
+
+PATIENTS = [{"id": i, "nome": f"Paciente {i}", "idade": 20 + i} for i in range(1, 8)]
+# Nutricionista 1 atende os pacientes ímpares, nutricionista 2 os pares
+NUTRITIONISTS = [{"id": 1, "nome": "Ana"}, {"id": 2, "nome": "Carlos"}]
+ATENDE = [
+    (1 + (p["id"] % 2 == 0), p["id"], {"desde": "2024-01-0%d" % p["id"]})
+    for p in PATIENTS
+]
+
+
+NOW = DateTime(2024, 3, 20, 3, 0, 0, tzinfo=timezone.utc)
+
+
+class FakeRelationship:
+    def __init__(self, start, rel_type, end):
+        self.start_node = type("Node", (), {"labels": frozenset([start])})()
+        self.type = rel_type
+        self.end_node = type("Node", (), {"labels": frozenset([end])})()
+
+
+class FakeGraph:
+    """Answers the handful of Cypher statements neo4j_dump issues.
+
+    Page queries must use keyset filters on id; any SKIP fails the test.
+    """
+
+    def __init__(self, nodes, relationships, tombstones=()):
+        self.nodes = nodes  # {label: [props]}
+        self.relationships = relationships  # {(from, type, to): [(de, para, props)]}
+        self.tombstones = list(tombstones)  # [props], deleted_at em ISO 8601
+        self.queries = []
+        self.writes = []
+
+    def run(self, query, **parameters):
+        self.queries.append(query)
+        assert "SKIP" not in query, query
+        if query.startswith("CALL db.labels"):
+            return [{"label": label} for label in [*self.nodes, "_Tombstone"]]
+        if query == "RETURN datetime() AS now":
+            return FakeResult([{"now": NOW}])
+        if query.startswith("MATCH (t:`_Tombstone`)"):
+            return [
+                {"props": props}
+                for props in sorted(self.tombstones, key=lambda t: t["deleted_at"])
+                if props["deleted_at"] > parameters["since"]
+            ]
+        if query.startswith("CALL db.schema.visualization"):
+            rels = [FakeRelationship(*pattern) for pattern in self.relationships]
+            # Combinação listada pelas estatísticas mas sem relacionamentos
+            rels.append(FakeRelationship("Paciente", "ATENDE", "Paciente"))
+            return [{"relationships": rels}]
+        if query.startswith("UNWIND $rows"):
+            self.writes.append((query, list(parameters["rows"])))
+            return FakeResult()
+        if "UNWIND keys(" in query:
+            return [{"key": key} for key in sorted(self._keys(query))]
+        if query.startswith("CREATE CONSTRAINT") or query.startswith("MATCH (n) CALL"):
+            return FakeResult()
+        return self._page(
+            query, parameters["after"], parameters["limit"], parameters.get("since")
+        )
+
+    def _keys(self, query):
+        if "-[r:" in query:
+            pattern = self._pattern(query)
+            rels = self.relationships.get(pattern, [])
+            return {key for _, _, props in rels for key in props}
+        label = re.search(r"\(n:`(\w+)`\)", query).group(1)
+        return {key for props in self.nodes[label] for key in props}
+
+    def _pattern(self, query):
+        start, rel_type, end = re.search(
+            r"\(a:`(\w+)`\).*\[r:`(\w+)`\]->\(b:`(\w+)`\)", query
+        ).groups()
+        return start, rel_type, end
+
+    def _page(self, query, after, limit, since=None):
+        if after is None:
+            assert "IS NOT NULL" in query
+        else:
+            assert ".id > $after" in query
+
+        def changed(props):
+            # updated_at > datetime($since), com as datas em ISO 8601
+            return since is None or props.get("updated_at", "") > since
+
+        label = re.search(r"MATCH \((?:n|a):`(\w+)`\)", query).group(1)
+        page = sorted(
+            (
+                p
+                for p in self.nodes[label]
+                if (after is None or p["id"] > after)
+                and ("-[r:" in query or changed(p))
+            ),
+            key=lambda p: p["id"],
+        )[:limit]
+        if "-[r:" not in query:
+            return [{"key": p["id"], "props": dict(p)} for p in page]
+        pattern = self._pattern(query)
+        return [
+            {
+                "key": p["id"],
+                "rels": [
+                    {"para": para, "props": props}
+                    for de, para, props in self.relationships.get(pattern, [])
+                    if de == p["id"] and changed(props)
+                ],
+            }
+            for p in page
+        ]
+
+
+class FakeResult(list):
+    def consume(self):
+        return None
+
+    def single(self):
+        return self[0] if self else None
+
+
+class FakeSession:
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, **parameters):
+        return self.graph.run(query, **parameters)
+
+    def execute_read(self, work, *args):
+        return work(self, *args)
+
+    execute_write = execute_read
+
+
+class FakeDriver:
+    def __init__(self, graph):
+        self.graph = graph
+
+    def session(self):
+        return FakeSession(self.graph)
+
+
+class Neo4jLogicalDumpTests(unittest.TestCase):
+    """Test the keyset-paginated export and the re-import of the graph."""
+
+    def setUp(self):
+        """Build a small graph and a temporary dump directory."""
+        self.graph = FakeGraph(
+            {"Paciente": PATIENTS, "Nutricionista": NUTRITIONISTS},
+            {("Nutricionista", "ATENDE", "Paciente"): ATENDE},
+        )
+        self.driver = FakeDriver(self.graph)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.dir = Path(self.tmp.name)
+
+    def round_trip(self, fmt):
+        manifest = neo4j_dump.export_database(
+            self.driver, self.dir, fmt=fmt, page_size=3, max_workers=2
+        )
+        counts = neo4j_dump.import_database(self.driver, self.dir, max_workers=2)
+        return manifest, counts
+
+    def written(self, marker):
+        return [
+            row for query, rows in self.graph.writes if marker in query for row in rows
+        ]
+
+    def test_export_pages_by_id(self):
+        """Test if every node is exported once, in id order, over keyset pages."""
+        manifest, _ = self.round_trip("ndjson")
+        self.assertEqual(manifest["nodes"]["Paciente"]["rows"], len(PATIENTS))
+        pages = [
+            q
+            for q in self.graph.queries
+            if "ORDER BY n.id LIMIT" in q and "Paciente" in q
+        ]
+        # 7 pacientes em páginas de 3: 3 + 3 + 1
+        self.assertEqual(len(pages), 3)
+
+    def test_empty_schema_patterns_left_out(self):
+        """Test if schema combinations without relationships produce no files."""
+        manifest, _ = self.round_trip("ndjson")
+        self.assertEqual(
+            [rel["directory"] for rel in manifest["relationships"]],
+            ["Nutricionista-ATENDE-Paciente"],
+        )
+        self.assertFalse(
+            (self.dir / "relationships" / "Paciente-ATENDE-Paciente").exists()
+        )
+
+    def test_ndjson_round_trip(self):
+        """Test if re-importing an NDJSON dump writes the same nodes and relationships."""
+        _, counts = self.round_trip("ndjson")
+        self.assertEqual(counts["Paciente"], len(PATIENTS))
+        self.assertEqual(counts["Nutricionista-ATENDE-Paciente"], len(ATENDE))
+        self.assertCountEqual(self.written("MERGE (n:`Paciente`"), PATIENTS)
+        self.assertCountEqual(
+            self.written("MERGE (a)-[r:`ATENDE`]"),
+            [{"de": de, "para": para, "props": props} for de, para, props in ATENDE],
+        )
+
+    def test_csv_round_trip_keeps_types(self):
+        """Test if CSV cells keep their JSON types and absent properties stay absent."""
+        self.graph.nodes["Nutricionista"] = [
+            {"id": 1, "nome": "Ana", "experiencia": 8},
+            {"id": 2, "nome": "Carlos"},
+        ]
+        self.round_trip("csv")
+        self.assertCountEqual(
+            self.written("MERGE (n:`Nutricionista`"), self.graph.nodes["Nutricionista"]
+        )
+
+    def test_chunks_rotate(self):
+        """Test if long streams are split into several chunk files."""
+        rows = neo4j_dump.CHUNK_ROWS
+        neo4j_dump.CHUNK_ROWS = 2
+        self.addCleanup(setattr, neo4j_dump, "CHUNK_ROWS", rows)
+        manifest, counts = self.round_trip("ndjson")
+        self.assertEqual(len(manifest["nodes"]["Paciente"]["chunks"]), 4)
+        self.assertEqual(counts["Paciente"], len(PATIENTS))
+
+    def test_corrupted_chunk_rejected(self):
+        """Test if a chunk that differs from the manifest checksum is not imported."""
+        manifest = neo4j_dump.export_database(self.driver, self.dir, page_size=3)
+        checksums = manifest["nodes"]["Paciente"]["checksums"]
+        path = self.dir / "nodes" / "Paciente" / "000000.ndjson.gz"
+        self.assertEqual(checksums[path.name]["bytes"], path.stat().st_size)
+        path.write_bytes(path.read_bytes().replace(b"\x00", b"\x01", 1) + b"\x00")
+        with self.assertRaisesRegex(ValueError, "Chunk corrompido"):
+            neo4j_dump.import_database(self.driver, self.dir, max_workers=1)
+        self.assertEqual(self.written("MERGE (n:`Paciente`"), [])
+
+    def test_temporal_values_round_trip(self):
+        """Test if driver temporal types survive the JSON encoding."""
+        values = [
+            Date(2024, 3, 19),
+            DateTime(2024, 3, 19, 8, 30, 0),
+            Duration(days=7, seconds=60),
+        ]
+        encoded = neo4j_dump._dumps({"valores": values})
+        self.assertEqual(neo4j_dump._loads(encoded), {"valores": values})
+
+
+class Neo4jIncrementalDumpTests(unittest.TestCase):
+    """Test the deltas exported with --since and their replay on import."""
+
+    LATER = "2024-03-20T04:00:00+00:00"
+
+    def setUp(self):
+        """Build a base dump, then change one node, one relationship and delete some."""
+        self.graph = FakeGraph(
+            {"Paciente": [dict(p) for p in PATIENTS], "Nutricionista": NUTRITIONISTS},
+            {("Nutricionista", "ATENDE", "Paciente"): [list(r) for r in ATENDE]},
+            [{"reset": True, "deleted_at": "2024-01-01T00:00:00+00:00"}],
+        )
+        self.driver = FakeDriver(self.graph)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.dir = Path(self.tmp.name)
+        self.base = neo4j_dump.export_database(self.driver, self.dir / "base")
+
+        self.graph.nodes["Paciente"][2]["updated_at"] = self.LATER
+        self.graph.relationships[("Nutricionista", "ATENDE", "Paciente")][4][2] = {
+            "desde": "2024-03-20",
+            "updated_at": self.LATER,
+        }
+        self.graph.tombstones += [
+            {"rotulo": "Paciente", "id": 7, "deleted_at": self.LATER},
+            {
+                "origem": "Nutricionista",
+                "tipo": "ATENDE",
+                "destino": "Paciente",
+                "de": 2,
+                "para": 4,
+                "deleted_at": self.LATER,
+            },
+        ]
+
+    def test_delta_contains_only_churn(self):
+        """Test if the delta has the changed rows and the later tombstones only."""
+        delta = neo4j_dump.export_database(
+            self.driver, self.dir / "delta", since_dump=self.dir / "base"
+        )
+        self.assertEqual(self.base["kind"], "full")
+        self.assertNotIn("_Tombstone", self.base["nodes"])
+        self.assertEqual(
+            (delta["kind"], delta["parent"], delta["since"]),
+            ("incremental", str(Path("..") / "base"), self.base["watermark"]),
+        )
+        self.assertEqual(delta["nodes"]["Paciente"]["rows"], 1)
+        self.assertEqual(delta["nodes"]["Nutricionista"]["rows"], 0)
+        self.assertEqual([rel["rows"] for rel in delta["relationships"]], [1])
+        tombstones = neo4j_dump._loads(
+            (self.dir / "delta" / "tombstones.json").read_text(encoding="utf-8")
+        )
+        self.assertFalse(tombstones["reset"])
+        self.assertEqual(tombstones["nodes"], {"Paciente": [7]})
+        self.assertEqual(
+            [
+                (rel["tipo"], rel["de"], rel["para"])
+                for rel in tombstones["relationships"]
+            ],
+            [("ATENDE", 2, 4)],
+        )
+
+    def test_restore_replays_chain(self):
+        """Test if importing a delta restores the base, then deletes, then upserts."""
+        neo4j_dump.export_database(
+            self.driver, self.dir / "delta", since_dump=self.dir / "base"
+        )
+        counts = neo4j_dump.import_database(self.driver, self.dir / "delta")
+        self.assertEqual(counts["Paciente"], len(PATIENTS) + 1)
+        queries = [query for query, _ in self.graph.writes]
+        deleted = [i for i, query in enumerate(queries) if "DETACH DELETE n" in query]
+        merged = [
+            i for i, query in enumerate(queries) if "MERGE (n:`Paciente`" in query
+        ]
+        self.assertEqual(len(deleted), 1)
+        self.assertEqual(self.graph.writes[deleted[0]][1], [7])
+        # A remoção do delta vem depois da base e antes dos nós do delta
+        self.assertLess(merged[0], deleted[0])
+        self.assertLess(deleted[0], merged[-1])
+
+    def test_reset_replaces_graph(self):
+        """Test if a full reload after the base makes the delta replace the graph."""
+        self.graph.tombstones.append({"reset": True, "deleted_at": self.LATER})
+        neo4j_dump.export_database(
+            self.driver, self.dir / "delta", since_dump=self.dir / "base"
+        )
+        tombstones = neo4j_dump._loads(
+            (self.dir / "delta" / "tombstones.json").read_text(encoding="utf-8")
+        )
+        self.assertEqual(tombstones, {"reset": True, "nodes": {}, "relationships": []})
+        self.graph.queries.clear()
+        neo4j_dump.import_database(self.driver, self.dir / "delta")
+        drops = [q for q in self.graph.queries if q.startswith("MATCH (n) CALL")]
+        self.assertEqual(len(drops), 1)
+
+    def test_watermark_from_server_clock(self):
+        """Test if the watermark is the server time minus the safety margin."""
+        expected = NOW.to_native() - neo4j_dump.WATERMARK_MARGIN
+        self.assertEqual(self.base["watermark"], expected.isoformat())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+import tempfile
+import unittest
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
+
+import instrumentation
+import load_data
+import load_mongodb_data
+import parquet_export
+from graph_store import MemoryGraphStore
+from memory_mongo import MemoryClient
+from sync import TOMBSTONES, UPDATED_AT_FIELD
+
+if parquet_export.pa is not None:
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+
+
+@unittest.skipIf(parquet_export.pa is None, "pyarrow não instalado")
+class ParquetExportTests(unittest.TestCase):
+    """Test the partitioned Parquet export of both stores."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Load the canonical data into in-memory stores once."""
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.object(
+            instrumentation, "RUN_OUTPUT_DIR", tmp
+        ):
+            cls.store = MemoryGraphStore()
+            load_data.load_all_data(quiet=True, store=cls.store)
+            cls.client = MemoryClient()
+            load_mongodb_data.load_all_data(quiet=True, client=cls.client)
+
+    def setUp(self):
+        """Export into a temporary directory, with a zero watermark margin."""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        self.db = self.client[load_mongodb_data.MONGO_DB]
+        patcher = mock.patch.object(parquet_export, "WATERMARK_MARGIN", timedelta(0))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def export(self, **kwargs):
+        return parquet_export.export_all(self.db, self.store, self.dir, **kwargs)
+
+    def test_partitioned_by_month_and_patient(self):
+        """Test if meals land in month/patient-bucket partitions with every row."""
+        state = self.export()
+        self.assertEqual(
+            state["collections"]["meals"]["rows"], self.db.meals.count_documents({})
+        )
+        meal = self.db.meals.find_one({"_id": 1})
+        bucket = parquet_export.patient_bucket(meal["paciente_id"])
+        partition = (
+            self.dir / "meals" / f"mes={meal['data']:%Y-%m}" / f"paciente={bucket:02d}"
+        )
+        (path,) = partition.glob("part-*.parquet")
+        self.assertIn(1, pq.read_table(path).column("_id").to_pylist())
+
+        october = parquet_export.read_collection(
+            self.dir, "meals", ds.field("mes") == "2023-10"
+        )
+        self.assertEqual(
+            october.num_rows,
+            sum(
+                1
+                for doc in self.db.meals.find()
+                if doc["data"].strftime("%Y-%m") == "2023-10"
+            ),
+        )
+
+    def test_dictionary_encoded_row_groups(self):
+        """Test if string columns are dictionary encoded in the written files."""
+        self.export()
+        path = next((self.dir / "foods").glob("part-*.parquet"))
+        metadata = pq.ParquetFile(path).metadata
+        column = metadata.schema.names.index("grupo")
+        encodings = metadata.row_group(0).column(column).encodings
+        self.assertTrue(any("DICTIONARY" in encoding for encoding in encodings))
+        self.assertEqual(pq.read_table(path).column("carboidratos")[0].as_py(), 25.0)
+
+    def test_incremental_appends_changes_and_removals(self):
+        """Test if a second export only appends changed and removed documents."""
+        later = self.export()["watermark"] + timedelta(seconds=1)
+        self.db.meals.update_one(
+            {"_id": 1}, {"$set": {"calorias": 999, UPDATED_AT_FIELD: later}}
+        )
+        self.db.meals.delete_one({"_id": 2})
+        self.db[TOMBSTONES].insert_one(
+            {"collection": "meals", "document_id": 2, "deleted_at": later}
+        )
+        self.addCleanup(self._reload_mongo)
+
+        state = self.export()
+        self.assertEqual(state["collections"]["meals"]["mode"], "incremental")
+        self.assertEqual(state["collections"]["meals"]["rows"], 1)
+        self.assertEqual(state["collections"]["meals"]["removed"], 1)
+        self.assertEqual(state["collections"]["foods"]["rows"], 0)
+
+        meals = parquet_export.read_collection(self.dir, "meals")
+        by_id = {row["_id"]: row for row in meals.to_pylist()}
+        self.assertEqual(by_id[1]["calorias"], 999)
+        self.assertNotIn(2, by_id)
+        self.assertEqual(len(by_id), self.db.meals.count_documents({}))
+
+    def test_graph_relationships_rewritten(self):
+        """Test if each relationship pattern is exported once per run, by patient."""
+        self.export()
+        state = self.export()
+        consome = state["graph"]["Paciente-CONSOME-Refeicao"]
+        self.assertEqual(consome["rows"], self.store.count_relationships("CONSOME"))
+        table = ds.dataset(
+            self.dir / "grafo" / "Paciente-CONSOME-Refeicao", partitioning="hive"
+        ).to_table()
+        self.assertEqual(table.num_rows, consome["rows"])
+        contem = pq.read_table(
+            next((self.dir / "grafo" / "Receita-CONTEM-Alimento").glob("part-*"))
+        )
+        self.assertEqual(contem.column_names, ["de", "para", "quantidade"])
+
+    def _reload_mongo(self):
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.object(
+            instrumentation, "RUN_OUTPUT_DIR", tmp
+        ):
+            load_mongodb_data.load_all_data(quiet=True, client=self.client)
+
+
+if __name__ == "__main__":
+    unittest.main()
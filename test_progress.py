@@ -0,0 +1,133 @@
+import tempfile
+import unittest
+from datetime import datetime
+from unittest import mock
+
+import numpy as np
+
+import analytics
+import instrumentation
+import load_mongodb_data
+import progress
+from memory_mongo import MemoryClient
+
+
+class ProgressTests(unittest.TestCase):
+    """Test the vectorized measurement trends against per-patient computations."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Load the canonical data into an in-memory client once."""
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.object(
+            instrumentation, "RUN_OUTPUT_DIR", tmp
+        ):
+            client = MemoryClient()
+            load_mongodb_data.load_all_data(quiet=True, client=client)
+        cls.db = client[load_mongodb_data.MONGO_DB]
+        cls.heights = progress.patient_heights(cls.db)
+        cls.durations = progress.plan_durations(cls.db)
+
+    def setUp(self):
+        """Read the measurement columns."""
+        self.columns = analytics.MeasurementColumns.from_mongodb(self.db)
+
+    def test_rolling_mean_stays_within_patient(self):
+        """Test if the rolling mean averages only the patient's last measurements."""
+        average = progress.rolling_mean(self.columns, "weight", window=2)
+        part = self.columns.patient_slice(1)
+        np.testing.assert_allclose(average[part], [92, 90.75, 88.65])
+        first_of_2 = self.columns.patient_slice(2).start
+        self.assertEqual(average[first_of_2], 78)
+
+    def test_weekly_rate(self):
+        """Test if the weekly rate uses the days since the previous measurement."""
+        rate = progress.weekly_rate(self.columns, "weight")
+        part = rate[self.columns.patient_slice(1)]
+        self.assertTrue(np.isnan(part[0]))
+        self.assertAlmostEqual(part[1], (89.5 - 92) / 16 * 7)
+        self.assertTrue(np.isnan(rate[self.columns.patient_slice(2).start]))
+
+    def test_trend_matches_polyfit(self):
+        """Test if the per-patient least squares match np.polyfit on each patient."""
+        patients, first, intercept, slope = progress.trend(self.columns)
+        for i, patient in enumerate(patients):
+            part = self.columns.patient_slice(patient)
+            weeks = (self.columns.time[part] - first[i]) / progress.WEEK
+            expected = np.polyfit(weeks, self.columns["weight"][part], 1)
+            np.testing.assert_allclose([slope[i], intercept[i]], expected)
+
+    def test_projection_to_plan_end_and_goal(self):
+        """Test if the trend is projected to the plan end and to the goal weight."""
+        goals = {1: 80, 2: 90}
+        result = progress.project(self.columns, self.durations, goals)
+        i = result["patient"].tolist().index(1)
+        self.assertEqual(
+            result["plan_end"][i], np.datetime64(datetime(2023, 12, 14), "s")
+        )
+        _, _, intercept, slope = progress.trend(self.columns)
+        self.assertAlmostEqual(result["projected"][i], intercept[i] + slope[i] * 90 / 7)
+        self.assertGreater(result["goal_date"][i], np.datetime64("2023-10-15"))
+        # O paciente 2 perde peso, e a meta dele está acima: a reta não chega
+        j = result["patient"].tolist().index(2)
+        self.assertEqual(
+            result["plan_end"][j],
+            np.datetime64(datetime(2023, 9, 10), "s")
+            + np.timedelta64(self.durations[2], "D"),
+        )
+        self.assertTrue(np.isnat(result["goal_date"][j]))
+
+        no_plan = progress.project(self.columns, {})
+        self.assertTrue(np.all(np.isnat(no_plan["plan_end"])))
+        self.assertTrue(np.all(np.isnan(no_plan["projected"])))
+
+    def test_bmi_check_flags_wrong_imc(self):
+        """Test if the stored imc agrees with the BMI recomputed from altura."""
+        bmi, wrong = progress.bmi_check(self.columns, self.heights)
+        self.assertEqual(wrong.tolist(), [])
+        self.assertAlmostEqual(bmi[0], 92 / 1.78**2)
+
+        self.columns["bmi"][1] = 35.0
+        _, wrong = progress.bmi_check(self.columns, self.heights)
+        self.assertEqual(wrong.tolist(), [1])
+
+    def test_cache_invalidates_only_new_patients(self):
+        """Test if appending measurements recomputes only the patients in them."""
+        cache = progress.ProgressCache(self.columns, self.heights, self.durations)
+        before = cache.get(1)
+        other = cache.get(2)
+        self.assertIs(cache.get(1), before)
+
+        new = {
+            "paciente_id": 1,
+            "data": datetime(2023, 11, 1),
+            "peso": 86.0,
+            "imc": 27.1,
+            "medidas": {"cintura": 95, "quadril": 103},
+        }
+        cache.append(analytics.MeasurementColumns.from_rows([new]))
+        after = cache.get(1)
+        self.assertIs(cache.get(2), other)
+        self.assertEqual(after["weight"].tolist(), [92, 89.5, 87.8, 86.0])
+        self.assertEqual(after["hip"].tolist(), [106, 105, 104, 103])
+
+        fresh = progress.ProgressCache(
+            analytics.MeasurementColumns.from_rows([*self.db.measurements.find(), new]),
+            self.heights,
+            self.durations,
+        ).get(1)
+        np.testing.assert_allclose(after["weight_average"], fresh["weight_average"])
+        self.assertAlmostEqual(after["projected"], fresh["projected"])
+
+    def test_empty_columns(self):
+        """Test if the trends work with no measurements."""
+        empty = analytics.MeasurementColumns.from_rows([])
+        self.assertEqual(len(progress.rolling_mean(empty, "weight")), 0)
+        self.assertEqual(len(progress.weekly_rate(empty, "weight")), 0)
+        self.assertEqual(len(progress.project(empty, self.durations)["slope"]), 0)
+        self.assertIsNone(
+            progress.ProgressCache(empty, self.heights, self.durations).get(1)
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
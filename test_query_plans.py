@@ -0,0 +1,167 @@
+import re
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import query_plans
+from queries import MONGODB_QUERIES, NEO4J_QUERIES
+
+
+class QueryPlanCheckerTests(unittest.TestCase):
+    """Test plan parsing and flagging against the recorded plan fixtures."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Load the recorded plans once for all tests."""
+        cls.neo4j_plans, cls.mongodb_plans = query_plans.load_fixtures()
+
+    def test_fixtures_cover_all_documented_queries(self):
+        """Test if every recorded plan is of a documented query, and list the missing."""
+        self.assertLessEqual(set(self.neo4j_plans), set(NEO4J_QUERIES))
+        self.assertLessEqual(set(self.mongodb_plans), set(MONGODB_QUERIES))
+        missing = query_plans.missing_plans(self.neo4j_plans, self.mongodb_plans)
+        if missing:
+            self.skipTest(
+                "Sem plano gravado (rode python query_plans.py --record): "
+                + ", ".join(f"{database} {number}" for database, number in missing)
+            )
+
+    def test_neo4j_label_scan_flagged(self):
+        """Test if query 1 (Nutricionista by nome) is flagged as a label scan."""
+        flagged = query_plans.check_neo4j_plan(self.neo4j_plans[1])
+        self.assertEqual(flagged, ["NodeByLabelScan"])
+
+    def test_neo4j_cohort_scan_accepted(self):
+        """Test if the label scan of a cohort-wide query is flagged but accepted."""
+        flagged = query_plans.check_neo4j_plan(self.neo4j_plans[5])
+        self.assertEqual(flagged, ["NodeByLabelScan"])
+        self.assertIn(("Neo4j", 5, "NodeByLabelScan"), query_plans.load_baseline())
+
+    def test_mongodb_collscan_flagged(self):
+        """Test if query 4 (restricoes filter) is flagged as a COLLSCAN."""
+        flagged = query_plans.check_mongodb_plan(self.mongodb_plans[4])
+        self.assertEqual(flagged, ["COLLSCAN"])
+
+    def test_mongodb_in_memory_sort_flagged(self):
+        """Test if the in-memory SORT stage of query 2 is flagged."""
+        flagged = query_plans.check_mongodb_plan(self.mongodb_plans[2])
+        self.assertIn("SORT", flagged)
+
+    def test_operator_suffix_and_nesting(self):
+        """Test if runtime suffixes are stripped and children are visited."""
+        plan = {
+            "operatorType": "ProduceResults@neo4j",
+            "children": [
+                {
+                    "operatorType": "CartesianProduct@neo4j",
+                    "children": [
+                        {"operatorType": "NodeIndexSeek@neo4j", "children": []},
+                        {"operatorType": "AllNodesScan@neo4j", "children": []},
+                    ],
+                }
+            ],
+        }
+        self.assertEqual(
+            query_plans.check_neo4j_plan(plan), ["AllNodesScan", "CartesianProduct"]
+        )
+
+    def test_rejected_plans_ignored(self):
+        """Test if stages of rejected plans are not reported."""
+        explain = {
+            "queryPlanner": {
+                "winningPlan": {
+                    "stage": "FETCH",
+                    "inputStage": {"stage": "IXSCAN", "indexName": "paciente_id_1"},
+                },
+                "rejectedPlans": [{"stage": "COLLSCAN"}],
+            }
+        }
+        self.assertEqual(query_plans.mongodb_stages(explain), ["FETCH", "IXSCAN"])
+        self.assertEqual(query_plans.check_mongodb_plan(explain), [])
+
+    def test_cypher_queries_match_documentation(self):
+        """Test if every Cypher query is documented verbatim."""
+        path = Path(__file__).resolve().parent / "docs" / "consultas" / "neo4j.md"
+        docs = path.read_text(encoding="utf-8")
+        normalized_docs = re.sub(r"\s+", " ", docs)
+        for number, query in NEO4J_QUERIES.items():
+            normalized = re.sub(r"\s+", " ", query).strip()
+            self.assertIn(normalized, normalized_docs, f"Consulta {number}")
+
+    def test_fixtures_have_no_server_specific_fields(self):
+        """Test if recorded MongoDB plans carry no host or plan cache hashes."""
+        for number, explain in self.mongodb_plans.items():
+            self.assertEqual(query_plans.strip_volatile(explain), explain, number)
+
+
+class AcceptedFindingsTests(unittest.TestCase):
+    """Test the accepted-findings baseline used to gate new regressions."""
+
+    def test_recorded_fixtures_match_baseline(self):
+        """Test if the recorded plans produce no findings outside the baseline."""
+        findings = query_plans.check_plans(*query_plans.load_fixtures())
+        new, resolved = query_plans.compare_baseline(
+            findings, query_plans.load_baseline()
+        )
+        self.assertEqual(new, [])
+        self.assertEqual(resolved, [])
+        self.assertEqual(query_plans.stale_fixtures(), [])
+
+    def test_stale_fixture_reported(self):
+        """Test if a plan recorded for another version of its query is reported."""
+        neo4j_plans, mongodb_plans = query_plans.load_fixtures()
+        with tempfile.TemporaryDirectory() as directory:
+            query_plans.record_fixtures(neo4j_plans, mongodb_plans, directory)
+            self.assertEqual(query_plans.stale_fixtures(directory), [])
+            pipeline = [{"$lookup": {"from": "patients", "as": "paciente"}}]
+            with mock.patch.dict(
+                query_plans.NEO4J_QUERIES, {1: "MATCH (n) RETURN n"}
+            ), mock.patch.dict(
+                query_plans.MONGODB_QUERIES,
+                {3: {"collection": "meals", "pipeline": pipeline}},
+            ):
+                stale = query_plans.stale_fixtures(directory)
+        self.assertEqual(stale, [("Neo4j", 1), ("MongoDB", 3)])
+
+    def test_new_finding_reported(self):
+        """Test if only findings missing from the baseline are reported as new."""
+        baseline = {("MongoDB", 2, "COLLSCAN")}
+        findings = [
+            ("MongoDB", 2, ["COLLSCAN", "SORT"]),
+            ("Neo4j", 1, ["AllNodesScan"]),
+        ]
+        new, resolved = query_plans.compare_baseline(findings, baseline)
+        self.assertEqual(
+            new, [("MongoDB", 2, ["SORT"]), ("Neo4j", 1, ["AllNodesScan"])]
+        )
+        self.assertEqual(resolved, [])
+
+    def test_resolved_finding_reported(self):
+        """Test if accepted findings that no longer occur are reported."""
+        baseline = {("Neo4j", 1, "NodeByLabelScan")}
+        new, resolved = query_plans.compare_baseline([], baseline)
+        self.assertEqual(new, [])
+        self.assertEqual(resolved, [("Neo4j", 1, "NodeByLabelScan")])
+
+    def test_baseline_round_trip(self):
+        """Test if recorded findings are read back as the same baseline."""
+        findings = [
+            ("Neo4j", 3, ["NodeByLabelScan"]),
+            ("MongoDB", 6, ["COLLSCAN", "SORT"]),
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            query_plans.record_baseline(findings, directory)
+            baseline = query_plans.load_baseline(directory)
+        self.assertEqual(
+            baseline,
+            {
+                ("Neo4j", 3, "NodeByLabelScan"),
+                ("MongoDB", 6, "COLLSCAN"),
+                ("MongoDB", 6, "SORT"),
+            },
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+import tempfile
+import unittest
+from datetime import date, datetime
+from unittest import mock
+
+import instrumentation
+import load_data
+import load_mongodb_data
+import reminders
+import scheduling
+from graph_store import MemoryGraphStore
+from memory_mongo import MemoryClient
+
+# Véspera da consulta 4 (paciente 1, 01/11/2023 às 16h)
+EVE = datetime(2023, 10, 31, 18, 0)
+
+
+class ReminderTests(unittest.TestCase):
+    """Test the reminder job against both in-memory stores."""
+
+    def setUp(self):
+        """Load the canonical data into an in-memory client and graph store."""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patcher = mock.patch.object(instrumentation, "RUN_OUTPUT_DIR", tmp.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        client = MemoryClient()
+        load_mongodb_data.load_all_data(quiet=True, client=client)
+        self.db = client[load_mongodb_data.MONGO_DB]
+        self.store = MemoryGraphStore()
+        load_data.load_all_data(quiet=True, store=self.store)
+
+    def test_reminds_upcoming_appointment(self):
+        """Test if an appointment inside the window gets one reminder everywhere."""
+        totals = reminders.send_reminders(self.db, self.store, now=EVE)
+        self.assertEqual(totals, {"consultas": 1, "mensagens": 1, "grafo": 1})
+        (message,) = self.db.messages.find({"lembrete": {"$exists": True}})
+        self.assertEqual(message["conteudo"], "Lembrete: sua consulta é amanhã às 16h")
+        self.assertEqual(message["para"], {"id": 1, "nome": "João Pereira"})
+        inbox = self.db.inbox.find_one({"_id": "1:1"})
+        self.assertEqual((inbox["mensagens"], inbox["nao_lidas"]["paciente"]), (6, 1))
+        self.assertEqual(inbox["ultima"]["_id"], message["_id"])
+        (latest,) = self.store.latest_messages(1, 1, 1)
+        self.assertEqual(latest["id"], message["_id"])
+
+    def test_rerun_is_idempotent(self):
+        """Test if running the job twice does not duplicate reminders."""
+        reminders.send_reminders(self.db, self.store, now=EVE)
+        totals = reminders.send_reminders(
+            self.db, self.store, now=EVE.replace(minute=30)
+        )
+        self.assertEqual(totals, {"consultas": 1, "mensagens": 0, "grafo": 0})
+        self.assertEqual(self.db.messages.count_documents({}), 7)
+        self.assertEqual(self.db.inbox.find_one({"_id": "1:1"})["mensagens"], 6)
+        self.assertEqual(self.store.node("Conversa", "1:1")["mensagens"], 6)
+
+    def test_graph_catches_up(self):
+        """Test if a run that skipped the graph is completed by the next one."""
+        reminders.send_reminders(self.db, now=EVE)
+        later = EVE.replace(hour=20)
+        totals = reminders.send_reminders(self.db, self.store, now=later)
+        self.assertEqual(totals["grafo"], 1)
+        (latest,) = self.store.latest_messages(1, 1, 1)
+        self.assertEqual(latest["hora"], "18:00")
+
+    def test_window_and_order(self):
+        """Test if only appointments in the window are read, the soonest first."""
+        self.assertEqual(
+            reminders.send_reminders(self.db, now=datetime(2023, 10, 30, 12)),
+            {"consultas": 0, "mensagens": 0, "grafo": 0},
+        )
+        schedule = scheduling.Schedule.from_mongodb(self.db)
+        day = date(2023, 11, 2)
+        booked = schedule.book(
+            [
+                {"nutricionista_id": 2, "paciente_id": 2, "data": day, "hora": "10:30"},
+                {"nutricionista_id": 1, "paciente_id": 3, "data": day, "hora": "09:00"},
+                {"nutricionista_id": 1, "paciente_id": 1, "data": day, "hora": "20:00"},
+            ]
+        )
+        now = datetime(2023, 11, 1, 12)
+        due = [a["_id"] for a in reminders.due_appointments(self.db, now)]
+        self.assertEqual(due, [4, booked[1], booked[0]])
+        totals = reminders.send_reminders(self.db, now=now, chunk_size=2)
+        self.assertEqual(totals["mensagens"], 3)
+        self.assertIsNotNone(self.db.inbox.find_one({"_id": "1:3"}))
+
+    def test_graph_written_per_conversation(self):
+        """Test if a chunk is checked in one read and appended once per conversation."""
+        schedule = scheduling.Schedule.from_mongodb(self.db)
+        day = date(2023, 11, 2)
+        schedule.book(
+            [
+                {"nutricionista_id": 1, "paciente_id": 3, "data": day, "hora": "09:00"},
+                {"nutricionista_id": 2, "paciente_id": 2, "data": day, "hora": "10:30"},
+                {"nutricionista_id": 1, "paciente_id": 3, "data": day, "hora": "11:30"},
+            ]
+        )
+        with mock.patch.object(
+            self.store, "missing_nodes", wraps=self.store.missing_nodes
+        ) as missing, mock.patch.object(
+            self.store, "append_messages", wraps=self.store.append_messages
+        ) as append:
+            totals = reminders.send_reminders(
+                self.db, self.store, now=datetime(2023, 11, 1, 12)
+            )
+        self.assertEqual(totals["grafo"], 4)
+        self.assertEqual(missing.call_count, 1)
+        self.assertEqual(
+            sorted(call.args[:2] for call in append.call_args_list),
+            [(1, 1), (1, 3), (2, 2)],
+        )
+        thread = [m["conteudo"] for m in reversed(self.store.latest_messages(1, 3, 5))]
+        self.assertEqual(
+            thread,
+            [
+                "Lembrete: sua consulta é amanhã às 9h",
+                "Lembrete: sua consulta é amanhã às 11h30",
+            ],
+        )
+
+    def test_reminder_text(self):
+        """Test if the text says today, tomorrow or the date, with minutes."""
+        now = datetime(2023, 11, 1, 8)
+        text = reminders.reminder_text
+        self.assertEqual(
+            text(datetime(2023, 11, 1, 14, 30), now),
+            "Lembrete: sua consulta é hoje às 14h30",
+        )
+        self.assertEqual(
+            text(datetime(2023, 11, 3, 9), now),
+            "Lembrete: sua consulta é em 03/11 às 9h",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
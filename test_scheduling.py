@@ -0,0 +1,118 @@
+import tempfile
+import unittest
+from datetime import date, datetime
+from unittest import mock
+
+import instrumentation
+import load_mongodb_data
+import scheduling
+from memory_mongo import MemoryClient
+
+
+def request(nutritionist_id, patient_id, day, hour, duration=60):
+    return {
+        "nutricionista_id": nutritionist_id,
+        "paciente_id": patient_id,
+        "data": day,
+        "hora": hour,
+        "duracao": duration,
+    }
+
+
+def at(hour, minute=0):
+    return datetime(2023, 11, 1, hour, minute)
+
+
+class IntervalIndexTests(unittest.TestCase):
+    """Test the sorted-array interval index of one nutritionist."""
+
+    def setUp(self):
+        """Fill a schedule with overlapping and adjacent appointments."""
+        self.agenda = scheduling.NutritionistSchedule()
+        for appointment_id, (start, end) in enumerate(
+            [(9, 12), (10, 11), (13, 14), (14, 15)], start=1
+        ):
+            self.agenda.add(appointment_id, at(start), at(end))
+
+    def test_conflicts(self):
+        """Test if overlaps are found even behind a long earlier interval."""
+        self.assertEqual(self.agenda.conflicts(at(11, 30), at(12, 30)), [1])
+        self.assertEqual(self.agenda.conflicts(at(10, 30), at(13, 30)), [1, 2, 3])
+        self.assertEqual(self.agenda.conflicts(at(12), at(13)), [])
+        self.assertEqual(self.agenda.conflicts(at(15), at(16)), [])
+
+    def test_free_slots(self):
+        """Test if the gaps between opening and closing hours are listed."""
+        self.assertEqual(
+            self.agenda.free_slots(date(2023, 11, 1)),
+            [(at(8), at(9)), (at(12), at(13)), (at(15), at(18))],
+        )
+        self.assertEqual(self.agenda.free_slots(at(0), duration=90), [(at(15), at(18))])
+
+
+class ScheduleTests(unittest.TestCase):
+    """Test booking against the loaded appointments with optimistic concurrency."""
+
+    def setUp(self):
+        """Load the canonical data into an in-memory client."""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patcher = mock.patch.object(instrumentation, "RUN_OUTPUT_DIR", tmp.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        client = MemoryClient()
+        load_mongodb_data.load_all_data(quiet=True, client=client)
+        self.db = client[load_mongodb_data.MONGO_DB]
+        self.schedule = scheduling.Schedule.from_mongodb(self.db)
+
+    def test_loaded_appointments_block(self):
+        """Test if booked and done appointments block, and cancelled ones do not."""
+        self.assertEqual(self.schedule.conflicts(1, date(2023, 11, 1), "16:30"), [4])
+        self.assertEqual(self.schedule.conflicts(2, date(2023, 10, 25), "09:30"), [])
+
+    def test_book_batch(self):
+        """Test if a batch books free slots and rejects clashes within the batch."""
+        day = date(2023, 11, 2)
+        results = self.schedule.book(
+            [
+                request(1, 1, day, "09:00"),
+                request(1, 2, day, "09:30"),
+                request(2, 2, day, "09:30"),
+                request(1, 3, date(2023, 11, 1), "15:30"),
+            ]
+        )
+        self.assertEqual(results, [9, None, 10, None])
+        doc = self.db.appointments.find_one({"_id": 9})
+        self.assertEqual(doc["status"], "Agendada")
+        self.assertEqual(doc["paciente"], {"id": 1, "nome": "João Pereira"})
+        self.assertIn("updated_at", doc)
+        self.assertEqual(self.db[scheduling.AGENDAS].find_one({"_id": 1})["versao"], 1)
+        self.assertEqual(self.schedule.conflicts(1, day, "09:45", 15), [9])
+
+    def test_concurrent_booking_is_detected(self):
+        """Test if a stale schedule rereads the store instead of double-booking."""
+        other = scheduling.Schedule.from_mongodb(self.db)
+        day = date(2023, 11, 3)
+        self.assertEqual(other.book([request(1, 1, day, "10:00")]), [9])
+        self.assertEqual(self.schedule.book([request(1, 2, day, "10:30")]), [None])
+        # Sem colisão de _id, quem barra é a versão da agenda
+        stale = scheduling.Schedule.from_mongodb(self.db)
+        stale._next_id = 50
+        other.book([request(1, 3, day, "14:00")])
+        self.assertEqual(stale.book([request(1, 2, day, "14:30")]), [None])
+        self.assertIsNone(self.db.appointments.find_one({"_id": 50}))
+        self.assertEqual(self.schedule.book([request(1, 2, day, "11:00")]), [11])
+        self.assertEqual(
+            self.db.appointments.count_documents({"nutricionista_id": 1}), 7
+        )
+        self.assertEqual(self.db[scheduling.AGENDAS].find_one({"_id": 1})["versao"], 3)
+
+    def test_unknown_patient(self):
+        """Test if a request for a missing patient is rejected without writes."""
+        with self.assertRaises(ValueError):
+            self.schedule.book([request(1, 99, date(2023, 11, 2), "09:00")])
+        self.assertEqual(self.db.appointments.count_documents({}), 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
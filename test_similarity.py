@@ -0,0 +1,127 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+
+import analytics
+import instrumentation
+import load_mongodb_data
+import similarity
+from memory_mongo import MemoryClient
+
+
+def brute_force(vectors, k):
+    """The k most similar rows of each row from the full similarity matrix."""
+    scores = vectors @ vectors.T
+    np.fill_diagonal(scores, -np.inf)
+    return -np.sort(-scores, axis=1)[:, :k]
+
+
+class SimilarityTests(unittest.TestCase):
+    """Test the patient feature vectors and the blocked kNN."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Load the canonical data into an in-memory client once."""
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.object(
+            instrumentation, "RUN_OUTPUT_DIR", tmp
+        ):
+            client = MemoryClient()
+            load_mongodb_data.load_all_data(quiet=True, client=client)
+        cls.db = client[load_mongodb_data.MONGO_DB]
+
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+
+    def test_feature_matrix(self):
+        """Test if the features come from the meals and the measurements."""
+        meals = analytics.MealColumns.from_mongodb(self.db)
+        measurements = analytics.MeasurementColumns.from_mongodb(self.db)
+        macros = similarity.macro_shares(self.db)
+        matrix = similarity.feature_matrix([1, 2, 3], meals, measurements, macros)
+
+        self.assertEqual(matrix.shape, (3, len(similarity.FEATURES)))
+        np.testing.assert_allclose(matrix[:2, 0:3].sum(axis=1), [1, 1])
+        self.assertEqual(matrix[0, 3], 320 + 580 + 180 + 450)
+        self.assertEqual(matrix[0, 4], 0.75)
+        self.assertAlmostEqual(matrix[0, 6], (87.8 - 92) / 92 * 100)
+        self.assertTrue(np.isnan(matrix[2]).all())
+
+    def test_blocked_top_k_matches_brute_force(self):
+        """Test if small blocks find the same neighbours as the full matrix."""
+        raw = self.rng.normal(size=(700, 5))
+        vectors = similarity.normalize(raw, *similarity.fit_scale(raw))
+        idx, scores = similarity.top_k(vectors, k=8, block_elements=1000)
+        np.testing.assert_allclose(scores, brute_force(vectors, 8), atol=1e-6)
+        self.assertFalse((idx == np.arange(700)[:, None]).any())
+        np.testing.assert_allclose(
+            np.take_along_axis(vectors @ vectors.T, idx, axis=1), scores, atol=1e-6
+        )
+
+    def test_process_pool_matches_single_process(self):
+        """Test if splitting the query blocks across processes changes nothing."""
+        raw = self.rng.normal(size=(600, 4))
+        vectors = similarity.normalize(raw, *similarity.fit_scale(raw))
+        single = similarity.top_k(vectors, k=5)
+        pooled = similarity.top_k(vectors, k=5, workers=2)
+        np.testing.assert_array_equal(single[0], pooled[0])
+        np.testing.assert_array_equal(single[1], pooled[1])
+
+    def test_fewer_patients_than_k(self):
+        """Test if missing neighbours are marked with -1."""
+        vectors = similarity.normalize(np.eye(3), np.zeros(3), np.ones(3))
+        idx, scores = similarity.top_k(vectors, k=4)
+        self.assertEqual(idx[0].tolist()[2:], [-1, -1])
+        self.assertTrue(np.isneginf(scores[:, 2:]).all())
+
+    def test_incremental_update_matches_rebuild(self):
+        """Test if updating some vectors gives the neighbours of a full rebuild."""
+        raw = self.rng.normal(size=(500, 6))
+        index = similarity.SimilarityIndex(
+            np.arange(500) * 2, raw, k=6, slack=2, block_elements=2000
+        )
+        for step in range(10):
+            ids = self.rng.choice(500, 25, replace=False) * 2
+            ids = np.append(ids, 1000 + step * 2)  # um paciente novo a cada passo
+            recomputed = index.update(ids, self.rng.normal(size=(len(ids), 6)))
+            self.assertLess(recomputed, len(index))
+        self.assertEqual(len(index), 510)
+        np.testing.assert_allclose(
+            index.scores[:, :6], brute_force(index.vectors, 6), atol=1e-5
+        )
+        self.assertEqual(len(index.neighbours_of(1000)), 6)
+
+    def test_plan_suggestions(self):
+        """Test if the plans of similar successful patients are suggested."""
+        raw = np.array([[1.0, 0.0], [0.9, 0.1], [0.8, 0.3], [-1.0, 0.0], [0.0, 1.0]])
+        index = similarity.SimilarityIndex([1, 2, 3, 4, 5], raw, k=3)
+        plans = {2: 10, 3: 10, 4: 20, 5: 30}
+        suggestions = similarity.plan_suggestions(index, 1, plans, {2, 3, 4})
+        self.assertEqual([plan for plan, _, _ in suggestions], [10])
+        self.assertEqual(suggestions[0][2], [2, 3])
+
+    def test_save_and_load(self):
+        """Test if a saved index answers the same and keeps updating."""
+        raw = self.rng.normal(size=(50, 3))
+        index = similarity.SimilarityIndex(np.arange(50), raw, k=4)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "index.npz"
+            index.save(path)
+            loaded = similarity.SimilarityIndex.load(path)
+        self.assertEqual(loaded.neighbours_of(7), index.neighbours_of(7))
+        loaded.update([7], self.rng.normal(size=(1, 3)))
+        np.testing.assert_allclose(
+            loaded.scores[:, :4], brute_force(loaded.vectors, 4), atol=1e-5
+        )
+
+    def test_index_from_mongodb(self):
+        """Test if the index covers every patient of the canonical data."""
+        index = similarity.SimilarityIndex.from_mongodb(self.db, k=2)
+        self.assertEqual(index.ids.tolist(), [1, 2, 3, 4, 5])
+        self.assertEqual(len(index.neighbours_of(1)), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
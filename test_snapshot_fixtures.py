@@ -0,0 +1,155 @@
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import load_mongodb_data
+import snapshot_fixtures
+from memory_mongo import MemoryClient
+from sync import DATASET_SOURCES, UPDATED_AT_FIELD, with_hash
+
+
+def collection_ids(snapshot, name):
+    return sorted(doc["_id"] for doc in snapshot.collections[name])
+
+
+class RecordingTransaction:
+    def __init__(self):
+        self.queries = []
+
+    def run(self, query, **parameters):
+        self.queries.append((query, parameters))
+        return mock.Mock()
+
+
+class SnapshotFileTests(unittest.TestCase):
+    """Test building, writing and reading the fixture snapshot."""
+
+    def setUp(self):
+        """Point the snapshot directory to a temporary directory."""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patcher = mock.patch.object(snapshot_fixtures, "SNAPSHOT_DIR", Path(tmp.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        snapshot_fixtures.load_snapshot.cache_clear()
+        self.addCleanup(snapshot_fixtures.load_snapshot.cache_clear)
+
+    def test_round_trip(self):
+        """Test if a written snapshot reads back with the same data."""
+        built = snapshot_fixtures.build_dataset("digest")
+        path = snapshot_fixtures.snapshot_path(built.digest)
+        with mock.patch.object(snapshot_fixtures, "ROWS_PER_RECORD", 2):
+            snapshot_fixtures.write_snapshot(built, path)
+        read = snapshot_fixtures.read_snapshot(path)
+        self.assertEqual(read.digest, "digest")
+        self.assertEqual(read.nodes, built.nodes)
+        self.assertEqual(read.collections, built.collections)
+        self.assertEqual(
+            [tuple(rel) for rel in read.relationships],
+            [tuple(rel) for rel in built.relationships],
+        )
+
+    def test_snapshot_built_once(self):
+        """Test if an existing snapshot file is read instead of rebuilt."""
+        first = snapshot_fixtures.load_snapshot()
+        snapshot_fixtures.load_snapshot.cache_clear()
+        with mock.patch.object(snapshot_fixtures, "build_dataset") as build:
+            second = snapshot_fixtures.load_snapshot()
+        build.assert_not_called()
+        self.assertEqual(second.digest, first.digest)
+        self.assertEqual(second.nodes, first.nodes)
+
+    def test_digest_covers_dataset_sources(self):
+        """Test if a change to any module of the dataset invalidates the snapshot."""
+        self.assertEqual(
+            snapshot_fixtures.SOURCES, DATASET_SOURCES + ("snapshot_fixtures.py",)
+        )
+        root = Path(snapshot_fixtures.__file__).resolve().parent
+        for name in snapshot_fixtures.SOURCES:
+            self.assertTrue((root / name).is_file(), name)
+
+    def test_snapshot_keeps_loader_hashes(self):
+        """Test if restored records carry the _hash written by the loaders."""
+        snapshot = snapshot_fixtures.load_snapshot()
+        patient = snapshot.collections["patients"][0]
+        self.assertEqual(
+            patient["_hash"],
+            with_hash(load_mongodb_data.PATIENTS[0])["_hash"],
+        )
+        for _, _, _, rows in snapshot.relationships:
+            self.assertTrue(all("_hash" in row for row in rows))
+
+
+class RestoreTests(unittest.TestCase):
+    """Test restoring the snapshot into the stores."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Build the dataset once for every test."""
+        cls.snapshot = snapshot_fixtures.build_dataset("digest")
+
+    def test_restore_graph_in_one_transaction(self):
+        """Test if the graph is cleared and rebuilt with one statement per label and type."""
+        tx = RecordingTransaction()
+        snapshot_fixtures._restore_graph(tx, self.snapshot)
+        queries = [query for query, _ in tx.queries]
+        self.assertEqual(queries[0], "MATCH (n) DETACH DELETE n")
+        self.assertEqual(
+            len(queries),
+            1 + len(self.snapshot.nodes) + len(self.snapshot.relationships),
+        )
+        self.assertNotIn("MERGE", "".join(queries))
+
+    def test_restore_mongodb_in_memory(self):
+        """Test if the collections are replaced by the snapshot documents."""
+        db = MemoryClient().db
+        db.patients.insert_one({"_id": 99, "nome": "Fora do snapshot"})
+        db.extra.insert_one({"_id": 1})
+
+        start = time.perf_counter()
+        snapshot_fixtures.restore_mongodb(db, self.snapshot)
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(
+            sorted(db.patients.distinct("_id")),
+            collection_ids(self.snapshot, "patients"),
+        )
+        self.assertEqual(
+            db.patients.find_one({"_id": 1})[UPDATED_AT_FIELD],
+            self.snapshot.created_at,
+        )
+        self.assertNotIn(UPDATED_AT_FIELD, self.snapshot.collections["patients"][0])
+        self.assertLess(elapsed, 1.0)
+
+
+@mock.patch.object(snapshot_fixtures, "BACKEND", "memory")
+class MemoryBackendTests(unittest.TestCase):
+    """Test the MongoDB fixture test case with the in-memory backend."""
+
+    def setUp(self):
+        """Drop the shared client so the memory backend is picked up."""
+        snapshot_fixtures.mongo_client.cache_clear()
+        self.addCleanup(snapshot_fixtures.mongo_client.cache_clear)
+
+    def test_each_test_starts_from_the_snapshot(self):
+        """Test if changes made by one test are gone in the next."""
+
+        class Fixture(snapshot_fixtures.MongoSnapshotTestCase):
+            def test_a_delete(self):
+                self.db.patients.delete_many({})
+                self.assertEqual(self.db.patients.count_documents({}), 0)
+
+            def test_b_count(self):
+                self.assertEqual(self.db.patients.count_documents({}), 5)
+
+        suite = unittest.defaultTestLoader.loadTestsFromTestCase(Fixture)
+        result = unittest.TestResult()
+        suite.run(result)
+        self.assertEqual(result.failures + result.errors, [])
+        self.assertEqual(result.testsRun, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
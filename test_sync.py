@@ -0,0 +1,76 @@
+import unittest
+from datetime import datetime
+
+from sync import HASH_FIELD, content_hash, plan_sync, with_hash
+
+
+class ContentHashTests(unittest.TestCase):
+    """Test the canonical content hash used by the sync mode."""
+
+    def test_hash_ignores_key_order(self):
+        """Test if the hash does not depend on the order of the fields."""
+        self.assertEqual(
+            content_hash({"id": 1, "nome": "Ana"}),
+            content_hash({"nome": "Ana", "id": 1}),
+        )
+
+    def test_hash_ignores_stored_hash(self):
+        """Test if hashing a record that already carries _hash is stable."""
+        record = {"_id": 1, "data": datetime(2024, 1, 15, 8, 30)}
+        self.assertEqual(content_hash(with_hash(record)), content_hash(record))
+
+    def test_hash_ignores_updated_at(self):
+        """Test if the loaders' updated_at stamp does not change the hash."""
+        record = {"_id": 1, "nome": "Ana"}
+        stamped = {**record, "updated_at": datetime(2025, 3, 19, 23, 24)}
+        self.assertEqual(content_hash(stamped), content_hash(record))
+
+    def test_hash_changes_with_content(self):
+        """Test if changing a value changes the hash."""
+        self.assertNotEqual(
+            content_hash({"id": 1, "peso": 70.5}), content_hash({"id": 1, "peso": 70.0})
+        )
+
+
+class PlanSyncTests(unittest.TestCase):
+    """Test the comparison between canonical records and stored hashes."""
+
+    def setUp(self):
+        """Build canonical records and a target where all of them are stored."""
+        self.records = [{"id": 1, "nome": "Ana"}, {"id": 2, "nome": "Carlos"}]
+        self.stored = {r["id"]: content_hash(r) for r in self.records}
+
+    def plan(self, records, stored):
+        return plan_sync(records, stored, lambda r: r["id"])
+
+    def test_unchanged_records_skipped(self):
+        """Test if records with matching hashes are skipped."""
+        plan = self.plan(self.records, self.stored)
+        self.assertEqual((plan.upserts, plan.deletes, plan.skipped), ([], [], 2))
+
+    def test_new_and_changed_records_written(self):
+        """Test if new and changed records are written with their hash."""
+        records = [
+            {"id": 1, "nome": "Ana Silva"},
+            {"id": 2, "nome": "Carlos"},
+            {"id": 3, "nome": "Mariana"},
+        ]
+        plan = self.plan(records, self.stored)
+        self.assertEqual([r["id"] for r in plan.upserts], [1, 3])
+        self.assertEqual(plan.upserts[0][HASH_FIELD], content_hash(records[0]))
+        self.assertEqual(plan.skipped, 1)
+
+    def test_records_without_hash_rewritten(self):
+        """Test if records loaded before the sync mode existed are rewritten."""
+        plan = self.plan(self.records, {1: None, 2: None})
+        self.assertEqual(len(plan.upserts), 2)
+
+    def test_removed_records_deleted(self):
+        """Test if records missing from the canonical data are deleted."""
+        plan = self.plan(self.records[:1], self.stored)
+        self.assertEqual(plan.deletes, [2])
+        self.assertEqual(plan.skipped, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()